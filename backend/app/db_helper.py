@@ -3,7 +3,7 @@ import os
 import asyncpg
 from typing import List, Dict, Optional
 from contextlib import asynccontextmanager
-from datetime import datetime
+from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
@@ -159,6 +159,33 @@ async def _has_provenance_columns(conn) -> bool:
     return _HAS_PROVENANCE_COLUMNS
 
 
+# Same idea for migration 011 (prefetch queue state and proposal excerpts).
+_HAS_PREFETCH_COLUMNS: Optional[bool] = None
+
+
+async def _has_prefetch_columns(conn) -> bool:
+    global _HAS_PREFETCH_COLUMNS
+    if _HAS_PREFETCH_COLUMNS is None:
+        _HAS_PREFETCH_COLUMNS = bool(
+            await conn.fetchval(
+                '''
+                SELECT COUNT(*) = 2 FROM information_schema.columns
+                WHERE (table_name = 'correction_histories'
+                       AND column_name = 'prefetch_state')
+                   OR (table_name = 'ai_proposals'
+                       AND column_name = 'source_excerpt')
+                '''
+            )
+        )
+        if not _HAS_PREFETCH_COLUMNS:
+            logger.warning(
+                "correction_histories.prefetch_state/ai_proposals.source_excerpt "
+                "are missing; nothing is prefetched. Apply 011_prefetch_queue.sql "
+                "to enable it."
+            )
+    return _HAS_PREFETCH_COLUMNS
+
+
 def _history_columns(with_provenance: bool) -> str:
     """Projection shared by every history read."""
     provenance = (
@@ -267,6 +294,15 @@ async def insert_history(history):
         if with_provenance:
             columns += ['llm_provider', 'llm_model']
             values += [history.get('llm_provider'), history.get('llm_model')]
+        # Only a pending round can wait for prefetch; the column is NULL
+        # otherwise, so it is named only when a client queues one.
+        if (
+            history.get('awaiting_prefetch')
+            and status == 'pending'
+            and await _has_prefetch_columns(conn)
+        ):
+            columns.append('prefetch_state')
+            values.append(PREFETCH_QUEUED)
         placeholders = ', '.join(f'${i}' for i in range(1, len(values) + 1))
         await conn.execute(
             f'''
@@ -490,6 +526,302 @@ async def upsert_provider_health(records):
         )
 
 
+async def fetch_provider_latency():
+    """
+    Read the learned per-model latency snapshots (migration 009).
+
+    A missing table reads as "nothing learned yet": the providers then plan with
+    their static timeouts exactly as before the table existed.
+    """
+    async with get_db() as conn:
+        try:
+            rows = await conn.fetch(
+                '''
+                SELECT
+                    provider,
+                    model,
+                    size_bucket AS "sizeBucket",
+                    ewma_s AS "ewmaS",
+                    samples,
+                    histogram
+                FROM provider_latency
+                '''
+            )
+        except asyncpg.exceptions.UndefinedTableError:
+            logger.warning("provider_latency missing; using static provider timeouts")
+            return []
+        return [dict(row) for row in rows]
+
+
+async def upsert_provider_latency(records):
+    """
+    Store this process's latency snapshots, one row per (provider, model, size).
+
+    Last writer wins: each snapshot is a decayed summary of recent calls, so the
+    newest one is the best single estimate and there is nothing to merge.
+
+    `records` items are (provider, model, size_bucket, ewma_s, samples, histogram).
+    """
+    if not records:
+        return
+    async with get_db() as conn:
+        await conn.executemany(
+            '''
+            INSERT INTO provider_latency (
+                provider, model, size_bucket, ewma_s, samples, histogram, updated_at
+            )
+            VALUES ($1, $2, $3, $4, $5, $6, NOW())
+            ON CONFLICT (provider, model, size_bucket) DO UPDATE
+                SET ewma_s = EXCLUDED.ewma_s,
+                    samples = EXCLUDED.samples,
+                    histogram = EXCLUDED.histogram,
+                    updated_at = EXCLUDED.updated_at
+            ''',
+            list(records),
+        )
+
+
+async def acquire_generation_lease(lease_key, holder, ttl_s):
+    """
+    Take the generation lease for `lease_key` unless a live one exists (migration 010).
+
+    An expired lease — its holder died or its result is stale — is taken over
+    in the same statement, so two processes can never both win.
+    Returns whether `holder` now owns the lease.
+    """
+    async with get_db() as conn:
+        row = await conn.fetchrow(
+            '''
+            INSERT INTO generation_leases (lease_key, holder, expires_at, result)
+            VALUES ($1, $2, NOW() + make_interval(secs => $3), NULL)
+            ON CONFLICT (lease_key) DO UPDATE
+                SET holder = EXCLUDED.holder,
+                    expires_at = EXCLUDED.expires_at,
+                    result = NULL
+                WHERE generation_leases.expires_at <= NOW()
+            RETURNING holder
+            ''',
+            lease_key,
+            holder,
+            float(ttl_s),
+        )
+        return row is not None and row["holder"] == holder
+
+
+async def fetch_generation_lease(lease_key):
+    """
+    Read a generation lease: {"result": json text or None, "expired": bool}, or
+    None when there is no lease (it was released).
+    """
+    async with get_db() as conn:
+        row = await conn.fetchrow(
+            '''
+            SELECT result, expires_at <= NOW() AS expired
+            FROM generation_leases
+            WHERE lease_key = $1
+            ''',
+            lease_key,
+        )
+        return dict(row) if row else None
+
+
+async def complete_generation_lease(lease_key, holder, result_json, keep_s):
+    """Publish the finished result; waiters can read it for `keep_s` seconds."""
+    async with get_db() as conn:
+        await conn.execute(
+            '''
+            UPDATE generation_leases
+            SET result = $3, expires_at = NOW() + make_interval(secs => $4)
+            WHERE lease_key = $1 AND holder = $2
+            ''',
+            lease_key,
+            holder,
+            result_json,
+            float(keep_s),
+        )
+
+
+async def release_generation_lease(lease_key, holder):
+    """Drop a lease whose generation failed, so waiters generate for themselves."""
+    async with get_db() as conn:
+        await conn.execute(
+            'DELETE FROM generation_leases WHERE lease_key = $1 AND holder = $2',
+            lease_key,
+            holder,
+        )
+
+
+# --- Prefetched suggestions (app/llm/prefetch.py) ----------------------------
+# A round queued for prefetch is a pending history whose `prefetch_state`
+# (migration 011) is 'queued'. Once filled it is 'ready' until a client adopts
+# it, and NULL after that. `provider` is never used for this: a prefetched
+# round records the transport that produced it ('api') like any other. Its
+# proposals are ordinary AI proposals that also keep the model's source
+# excerpts.
+
+PREFETCH_QUEUED = 'queued'
+PREFETCH_READY = 'ready'
+
+
+async def fetch_unprefetched_histories(limit):
+    """Oldest histories queued for prefetch that have no proposals yet."""
+    async with get_db() as conn:
+        if not await _has_prefetch_columns(conn):
+            return []
+        rows = await conn.fetch(
+            '''
+            SELECT
+                h.history_id AS "historyId",
+                h.session_id AS "sessionId",
+                h.original_text AS "originalText",
+                h.target_text AS "targetText"
+            FROM correction_histories h
+            WHERE h.prefetch_state = $2
+              AND h.status = 'pending'
+              AND h.is_archived = false
+              AND h.target_text IS NOT NULL
+              AND NOT EXISTS (
+                  SELECT 1 FROM ai_proposals p WHERE p.history_id = h.history_id
+              )
+            ORDER BY h.timestamp ASC
+            LIMIT $1
+            ''',
+            int(limit),
+            PREFETCH_QUEUED,
+        )
+        return [dict(row) for row in rows]
+
+
+async def store_prefetched_suggestions(
+    history_id, proposals, overall_comment, llm_provider=None, llm_model=None
+):
+    """
+    Attach prefetched proposals and the overall comment to a queued history.
+
+    Done in one transaction that re-checks the row is still queued, pending and
+    without proposals, so a round the reviewer generated in the meantime is
+    never given a second set. Returns whether the proposals were stored.
+    """
+    async with get_db() as conn:
+        if not await _has_prefetch_columns(conn):
+            return False
+        with_provenance = await _has_provenance_columns(conn)
+        async with conn.transaction():
+            row = await conn.fetchrow(
+                '''
+                SELECT history_id FROM correction_histories h
+                WHERE h.history_id = $1
+                  AND h.prefetch_state = $2
+                  AND h.status = 'pending'
+                  AND h.is_archived = false
+                  AND NOT EXISTS (
+                      SELECT 1 FROM ai_proposals p WHERE p.history_id = h.history_id
+                  )
+                FOR UPDATE
+                ''',
+                history_id,
+                PREFETCH_QUEUED,
+            )
+            if row is None:
+                return False
+            now = datetime.now()
+            await conn.executemany(
+                '''
+                INSERT INTO ai_proposals (
+                    proposal_id, history_id, type,
+                    original_after_text, original_reason,
+                    modified_after_text, modified_reason,
+                    is_selected, is_modified, is_custom, selected_order, created_at,
+                    source_excerpt
+                )
+                VALUES ($1, $2, 'AI', $3, $4, $3, $4, false, false, false, NULL, $5, $6)
+                ''',
+                [
+                    # Distinct timestamps keep the model's order on read-back.
+                    (p['proposalId'], history_id, p['originalAfterText'],
+                     p.get('originalReason'), now + timedelta(microseconds=i),
+                     p.get('sourceExcerpt'))
+                    for i, p in enumerate(proposals)
+                ],
+            )
+            set_parts = [
+                'prefetch_state = $2',
+                'overall_comment = $3',
+                'combined_comment = $3',
+                # Generated by the server API, like a round from /suggestions.
+                "provider = 'api'",
+            ]
+            params = [history_id, PREFETCH_READY, overall_comment]
+            if with_provenance:
+                set_parts += ['llm_provider = $4', 'llm_model = $5']
+                params += [llm_provider, llm_model]
+            await conn.execute(
+                f'''
+                UPDATE correction_histories
+                SET {", ".join(set_parts)}
+                WHERE history_id = $1
+                ''',
+                *params,
+            )
+            return True
+
+
+async def claim_prefetched_history(session_id, original_text, target_text):
+    """
+    Hand a prefetched round for this exact SOURCE/TARGET to one client.
+
+    The row's `prefetch_state` is cleared in the same statement that finds it,
+    so two clicks can never adopt the same round.
+    Returns the history (camelCase) with its `proposals`, or None.
+    """
+    async with get_db() as conn:
+        # Nothing is prefetched before migration 011, and the proposal read
+        # below names its column.
+        if not await _has_prefetch_columns(conn):
+            return None
+        columns = _history_columns(await _has_provenance_columns(conn))
+        row = await conn.fetchrow(
+            f'''
+            UPDATE correction_histories
+            SET prefetch_state = NULL
+            WHERE history_id = (
+                SELECT history_id FROM correction_histories
+                WHERE session_id = $1
+                  AND original_text = $2
+                  AND target_text = $3
+                  AND status = 'pending'
+                  AND is_archived = false
+                  AND prefetch_state = '{PREFETCH_READY}'
+                ORDER BY timestamp DESC
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING {columns}
+            ''',
+            session_id,
+            original_text,
+            target_text,
+        )
+        if row is None:
+            return None
+        history = dict(row)
+        proposals = await conn.fetch(
+            '''
+            SELECT
+                proposal_id AS "proposalId",
+                original_after_text AS "originalAfterText",
+                original_reason AS "originalReason",
+                source_excerpt AS "sourceExcerpt"
+            FROM ai_proposals
+            WHERE history_id = $1
+            ORDER BY created_at ASC
+            ''',
+            history['historyId'],
+        )
+        history['proposals'] = [dict(p) for p in proposals]
+        return history
+
+
 # 提案一覧取得（フル field set, camelCase)
 async def fetch_proposals_by_history(history_id):
     async with get_db() as conn:
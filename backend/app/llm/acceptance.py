@@ -0,0 +1,107 @@
+"""
+Partial acceptance of suggestion bodies with a few bad items.
+
+`suggestions._content_usable()` is all-or-nothing: one `reason` written in
+Japanese among fifteen good ones sends the chain to the next provider and, if
+that fails too, round another full pass. With an acceptance policy configured,
+a body whose items mostly pass the per-item checks (`parser.suggestion_problems`)
+is returned at once instead:
+
+- `SUGGESTIONS_ACCEPT_POLICY=drop` removes the failing items;
+- `SUGGESTIONS_ACCEPT_POLICY=flag` keeps them, each with a `problems` list.
+
+Either way the response lists every affected item under `itemDiagnostics`
+(`{"id", "problems", "action"}`). `SUGGESTIONS_ACCEPT_MIN_SHARE` (default 0.8)
+is the share of items that must pass. A body that does not parse or whose
+`overallComment` fails its checks is never partially accepted — nothing in it
+can be trusted item by item. Unset (the default), behaviour is unchanged.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from typing import List, Optional, Tuple
+
+from .parser import (
+    ParsedResponse,
+    is_json_extraction_failure,
+    overall_comment_problems,
+    suggestion_problems,
+)
+
+logger = logging.getLogger(__name__)
+
+ACCEPT_POLICY_ENV = "SUGGESTIONS_ACCEPT_POLICY"
+ACCEPT_MIN_SHARE_ENV = "SUGGESTIONS_ACCEPT_MIN_SHARE"
+
+POLICIES = ("off", "drop", "flag")
+DEFAULT_MIN_SHARE = 0.8
+
+
+def acceptance_policy() -> str:
+    """`SUGGESTIONS_ACCEPT_POLICY`: `off` (default), `drop` or `flag`."""
+    policy = (os.environ.get(ACCEPT_POLICY_ENV) or "off").strip().lower()
+    if policy not in POLICIES:
+        logger.warning("Ignoring unknown %s=%r", ACCEPT_POLICY_ENV, policy)
+        return "off"
+    return policy
+
+
+def acceptance_min_share() -> float:
+    raw = (os.environ.get(ACCEPT_MIN_SHARE_ENV) or "").strip()
+    if not raw:
+        return DEFAULT_MIN_SHARE
+    try:
+        share = float(raw)
+    except ValueError:
+        share = -1.0
+    if not 0.0 < share <= 1.0:
+        logger.warning("Ignoring %s=%r", ACCEPT_MIN_SHARE_ENV, raw)
+        return DEFAULT_MIN_SHARE
+    return share
+
+
+def accept_partially(
+    result: ParsedResponse,
+) -> Optional[Tuple[ParsedResponse, Tuple[dict, ...]]]:
+    """
+    The body to return under the acceptance policy, with per-item diagnostics.
+
+    None when the policy is off, the body is not eligible, no item fails, or
+    too few items pass — the caller then treats it as unusable as before.
+    """
+    policy = acceptance_policy()
+    if policy == "off":
+        return None
+    if is_json_extraction_failure(result) or overall_comment_problems(result):
+        return None
+    suggestions = result["suggestions"]
+    problems = [suggestion_problems(s) for s in suggestions]
+    failing = sum(1 for p in problems if p)
+    if not suggestions or not failing:
+        return None
+    passing_share = (len(suggestions) - failing) / len(suggestions)
+    if passing_share < acceptance_min_share():
+        return None
+
+    action = "dropped" if policy == "drop" else "flagged"
+    kept: List[dict] = []
+    diagnostics = []
+    for suggestion, item_problems in zip(suggestions, problems):
+        if item_problems:
+            diagnostics.append(
+                {"id": suggestion["id"], "problems": item_problems, "action": action}
+            )
+            if policy == "drop":
+                continue
+            suggestion = {**suggestion, "problems": item_problems}
+        kept.append(suggestion)
+    logger.info(
+        "Accepting body with %s/%s item(s) %s (%.0f%% passed)",
+        failing,
+        len(suggestions),
+        action,
+        passing_share * 100,
+    )
+    return {**result, "suggestions": kept}, tuple(diagnostics)
@@ -0,0 +1,144 @@
+"""
+Batch generation: many (SOURCE, TARGET, exemplar) items under one request.
+
+Reviewers queue many paragraphs at once, and as independent `/suggestions`
+requests they all start together, race for the same first key of the same
+first provider, and collect 429s that then cool that key down for everyone. A
+batch is scheduled instead: at most as many items are in flight as the first
+provider the chain will call has (credential, model) pairs not known to be
+cooled down (`key_pool.ready_pair_count`). Every item starts the chain there,
+so pairs of later providers add nothing to how many can start without racing.
+That bound is re-read before every item starts, so a 429 seen by one item
+immediately narrows how many run, and recovery widens it again. Round-robin in
+`key_pool._acquire` then spreads the in-flight items across those pairs.
+
+The batch shares one platform deadline: it is a single HTTP invocation. An item
+is started only while `BATCH_ITEM_MIN_BUDGET_S` remain, and items that cannot
+start are reported as not attempted so the client can resubmit just those.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Set
+
+from .budget import seconds_left
+from .suggestions import (
+    SuggestionsError,
+    first_provider_ready_pairs,
+    generate_suggestions,
+)
+
+logger = logging.getLogger(__name__)
+
+# Largest batch one request accepts. Every item shares the single invocation's
+# wall clock, so a larger batch would mostly produce "not attempted" items.
+BATCH_MAX_ITEMS = 20
+
+# Upper bound on concurrent items whatever the pools allow, so a large pool
+# cannot turn one request into a burst the platform's connection limits reject.
+BATCH_MAX_CONCURRENCY = 8
+
+# An item is not started with less budget than this left: one provider answer
+# plus parsing. Starting later only turns "not attempted" into "timed out"
+# after spending quota.
+BATCH_ITEM_MIN_BUDGET_S = 10.0
+
+# Error reported for items the deadline did not allow to start.
+NOT_ATTEMPTED_ERROR = "Not attempted: the batch ran out of time; resubmit this item"
+
+
+def batch_concurrency() -> int:
+    """
+    How many items may be in flight right now.
+
+    The ready (credential, model) pairs of the first provider in `CHAIN_ORDER`
+    that is configured and not wholly cooled down, capped at
+    `BATCH_MAX_CONCURRENCY`, and never below 1: when everything is cooled down
+    the chain's last-resort release still makes one attempt worthwhile.
+    """
+    ready = first_provider_ready_pairs()
+    if ready is None:
+        return 1
+    return max(1, min(ready, BATCH_MAX_CONCURRENCY))
+
+
+def _item_error(index: int, error: str, *, status: int, **extra) -> dict:
+    return {"index": index, "ok": False, "status": status, "error": error, **extra}
+
+
+async def run_batch(
+    items: Sequence[dict],
+    *,
+    system_prompt_override: Optional[str] = None,
+    deadline_monotonic: Optional[float] = None,
+    error_details=None,
+) -> AsyncIterator[dict]:
+    """
+    Generate every item, yielding per-item results as they complete.
+
+    `items` are request-shaped dicts (`originalText`, `targetText`, optional
+    `exemplarTranslation`). Each yielded dict carries the item's `index` and
+    either `ok: True` with the `result` body, or `ok: False` with an HTTP-style
+    `status` and `error`. `error_details(exc)` may add fields for a
+    `SuggestionsError`, so batch items explain failures the same way the
+    single-item endpoint does.
+    """
+    pending: List[int] = []
+    for index, item in enumerate(items):
+        if not (item.get("originalText") and item.get("targetText")):
+            yield _item_error(
+                index, "originalText and targetText are required", status=400
+            )
+        else:
+            pending.append(index)
+
+    async def run(index: int) -> dict:
+        item = items[index]
+        try:
+            result = await generate_suggestions(
+                item["originalText"],
+                item["targetText"],
+                (item.get("exemplarTranslation") or "").strip(),
+                system_prompt_override,
+                deadline_monotonic=deadline_monotonic,
+                # Batch items are already paragraph-sized; chunking them would
+                # multiply calls against the pool this scheduler is rationing.
+                chunk_paragraphs=False,
+            )
+        except SuggestionsError as e:
+            logger.warning("Batch item %s failed: %s", index, e)
+            extra: Dict = dict(error_details(e)) if error_details else {}
+            extra.pop("error", None)
+            return _item_error(index, str(e), status=503, **extra)
+        except Exception as e:
+            # One item's bug must not end the stream and lose every other item.
+            logger.exception("Batch item %s failed unexpectedly", index)
+            return _item_error(index, f"Unexpected error: {e}", status=500)
+        return {"index": index, "ok": True, "result": result}
+
+    running: Set[asyncio.Task] = set()
+    queue = list(pending)
+    try:
+        while queue or running:
+            while queue and len(running) < batch_concurrency():
+                if seconds_left(deadline_monotonic) < BATCH_ITEM_MIN_BUDGET_S:
+                    break
+                running.add(asyncio.create_task(run(queue.pop(0))))
+            if not running:
+                # Nothing in flight and no budget to start more.
+                for index in queue:
+                    yield _item_error(index, NOT_ATTEMPTED_ERROR, status=503)
+                queue.clear()
+                break
+            done, running = await asyncio.wait(
+                running, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                yield task.result()
+    finally:
+        # A consumer that stops reading (client gone) must not leave calls
+        # spending quota in the background.
+        for task in running:
+            task.cancel()
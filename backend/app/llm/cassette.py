@@ -0,0 +1,326 @@
+"""
+Record/replay of provider HTTP traffic ("cassettes").
+
+Tests mock providers at the function level and the `live_*` scripts need real
+keys and network, so nothing exercised the real request/response shapes
+offline, and a pipeline benchmark could not be repeated. With
+`LLM_CASSETTE_MODE` set, every `httpx.AsyncClient` the providers open gets a
+transport from `cassette_transport()`:
+
+- `record`: requests go to the network as usual and each exchange is written
+  to `LLM_CASSETTE_DIR` (one JSON file per distinct request) together with how
+  long the upstream took. Credentials never reach disk: auth headers are not
+  stored, and the API key / Cloudflare account id are replaced by `REDACTED`
+  wherever they appear in the URL or bodies.
+- `replay`: no network at all. A request is answered from its cassette after
+  sleeping the recorded latency times `LLM_CASSETTE_LATENCY_SCALE` (default 1,
+  `0` answers at once), so deadlines and timeouts behave as they did live.
+
+A request is matched on method, redacted URL and JSON body. Model rotation is
+random, so a replayed request may name a different model than was recorded;
+it then falls back to a recording of the same host and body minus the model
+(logged). Repeated identical requests replay their recorded responses in
+order — a 429 followed by a 200 stays that way — and the last one repeats.
+A request with no recording fails as a connection error, which the providers
+already treat as a failed attempt.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_MODE_ENV = "LLM_CASSETTE_MODE"
+CASSETTE_DIR_ENV = "LLM_CASSETTE_DIR"
+CASSETTE_LATENCY_SCALE_ENV = "LLM_CASSETTE_LATENCY_SCALE"
+
+MODES = ("off", "record", "replay")
+DEFAULT_CASSETTE_DIR = Path(__file__).resolve().parents[2] / "cassettes"
+
+REDACTED = "REDACTED"
+# Shorter values are left alone: replacing them would mangle unrelated text.
+MIN_SECRET_CHARS = 8
+
+# Request headers carrying credentials; never written to a cassette.
+_SECRET_HEADERS = ("authorization", "x-goog-api-key")
+# Response headers that would be wrong on a replayed (already decoded) body.
+_DROPPED_RESPONSE_HEADERS = (
+    "content-encoding",
+    "content-length",
+    "transfer-encoding",
+    "set-cookie",
+)
+_ACCOUNT_IN_PATH = re.compile(r"(/accounts/)([^/]+)")
+_KEY_IN_QUERY = re.compile(r"([?&]key=)[^&]+")
+
+_lock = threading.Lock()
+_replay_positions: Dict[str, int] = {}
+_replay_index: Dict[Path, Tuple[Dict[str, Path], Dict[str, List[Path]]]] = {}
+
+
+def reset_cassette_state() -> None:
+    """Forget replay positions and the cassette index (for tests)."""
+    with _lock:
+        _replay_positions.clear()
+        _replay_index.clear()
+
+
+def cassette_mode() -> str:
+    """`LLM_CASSETTE_MODE`, or `off` when unset or not a known mode."""
+    mode = (os.environ.get(CASSETTE_MODE_ENV) or "off").strip().lower()
+    if mode not in MODES:
+        logger.warning("Ignoring unknown %s=%r", CASSETTE_MODE_ENV, mode)
+        return "off"
+    return mode
+
+
+def cassette_dir() -> Path:
+    raw = (os.environ.get(CASSETTE_DIR_ENV) or "").strip()
+    return Path(raw) if raw else DEFAULT_CASSETTE_DIR
+
+
+def latency_scale() -> float:
+    raw = (os.environ.get(CASSETTE_LATENCY_SCALE_ENV) or "").strip()
+    if not raw:
+        return 1.0
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        logger.warning("Ignoring %s=%r", CASSETTE_LATENCY_SCALE_ENV, raw)
+        return 1.0
+
+
+def cassette_transport() -> Optional[httpx.AsyncBaseTransport]:
+    """Transport for a provider's `AsyncClient`; None (httpx default) when off."""
+    mode = cassette_mode()
+    if mode == "record":
+        return RecordingTransport(cassette_dir())
+    if mode == "replay":
+        return ReplayTransport(cassette_dir(), latency_scale=latency_scale())
+    return None
+
+
+def _secrets(request: httpx.Request) -> List[str]:
+    found = []
+    for name in _SECRET_HEADERS:
+        value = request.headers.get(name)
+        if value:
+            found.append(value.split(" ", 1)[-1] if " " in value else value)
+    account = _ACCOUNT_IN_PATH.search(request.url.path)
+    if account:
+        found.append(account.group(2))
+    return [s for s in found if len(s) >= MIN_SECRET_CHARS]
+
+
+def _redact(text: str, secrets: List[str]) -> str:
+    for secret in secrets:
+        text = text.replace(secret, REDACTED)
+    return text
+
+
+def _redacted_url(url: httpx.URL) -> str:
+    text = _ACCOUNT_IN_PATH.sub(rf"\g<1>{REDACTED}", str(url))
+    return _KEY_IN_QUERY.sub(rf"\g<1>{REDACTED}", text)
+
+
+def _request_body(request: httpx.Request) -> object:
+    raw = request.content.decode("utf-8", errors="replace")
+    try:
+        return json.loads(raw) if raw else None
+    except ValueError:
+        return raw
+
+
+def _digest(*parts: object) -> str:
+    canonical = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _model_free(url: str, body: object) -> Tuple[str, object]:
+    """URL host and body with the model removed, for the loose match."""
+    host = httpx.URL(url).host
+    if isinstance(body, dict):
+        body = {k: v for k, v in body.items() if k != "model"}
+    return host, body
+
+
+def request_keys(request: httpx.Request) -> Tuple[str, str]:
+    """(exact key, model-free key) identifying `request` in a cassette."""
+    url = _redacted_url(request.url)
+    body = _request_body(request)
+    return (
+        _digest(request.method, url, body),
+        _digest(request.method, *_model_free(url, body)),
+    )
+
+
+def _cassette_path(directory: Path, request: httpx.Request, key: str) -> Path:
+    host = (request.url.host or "unknown").replace(".", "-")
+    return directory / f"{host}-{key[:16]}.json"
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Forward to the network and append each exchange to its cassette."""
+
+    def __init__(
+        self,
+        directory: Path,
+        inner: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.directory = Path(directory)
+        self.inner = inner or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.monotonic()
+        response = await self.inner.handle_async_request(request)
+        body = await response.aread()
+        elapsed = time.monotonic() - started
+        await response.aclose()
+        try:
+            self._save(request, response, body, elapsed)
+        except OSError as e:
+            logger.warning("Could not write cassette: %s", e)
+        return httpx.Response(
+            response.status_code,
+            headers=_replay_headers(response.headers),
+            content=body,
+            request=request,
+        )
+
+    def _save(
+        self,
+        request: httpx.Request,
+        response: httpx.Response,
+        body: bytes,
+        elapsed: float,
+    ) -> None:
+        secrets = _secrets(request)
+        key, loose_key = request_keys(request)
+        path = _cassette_path(self.directory, request, key)
+        recorded = {
+            "status": response.status_code,
+            "headers": dict(_replay_headers(response.headers)),
+            "body": _redact(body.decode("utf-8", errors="replace"), secrets),
+            "elapsedS": round(elapsed, 3),
+        }
+        with _lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if path.exists():
+                cassette = json.loads(path.read_text(encoding="utf-8"))
+            else:
+                cassette = {
+                    "key": key,
+                    "looseKey": loose_key,
+                    "request": {
+                        "method": request.method,
+                        "url": _redacted_url(request.url),
+                        "body": json.loads(
+                            _redact(json.dumps(_request_body(request)), secrets)
+                        ),
+                    },
+                    "responses": [],
+                }
+            cassette["responses"].append(recorded)
+            path.write_text(
+                json.dumps(cassette, ensure_ascii=False, indent=2), encoding="utf-8"
+            )
+            _replay_index.pop(self.directory, None)
+        logger.info(
+            "Recorded %s %s → %d in %.2fs (%s)",
+            request.method,
+            _redacted_url(request.url),
+            response.status_code,
+            elapsed,
+            path.name,
+        )
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Answer requests from recorded cassettes, without touching the network."""
+
+    def __init__(self, directory: Path, *, latency_scale: float = 1.0) -> None:
+        self.directory = Path(directory)
+        self.latency_scale = latency_scale
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key, loose_key = request_keys(request)
+        path = self._find(key, loose_key, request)
+        if path is None:
+            raise httpx.ConnectError(
+                f"No cassette for {request.method} {_redacted_url(request.url)} "
+                f"in {self.directory}",
+                request=request,
+            )
+        cassette = json.loads(path.read_text(encoding="utf-8"))
+        responses = cassette["responses"]
+        with _lock:
+            position = _replay_positions.get(str(path), 0)
+            _replay_positions[str(path)] = position + 1
+        recorded = responses[min(position, len(responses) - 1)]
+        delay = recorded.get("elapsedS", 0.0) * self.latency_scale
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return httpx.Response(
+            recorded["status"],
+            headers=recorded.get("headers") or {},
+            content=recorded["body"].encode("utf-8"),
+            request=request,
+        )
+
+    def _find(
+        self, key: str, loose_key: str, request: httpx.Request
+    ) -> Optional[Path]:
+        exact, loose = self._index()
+        if key in exact:
+            return exact[key]
+        candidates = loose.get(loose_key)
+        if not candidates:
+            return None
+        logger.info(
+            "No exact cassette for %s %s; replaying %s recorded for another model",
+            request.method,
+            _redacted_url(request.url),
+            candidates[0].name,
+        )
+        return candidates[0]
+
+    def _index(self) -> Tuple[Dict[str, Path], Dict[str, List[Path]]]:
+        with _lock:
+            cached = _replay_index.get(self.directory)
+        if cached is not None:
+            return cached
+        exact: Dict[str, Path] = {}
+        loose: Dict[str, List[Path]] = {}
+        for path in sorted(self.directory.glob("*.json")):
+            try:
+                cassette = json.loads(path.read_text(encoding="utf-8"))
+                exact[cassette["key"]] = path
+                loose.setdefault(cassette["looseKey"], []).append(path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Skipping unreadable cassette %s: %s", path.name, e)
+        with _lock:
+            _replay_index[self.directory] = (exact, loose)
+        return exact, loose
+
+
+def _replay_headers(headers: httpx.Headers) -> List[Tuple[str, str]]:
+    return [
+        (name, value)
+        for name, value in headers.items()
+        if name.lower() not in _DROPPED_RESPONSE_HEADERS
+    ]
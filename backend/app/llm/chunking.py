@@ -0,0 +1,161 @@
+"""
+Paragraph-level chunking of long SOURCE/TARGET pairs, and merging the per-chunk
+critiques back into one body.
+
+A multi-paragraph homework goes out as a single call today. That call is the one
+that reaches `GEMINI_MAX_OUTPUT_TOKENS`, runs close to the deadline and comes
+back as truncated JSON that `parser.repair_truncated_json()` has to patch — and
+its latency grows with the whole document even though the prompt asks the model
+to scan one paragraph at a time anyway ("逐段扫描覆盖各段").
+
+Splitting only works when the two texts line up: a critique of TARGET paragraph
+3 needs SOURCE paragraph 3 beside it, or the meaning-shift checks the prompt
+calls highest priority have nothing to compare against. So chunking is refused
+(`plan_chunks()` returns a single chunk) whenever the paragraph counts differ,
+rather than guessing an alignment.
+
+Short paragraphs are packed together up to `CHUNK_TARGET_CHARS`, and the number
+of chunks is capped at `MAX_CHUNKS`: each chunk is a full provider call against
+the same free-tier quota, so one call per one-line paragraph would trade a slow
+answer for a rate-limited one.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from .parser import CorrectionSuggestion, ParsedResponse, is_json_extraction_failure
+
+# Below this TARGET length a single call is already fast; chunking would only
+# multiply the fixed per-call overhead (system prompt, few-shot, handshake).
+CHUNK_MIN_TARGET_CHARS = 600
+
+# Soft size of one chunk's TARGET text. Paragraphs are never split, so a single
+# paragraph longer than this becomes its own chunk.
+CHUNK_TARGET_CHARS = 400
+
+# Upper bound on concurrent calls one request may fan out into.
+MAX_CHUNKS = 6
+
+_PARAGRAPH_BREAK = re.compile(r"\n+")
+
+
+class TextChunk(NamedTuple):
+    """One aligned SOURCE/TARGET slice, numbered from 1 in document order."""
+
+    index: int
+    original_text: str
+    target_text: str
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """Non-empty paragraphs of `text`, split on line breaks."""
+    return [p.strip() for p in _PARAGRAPH_BREAK.split(text or "") if p.strip()]
+
+
+def _pack(
+    pairs: Sequence[Tuple[str, str]],
+    target_chars: int,
+) -> List[Tuple[List[str], List[str]]]:
+    """Greedily pack consecutive paragraph pairs up to `target_chars` of TARGET."""
+    groups: List[Tuple[List[str], List[str]]] = []
+    size = 0
+    for original, target in pairs:
+        if groups and size + len(target) <= target_chars:
+            groups[-1][0].append(original)
+            groups[-1][1].append(target)
+            size += len(target)
+            continue
+        groups.append(([original], [target]))
+        size = len(target)
+    return groups
+
+
+def plan_chunks(
+    original_text: str,
+    target_text: str,
+    *,
+    min_target_chars: int = CHUNK_MIN_TARGET_CHARS,
+    target_chars: int = CHUNK_TARGET_CHARS,
+    max_chunks: int = MAX_CHUNKS,
+) -> List[TextChunk]:
+    """
+    Split an aligned SOURCE/TARGET pair into paragraph chunks.
+
+    Returns a single chunk holding both texts unchanged when the input is short,
+    has one paragraph, or the two sides do not have the same paragraph count.
+    """
+    whole = [TextChunk(1, original_text, target_text)]
+    if len(target_text or "") < min_target_chars:
+        return whole
+    originals = split_paragraphs(original_text)
+    targets = split_paragraphs(target_text)
+    if len(targets) < 2 or len(originals) != len(targets):
+        return whole
+
+    # Grow the packing size until the chunk count fits the cap, so a document of
+    # many short paragraphs degrades to fewer, larger chunks instead of refusing.
+    size = max(1, target_chars)
+    groups = _pack(list(zip(originals, targets)), size)
+    while len(groups) > max(1, max_chunks):
+        size *= 2
+        groups = _pack(list(zip(originals, targets)), size)
+    if len(groups) < 2:
+        return whole
+    return [
+        TextChunk(i, "\n".join(orig), "\n".join(tgt))
+        for i, (orig, tgt) in enumerate(groups, start=1)
+    ]
+
+
+def _dedupe_key(suggestion: CorrectionSuggestion) -> Tuple[str, str]:
+    return (
+        "".join((suggestion.get("original") or "").split()),
+        "".join((suggestion.get("reason") or "").split()),
+    )
+
+
+def merge_chunk_results(results: Sequence[Optional[ParsedResponse]]) -> ParsedResponse:
+    """
+    Combine per-chunk bodies (in chunk order) into one response.
+
+    Suggestions are concatenated, exact duplicates (same excerpt and reason,
+    ignoring whitespace) dropped, and ids renumbered contiguously. The
+    per-chunk `overallComment`s are joined under paragraph labels so the
+    learner still reads one comment. A chunk whose body is missing or is the
+    parse-failure placeholder contributes nothing; if every chunk is such a
+    failure, the first placeholder is returned as-is so callers can still
+    detect it with `is_json_extraction_failure()`.
+    """
+    usable = [
+        (i, r)
+        for i, r in enumerate(results, start=1)
+        if r is not None and not is_json_extraction_failure(r)
+    ]
+    if not usable:
+        for r in results:
+            if r is not None:
+                return r
+        return {"suggestions": [], "overallComment": ""}
+
+    suggestions: List[CorrectionSuggestion] = []
+    seen = set()
+    for _, result in usable:
+        for suggestion in result["suggestions"]:
+            key = _dedupe_key(suggestion)
+            if key in seen:
+                continue
+            seen.add(key)
+            suggestions.append(
+                {**suggestion, "id": str(len(suggestions) + 1)}
+            )
+
+    comments = [(i, (r.get("overallComment") or "").strip()) for i, r in usable]
+    comments = [(i, c) for i, c in comments if c]
+    if len(comments) == 1 or len(results) == 1:
+        overall = comments[0][1] if comments else ""
+    else:
+        overall = "\n".join(f"（第{i}部分）{c}" for i, c in comments)
+
+    return {"suggestions": suggestions, "overallComment": overall}
@@ -0,0 +1,245 @@
+"""
+Per-(provider, model) circuit breaker for degraded models.
+
+Cooldowns (`key_pool.mark_cooldown`) only react to refusals (401/403/429), which
+name a credential. A model that is degraded instead — answering 5xx, or not at
+all — is attempted again on every request, and a timeout costs the whole call
+slice (22s for Gemini) each time. The breaker counts those failures per model:
+
+- **closed**: calls go through. `FAILURE_THRESHOLD` consecutive server errors or
+  timeouts within `FAILURE_WINDOW_S` open the circuit. Only a call that had its
+  full (static or learned) timeout counts: a slice the request deadline cut
+  short, as the last provider in the chain often gets, timing out says nothing
+  about the model.
+- **open**: the provider skips the model without a call (raising its own
+  retriable server error, so rotation and the chain move on at once) until
+  `OPEN_S` has passed.
+- **half-open**: a single probe call is let through. Success closes the circuit;
+  another server error or timeout re-opens it for another `OPEN_S`. A probe
+  that never reports back (its call was skipped for budget, or the process was
+  killed) is forgotten after `PROBE_LEASE_S`.
+
+Refusals, client errors and malformed bodies neither count nor reset the
+streak: they say nothing about whether the model is up.
+
+An opened circuit is buffered into `provider_health` through the same
+observation/flush path as cooldowns, under the reserved fingerprint
+`CIRCUIT_FINGERPRINT`, and seeded back by `provider_health.seed_cooldowns`, so
+other invocations skip the model too instead of each paying one timeout to
+learn it. `LLM_CIRCUIT_BREAKER=off` disables the breaker.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterator, Optional, Tuple, Type
+
+from .provider_health import observe_circuit_open
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_BREAKER_ENV = "LLM_CIRCUIT_BREAKER"
+
+# Consecutive server errors/timeouts that open a circuit, and how recent they
+# must be: three failures spread over an hour are bad luck, not an outage.
+FAILURE_THRESHOLD = 3
+FAILURE_WINDOW_S = 120.0
+
+# How long an open circuit skips its model before letting a probe through.
+OPEN_S = 60.0
+
+# A probe is assumed lost after this long (longer than any single call).
+PROBE_LEASE_S = 60.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+@dataclass
+class _Circuit:
+    state: str = CLOSED
+    failures: Deque[float] = field(default_factory=deque)
+    # Monotonic time an open circuit may be probed.
+    open_until: float = 0.0
+    # Monotonic start of the probe in flight, if any.
+    probe_started: Optional[float] = None
+
+
+_lock = threading.Lock()
+_circuits: Dict[Tuple[str, str], _Circuit] = {}
+# Monotonic time a circuit last closed after being open. The stored row that
+# opened it outlives the recovery, and must not re-open it when read back.
+_recovered_at: Dict[Tuple[str, str], float] = {}
+
+
+def reset_circuit_state() -> None:
+    """Close every circuit (for tests)."""
+    with _lock:
+        _circuits.clear()
+        _recovered_at.clear()
+
+
+def is_circuit_breaker_enabled() -> bool:
+    return (os.environ.get(CIRCUIT_BREAKER_ENV) or "").strip().lower() not in (
+        "off",
+        "0",
+        "false",
+    )
+
+
+def circuit_state(provider: str, model: Optional[str]) -> str:
+    """Current state of the circuit, advancing open to half-open when due."""
+    with _lock:
+        circuit = _circuits.get((provider, model or ""))
+        if circuit is None:
+            return CLOSED
+        if circuit.state == OPEN and time.monotonic() >= circuit.open_until:
+            return HALF_OPEN
+        return circuit.state
+
+
+def allow_call(provider: str, model: Optional[str]) -> bool:
+    """
+    Whether a call to this model may go out now.
+
+    In half-open state the first caller takes the probe and later callers are
+    turned away until it reports back or its lease runs out.
+    """
+    if not is_circuit_breaker_enabled():
+        return True
+    with _lock:
+        circuit = _circuits.get((provider, model or ""))
+        if circuit is None or circuit.state == CLOSED:
+            return True
+        now = time.monotonic()
+        if circuit.state == OPEN:
+            if now < circuit.open_until:
+                return False
+            circuit.state = HALF_OPEN
+        if circuit.probe_started is not None and now - circuit.probe_started < PROBE_LEASE_S:
+            return False
+        circuit.probe_started = now
+        logger.info("Circuit half-open for %s model=%s; sending a probe", provider, model)
+        return True
+
+
+def _open(provider: str, model: str, circuit: _Circuit, seconds: float, reason: str) -> None:
+    circuit.state = OPEN
+    circuit.open_until = time.monotonic() + seconds
+    circuit.probe_started = None
+    circuit.failures.clear()
+    logger.warning(
+        "Circuit opened for %s model=%s for %.0fs: %s", provider, model, seconds, reason
+    )
+    observe_circuit_open(provider, model, seconds, reason)
+
+
+def record_success(provider: str, model: Optional[str]) -> None:
+    with _lock:
+        circuit = _circuits.get((provider, model or ""))
+        if circuit is None:
+            return
+        if circuit.state != CLOSED:
+            logger.info("Circuit closed for %s model=%s", provider, model)
+            _recovered_at[(provider, model or "")] = time.monotonic()
+        del _circuits[(provider, model or "")]
+
+
+def record_failure(provider: str, model: Optional[str], reason: str) -> None:
+    """Count a server error or timeout against the model."""
+    if not is_circuit_breaker_enabled():
+        return
+    key = (provider, model or "")
+    now = time.monotonic()
+    with _lock:
+        circuit = _circuits.setdefault(key, _Circuit())
+        if circuit.state in (OPEN, HALF_OPEN) and circuit.probe_started is not None:
+            _open(provider, key[1], circuit, OPEN_S, f"probe failed: {reason}")
+            return
+        if circuit.state != CLOSED:
+            return
+        circuit.failures.append(now)
+        while circuit.failures and now - circuit.failures[0] > FAILURE_WINDOW_S:
+            circuit.failures.popleft()
+        if len(circuit.failures) >= FAILURE_THRESHOLD:
+            _open(
+                provider,
+                key[1],
+                circuit,
+                OPEN_S,
+                f"{len(circuit.failures)} consecutive failures, last: {reason}",
+            )
+
+
+def release_probe(provider: str, model: Optional[str]) -> None:
+    """An outcome that says nothing about health: let the next caller probe."""
+    with _lock:
+        circuit = _circuits.get((provider, model or ""))
+        if circuit is not None:
+            circuit.probe_started = None
+
+
+def seed_open(provider: str, model: str, seconds: float) -> None:
+    """Open a circuit another invocation opened (from `provider_health`)."""
+    if not is_circuit_breaker_enabled() or seconds <= 0:
+        return
+    with _lock:
+        now = time.monotonic()
+        recovered = _recovered_at.get((provider, model))
+        if recovered is not None and now - recovered < OPEN_S:
+            # This process just saw the model answer; a stored open row is
+            # more likely the one that predates the probe than fresh news.
+            return
+        circuit = _circuits.setdefault((provider, model), _Circuit())
+        until = now + seconds
+        if circuit.state == OPEN and circuit.open_until >= until:
+            return
+        circuit.state = OPEN
+        circuit.open_until = until
+        circuit.probe_started = None
+        circuit.failures.clear()
+
+
+def _trips(error: BaseException, timeout_errors: Tuple[Type[BaseException], ...]) -> bool:
+    if isinstance(error, timeout_errors):
+        return True
+    status = getattr(error, "status_code", None)
+    return status is not None and status >= 500
+
+
+@contextmanager
+def track(
+    provider: str,
+    model: Optional[str],
+    *,
+    timeout_errors: Tuple[Type[BaseException], ...] = (),
+    clamped: bool = False,
+) -> Iterator[None]:
+    """
+    Report one provider attempt's outcome to the model's circuit.
+
+    Exceptions are re-raised unchanged; a server error (status >= 500) or one of
+    `timeout_errors` counts as a failure, success closes the circuit, and any
+    other error only releases a half-open probe. ``clamped`` marks a call whose
+    timeout the request deadline cut below the model's own: its timeout says
+    the budget ran out, not that the model is down, so it does not count.
+    """
+    try:
+        yield
+    except Exception as e:
+        if clamped and isinstance(e, timeout_errors):
+            release_probe(provider, model)
+        elif _trips(e, timeout_errors):
+            record_failure(provider, model, f"{type(e).__name__}: {e}"[:200])
+        else:
+            release_probe(provider, model)
+        raise
+    record_success(provider, model)
+
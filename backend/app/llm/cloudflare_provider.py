@@ -1,6 +1,13 @@
 """
 Cloudflare Workers AI provider.
 Fallback provider when Groq is unavailable.
+
+ALLOWED_CF_MODELS is tried in order (`select_cloudflare_models`):
+`call_cloudflare_with_rotation` calls the 70B first and retries once on Llama 4
+Scout, with cooldowns scoped per model: as the last link in the chain, a 429 or
+outage on one Workers AI model must not leave nothing to answer with. A prompt
+too long for the 70B's served window goes to Scout directly. CLOUDFLARE_MODEL
+pins a single model.
 """
 
 from __future__ import annotations
@@ -8,36 +15,82 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
+import os
 import httpx
 from typing import Any, Optional, Tuple, List, Dict, Set
 
 from .budget import describe_skip, resolve_call_timeout
+from .circuit import allow_call, track
+from .http_clients import provider_client
+from .latency import call_budget, measure, messages_chars
+from .provider_output import ProviderOutput
+from .router import is_router_enabled, rank_models
+from .timeline import span
+from .tokens import (
+    estimate_messages_tokens,
+    fitting_models,
+    output_token_cap,
+    prompt_fits,
+)
 from .key_pool import (
+    CloudflareCredential,
     PoolAvailability,
     acquire_cloudflare,
     cooldown_status_codes,
     credential_pool_index,
     format_credential_ref,
+    in_flight,
     is_cloudflare_configured,
     load_cloudflare_credentials,
     mark_cooldown,
+    note_rate_limits,
     pool_availability,
+    ready_pair_count,
     release_soonest_cooldown,
 )
 from .provider_health import (
     clamp_cooldown_seconds,
     observe_refusal,
+    parse_rate_limit_headers,
     parse_retry_after,
 )
 
 logger = logging.getLogger(__name__)
 
-# Prefer a stronger instruct model when available on Workers AI; 8B often
-# returns Chinese prose without a JSON object on long bilingual prompts.
-CF_MODEL = "@cf/meta/llama-3.3-70b-instruct-fp8-fast"
+# Rotation pool, in preference order, which is also the order models are tried
+# in. Prefer stronger instruct models when available on Workers AI; 8B often
+# returns Chinese prose without a JSON object on long bilingual prompts. Llama 4
+# Scout is only the fallback: a different deployment with its own per-model
+# limits, and served with a far larger context window, so it answers when the
+# 70B is rate-limited or down, and prompts the 70B cannot hold.
+ALLOWED_CF_MODELS = [
+    "@cf/meta/llama-3.3-70b-instruct-fp8-fast",
+    "@cf/meta/llama-4-scout-17b-16e-instruct",
+]
+# Default when rotation is off and the model attributed to plain-text answers.
+CF_MODEL = ALLOWED_CF_MODELS[0]
+# Pins one model id for every request (disables rotation).
+CF_MODEL_ENV = "CLOUDFLARE_MODEL"
+CF_API_BASE = "https://api.cloudflare.com/client/v4"
+# Overrides CF_API_BASE, e.g. to point at scripts/stub_llm_server.py.
+CF_API_BASE_ENV = "CLOUDFLARE_API_BASE"
 # Tertiary path: keep short so Gemini→Groq→CF still fits Vercel maxDuration.
 CF_TIMEOUT = 20.0  # seconds
 
+# Ceiling on max_tokens, matching Groq's headroom for multi-suggestion JSON on
+# long TARGET TEXT; shorter reviews get less (`tokens.output_token_cap`).
+CF_MAX_TOKENS = 4096
+
+# Context window Workers AI serves CF_MODEL with — far below the model's
+# native one, so long multi-paragraph prompts can genuinely not fit.
+CF_CONTEXT_WINDOW_TOKENS = 24_000
+# Per-model windows as served by Workers AI; a pinned model not listed here is
+# assumed to fit (the API rejects it otherwise).
+CF_CONTEXT_WINDOWS = {
+    CF_MODEL: CF_CONTEXT_WINDOW_TOKENS,
+    "@cf/meta/llama-4-scout-17b-16e-instruct": 131_000,
+}
+
 # Shortest slice worth spending on Cloudflare. Measured 2-5s for this prompt;
 # as the last provider in the chain it is usually the one running on whatever
 # budget the primary and secondary left behind.
@@ -69,6 +122,11 @@ class CloudflareRateLimitError(CloudflareError):
     pass
 
 
+class CloudflareServerError(CloudflareError):
+    """Cloudflare API server error (5xx)."""
+    pass
+
+
 def get_cloudflare_credentials() -> Tuple[Optional[str], Optional[str]]:
     """Return first configured CF pair if the pool is non-empty (back-compat).
 
@@ -81,9 +139,53 @@ def get_cloudflare_credentials() -> Tuple[Optional[str], Optional[str]]:
     return creds[0].account_id, creds[0].api_token
 
 
-def get_cloudflare_api_url(account_id: str) -> str:
-    """Build Cloudflare Workers AI API URL."""
-    return f"https://api.cloudflare.com/client/v4/accounts/{account_id}/ai/run/{CF_MODEL}"
+def get_cloudflare_model() -> str:
+    """Workers AI model id, overridable via CLOUDFLARE_MODEL."""
+    return (os.environ.get(CF_MODEL_ENV) or "").strip() or CF_MODEL
+
+
+def is_rotation_enabled() -> bool:
+    """Rotation is disabled when CLOUDFLARE_MODEL pins a non-empty model id."""
+    return not (os.environ.get(CF_MODEL_ENV) or "").strip()
+
+
+def select_cloudflare_models(
+    n: int = 2,
+    *,
+    input_chars: Optional[int] = None,
+    deadline_monotonic: Optional[float] = None,
+) -> List[str]:
+    """
+    Select up to n distinct Workers AI models for a single request.
+
+    The first n of ALLOWED_CF_MODELS when rotating — the 70B, then its
+    fallback — or the n best-scoring with `LLM_ROUTER=score`; the pinned model
+    alone otherwise.
+    """
+    if not is_rotation_enabled():
+        return [get_cloudflare_model()]
+    n = min(n, len(ALLOWED_CF_MODELS))
+    if is_router_enabled():
+        return rank_models(
+            "cloudflare",
+            ALLOWED_CF_MODELS,
+            input_chars=input_chars,
+            deadline_monotonic=deadline_monotonic,
+        )[:n]
+    return ALLOWED_CF_MODELS[:n]
+
+
+def _rotation_scopes() -> List[Optional[str]]:
+    """Models a request could pick, which is what cooldowns are scoped to."""
+    if not is_rotation_enabled():
+        return [get_cloudflare_model()]
+    return list(ALLOWED_CF_MODELS)
+
+
+def get_cloudflare_api_url(account_id: str, model: Optional[str] = None) -> str:
+    """Build Cloudflare Workers AI API URL (base overridable via CLOUDFLARE_API_BASE)."""
+    base = ((os.environ.get(CF_API_BASE_ENV) or "").strip() or CF_API_BASE).rstrip("/")
+    return f"{base}/accounts/{account_id}/ai/run/{model or get_cloudflare_model()}"
 
 
 async def _call_cloudflare_once(
@@ -91,6 +193,7 @@ async def _call_cloudflare_once(
     api_token: str,
     messages: list[dict[str, str]],
     timeout: float = CF_TIMEOUT,
+    model: Optional[str] = None,
 ) -> str:
     """Single Cloudflare Workers AI HTTP attempt.
 
@@ -98,7 +201,7 @@ async def _call_cloudflare_once(
     `gemini_provider._call_gemini_once` for why httpx's own timeout is not
     sufficient on its own).
     """
-    api_url = get_cloudflare_api_url(account_id)
+    api_url = get_cloudflare_api_url(account_id, model)
 
     headers = {
         "Authorization": f"Bearer {api_token}",
@@ -120,17 +223,15 @@ async def _call_cloudflare_once(
     ]
     payload: dict[str, Any] = {
         "messages": cf_messages,
-        # Match Groq headroom for multi-suggestion JSON on long TARGET TEXT.
-        "max_tokens": 4096,
+        "max_tokens": output_token_cap(cf_messages, ceiling=CF_MAX_TOKENS),
         "temperature": 0.15,
     }
 
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await asyncio.wait_for(
-                client.post(api_url, headers=headers, json=payload),
-                timeout=timeout,
-            )
+        response = await asyncio.wait_for(
+            provider_client(api_url).post(api_url, headers=headers, json=payload),
+            timeout=timeout,
+        )
     except (httpx.TimeoutException, asyncio.TimeoutError) as e:
         raise CloudflareTimeoutError(
             f"Cloudflare request timed out after {timeout:.1f}s"
@@ -150,12 +251,24 @@ async def _call_cloudflare_once(
             status_code=response.status_code,
         )
 
+    if response.status_code >= 500:
+        raise CloudflareServerError(
+            f"Cloudflare server error: {response.status_code}",
+            status_code=response.status_code,
+        )
+
     if response.status_code != 200:
         raise CloudflareError(
             f"Cloudflare API error: {response.status_code} - {response.text}",
             status_code=response.status_code,
         )
 
+    # Recorded only when the response carries `x-ratelimit-*` headers.
+    note_rate_limits(
+        CloudflareCredential(account_id, api_token).id,
+        parse_rate_limit_headers(response.headers),
+        scope=model or get_cloudflare_model(),
+    )
     data = response.json()
 
     if not data.get("success", False):
@@ -179,32 +292,40 @@ def cloudflare_availability() -> PoolAvailability:
     """
     Whether calling Cloudflare could plausibly succeed, from cooldown state alone.
 
-    Unlike Gemini and Groq, Cloudflare runs one fixed model, so its cooldowns are
-    credential-wide and there is no per-model scope to consider.
+    A pool counts as unusable only when every credential pair is cooled down
+    for every model rotation could choose.
     """
-    return pool_availability(load_cloudflare_credentials())
+    return pool_availability(load_cloudflare_credentials(), _rotation_scopes())
+
+
+def cloudflare_ready_pairs() -> int:
+    """(credential pair, model) pairs Cloudflare could be called on right now."""
+    return ready_pair_count(load_cloudflare_credentials(), _rotation_scopes())
 
 
 def release_cloudflare_cooldown() -> Optional[str]:
     """Free the soonest-recovering CF pair so one attempt can still be made."""
-    return release_soonest_cooldown(load_cloudflare_credentials())
+    return release_soonest_cooldown(load_cloudflare_credentials(), _rotation_scopes())
 
 
 async def call_cloudflare(
     messages: list[dict[str, str]],
     deadline_monotonic: Optional[float] = None,
+    model: Optional[str] = None,
 ) -> str:
     """
-    Call Cloudflare Workers AI API with the given messages.
+    Call Cloudflare Workers AI API with the given messages on one model.
 
     Uses the credential pool: on 401/403/429, cools down the failing pair
-    and retries with another eligible credential (bounded by pool size).
+    for this model and retries with another eligible credential (bounded by
+    pool size).
 
     Args:
         messages: List of message dicts with role and content keys.
         deadline_monotonic: Optional monotonic deadline bounding every attempt
             in the credential-pool loop, so N pooled pairs cannot cost N times
             CF_TIMEOUT and overrun the caller's request budget.
+        model: Workers AI model id; CLOUDFLARE_MODEL or CF_MODEL when omitted.
 
     Returns:
         The assistant's response content.
@@ -213,6 +334,7 @@ async def call_cloudflare(
         CloudflareError: If credentials are missing or other error occurs.
         CloudflareTimeoutError: If request times out.
         CloudflareRateLimitError: If rate limited or auth failed after pool exhaust.
+        CloudflareServerError: If Workers AI returns 5xx.
     """
     if not is_cloudflare_configured():
         raise CloudflareError(
@@ -220,56 +342,115 @@ async def call_cloudflare(
             "(CLOUDFLARE_ACCOUNT_ID/TOKEN or CLOUDFLARE_ACCOUNT_IDS/API_TOKENS)"
         )
 
+    resolved_model = model or get_cloudflare_model()
+    if not prompt_fits(
+        messages,
+        CF_CONTEXT_WINDOWS.get(resolved_model),
+        output_token_cap(messages, ceiling=CF_MAX_TOKENS),
+    ):
+        # Fail before spending a credential: the call could only be rejected.
+        raise CloudflareError(
+            f"Prompt of ~{estimate_messages_tokens(messages)} tokens does not fit "
+            f"the context window of {resolved_model}"
+        )
+
+    if not allow_call("cloudflare", resolved_model):
+        # Retriable, so rotation tries a sibling model.
+        raise CloudflareServerError(
+            f"Cloudflare model {resolved_model} skipped: circuit open after "
+            f"repeated server errors or timeouts"
+        )
+
     pool = load_cloudflare_credentials()
     pool_size = len(pool)
     attempted: Set[str] = set()
     last_error: Optional[CloudflareError] = None
     cooldown_codes = cooldown_status_codes()
+    input_chars = messages_chars(messages)
+    prompt_tokens = estimate_messages_tokens(messages)
 
     while True:
-        cred = acquire_cloudflare(exclude_ids=list(attempted))
+        cred = acquire_cloudflare(
+            exclude_ids=list(attempted), cooldown_scope=resolved_model
+        )
         if cred is None:
             if last_error is not None:
                 raise CloudflareRateLimitError(
                     f"All Cloudflare credentials are in cooldown or exhausted "
-                    f"(pool_size={pool_size}, cooled_or_tried={len(attempted)})",
+                    f"(pool_size={pool_size}, cooled_or_tried={len(attempted)}, "
+                    f"model={resolved_model})",
                     status_code=getattr(last_error, "status_code", None) or 429,
                 )
             raise CloudflareRateLimitError(
                 f"All Cloudflare credentials are in cooldown or exhausted "
-                f"(pool_size={pool_size})",
+                f"(pool_size={pool_size}, model={resolved_model})",
                 status_code=429,
             )
 
-        timeout = resolve_call_timeout(deadline_monotonic, CF_TIMEOUT, CF_MIN_SLICE_S)
+        budget = call_budget(
+            "cloudflare",
+            resolved_model,
+            input_chars,
+            default_timeout=CF_TIMEOUT,
+            default_min_slice=CF_MIN_SLICE_S,
+        )
+        timeout = resolve_call_timeout(
+            deadline_monotonic, budget.timeout_s, budget.min_slice_s
+        )
         if timeout is None:
             # A failure that already happened explains more than "and then we
             # ran out of time", so it wins when both are true.
             if last_error is not None:
                 raise last_error
             raise CloudflareTimeoutError(
-                describe_skip("Cloudflare", deadline_monotonic, CF_MIN_SLICE_S)
+                describe_skip("Cloudflare", deadline_monotonic, budget.min_slice_s)
             )
 
         attempted.add(cred.id)
         idx = credential_pool_index(pool, cred.id)
         cred_ref = format_credential_ref("cloudflare", idx, cred.label)
         try:
-            return await _call_cloudflare_once(
-                cred.account_id, cred.api_token, messages, timeout
-            )
+            with measure(
+                "cloudflare",
+                resolved_model,
+                input_chars,
+                timeout_s=timeout,
+                timeout_errors=(CloudflareTimeoutError,),
+                clamped=timeout < budget.timeout_s,
+            ), track(
+                "cloudflare",
+                resolved_model,
+                timeout_errors=(CloudflareTimeoutError,),
+                clamped=timeout < budget.timeout_s,
+            ), in_flight(
+                cred.id, scope=resolved_model, tokens=prompt_tokens
+            ), span("cloudflare", key=cred_ref, model=resolved_model) as attempt:
+                text = await _call_cloudflare_once(
+                    cred.account_id,
+                    cred.api_token,
+                    messages,
+                    timeout,
+                    model=resolved_model,
+                )
+                attempt["status"] = 200
+                return text
         except CloudflareError as e:
             status = e.status_code
             if status in cooldown_codes:
                 cooldown_s = clamp_cooldown_seconds(getattr(e, "retry_after", None))
-                mark_cooldown(cred.id, cooldown_s)
+                mark_cooldown(cred.id, cooldown_s, scope=resolved_model)
                 observe_refusal(
-                    "cloudflare", cred.id, cooldown_s, reason=f"HTTP {status}"
+                    "cloudflare",
+                    cred.id,
+                    cooldown_s,
+                    model=resolved_model,
+                    reason=f"HTTP {status}",
                 )
                 logger.warning(
-                    "%s failed with HTTP %s; cooling down %.0fs and trying next "
-                    "credential",
+                    "%s model=%s failed with HTTP %s; cooling down %.0fs for this "
+                    "model and trying next credential",
                     cred_ref,
+                    resolved_model,
                     status,
                     cooldown_s,
                 )
@@ -278,6 +459,87 @@ async def call_cloudflare(
             raise
 
 
+def _models_that_fit(messages: list[dict[str, str]], models: List[str]) -> List[str]:
+    """
+    `models` whose served context window holds this prompt and its output cap.
+
+    Raises a non-retriable CloudflareError when none does, so an oversize prompt
+    fails in microseconds instead of spending credentials.
+    """
+    output = output_token_cap(messages, ceiling=CF_MAX_TOKENS)
+    fitting = fitting_models(
+        messages,
+        models,
+        context_window=CF_CONTEXT_WINDOWS.get,
+        output_tokens=lambda _model: output,
+    )
+    if not fitting:
+        raise CloudflareError(
+            f"Prompt of ~{estimate_messages_tokens(messages)} tokens does not fit "
+            f"the context window of {', '.join(models)}"
+        )
+    return fitting
+
+
+async def call_cloudflare_with_rotation(
+    messages: list[dict[str, str]],
+    deadline_monotonic: Optional[float] = None,
+) -> ProviderOutput:
+    """
+    Call Workers AI with in-provider model rotation and bounded retry.
+
+    Mirrors `groq_provider.call_groq_with_rotation`: a rate-limit, 5xx or
+    timeout on the first model moves to a second one when the remaining budget
+    still covers it; anything else is raised at once. With CLOUDFLARE_MODEL
+    pinned this is a single `call_cloudflare`.
+
+    Returns the raw text together with the model that produced it.
+    """
+    models = _models_that_fit(
+        messages,
+        select_cloudflare_models(
+            n=2,
+            input_chars=messages_chars(messages),
+            deadline_monotonic=deadline_monotonic,
+        ),
+    )
+    first_model = models[0]
+
+    try:
+        return ProviderOutput(
+            await call_cloudflare(
+                messages, deadline_monotonic=deadline_monotonic, model=first_model
+            ),
+            first_model,
+        )
+    except (CloudflareRateLimitError, CloudflareServerError, CloudflareTimeoutError):
+        if len(models) < 2:
+            raise
+        second_model = models[1]
+        budget = call_budget(
+            "cloudflare",
+            second_model,
+            messages_chars(messages),
+            default_timeout=CF_TIMEOUT,
+            default_min_slice=CF_MIN_SLICE_S,
+        )
+        if (
+            resolve_call_timeout(
+                deadline_monotonic, budget.timeout_s, budget.min_slice_s
+            )
+            is None
+        ):
+            # Too little of the phase left for a sibling model, and the first
+            # model's failure is the more useful error to report upward.
+            raise
+        return ProviderOutput(
+            await call_cloudflare(
+                messages, deadline_monotonic=deadline_monotonic, model=second_model
+            ),
+            second_model,
+        )
+
+
 def _extract_cloudflare_text(result: Any) -> Optional[str]:
     """Normalize Workers AI `result` payloads to a single assistant string.
 
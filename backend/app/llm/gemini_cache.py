@@ -0,0 +1,241 @@
+"""
+Gemini context caching (`cachedContents`) for the static prompt prefix.
+
+Every suggestion call sends the same system prompt and few-shot block —
+thousands of tokens — ahead of a comparatively short SOURCE/TARGET. With
+`GEMINI_CONTEXT_CACHE=on` that prefix (the system instruction and the first
+content, the few-shot block of `prompts.build_messages()`) is stored once per
+API key and model as a Gemini cached content, and later calls send only
+`cachedContent` plus the contents after it, which cuts input-token cost and time
+to first token. Only that static part is cached: the per-request user prompt
+and any retry nudge appended after it stay in `contents`, so a nudged retry pass
+reuses the same entry instead of creating one no other request could use.
+
+Entries are keyed by a hash of the key, model and prefix, so a change to the
+shared prompt setting (or an exemplar, which is part of the system prompt)
+simply selects a different entry. Several prefixes are live at once for one key
+and model — requests with and without an exemplar build different system
+prompts — so an entry is never deleted for being "superseded": an unused one
+just runs out its TTL on Gemini's side and is forgotten here. An entry in use
+is recreated shortly before its TTL runs out.
+
+Caching never makes a call slower or fail. A missing entry is created in the
+background while the current call goes out uncached; a creation that fails
+(free-tier key, prefix below the model's minimum, quota) is not retried for
+`CACHE_RETRY_AFTER_S`; and a call rejected because its cached content is gone
+is repeated uncached by the provider.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, NamedTuple, Optional
+
+from .http_clients import provider_client
+from .tokens import estimate_messages_tokens
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_CACHE_ENV = "GEMINI_CONTEXT_CACHE"
+CONTEXT_CACHE_TTL_ENV = "GEMINI_CONTEXT_CACHE_TTL_S"
+
+DEFAULT_TTL_S = 3600
+# Recreate this long before the TTL ends, so no call races the expiry.
+REFRESH_MARGIN_S = 120.0
+# After a failed creation, calls go uncached for this long before trying again.
+CACHE_RETRY_AFTER_S = 600.0
+CACHE_CREATE_TIMEOUT_S = 10.0
+
+# Gemini refuses to cache fewer input tokens than this; smaller prefixes (the
+# repair prompt) are not worth a creation round trip.
+MIN_CACHE_TOKENS = 1024
+
+# Leading contents that are the same for every request (the few-shot block).
+STATIC_CONTENTS = 1
+
+# Statuses with which a generateContent call naming an expired, deleted or
+# foreign cachedContent is rejected.
+CACHE_MISS_STATUSES = (400, 403, 404)
+
+
+@dataclass
+class _Entry:
+    # None while creation is pending or after it failed.
+    name: Optional[str]
+    # Monotonic time after which this entry must not be used.
+    until: float
+
+
+class CachedRequest(NamedTuple):
+    """A generateContent body that references a cached prefix."""
+
+    key: str
+    payload: Dict[str, Any]
+
+
+_entries: Dict[str, _Entry] = {}
+_creating: Dict[str, asyncio.Task] = {}
+
+
+def reset_gemini_cache_state() -> None:
+    """Forget cached-content names and pending creations (for tests)."""
+    _entries.clear()
+    for task in _creating.values():
+        task.cancel()
+    _creating.clear()
+
+
+def context_cache_enabled() -> bool:
+    return (os.environ.get(CONTEXT_CACHE_ENV) or "").strip().lower() in (
+        "1",
+        "on",
+        "true",
+        "yes",
+    )
+
+
+def cache_ttl_s() -> int:
+    raw = (os.environ.get(CONTEXT_CACHE_TTL_ENV) or "").strip()
+    if not raw:
+        return DEFAULT_TTL_S
+    try:
+        ttl = int(raw)
+    except ValueError:
+        ttl = 0
+    if ttl <= REFRESH_MARGIN_S:
+        logger.warning("Ignoring %s=%r", CONTEXT_CACHE_TTL_ENV, raw)
+        return DEFAULT_TTL_S
+    return ttl
+
+
+def _api_root(models_base: str) -> str:
+    """`.../v1beta` from the `.../v1beta/models` endpoint base."""
+    return models_base[: -len("/models")] if models_base.endswith("/models") else models_base
+
+
+def _key_hash(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def _prefix(payload: Dict[str, Any]) -> Dict[str, Any]:
+    prefix: Dict[str, Any] = {"contents": payload["contents"][:STATIC_CONTENTS]}
+    if "system_instruction" in payload:
+        prefix["systemInstruction"] = payload["system_instruction"]
+    return prefix
+
+
+def _static_messages(messages: list[dict[str, str]]) -> list[dict[str, str]]:
+    """The system messages and the first `STATIC_CONTENTS` others: what `_prefix` holds."""
+    static: list[dict[str, str]] = []
+    others = 0
+    for message in messages:
+        if (message.get("role") or "").strip().lower() != "system":
+            if others == STATIC_CONTENTS:
+                continue
+            others += 1
+        static.append(message)
+    return static
+
+
+def prefix_key(api_key: str, model: str, payload: Dict[str, Any]) -> str:
+    canonical = json.dumps(
+        {"key": _key_hash(api_key), "model": model, "prefix": _prefix(payload)},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def prepare(
+    api_key: str,
+    model: str,
+    messages: list[dict[str, str]],
+    payload: Dict[str, Any],
+    models_base: str,
+) -> Optional[CachedRequest]:
+    """
+    The cached form of `payload`, or None to send it as is.
+
+    Starts creating the entry in the background when there is none yet.
+    """
+    if not context_cache_enabled() or len(payload["contents"]) <= STATIC_CONTENTS:
+        return None
+    if estimate_messages_tokens(_static_messages(messages)) < MIN_CACHE_TOKENS:
+        return None
+    key = prefix_key(api_key, model, payload)
+    entry = _entries.get(key)
+    now = time.monotonic()
+    if entry is not None and now < entry.until:
+        if entry.name is None:
+            return None
+        slim = {
+            k: v for k, v in payload.items() if k not in ("contents", "system_instruction")
+        }
+        slim["cachedContent"] = entry.name
+        slim["contents"] = payload["contents"][STATIC_CONTENTS:]
+        return CachedRequest(key, slim)
+    if key not in _creating:
+        task = asyncio.ensure_future(
+            _create(key, api_key, model, _prefix(payload), models_base)
+        )
+        _creating[key] = task
+        task.add_done_callback(lambda _t, key=key: _creating.pop(key, None))
+    return None
+
+
+def invalidate(key: str) -> None:
+    """Drop an entry Gemini no longer recognises; the next call recreates it."""
+    _entries.pop(key, None)
+
+
+async def _create(
+    key: str,
+    api_key: str,
+    model: str,
+    prefix: Dict[str, Any],
+    models_base: str,
+) -> None:
+    ttl = cache_ttl_s()
+    body = {"model": f"models/{model}", "ttl": f"{ttl}s", **prefix}
+    started = time.monotonic()
+    url = f"{_api_root(models_base)}/cachedContents"
+    try:
+        response = await asyncio.wait_for(
+            provider_client(url).post(
+                url,
+                headers={"Content-Type": "application/json", "x-goog-api-key": api_key},
+                json=body,
+            ),
+            timeout=CACHE_CREATE_TIMEOUT_S,
+        )
+        name = response.json().get("name") if response.status_code == 200 else None
+    except Exception as e:
+        logger.warning("Gemini context cache creation failed for %s: %s", model, e)
+        name = None
+    else:
+        if name is None:
+            logger.warning(
+                "Gemini context cache not created for %s: HTTP %s",
+                model,
+                response.status_code,
+            )
+
+    _forget_expired()
+    if name is None:
+        _entries[key] = _Entry(None, time.monotonic() + CACHE_RETRY_AFTER_S)
+        return
+    _entries[key] = _Entry(name, started + ttl - REFRESH_MARGIN_S)
+    logger.info("Gemini context cache %s ready for %s", name, model)
+
+
+def _forget_expired() -> None:
+    """Drop entries past their use-by time, so unused prefixes do not pile up."""
+    now = time.monotonic()
+    for key in [key for key, entry in _entries.items() if entry.until <= now]:
+        del _entries[key]
@@ -6,25 +6,42 @@ Primary cloud provider for suggestion generation (before Groq / Cloudflare).
 from __future__ import annotations
 
 import asyncio
+import json
 import logging
 import os
 import random
-from typing import Any, Dict, List, Optional, Set
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 import httpx
 
-from .budget import describe_skip, resolve_call_timeout
+from . import gemini_cache, thinking
+from .budget import describe_skip, resolve_call_timeout, seconds_left
+from .circuit import allow_call, track
+from .http_clients import provider_client
+from .json_stream import JsonObjectTracker
+from .latency import call_budget, measure, messages_chars
+from .timeline import span
+from .tokens import (
+    estimate_messages_tokens,
+    fitting_models,
+    is_short_review,
+    output_token_cap,
+)
 from .provider_output import ProviderOutput
+from .router import is_router_enabled, rank_models
 from .key_pool import (
     PoolAvailability,
     acquire_gemini,
     cooldown_status_codes,
     credential_pool_index,
     format_credential_ref,
+    in_flight,
     is_gemini_configured,
     load_gemini_credentials,
     mark_cooldown,
     pool_availability,
+    ready_pair_count,
     release_soonest_cooldown,
 )
 from .provider_health import (
@@ -37,6 +54,9 @@ from .provider_health import (
 logger = logging.getLogger(__name__)
 
 GEMINI_API_BASE = "https://generativelanguage.googleapis.com/v1beta/models"
+# Overrides GEMINI_API_BASE, e.g. to point at scripts/stub_llm_server.py.
+GEMINI_API_BASE_ENV = "GEMINI_API_BASE"
+GEMINI_STREAMING_ENV = "GEMINI_STREAMING"
 
 # Curated free-tier Flash models confirmed via live generateContent probes
 # (2026-08) against Google AI Studio keys. Prefer stable IDs over floating
@@ -77,6 +97,39 @@ DEFAULT_GEMINI_THINKING_LEVEL = "low"
 # thinking) instead of sending a literal "none" the API would reject.
 THINKING_LEVEL_OPT_OUT = "none"
 
+# A sentence or two (`tokens.is_short_review`) gets the lightest level unless
+# GEMINI_THINKING_LEVEL pins one: there is little to plan, and thinking time,
+# not output, dominates Gemini latency.
+SHORT_REVIEW_THINKING_LEVEL = "minimal"
+
+# Levels from lightest to heaviest, for `thinking_level_for` to step through.
+# The API has no lighter level than "minimal": "none" here means the provider
+# default, which thinks the most.
+THINKING_LEVELS = ("minimal", "low", "medium", "high")
+
+# With less request time than this left, every pass thinks minimally: low
+# thinking measured 7.2-13.8s for a homework-length critique (see
+# GEMINI_MIN_SLICE_S), and a thorough answer that arrives late is a timeout.
+TIGHT_DEADLINE_THINKING_S = 15.0
+
+# A retry pass (the previous one failed the content checks) thinks one level
+# harder, but only with this much time left: the heavier level is slower, and
+# it must still leave room for Groq and Cloudflare behind it.
+RETRY_THINKING_MIN_S = 25.0
+
+# Thinking tokens count against maxOutputTokens, so each level's typical spend
+# is reserved on top of the expected answer. Default thinking spent ~2.9k-3.8k
+# (see above); an unknown level or the provider default keeps the full ceiling.
+GEMINI_THINKING_RESERVE_TOKENS = {
+    "minimal": 512,
+    "low": 2048,
+    "medium": 4096,
+    "high": 8192,
+}
+
+# inputTokenLimit of every pooled Flash model.
+GEMINI_CONTEXT_WINDOW_TOKENS = 1_048_576
+
 
 class GeminiError(Exception):
     """Error from Gemini API."""
@@ -128,6 +181,23 @@ def get_gemini_model() -> str:
     return (os.environ.get("GEMINI_MODEL") or "").strip() or DEFAULT_GEMINI_MODEL
 
 
+def get_gemini_api_base() -> str:
+    """Gemini models endpoint, overridable via GEMINI_API_BASE env var."""
+    return (
+        (os.environ.get(GEMINI_API_BASE_ENV) or "").strip() or GEMINI_API_BASE
+    ).rstrip("/")
+
+
+def is_streaming_enabled() -> bool:
+    """GEMINI_STREAMING=on reads answers over SSE and stops once they are whole."""
+    return (os.environ.get(GEMINI_STREAMING_ENV) or "").strip().lower() in (
+        "1",
+        "on",
+        "true",
+        "yes",
+    )
+
+
 def get_thinking_level() -> str:
     """Get the Gemini thinking level, overridable via GEMINI_THINKING_LEVEL."""
     return (
@@ -135,16 +205,75 @@ def get_thinking_level() -> str:
     ).strip() or DEFAULT_GEMINI_THINKING_LEVEL
 
 
+def thinking_level_for(
+    messages: list[dict[str, str]],
+    *,
+    deadline_monotonic: Optional[float] = None,
+    attempt: Optional[int] = None,
+) -> str:
+    """
+    Thinking level for this call.
+
+    GEMINI_THINKING_LEVEL pins one. Otherwise the first pass thinks least on a
+    sentence or two and `low` on anything longer; a retry pass thinks one level
+    harder when at least RETRY_THINKING_MIN_S is left; and under
+    TIGHT_DEADLINE_THINKING_S every pass thinks minimally. `attempt` defaults
+    to the enclosing `thinking.pass_scope()`.
+    """
+    if (os.environ.get("GEMINI_THINKING_LEVEL") or "").strip():
+        return get_thinking_level()
+    left = seconds_left(deadline_monotonic)
+    if left < TIGHT_DEADLINE_THINKING_S:
+        return THINKING_LEVELS[0]
+    if is_short_review(messages):
+        level = SHORT_REVIEW_THINKING_LEVEL
+    else:
+        level = DEFAULT_GEMINI_THINKING_LEVEL
+    if attempt is None:
+        attempt = thinking.current_pass_attempt()
+    if attempt > 1 and left >= RETRY_THINKING_MIN_S and level in THINKING_LEVELS:
+        level = THINKING_LEVELS[
+            min(THINKING_LEVELS.index(level) + 1, len(THINKING_LEVELS) - 1)
+        ]
+    return level
+
+
+def gemini_output_tokens(messages: list[dict[str, str]], thinking_level: str) -> int:
+    """maxOutputTokens for this prompt: expected answer plus thinking reserve."""
+    reserve = GEMINI_THINKING_RESERVE_TOKENS.get(thinking_level.lower())
+    if reserve is None:
+        return GEMINI_MAX_OUTPUT_TOKENS
+    return output_token_cap(
+        messages, ceiling=GEMINI_MAX_OUTPUT_TOKENS, reserved=reserve
+    )
+
+
 def is_rotation_enabled() -> bool:
     """Rotation is disabled when GEMINI_MODEL pins a non-empty model id."""
     return not (os.environ.get("GEMINI_MODEL") or "").strip()
 
 
-def select_gemini_models(n: int = 2) -> List[str]:
-    """Select up to n distinct Gemini models for a single logical request."""
+def select_gemini_models(
+    n: int = 2,
+    *,
+    input_chars: Optional[int] = None,
+    deadline_monotonic: Optional[float] = None,
+) -> List[str]:
+    """
+    Select up to n distinct Gemini models for a single logical request.
+
+    Random when rotating, or the n best-scoring with `LLM_ROUTER=score`.
+    """
     if not is_rotation_enabled():
         return [get_gemini_model()]
     n = min(n, len(ALLOWED_GEMINI_MODELS))
+    if is_router_enabled():
+        return rank_models(
+            "gemini",
+            ALLOWED_GEMINI_MODELS,
+            input_chars=input_chars,
+            deadline_monotonic=deadline_monotonic,
+        )[:n]
     return random.sample(ALLOWED_GEMINI_MODELS, n)
 
 
@@ -165,6 +294,11 @@ def gemini_availability() -> PoolAvailability:
     return pool_availability(load_gemini_credentials(), _rotation_scopes())
 
 
+def gemini_ready_pairs() -> int:
+    """(key, model) pairs Gemini could be called on right now without a known refusal."""
+    return ready_pair_count(load_gemini_credentials(), _rotation_scopes())
+
+
 def release_gemini_cooldown() -> Optional[str]:
     """Free the soonest-recovering Gemini key so one attempt can still be made."""
     return release_soonest_cooldown(load_gemini_credentials(), _rotation_scopes())
@@ -172,8 +306,15 @@ def release_gemini_cooldown() -> Optional[str]:
 
 def _messages_to_gemini_payload(
     messages: list[dict[str, str]],
+    deadline_monotonic: Optional[float] = None,
 ) -> Dict[str, Any]:
-    """Map OpenAI-style chat messages to Gemini generateContent body parts."""
+    """
+    Map OpenAI-style chat messages to Gemini generateContent body parts.
+
+    The thinking level is chosen here, per call (`thinking_level_for`), from
+    the prompt, the enclosing retry pass and the time left before
+    `deadline_monotonic`.
+    """
     system_chunks: List[str] = []
     contents: List[Dict[str, Any]] = []
 
@@ -195,12 +336,14 @@ def _messages_to_gemini_payload(
     if not contents:
         contents = [{"role": "user", "parts": [{"text": ""}]}]
 
+    thinking_level = thinking_level_for(
+        messages, deadline_monotonic=deadline_monotonic
+    )
     generation_config: Dict[str, Any] = {
         "temperature": 0.15,
-        "maxOutputTokens": GEMINI_MAX_OUTPUT_TOKENS,
+        "maxOutputTokens": gemini_output_tokens(messages, thinking_level),
         "responseMimeType": "application/json",
     }
-    thinking_level = get_thinking_level()
     if thinking_level.lower() != THINKING_LEVEL_OPT_OUT:
         generation_config["thinkingConfig"] = {"thinkingLevel": thinking_level}
 
@@ -215,15 +358,9 @@ def _messages_to_gemini_payload(
     return payload
 
 
-def _extract_text_from_response(data: dict[str, Any]) -> str:
-    """Pull concatenated text parts from a generateContent response."""
-    candidates = data.get("candidates") or []
-    if not candidates:
-        # promptFeedback / blocked responses often omit candidates
-        feedback = data.get("promptFeedback") or data.get("error")
-        raise GeminiError(f"Unexpected Gemini response (no candidates): {feedback or data}")
-
-    candidate0 = candidates[0] or {}
+def _log_response_metadata(data: dict[str, Any], max_output_tokens: int) -> None:
+    """Log a response's finishReason and token usage, once per call."""
+    candidate0 = (data.get("candidates") or [{}])[0] or {}
     finish_reason = candidate0.get("finishReason") or candidate0.get("finish_reason")
     if finish_reason:
         # Surface truncation vs STOP so ops can tell short critiques from
@@ -236,8 +373,8 @@ def _extract_text_from_response(data: dict[str, Any]) -> str:
         logger.log(level, "Gemini finishReason=%s", finish_reason)
 
     # Token counts make "was the budget the constraint?" answerable from
-    # production logs: a STOP with candidatesTokenCount far below
-    # GEMINI_MAX_OUTPUT_TOKENS means the model chose to be brief, while a
+    # production logs: a STOP with candidatesTokenCount far below the call's
+    # maxOutputTokens means the model chose to be brief, while a
     # thoughtsTokenCount in the thousands means thinking, not output, is
     # driving latency. Counts only — no prompt or response content.
     usage = data.get("usageMetadata")
@@ -249,9 +386,31 @@ def _extract_text_from_response(data: dict[str, Any]) -> str:
             usage.get("candidatesTokenCount"),
             usage.get("thoughtsTokenCount"),
             usage.get("totalTokenCount"),
-            GEMINI_MAX_OUTPUT_TOKENS,
+            max_output_tokens,
         )
 
+
+def _extract_text_from_response(
+    data: dict[str, Any],
+    max_output_tokens: int = GEMINI_MAX_OUTPUT_TOKENS,
+    *,
+    log_metadata: bool = True,
+) -> str:
+    """
+    Pull concatenated text parts from a generateContent response.
+
+    A streamed call passes `log_metadata=False` for each frame and logs the
+    last one when the stream ends, so a call logs its metadata once.
+    """
+    candidates = data.get("candidates") or []
+    if not candidates:
+        # promptFeedback / blocked responses often omit candidates
+        feedback = data.get("promptFeedback") or data.get("error")
+        raise GeminiError(f"Unexpected Gemini response (no candidates): {feedback or data}")
+    if log_metadata:
+        _log_response_metadata(data, max_output_tokens)
+
+    candidate0 = candidates[0] or {}
     parts = (candidate0.get("content") or {}).get("parts") or []
     texts: List[str] = []
     for part in parts:
@@ -295,33 +454,127 @@ def _retry_hint_seconds(response: httpx.Response) -> Optional[float]:
     return None
 
 
+async def _send_generate(
+    client: httpx.AsyncClient,
+    api_base: str,
+    model: str,
+    headers: Dict[str, str],
+    body: Dict[str, Any],
+    max_output_tokens: int,
+) -> Tuple[httpx.Response, Optional[str]]:
+    """POST generateContent; the text is read from the body later."""
+    url = f"{api_base}/{model}:generateContent"
+    return await client.post(url, headers=headers, json=body), None
+
+
+async def _stream_generate(
+    client: httpx.AsyncClient,
+    api_base: str,
+    model: str,
+    headers: Dict[str, str],
+    body: Dict[str, Any],
+    max_output_tokens: int,
+) -> Tuple[httpx.Response, Optional[str]]:
+    """
+    streamGenerateContent over SSE, returning as soon as the answer is whole.
+
+    Text parts are accumulated as frames arrive and fed to a
+    `JsonObjectTracker`; once the top-level object balances and parses, the
+    stream is abandoned instead of waiting for trailing tokens and the final
+    metadata frame. An error status is returned with its body read, so it
+    maps to the same typed errors as a plain call. finishReason and usage are
+    logged once, from the last frame read, rather than for every frame.
+    """
+    url = f"{api_base}/{model}:streamGenerateContent?alt=sse"
+    async with client.stream("POST", url, headers=headers, json=body) as response:
+        if response.status_code != 200:
+            await response.aread()
+            return response, None
+        tracker = JsonObjectTracker()
+        last_frame: Optional[Dict[str, Any]] = None
+        try:
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                try:
+                    frame = json.loads(line[len("data:"):].strip())
+                except ValueError:
+                    continue
+                if not frame.get("candidates"):
+                    continue
+                last_frame = frame
+                text = _extract_text_from_response(
+                    frame, max_output_tokens, log_metadata=False
+                )
+                if text and tracker.feed(text) is not None:
+                    logger.info("Gemini stream: answer complete; closing stream early")
+                    return response, tracker.complete
+            return response, tracker.text
+        finally:
+            if last_frame is not None:
+                _log_response_metadata(last_frame, max_output_tokens)
+
+
 async def _call_gemini_once(
     api_key: str,
     messages: list[dict[str, str]],
     resolved_model: str,
     timeout: float = GEMINI_TIMEOUT,
+    deadline_monotonic: Optional[float] = None,
 ) -> str:
     """Single Gemini HTTP attempt with a concrete API key.
 
     `timeout` is a hard ceiling on the whole attempt, enforced with
     `asyncio.wait_for` rather than left to httpx: httpx applies its timeout per
     operation, so connect and read can each take the full value and a call sized
-    to the remaining request budget could still overshoot it.
+    to the remaining request budget could still overshoot it. With streaming
+    the ceiling covers reading the stream too.
     """
-    url = f"{GEMINI_API_BASE}/{resolved_model}:generateContent"
+    api_base = get_gemini_api_base()
     headers = {
         "Content-Type": "application/json",
         "x-goog-api-key": api_key,
     }
-    payload = _messages_to_gemini_payload(messages)
+    payload = _messages_to_gemini_payload(messages, deadline_monotonic)
+    max_output_tokens = payload["generationConfig"]["maxOutputTokens"]
+    thinking_level = (
+        payload["generationConfig"].get("thinkingConfig", {}).get("thinkingLevel")
+        or THINKING_LEVEL_OPT_OUT
+    )
+    cached = gemini_cache.prepare(api_key, resolved_model, messages, payload, api_base)
+    send = _stream_generate if is_streaming_enabled() else _send_generate
+    started = time.monotonic()
 
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await asyncio.wait_for(
-                client.post(url, headers=headers, json=payload),
-                timeout=timeout,
+        client = provider_client(api_base)
+        response, streamed = await asyncio.wait_for(
+            send(
+                client,
+                api_base,
+                resolved_model,
+                headers,
+                cached.payload if cached else payload,
+                max_output_tokens,
+            ),
+            timeout=timeout,
+        )
+        if cached and response.status_code in gemini_cache.CACHE_MISS_STATUSES:
+            # The cached content expired or was deleted elsewhere: repeat
+            # the call in full rather than fail it.
+            logger.info(
+                "Gemini rejected cached content (HTTP %s); retrying uncached",
+                response.status_code,
+            )
+            gemini_cache.invalidate(cached.key)
+            remaining = timeout - (time.monotonic() - started)
+            response, streamed = await asyncio.wait_for(
+                send(client, api_base, resolved_model, headers, payload, max_output_tokens),
+                timeout=max(remaining, 0.0),
             )
     except (httpx.TimeoutException, asyncio.TimeoutError) as e:
+        thinking.record_call(
+            thinking_level, time.monotonic() - started, answered=False
+        )
         raise GeminiTimeoutError(
             f"Gemini request timed out after {timeout:.1f}s"
         ) from e
@@ -356,13 +609,16 @@ async def _call_gemini_once(
             status_code=response.status_code,
         )
 
-    data = response.json()
-    try:
-        return _extract_text_from_response(data)
-    except GeminiError:
-        raise
-    except (KeyError, IndexError, TypeError) as e:
-        raise GeminiError(f"Unexpected Gemini response format: {data}") from e
+    if streamed is None:
+        data = response.json()
+        try:
+            streamed = _extract_text_from_response(data, max_output_tokens)
+        except GeminiError:
+            raise
+        except (KeyError, IndexError, TypeError) as e:
+            raise GeminiError(f"Unexpected Gemini response format: {data}") from e
+    thinking.record_call(thinking_level, time.monotonic() - started, answered=True)
+    return streamed
 
 
 async def call_gemini(
@@ -383,11 +639,19 @@ async def call_gemini(
         raise GeminiError("GEMINI_API_KEY not configured")
 
     resolved_model = model or get_gemini_model()
+    if not allow_call("gemini", resolved_model):
+        # Retriable, so rotation tries a sibling model and the chain moves on.
+        raise GeminiServerError(
+            f"Gemini model {resolved_model} skipped: circuit open after "
+            f"repeated server errors or timeouts"
+        )
     pool = load_gemini_credentials()
     pool_size = len(pool)
     attempted: Set[str] = set()
     last_error: Optional[GeminiError] = None
     cooldown_codes = cooldown_status_codes()
+    input_chars = messages_chars(messages)
+    prompt_tokens = estimate_messages_tokens(messages)
 
     while True:
         cred = acquire_gemini(
@@ -408,8 +672,15 @@ async def call_gemini(
                 status_code=429,
             )
 
+        budget = call_budget(
+            "gemini",
+            resolved_model,
+            input_chars,
+            default_timeout=GEMINI_TIMEOUT,
+            default_min_slice=GEMINI_MIN_SLICE_S,
+        )
         timeout = resolve_call_timeout(
-            deadline_monotonic, GEMINI_TIMEOUT, GEMINI_MIN_SLICE_S
+            deadline_monotonic, budget.timeout_s, budget.min_slice_s
         )
         if timeout is None:
             # A failure that already happened explains more than "and then we
@@ -417,16 +688,37 @@ async def call_gemini(
             if last_error is not None:
                 raise last_error
             raise GeminiTimeoutError(
-                describe_skip("Gemini", deadline_monotonic, GEMINI_MIN_SLICE_S)
+                describe_skip("Gemini", deadline_monotonic, budget.min_slice_s)
             )
 
         attempted.add(cred.id)
         idx = credential_pool_index(pool, cred.id)
         cred_ref = format_credential_ref("gemini", idx, cred.label)
         try:
-            return await _call_gemini_once(
-                cred.api_key, messages, resolved_model, timeout
-            )
+            with measure(
+                "gemini",
+                resolved_model,
+                input_chars,
+                timeout_s=timeout,
+                timeout_errors=(GeminiTimeoutError,),
+                clamped=timeout < budget.timeout_s,
+            ), track(
+                "gemini",
+                resolved_model,
+                timeout_errors=(GeminiTimeoutError,),
+                clamped=timeout < budget.timeout_s,
+            ), in_flight(
+                cred.id, scope=resolved_model, tokens=prompt_tokens
+            ), span("gemini", key=cred_ref, model=resolved_model) as attempt:
+                text = await _call_gemini_once(
+                    cred.api_key,
+                    messages,
+                    resolved_model,
+                    timeout,
+                    deadline_monotonic=deadline_monotonic,
+                )
+                attempt["status"] = 200
+                return text
         except GeminiError as e:
             status = e.status_code
             if status in cooldown_codes:
@@ -452,6 +744,35 @@ async def call_gemini(
             raise
 
 
+def _models_that_fit(
+    messages: list[dict[str, str]],
+    models: List[str],
+    deadline_monotonic: Optional[float] = None,
+) -> List[str]:
+    """
+    `models` whose context window holds this prompt and its output budget.
+
+    Raises a non-retriable GeminiError when none does, so an oversize prompt
+    fails in microseconds and the chain moves on instead of spending keys.
+    """
+    output = gemini_output_tokens(
+        messages,
+        thinking_level_for(messages, deadline_monotonic=deadline_monotonic),
+    )
+    fitting = fitting_models(
+        messages,
+        models,
+        context_window=lambda _model: GEMINI_CONTEXT_WINDOW_TOKENS,
+        output_tokens=lambda _model: output,
+    )
+    if not fitting:
+        raise GeminiError(
+            f"Prompt of ~{estimate_messages_tokens(messages)} tokens does not fit "
+            f"the context window of {', '.join(models)}"
+        )
+    return fitting
+
+
 async def call_gemini_with_rotation(
     messages: list[dict[str, str]],
     deadline_monotonic: Optional[float] = None,
@@ -473,7 +794,15 @@ async def call_gemini_with_rotation(
     Returns the raw text together with the model that produced it — after a
     retry that is the second model, not the first one attempted.
     """
-    models = select_gemini_models(n=2)
+    models = _models_that_fit(
+        messages,
+        select_gemini_models(
+            n=2,
+            input_chars=messages_chars(messages),
+            deadline_monotonic=deadline_monotonic,
+        ),
+        deadline_monotonic,
+    )
     first_model = models[0]
 
     try:
@@ -486,16 +815,23 @@ async def call_gemini_with_rotation(
     except (GeminiRateLimitError, GeminiServerError, GeminiTimeoutError):
         if len(models) < 2:
             raise
+        second_model = models[1]
+        budget = call_budget(
+            "gemini",
+            second_model,
+            messages_chars(messages),
+            default_timeout=GEMINI_TIMEOUT,
+            default_min_slice=GEMINI_MIN_SLICE_S,
+        )
         if (
             resolve_call_timeout(
-                deadline_monotonic, GEMINI_TIMEOUT, GEMINI_MIN_SLICE_S
+                deadline_monotonic, budget.timeout_s, budget.min_slice_s
             )
             is None
         ):
             # Too little of the phase left for a sibling model, and the first
             # model's failure is the more useful error to report upward.
             raise
-        second_model = models[1]
         return ProviderOutput(
             await call_gemini(
                 messages, model=second_model, deadline_monotonic=deadline_monotonic
@@ -6,36 +6,59 @@ Primary provider for fast inference (~1-3 seconds).
 from __future__ import annotations
 
 import asyncio
+import json
 import logging
 import os
 import random
+import time
 import httpx
-from typing import Any, Optional, List, Dict, Set
+from typing import Any, Optional, List, Dict, Set, Tuple
 
 from .budget import describe_skip, resolve_call_timeout
+from .circuit import allow_call, track
+from .http_clients import provider_client
+from .json_stream import JsonObjectTracker
+from .latency import call_budget, measure, messages_chars
+from .timeline import span
+from .tokens import (
+    estimate_messages_tokens,
+    estimate_tokens,
+    fitting_models,
+    output_token_cap,
+)
 from .provider_output import ProviderOutput
+from .router import is_router_enabled, rank_models
 from .key_pool import (
+    GroqCredential,
     PoolAvailability,
     acquire_groq,
     cooldown_status_codes,
     credential_pool_index,
     format_credential_ref,
+    in_flight,
     is_groq_configured,
     load_groq_credentials,
     mark_cooldown,
+    note_rate_limits,
     pool_availability,
+    ready_pair_count,
     release_soonest_cooldown,
 )
 from .provider_health import (
     clamp_cooldown_seconds,
     observe_refusal,
     parse_duration_hint,
+    parse_rate_limit_headers,
     parse_retry_after,
 )
 
 logger = logging.getLogger(__name__)
 
 GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+# Overrides GROQ_API_URL, e.g. to point at scripts/stub_llm_server.py.
+GROQ_API_URL_ENV = "GROQ_API_URL"
+# "on" reads completions as a stream and stops once the JSON answer closes.
+GROQ_STREAMING_ENV = "GROQ_STREAMING"
 
 # Curated rotation pool of general-purpose instruction-following chat models
 # known to produce coherent structured JSON output for this task. A model is
@@ -103,6 +126,22 @@ GROQ_MIN_SLICE_S = 5.0
 # content without an inline thinking block at default settings.
 QWEN_REASONING_MODELS = {"qwen/qwen3.6-27b"}
 
+# Ceiling on max_tokens. Long TARGET TEXT (e.g. multi-paragraph epic corpus)
+# with ≥5 suggestions needs headroom; 1024/2048 truncated mid-JSON in live
+# smoke. Shorter reviews get less (`tokens.output_token_cap`).
+GROQ_MAX_TOKENS = 4096
+
+# gpt-oss models reason before answering and the reasoning counts against
+# max_tokens, so it is reserved on top of the expected answer. Models run with
+# reasoning_effort="none" (QWEN_REASONING_MODELS) need no reserve.
+GROQ_REASONING_RESERVE_TOKENS = 1024
+
+# Context windows of the pooled models; a model missing here is never skipped.
+GROQ_CONTEXT_WINDOW_TOKENS = {
+    "openai/gpt-oss-120b": 131_072,
+    "openai/gpt-oss-20b": 131_072,
+}
+
 
 class GroqError(Exception):
     """Error from Groq API."""
@@ -160,6 +199,21 @@ def get_groq_model() -> str:
     return os.environ.get("GROQ_MODEL") or DEFAULT_GROQ_MODEL
 
 
+def get_groq_api_url() -> str:
+    """Groq chat completions endpoint, overridable via GROQ_API_URL env var."""
+    return (os.environ.get(GROQ_API_URL_ENV) or "").strip() or GROQ_API_URL
+
+
+def is_streaming_enabled() -> bool:
+    """GROQ_STREAMING=on reads answers over SSE and stops once they are whole."""
+    return (os.environ.get(GROQ_STREAMING_ENV) or "").strip().lower() in (
+        "1",
+        "on",
+        "true",
+        "yes",
+    )
+
+
 def is_rotation_enabled() -> bool:
     """
     Whether per-request model rotation across ALLOWED_GROQ_MODELS is active.
@@ -171,19 +225,33 @@ def is_rotation_enabled() -> bool:
     return not os.environ.get("GROQ_MODEL")
 
 
-def select_groq_models(n: int = 2) -> List[str]:
+def select_groq_models(
+    n: int = 2,
+    *,
+    input_chars: Optional[int] = None,
+    deadline_monotonic: Optional[float] = None,
+) -> List[str]:
     """
     Select up to n distinct Groq models to attempt for a single request.
 
     When rotation is enabled, returns n distinct models chosen via
     random.sample() from ALLOWED_GROQ_MODELS (no persistent counter, since
     Vercel serverless invocations are stateless per-request — see
-    design.md Decision 2). When GROQ_MODEL pins a single model, rotation is
-    disabled and only that one model is returned regardless of n.
+    design.md Decision 2). With `LLM_ROUTER=score` the n best-scoring models
+    are taken instead (`router.rank_models`). When GROQ_MODEL pins a single
+    model, rotation is disabled and only that one model is returned regardless
+    of n.
     """
     if not is_rotation_enabled():
         return [get_groq_model()]
     n = min(n, len(ALLOWED_GROQ_MODELS))
+    if is_router_enabled():
+        return rank_models(
+            "groq",
+            ALLOWED_GROQ_MODELS,
+            input_chars=input_chars,
+            deadline_monotonic=deadline_monotonic,
+        )[:n]
     return random.sample(ALLOWED_GROQ_MODELS, n)
 
 
@@ -204,11 +272,22 @@ def groq_availability() -> PoolAvailability:
     return pool_availability(load_groq_credentials(), _rotation_scopes())
 
 
+def groq_ready_pairs() -> int:
+    """(key, model) pairs Groq could be called on right now without a known refusal."""
+    return ready_pair_count(load_groq_credentials(), _rotation_scopes())
+
+
 def release_groq_cooldown() -> Optional[str]:
     """Free the soonest-recovering Groq key so one attempt can still be made."""
     return release_soonest_cooldown(load_groq_credentials(), _rotation_scopes())
 
 
+def groq_output_tokens(messages: list[dict[str, str]], model: str) -> int:
+    """max_tokens for this prompt on `model`."""
+    reserve = 0 if model in QWEN_REASONING_MODELS else GROQ_REASONING_RESERVE_TOKENS
+    return output_token_cap(messages, ceiling=GROQ_MAX_TOKENS, reserved=reserve)
+
+
 def _retry_hint_seconds(response: httpx.Response) -> Optional[float]:
     """
     Seconds Groq asked us to wait, from `Retry-After` or its reset headers.
@@ -228,6 +307,153 @@ def _retry_hint_seconds(response: httpx.Response) -> Optional[float]:
     return None
 
 
+class _ThinkFilter:
+    """
+    Drops `<think>...</think>` segments from streamed content.
+
+    Tags can be split across deltas, so a trailing fragment that could still
+    become a tag is held back until the next delta decides it.
+    """
+
+    OPEN = "<think>"
+    CLOSE = "</think>"
+
+    def __init__(self) -> None:
+        self._pending = ""
+        self._thinking = False
+
+    def feed(self, fragment: str) -> str:
+        text = self._pending + fragment
+        self._pending = ""
+        visible: List[str] = []
+        while text:
+            tag = self.CLOSE if self._thinking else self.OPEN
+            at = text.find(tag)
+            if at >= 0:
+                if not self._thinking:
+                    visible.append(text[:at])
+                text = text[at + len(tag):]
+                self._thinking = not self._thinking
+                continue
+            keep = _partial_tag_length(text, tag)
+            if not self._thinking:
+                visible.append(text[: len(text) - keep])
+            self._pending = text[len(text) - keep:] if keep else ""
+            break
+        return "".join(visible)
+
+
+def _partial_tag_length(text: str, tag: str) -> int:
+    """Length of the longest suffix of `text` that is a prefix of `tag`."""
+    for n in range(min(len(text), len(tag) - 1), 0, -1):
+        if tag.startswith(text[-n:]):
+            return n
+    return 0
+
+
+async def _send_chat(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: Dict[str, str],
+    payload: Dict[str, Any],
+) -> Tuple[httpx.Response, Optional[str]]:
+    """POST chat/completions; the text is read from the body later."""
+    return await client.post(url, headers=headers, json=payload), None
+
+
+async def _stream_chat(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: Dict[str, str],
+    payload: Dict[str, Any],
+) -> Tuple[httpx.Response, Optional[str]]:
+    """
+    chat/completions with `stream: true`, returning once the answer is whole.
+
+    Only `delta.content` is kept: reasoning that gpt-oss streams separately
+    (`delta.reasoning`) and inline `<think>` blocks are dropped as they
+    arrive. The rest is fed to a `JsonObjectTracker`, and the stream is
+    abandoned as soon as the top-level object balances and parses. Time to
+    first token and observed tokens per second are logged and recorded on a
+    `groq_stream` timeline span, per model. An error status is returned with
+    its body read, so it maps to the same typed errors as a plain call.
+    """
+    model = payload["model"]
+    body = {**payload, "stream": True}
+    # Groq's JSON mode cannot be streamed; the tracker finds the object instead.
+    body.pop("response_format", None)
+    started = time.monotonic()
+    with span("groq_stream", model=model) as stats:
+        async with client.stream("POST", url, headers=headers, json=body) as response:
+            if response.status_code != 200:
+                await response.aread()
+                return response, None
+            tracker = JsonObjectTracker()
+            think = _ThinkFilter()
+            first_token: Optional[float] = None
+            generated: List[str] = []
+            usage_tokens: Optional[int] = None
+            answer: Optional[str] = None
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except ValueError:
+                    continue
+                usage = (chunk.get("x_groq") or {}).get("usage") or chunk.get("usage")
+                if usage and usage.get("completion_tokens") is not None:
+                    usage_tokens = usage["completion_tokens"]
+                choices = chunk.get("choices") or []
+                if not choices:
+                    continue
+                delta = choices[0].get("delta") or {}
+                reasoning = delta.get("reasoning") or ""
+                content = delta.get("content") or ""
+                if (reasoning or content) and first_token is None:
+                    first_token = time.monotonic()
+                generated.append(reasoning + content)
+                visible = think.feed(content) if content else ""
+                if visible and tracker.feed(visible) is not None:
+                    answer = tracker.complete
+                    break
+            if answer is None:
+                answer = tracker.text
+        _observe_stream(stats, model, started, first_token, generated, usage_tokens)
+    return response, answer
+
+
+def _observe_stream(
+    stats: Dict[str, Any],
+    model: str,
+    started: float,
+    first_token: Optional[float],
+    generated: List[str],
+    usage_tokens: Optional[int],
+) -> None:
+    """Record TTFB and generation speed of one streamed completion."""
+    if first_token is None:
+        return
+    # Groq reports usage only on the last chunk, which an early finish skips.
+    tokens = usage_tokens if usage_tokens is not None else estimate_tokens("".join(generated))
+    generating_s = time.monotonic() - first_token
+    ttfb_s = first_token - started
+    stats["ttfb_ms"] = round(ttfb_s * 1000, 1)
+    stats["tokens"] = tokens
+    if generating_s > 0:
+        stats["tokens_per_s"] = round(tokens / generating_s, 1)
+    logger.info(
+        "Groq stream model=%s ttfb=%.0fms tokens=%d tokens_per_s=%s",
+        model,
+        ttfb_s * 1000,
+        tokens,
+        stats.get("tokens_per_s", "n/a"),
+    )
+
+
 async def _call_groq_once(
     api_key: str,
     messages: list[dict[str, str]],
@@ -238,7 +464,7 @@ async def _call_groq_once(
 
     `timeout` is a hard ceiling on the whole attempt (see
     `gemini_provider._call_gemini_once` for why httpx's own timeout is not
-    sufficient on its own).
+    sufficient on its own). With streaming it covers reading the stream too.
     """
     headers = {
         "Authorization": f"Bearer {api_key}",
@@ -247,9 +473,7 @@ async def _call_groq_once(
     payload: dict[str, Any] = {
         "model": resolved_model,
         "messages": messages,
-        # Long TARGET TEXT (e.g. multi-paragraph epic corpus) with ≥5
-        # suggestions needs headroom; 1024/2048 truncated mid-JSON in live smoke.
-        "max_tokens": 4096,
+        "max_tokens": groq_output_tokens(messages, resolved_model),
         "temperature": 0.15,
         # Force a JSON object body — prompts already require JSON-only output;
         # this prevents prose-only replies that burn the parse-retry budget.
@@ -260,12 +484,13 @@ async def _call_groq_once(
         # can consume the entire max_tokens budget before any JSON is emitted.
         payload["reasoning_effort"] = "none"
 
+    url = get_groq_api_url()
+    send = _stream_chat if is_streaming_enabled() else _send_chat
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await asyncio.wait_for(
-                client.post(GROQ_API_URL, headers=headers, json=payload),
-                timeout=timeout,
-            )
+        response, streamed = await asyncio.wait_for(
+            send(provider_client(url), url, headers, payload),
+            timeout=timeout,
+        )
     except (httpx.TimeoutException, asyncio.TimeoutError) as e:
         raise GroqTimeoutError(f"Groq request timed out after {timeout:.1f}s") from e
     except httpx.RequestError as e:
@@ -296,6 +521,15 @@ async def _call_groq_once(
             status_code=response.status_code,
         )
 
+    # What is left of this key's limits for the model, so the next selection
+    # can move to another key before this one is refused.
+    note_rate_limits(
+        GroqCredential(api_key).id,
+        parse_rate_limit_headers(response.headers),
+        scope=resolved_model,
+    )
+    if streamed is not None:
+        return streamed
     data = response.json()
 
     try:
@@ -336,11 +570,19 @@ async def call_groq(
         raise GroqError("GROQ_API_KEY not configured")
 
     resolved_model = model or get_groq_model()
+    if not allow_call("groq", resolved_model):
+        # Retriable, so rotation tries a sibling model and the chain moves on.
+        raise GroqServerError(
+            f"Groq model {resolved_model} skipped: circuit open after "
+            f"repeated server errors or timeouts"
+        )
     pool = load_groq_credentials()
     pool_size = len(pool)
     attempted: Set[str] = set()
     last_error: Optional[GroqError] = None
     cooldown_codes = cooldown_status_codes()
+    input_chars = messages_chars(messages)
+    prompt_tokens = estimate_messages_tokens(messages)
 
     while True:
         # Scope cooldown by model so a 429 on model A does not block model B
@@ -365,8 +607,15 @@ async def call_groq(
                 status_code=429,
             )
 
+        budget = call_budget(
+            "groq",
+            resolved_model,
+            input_chars,
+            default_timeout=GROQ_TIMEOUT,
+            default_min_slice=GROQ_MIN_SLICE_S,
+        )
         timeout = resolve_call_timeout(
-            deadline_monotonic, GROQ_TIMEOUT, GROQ_MIN_SLICE_S
+            deadline_monotonic, budget.timeout_s, budget.min_slice_s
         )
         if timeout is None:
             # A failure that already happened explains more than "and then we
@@ -374,16 +623,33 @@ async def call_groq(
             if last_error is not None:
                 raise last_error
             raise GroqTimeoutError(
-                describe_skip("Groq", deadline_monotonic, GROQ_MIN_SLICE_S)
+                describe_skip("Groq", deadline_monotonic, budget.min_slice_s)
             )
 
         attempted.add(cred.id)
         idx = credential_pool_index(pool, cred.id)
         cred_ref = format_credential_ref("groq", idx, cred.label)
         try:
-            return await _call_groq_once(
-                cred.api_key, messages, resolved_model, timeout
-            )
+            with measure(
+                "groq",
+                resolved_model,
+                input_chars,
+                timeout_s=timeout,
+                timeout_errors=(GroqTimeoutError,),
+                clamped=timeout < budget.timeout_s,
+            ), track(
+                "groq",
+                resolved_model,
+                timeout_errors=(GroqTimeoutError,),
+                clamped=timeout < budget.timeout_s,
+            ), in_flight(
+                cred.id, scope=resolved_model, tokens=prompt_tokens
+            ), span("groq", key=cred_ref, model=resolved_model) as attempt:
+                text = await _call_groq_once(
+                    cred.api_key, messages, resolved_model, timeout
+                )
+                attempt["status"] = 200
+                return text
         except GroqError as e:
             status = e.status_code
             if status in cooldown_codes:
@@ -409,6 +675,27 @@ async def call_groq(
             raise
 
 
+def _models_that_fit(messages: list[dict[str, str]], models: List[str]) -> List[str]:
+    """
+    `models` whose context window holds this prompt and its output budget.
+
+    Raises a non-retriable GroqError when none does, so an oversize prompt
+    fails before a key is spent and the chain moves on.
+    """
+    fitting = fitting_models(
+        messages,
+        models,
+        context_window=GROQ_CONTEXT_WINDOW_TOKENS.get,
+        output_tokens=lambda model: groq_output_tokens(messages, model),
+    )
+    if not fitting:
+        raise GroqError(
+            f"Prompt of ~{estimate_messages_tokens(messages)} tokens does not fit "
+            f"the context window of {', '.join(models)}"
+        )
+    return fitting
+
+
 async def call_groq_with_rotation(
     messages: list[dict[str, str]],
     deadline_monotonic: Optional[float] = None,
@@ -439,7 +726,14 @@ async def call_groq_with_rotation(
         GroqError and subclasses: the final attempt's error, if all
             attempted models fail.
     """
-    models = select_groq_models(n=2)
+    models = _models_that_fit(
+        messages,
+        select_groq_models(
+            n=2,
+            input_chars=messages_chars(messages),
+            deadline_monotonic=deadline_monotonic,
+        ),
+    )
     first_model = models[0]
 
     try:
@@ -452,14 +746,23 @@ async def call_groq_with_rotation(
     except (GroqRateLimitError, GroqServerError, GroqTimeoutError, GroqJsonValidateError):
         if len(models) < 2:
             raise
+        second_model = models[1]
+        budget = call_budget(
+            "groq",
+            second_model,
+            messages_chars(messages),
+            default_timeout=GROQ_TIMEOUT,
+            default_min_slice=GROQ_MIN_SLICE_S,
+        )
         if (
-            resolve_call_timeout(deadline_monotonic, GROQ_TIMEOUT, GROQ_MIN_SLICE_S)
+            resolve_call_timeout(
+                deadline_monotonic, budget.timeout_s, budget.min_slice_s
+            )
             is None
         ):
             # Too little of the phase left for a sibling model, and the first
             # model's failure is the more useful error to report upward.
             raise
-        second_model = models[1]
         return ProviderOutput(
             await call_groq(
                 messages, model=second_model, deadline_monotonic=deadline_monotonic
@@ -0,0 +1,113 @@
+"""
+Shared, long-lived HTTP clients for the LLM providers.
+
+Each provider attempt used to open its own `httpx.AsyncClient`, so every pooled
+key retry and every model rotation paid DNS, TCP and TLS again before a byte of
+prompt was sent. `provider_client(url)` instead returns one client per origin
+(scheme, host, port), which keeps connections alive between attempts and
+between requests served by the same warm instance.
+
+The clients carry no useful timeout of their own: callers keep bounding each
+attempt with `asyncio.wait_for`, which is the hard ceiling (see
+`gemini_provider._call_gemini_once`). A cancelled attempt only closes its own
+connection. `LLM_HTTP2=on` multiplexes attempts to one host over a single
+HTTP/2 connection when the `h2` package is installed.
+
+A client is bound to the event loop it was created on, so a different loop
+(each test, each `asyncio.run` in a script) gets its own. The clients are
+closed on application shutdown (`close_provider_clients`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from .budget import PLATFORM_MAX_DURATION_S
+from .cassette import cassette_dir, cassette_mode, cassette_transport
+
+logger = logging.getLogger(__name__)
+
+HTTP2_ENV = "LLM_HTTP2"
+
+# Enough for a batch request's concurrent items against one host, with spare
+# idle connections kept warm for the next request.
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+# Providers close idle connections after roughly a minute; reusing one they
+# have already dropped costs a failed write and a reconnect.
+KEEPALIVE_EXPIRY_S = 30.0
+CONNECT_TIMEOUT_S = 10.0
+
+# Backstop only: attempts are bounded by `asyncio.wait_for`.
+CLIENT_TIMEOUT = httpx.Timeout(PLATFORM_MAX_DURATION_S, connect=CONNECT_TIMEOUT_S)
+
+_ClientKey = Tuple[str, str, Optional[str]]
+_clients: Dict[_ClientKey, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+
+
+def reset_http_clients() -> None:
+    """Forget every shared client without closing it (for tests)."""
+    _clients.clear()
+
+
+def http2_enabled() -> bool:
+    return (os.environ.get(HTTP2_ENV) or "").strip().lower() in ("1", "on", "true", "yes")
+
+
+def _origin(url: str) -> str:
+    parsed = httpx.URL(url)
+    port = f":{parsed.port}" if parsed.port else ""
+    return f"{parsed.scheme}://{parsed.host}{port}"
+
+
+def _new_client() -> httpx.AsyncClient:
+    options = dict(
+        timeout=CLIENT_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY_S,
+        ),
+        transport=cassette_transport(),
+    )
+    if http2_enabled():
+        try:
+            return httpx.AsyncClient(http2=True, **options)
+        except ImportError:
+            logger.warning("%s is set but the h2 package is missing; using HTTP/1.1", HTTP2_ENV)
+    return httpx.AsyncClient(**options)
+
+
+def provider_client(url: str) -> httpx.AsyncClient:
+    """The shared client for `url`'s origin on the running event loop."""
+    mode = cassette_mode()
+    key: _ClientKey = (
+        _origin(url),
+        mode,
+        str(cassette_dir()) if mode != "off" else None,
+    )
+    loop = asyncio.get_running_loop()
+    entry = _clients.get(key)
+    if entry is not None and entry[0] is loop:
+        return entry[1]
+    client = _new_client()
+    _clients[key] = (loop, client)
+    return client
+
+
+async def close_provider_clients() -> None:
+    """Close every client created on the running loop (application shutdown)."""
+    loop = asyncio.get_running_loop()
+    for key, (owner, client) in list(_clients.items()):
+        if owner is not loop:
+            continue
+        del _clients[key]
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning("Could not close provider client for %s: %s", key[0], e)
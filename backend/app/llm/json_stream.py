@@ -0,0 +1,76 @@
+"""
+Incremental detection of a complete JSON object in streamed model output.
+
+Streaming providers deliver the answer in fragments, and the answer is done as
+soon as its top-level object closes: whatever follows is trailing whitespace,
+a closing code fence or a metadata frame. `JsonObjectTracker` is fed each text
+fragment as it arrives and reports the object once its braces balance (outside
+string literals) and it parses, so the caller can stop reading there.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import List, Optional
+
+
+class JsonObjectTracker:
+    """Tracks brace depth of the first top-level `{...}` across fragments."""
+
+    def __init__(self) -> None:
+        self._parts: List[str] = []
+        self._length = 0
+        self._start: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        # Set once the object closed, parsed or not: an object that closes
+        # but does not parse is left to the tolerant parser downstream.
+        self.done = False
+        self.complete: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return "".join(self._parts)
+
+    def feed(self, fragment: str) -> Optional[str]:
+        """
+        Add a fragment; returns the object text the first time it is complete
+        and parseable, else None.
+        """
+        offset = self._length
+        self._parts.append(fragment)
+        self._length += len(fragment)
+        if self.done:
+            return None
+        for i, ch in enumerate(fragment):
+            if self._start is None:
+                if ch == "{":
+                    self._start = offset + i
+                    self._depth = 1
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.done = True
+                    candidate = self.text[self._start : offset + i + 1]
+                    try:
+                        json.loads(candidate)
+                    except ValueError:
+                        return None
+                    self.complete = candidate
+                    return candidate
+        return None
@@ -5,25 +5,78 @@ Loads multiple Groq keys or Cloudflare (account_id, token) pairs, selects
 via round-robin among non-cooled-down entries, and supports marking
 credentials unavailable after 401/403/429.
 
+Successful responses also report what is left of each limit
+(`x-ratelimit-remaining-*`). `note_rate_limits` keeps that as a bucket per
+(credential, scope) that refills linearly until its reset, and selection skips
+a key whose bucket is nearly empty while another still has headroom — a soft
+cooldown, so the 429 is avoided instead of paid for. A soft-cooled key is still
+used when it is the only one left; only a refusal makes a key unselectable.
+
+`LLM_KEY_SELECTION=least_loaded` replaces the round-robin pick: providers wrap
+each call in `in_flight()`, and selection takes the key with the fewest calls
+in flight and then the fewest tokens sent in the last minute for that scope,
+with round-robin order breaking ties. Concurrent long calls in one process then
+spread over the pool instead of queueing on whichever key the ring pointed at.
+
+Pools are parsed once and re-parsed only when one of their env vars changes.
+Per (provider, scope) an index keeps the sorted positions of the keys not
+cooled down (the ready set) and a min-heap of cooldown expiries, so selection
+and availability checks cost a bisect or a heap operation instead of a scan of
+every (credential, scope) pair; `scripts/bench_key_pool.py` measures the two.
+
 Env convention (plural wins when non-empty after parse):
   GROQ_API_KEYS=key1,key2          else GROQ_API_KEY
   CLOUDFLARE_ACCOUNT_IDS=id1,id2   + CLOUDFLARE_API_TOKENS=tok1,tok2
                                    else CLOUDFLARE_ACCOUNT_ID + CLOUDFLARE_API_TOKEN
   GEMINI_API_KEYS=key1,key2        else GEMINI_API_KEY
+  LOCAL_LLM_API_KEYS=key1,key2     else LOCAL_LLM_API_KEY, else one keyless
+                                   entry (only when LOCAL_LLM_BASE_URL is set)
 """
 
 from __future__ import annotations
 
+import heapq
 import os
 import threading
 import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple, TypeVar
+from typing import (
+    Callable,
+    ClassVar,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+)
 
 _TCred = TypeVar("_TCred")
 
 DEFAULT_COOLDOWN_SECONDS = 60.0
 
+# A rate-limit bucket estimated below this share of its limit marks the key as
+# soft-cooled for that scope.
+SOFT_COOLDOWN_FRACTION = 0.1
+# Token buckets are also soft-cooled below roughly one homework-length call
+# (prompt plus capped answer): the next call would likely overdraw them, and
+# free-tier TPM limits are only a few of these.
+SOFT_COOLDOWN_MIN_TOKENS = 4096
+# A reading without a reset time is trusted this long: a soft-cooled key is not
+# selected, so nothing else would ever refresh it.
+UNTIMED_BUCKET_TTL_S = 60.0
+
+KEY_SELECTION_ENV = "LLM_KEY_SELECTION"
+# Token spend counts towards a key's load for this long (per-minute TPM limits).
+LOAD_WINDOW_S = 60.0
+
 
 class _Cooldown(NamedTuple):
     """When a credential becomes selectable again, and where we learned it."""
@@ -35,6 +88,56 @@ class _Cooldown(NamedTuple):
     carried_over: bool
 
 
+class RateLimitReading(NamedTuple):
+    """One limit as a response reported it (`x-ratelimit-*-requests` etc.)."""
+
+    remaining: float
+    limit: Optional[float] = None
+    # Seconds until the limit is fully replenished; None when not reported.
+    reset_s: Optional[float] = None
+
+
+@dataclass
+class _Bucket:
+    remaining: float
+    limit: Optional[float]
+    reset_s: Optional[float]
+    observed_at: float
+
+    def level(self, now: float) -> float:
+        """Estimated remaining now, refilling linearly towards the reset."""
+        elapsed = now - self.observed_at
+        expires = self.reset_s if self.reset_s is not None else UNTIMED_BUCKET_TTL_S
+        if elapsed >= expires:
+            return self.limit if self.limit is not None else float("inf")
+        if self.reset_s is None or self.limit is None or self.reset_s <= 0:
+            return self.remaining
+        refill = (self.limit - self.remaining) * elapsed / self.reset_s
+        return min(self.limit, self.remaining + refill)
+
+    def is_low(self, now: float, floor: float) -> bool:
+        level = self.level(now)
+        if level < max(1.0, floor):
+            return True
+        return self.limit is not None and level < self.limit * SOFT_COOLDOWN_FRACTION
+
+
+@dataclass
+class _PoolIndex:
+    """Which keys of one provider's pool are usable for one scope."""
+
+    credentials: Sequence
+    # credential id -> position in `credentials`
+    positions: Dict[str, int]
+    # Sorted positions of keys not cooled down for this scope.
+    ready: List[int]
+    # (until, position) of cooled keys; entries a later mark or release
+    # superseded are dropped when they reach the top.
+    expiries: List[Tuple[float, int]]
+    # Positions whose live cooldown was seeded from shared storage.
+    carried: Set[int]
+
+
 class PoolAvailability(NamedTuple):
     """Whether a provider is worth calling at all, from cooldown state alone."""
 
@@ -53,13 +156,31 @@ _lock = threading.Lock()
 _cooldowns: Dict[str, _Cooldown] = {}
 # provider name -> next round-robin index
 _rr_index: Dict[str, int] = {}
+# cooldown key -> limit kind ("requests" / "tokens") -> bucket
+_buckets: Dict[str, Dict[str, _Bucket]] = {}
+# scope -> provider -> index over that provider's pool
+_pools: Dict[Optional[str], Dict[str, _PoolIndex]] = {}
+# pool name -> (env values it was parsed from, parsed pool)
+_credential_cache: Dict[str, Tuple[Tuple[Optional[str], ...], list]] = {}
+# cooldown key -> calls currently in flight
+_in_flight: Dict[str, int] = {}
+# cooldown key -> (monotonic start, estimated tokens) of recent calls
+_spend: Dict[str, Deque[Tuple[float, int]]] = {}
+
+# Floor below which each kind of bucket is low regardless of its limit.
+_BUCKET_FLOORS = {"requests": 1.0, "tokens": float(SOFT_COOLDOWN_MIN_TOKENS)}
 
 
 def reset_key_pool_state() -> None:
-    """Clear cooldown and round-robin state (for tests)."""
+    """Clear cooldown, rate-limit bucket, load and round-robin state (for tests)."""
     with _lock:
         _cooldowns.clear()
         _rr_index.clear()
+        _buckets.clear()
+        _in_flight.clear()
+        _spend.clear()
+        _pools.clear()
+        _credential_cache.clear()
 
 
 def redact_secret(value: str, prefix: int = 4, suffix: int = 4) -> str:
@@ -92,6 +213,8 @@ def _dedupe_by_id(credentials: Sequence[_TCred]) -> List[_TCred]:
 
 @dataclass(frozen=True)
 class GroqCredential:
+    provider: ClassVar[str] = "groq"
+
     api_key: str
 
     @property
@@ -105,6 +228,8 @@ class GroqCredential:
 
 @dataclass(frozen=True)
 class CloudflareCredential:
+    provider: ClassVar[str] = "cloudflare"
+
     account_id: str
     api_token: str
 
@@ -119,6 +244,8 @@ class CloudflareCredential:
 
 @dataclass(frozen=True)
 class GeminiCredential:
+    provider: ClassVar[str] = "gemini"
+
     api_key: str
 
     @property
@@ -130,12 +257,56 @@ class GeminiCredential:
         return redact_secret(self.api_key)
 
 
+@dataclass(frozen=True)
+class LocalCredential:
+    provider: ClassVar[str] = "local"
+
+    # Empty for a server that does not check keys.
+    api_key: str
+
+    @property
+    def id(self) -> str:
+        return f"local:{self.api_key}"
+
+    @property
+    def label(self) -> str:
+        return redact_secret(self.api_key) if self.api_key else "<no key>"
+
+
+def _cached_pool(
+    name: str,
+    env_names: Tuple[str, ...],
+    parse: Callable[[], list],
+) -> list:
+    """
+    The parsed pool, re-parsed only when one of ``env_names`` changed.
+
+    Callers get the cached list itself and must not mutate it; keeping its
+    identity is also what tells `_pool_index` that its index is still current.
+    """
+    snapshot = tuple(os.environ.get(env_name) for env_name in env_names)
+    cached = _credential_cache.get(name)
+    if cached is not None and cached[0] == snapshot:
+        return cached[1]
+    pool = parse()
+    _credential_cache[name] = (snapshot, pool)
+    return pool
+
+
 def load_groq_credentials() -> List[GroqCredential]:
     """Load Groq keys: GROQ_API_KEYS if non-empty, else GROQ_API_KEY.
 
     Plural wins when non-empty (singular is not merged). Duplicate keys
     in the plural list are collapsed to one entry.
     """
+    return _cached_pool(
+        "groq",
+        ("GROQ_API_KEYS", "GROQ_API_KEY"),
+        _parse_groq_credentials,
+    )
+
+
+def _parse_groq_credentials() -> List[GroqCredential]:
     plural = _split_csv(os.environ.get("GROQ_API_KEYS"))
     if plural:
         return _dedupe_by_id([GroqCredential(api_key=k) for k in plural])
@@ -152,6 +323,19 @@ def load_cloudflare_credentials() -> List[CloudflareCredential]:
     silent mis-pairing). Duplicate pairs are collapsed. Plural lists win
     when either is set (singular is not merged).
     """
+    return _cached_pool(
+        "cloudflare",
+        (
+            "CLOUDFLARE_ACCOUNT_IDS",
+            "CLOUDFLARE_API_TOKENS",
+            "CLOUDFLARE_ACCOUNT_ID",
+            "CLOUDFLARE_API_TOKEN",
+        ),
+        _parse_cloudflare_credentials,
+    )
+
+
+def _parse_cloudflare_credentials() -> List[CloudflareCredential]:
     ids = _split_csv(os.environ.get("CLOUDFLARE_ACCOUNT_IDS"))
     tokens = _split_csv(os.environ.get("CLOUDFLARE_API_TOKENS"))
     if ids or tokens:
@@ -176,6 +360,14 @@ def load_gemini_credentials() -> List[GeminiCredential]:
     Plural wins when non-empty (singular is not merged). Duplicate keys
     in the plural list are collapsed to one entry.
     """
+    return _cached_pool(
+        "gemini",
+        ("GEMINI_API_KEYS", "GEMINI_API_KEY"),
+        _parse_gemini_credentials,
+    )
+
+
+def _parse_gemini_credentials() -> List[GeminiCredential]:
     plural = _split_csv(os.environ.get("GEMINI_API_KEYS"))
     if plural:
         return _dedupe_by_id([GeminiCredential(api_key=k) for k in plural])
@@ -185,6 +377,30 @@ def load_gemini_credentials() -> List[GeminiCredential]:
     return []
 
 
+def load_local_credentials() -> List[LocalCredential]:
+    """Load keys for the self-hosted OpenAI-compatible server.
+
+    Empty unless LOCAL_LLM_BASE_URL is set. LOCAL_LLM_API_KEYS wins when
+    non-empty, else LOCAL_LLM_API_KEY; a server without auth gets a single
+    keyless entry, so cooldowns and round-robin still have something to track.
+    """
+    return _cached_pool(
+        "local",
+        ("LOCAL_LLM_BASE_URL", "LOCAL_LLM_API_KEYS", "LOCAL_LLM_API_KEY"),
+        _parse_local_credentials,
+    )
+
+
+def _parse_local_credentials() -> List[LocalCredential]:
+    if not (os.environ.get("LOCAL_LLM_BASE_URL") or "").strip():
+        return []
+    plural = _split_csv(os.environ.get("LOCAL_LLM_API_KEYS"))
+    if plural:
+        return _dedupe_by_id([LocalCredential(api_key=k) for k in plural])
+    single = (os.environ.get("LOCAL_LLM_API_KEY") or "").strip()
+    return [LocalCredential(api_key=single)]
+
+
 def credential_pool_index(credentials: Sequence, credential_id: str) -> int:
     """Return 0-based index of credential_id in the loaded pool, or -1."""
     for i, cred in enumerate(credentials):
@@ -222,14 +438,6 @@ def _live_cooldown(
     return entry
 
 
-def _is_cooled_down(
-    credential_id: str,
-    now: float,
-    scope: Optional[str] = None,
-) -> bool:
-    return _live_cooldown(credential_id, now, scope) is not None
-
-
 def mark_cooldown(
     credential_id: str,
     seconds: float = DEFAULT_COOLDOWN_SECONDS,
@@ -245,11 +453,209 @@ def mark_cooldown(
     ``carried_over`` marks state seeded from shared storage rather than observed
     here, so a skip can say whether this request ever asked the provider.
     """
+    until = time.monotonic() + max(0.0, seconds)
     with _lock:
         _cooldowns[_cooldown_key(credential_id, scope)] = _Cooldown(
-            until=time.monotonic() + max(0.0, seconds),
+            until=until,
             carried_over=carried_over,
         )
+        for pool in _pools.get(scope or None, {}).values():
+            position = pool.positions.get(credential_id)
+            if position is not None:
+                _mark_cooled(pool, position, until, carried_over)
+
+
+def _mark_cooled(
+    pool: _PoolIndex,
+    position: int,
+    until: float,
+    carried_over: bool,
+) -> None:
+    at = bisect_left(pool.ready, position)
+    if at < len(pool.ready) and pool.ready[at] == position:
+        del pool.ready[at]
+    heapq.heappush(pool.expiries, (until, position))
+    if carried_over:
+        pool.carried.add(position)
+    else:
+        pool.carried.discard(position)
+
+
+def _mark_ready(pool: _PoolIndex, position: int) -> None:
+    at = bisect_left(pool.ready, position)
+    if at == len(pool.ready) or pool.ready[at] != position:
+        pool.ready.insert(at, position)
+    pool.carried.discard(position)
+
+
+def _pool_index(
+    provider: str,
+    credentials: Sequence,
+    scope: Optional[str],
+    now: float,
+) -> _PoolIndex:
+    """
+    The index for this pool and scope, with cooldowns that ran out moved back
+    to the ready set. Rebuilt when the caller passes a different pool object
+    (the env changed, or a caller built its own list).
+    """
+    scope = scope or None
+    by_provider = _pools.setdefault(scope, {})
+    pool = by_provider.get(provider)
+    if pool is None or pool.credentials is not credentials:
+        pool = _PoolIndex(
+            credentials=credentials,
+            positions={cred.id: i for i, cred in enumerate(credentials)},
+            ready=[],
+            expiries=[],
+            carried=set(),
+        )
+        for i, cred in enumerate(credentials):
+            entry = _live_cooldown(cred.id, now, scope)
+            if entry is None:
+                pool.ready.append(i)
+            else:
+                pool.expiries.append((entry.until, i))
+                if entry.carried_over:
+                    pool.carried.add(i)
+        heapq.heapify(pool.expiries)
+        by_provider[provider] = pool
+    while pool.expiries and pool.expiries[0][0] <= now:
+        until, position = heapq.heappop(pool.expiries)
+        key = _cooldown_key(pool.credentials[position].id, scope)
+        entry = _cooldowns.get(key)
+        if entry is not None and entry.until > now:
+            continue  # superseded by a later cooldown, which has its own entry
+        _cooldowns.pop(key, None)
+        _mark_ready(pool, position)
+    return pool
+
+
+def _soonest_expiry(
+    pool: _PoolIndex,
+    scope: Optional[str],
+) -> Optional[Tuple[float, int]]:
+    """(until, position) of the live cooldown in this pool that ends first."""
+    while pool.expiries:
+        until, position = pool.expiries[0]
+        entry = _cooldowns.get(_cooldown_key(pool.credentials[position].id, scope))
+        if entry is not None and entry.until == until:
+            return until, position
+        heapq.heappop(pool.expiries)
+    return None
+
+
+def _provider_of(credentials: Sequence) -> str:
+    return credentials[0].provider
+
+
+def note_rate_limits(
+    credential_id: str,
+    readings: Dict[str, RateLimitReading],
+    *,
+    scope: Optional[str] = None,
+) -> None:
+    """
+    Record the remaining limits a successful response reported.
+
+    ``readings`` maps a limit kind ("requests", "tokens") to what the response
+    said about it; kinds it did not mention keep their previous bucket.
+    """
+    if not readings:
+        return
+    now = time.monotonic()
+    with _lock:
+        buckets = _buckets.setdefault(_cooldown_key(credential_id, scope), {})
+        for kind, reading in readings.items():
+            buckets[kind] = _Bucket(
+                remaining=max(0.0, reading.remaining),
+                limit=reading.limit,
+                reset_s=reading.reset_s,
+                observed_at=now,
+            )
+
+
+def _is_soft_cooled(
+    credential_id: str,
+    now: float,
+    scope: Optional[str] = None,
+) -> bool:
+    """Some bucket of this credential/scope is estimated nearly empty."""
+    buckets = _buckets.get(_cooldown_key(credential_id, scope))
+    if not buckets:
+        return False
+    return any(
+        bucket.is_low(now, _BUCKET_FLOORS.get(kind, 1.0))
+        for kind, bucket in buckets.items()
+    )
+
+
+def _debit_request(credential_id: str, scope: Optional[str] = None) -> None:
+    """Count a selection against the requests bucket until the response says more."""
+    buckets = _buckets.get(_cooldown_key(credential_id, scope))
+    bucket = buckets.get("requests") if buckets else None
+    if bucket is not None:
+        bucket.remaining = max(0.0, bucket.remaining - 1)
+
+
+def is_least_loaded_selection() -> bool:
+    """Whether `LLM_KEY_SELECTION=least_loaded` replaces round-robin selection."""
+    value = (os.environ.get(KEY_SELECTION_ENV) or "").strip().lower()
+    return value in ("least_loaded", "least-loaded")
+
+
+@contextmanager
+def in_flight(
+    credential_id: str,
+    *,
+    scope: Optional[str] = None,
+    tokens: int = 0,
+) -> Iterator[None]:
+    """
+    Count one call against a credential/scope while it runs.
+
+    ``tokens`` (the prompt estimate) is charged when the call starts, since
+    that is when the provider counts it against the key's per-minute limit.
+    """
+    key = _cooldown_key(credential_id, scope)
+    with _lock:
+        _in_flight[key] = _in_flight.get(key, 0) + 1
+        if tokens > 0:
+            now = time.monotonic()
+            spend = _spend.setdefault(key, deque())
+            _trim_spend(spend, now)
+            spend.append((now, tokens))
+    try:
+        yield
+    finally:
+        with _lock:
+            remaining = _in_flight.get(key, 0) - 1
+            if remaining > 0:
+                _in_flight[key] = remaining
+            else:
+                _in_flight.pop(key, None)
+
+
+def _trim_spend(spend: Deque[Tuple[float, int]], now: float) -> None:
+    """Drop spend older than LOAD_WINDOW_S (every append trims, so it is bounded)."""
+    while spend and spend[0][0] <= now - LOAD_WINDOW_S:
+        spend.popleft()
+
+
+def _load(
+    credential_id: str,
+    now: float,
+    scope: Optional[str] = None,
+) -> Tuple[int, int]:
+    """(calls in flight, tokens sent within LOAD_WINDOW_S) for a credential/scope."""
+    key = _cooldown_key(credential_id, scope)
+    spend = _spend.get(key)
+    if spend:
+        _trim_spend(spend, now)
+        if not spend:
+            del _spend[key]
+    tokens = sum(t for _, t in spend) if spend else 0
+    return _in_flight.get(key, 0), tokens
 
 
 def pool_availability(
@@ -259,39 +665,63 @@ def pool_availability(
     """
     Summarize whether any (credential, scope) pair is still worth trying.
 
-    ``scopes`` is the set of models the caller may rotate over, since Gemini and
-    Groq limits are per model: a pool is only unusable when every key is cooled
+    ``scopes`` is the set of models the caller may rotate over, since provider
+    limits are per model: a pool is only unusable when every key is cooled
     down for every model it could pick, not when the key that answered last is.
     """
     if not credentials:
         return PoolAvailability(
             configured=False, all_cooled=False, recover_in_s=None, carried_over=False
         )
+    provider = _provider_of(credentials)
     effective_scopes = list(scopes) or [None]
     with _lock:
         now = time.monotonic()
         remaining: List[float] = []
-        carried: List[bool] = []
-        for cred in credentials:
-            for scope in effective_scopes:
-                entry = _live_cooldown(cred.id, now, scope)
-                if entry is None:
-                    return PoolAvailability(
-                        configured=True,
-                        all_cooled=False,
-                        recover_in_s=None,
-                        carried_over=False,
-                    )
-                remaining.append(entry.until - now)
-                carried.append(entry.carried_over)
+        carried = True
+        for scope in effective_scopes:
+            pool = _pool_index(provider, credentials, scope, now)
+            soonest = _soonest_expiry(pool, scope or None)
+            if pool.ready or soonest is None:
+                return PoolAvailability(
+                    configured=True,
+                    all_cooled=False,
+                    recover_in_s=None,
+                    carried_over=False,
+                )
+            remaining.append(soonest[0] - now)
+            carried = carried and len(pool.carried) == len(credentials)
     return PoolAvailability(
         configured=True,
         all_cooled=True,
         recover_in_s=min(remaining),
-        carried_over=all(carried),
+        carried_over=carried,
     )
 
 
+def ready_pair_count(
+    credentials: Sequence,
+    scopes: Sequence[Optional[str]] = (None,),
+) -> int:
+    """
+    Number of (credential, scope) pairs not cooled down right now.
+
+    Each such pair can carry one call without colliding with another on the same
+    per-key, per-model limit, which makes this the natural concurrency bound for
+    callers that fan out (e.g. the batch endpoint).
+    """
+    if not credentials:
+        return 0
+    provider = _provider_of(credentials)
+    effective_scopes = list(scopes) or [None]
+    with _lock:
+        now = time.monotonic()
+        return sum(
+            len(_pool_index(provider, credentials, scope, now).ready)
+            for scope in effective_scopes
+        )
+
+
 def release_soonest_cooldown(
     credentials: Sequence,
     scopes: Sequence[Optional[str]] = (None,),
@@ -304,23 +734,26 @@ def release_soonest_cooldown(
     recovering is the most plausible candidate to spend that attempt on. Returns
     the credential id that was released, or None when nothing was cooled down.
     """
+    if not credentials:
+        return None
+    provider = _provider_of(credentials)
     effective_scopes = list(scopes) or [None]
     with _lock:
         now = time.monotonic()
-        soonest_key: Optional[str] = None
-        soonest_cred: Optional[str] = None
-        soonest_until = float("inf")
-        for cred in credentials:
-            for scope in effective_scopes:
-                entry = _live_cooldown(cred.id, now, scope)
-                if entry is not None and entry.until < soonest_until:
-                    soonest_until = entry.until
-                    soonest_key = _cooldown_key(cred.id, scope)
-                    soonest_cred = cred.id
-        if soonest_key is None:
+        soonest: Optional[Tuple[float, _PoolIndex, Optional[str], int]] = None
+        for scope in effective_scopes:
+            pool = _pool_index(provider, credentials, scope, now)
+            entry = _soonest_expiry(pool, scope or None)
+            if entry is not None and (soonest is None or entry[0] < soonest[0]):
+                soonest = (entry[0], pool, scope or None, entry[1])
+        if soonest is None:
             return None
-        _cooldowns.pop(soonest_key, None)
-        return soonest_cred
+        _, pool, scope, position = soonest
+        heapq.heappop(pool.expiries)
+        credential_id = credentials[position].id
+        _cooldowns.pop(_cooldown_key(credential_id, scope), None)
+        _mark_ready(pool, position)
+        return credential_id
 
 
 def _acquire(
@@ -329,28 +762,59 @@ def _acquire(
     exclude_ids: Optional[Sequence[str]] = None,
     cooldown_scope: Optional[str] = None,
 ):
-    """Round-robin among credentials that are not cooled down / excluded."""
+    """
+    Round-robin among credentials that are not cooled down / excluded.
+
+    Credentials whose reported limits are nearly used up (soft cooldown) are
+    passed over while any other eligible credential has headroom. With
+    least-loaded selection the least busy eligible credential wins, the ring
+    order only breaking ties.
+    """
     if not credentials:
         return None
     excluded = set(exclude_ids or ())
     with _lock:
         now = time.monotonic()
-        eligible_indices = [
-            i
-            for i, c in enumerate(credentials)
-            if c.id not in excluded
-            and not _is_cooled_down(c.id, now, cooldown_scope)
-        ]
-        if not eligible_indices:
+        ready = _pool_index(provider, credentials, cooldown_scope, now).ready
+        if not ready:
             return None
-        start = _rr_index.get(provider, 0) % len(credentials)
-        # Walk from start in ring order, pick first eligible
-        ordered = list(range(start, len(credentials))) + list(range(0, start))
-        for idx in ordered:
-            if idx in eligible_indices:
-                _rr_index[provider] = (idx + 1) % len(credentials)
-                return credentials[idx]
-        return None
+        # Ready positions in ring order from the round-robin cursor.
+        first = bisect_left(ready, _rr_index.get(provider, 0) % len(credentials))
+        ring = (ready[(first + k) % len(ready)] for k in range(len(ready)))
+        if is_least_loaded_selection():
+            eligible = [i for i in ring if credentials[i].id not in excluded]
+            candidates = [
+                i
+                for i in eligible
+                if not _is_soft_cooled(credentials[i].id, now, cooldown_scope)
+            ] or eligible
+            # min() keeps the first of equals, i.e. the ring order.
+            idx = (
+                min(
+                    candidates,
+                    key=lambda i: _load(credentials[i].id, now, cooldown_scope),
+                )
+                if candidates
+                else None
+            )
+        else:
+            idx = fallback = None
+            for i in ring:
+                cred_id = credentials[i].id
+                if cred_id in excluded:
+                    continue
+                if not _is_soft_cooled(cred_id, now, cooldown_scope):
+                    idx = i
+                    break
+                if fallback is None:
+                    fallback = i
+            if idx is None:
+                idx = fallback
+        if idx is None:
+            return None
+        _rr_index[provider] = (idx + 1) % len(credentials)
+        _debit_request(credentials[idx].id, cooldown_scope)
+        return credentials[idx]
 
 
 def acquire_groq(
@@ -369,8 +833,16 @@ def acquire_groq(
 
 def acquire_cloudflare(
     exclude_ids: Optional[Sequence[str]] = None,
+    *,
+    cooldown_scope: Optional[str] = None,
 ) -> Optional[CloudflareCredential]:
-    return _acquire("cloudflare", load_cloudflare_credentials(), exclude_ids)
+    """Select a CF pair. ``cooldown_scope`` should be the model id in use."""
+    return _acquire(
+        "cloudflare",
+        load_cloudflare_credentials(),
+        exclude_ids,
+        cooldown_scope,
+    )
 
 
 def acquire_gemini(
@@ -387,6 +859,20 @@ def acquire_gemini(
     )
 
 
+def acquire_local(
+    exclude_ids: Optional[Sequence[str]] = None,
+    *,
+    cooldown_scope: Optional[str] = None,
+) -> Optional[LocalCredential]:
+    """Select a local-server key. ``cooldown_scope`` should be the model id in use."""
+    return _acquire(
+        "local",
+        load_local_credentials(),
+        exclude_ids,
+        cooldown_scope,
+    )
+
+
 def is_groq_configured() -> bool:
     return bool(load_groq_credentials())
 
@@ -399,6 +885,10 @@ def is_gemini_configured() -> bool:
     return bool(load_gemini_credentials())
 
 
+def is_local_configured() -> bool:
+    return bool(load_local_credentials())
+
+
 def cooldown_status_codes() -> Tuple[int, ...]:
     """HTTP statuses that trigger credential cooldown + next-key retry."""
     return (401, 403, 429)
@@ -0,0 +1,393 @@
+"""
+Learned per-model latency, so budget decisions track how fast models really are.
+
+`GEMINI_MIN_SLICE_S`, `GROQ_MIN_SLICE_S`, `CF_MIN_SLICE_S` and the per-provider
+timeouts were measured once by hand, yet every skip/attempt decision in
+`budget.resolve_call_timeout()` and `suggestions._phase_budget()` is made from
+them. When a model gets faster the chain keeps skipping it on budgets it could
+have used; when it gets slower the chain keeps starting calls it cannot finish.
+
+This module records how long calls actually took, per
+(provider, model, input-size bucket), as an EWMA plus a decayed log-bucket
+histogram from which p50/p95 are read. `call_budget()` turns those into the
+(timeout, min_slice) pair the budget math consumes:
+
+- min slice = learned p50: a call given less than the model's median is more
+  likely to time out than to answer.
+- timeout = learned p95 with headroom: waiting far past the tail only burns
+  budget a faster provider downstream could use.
+
+Three properties keep this safe to turn on:
+
+- **Static values stay the cold-start default.** Until `MIN_SAMPLES` calls are
+  seen for a key the hand-tuned constants apply unchanged, so a fresh process
+  behaves exactly as before.
+- **The static timeout stays a ceiling.** A learned value can shorten a call but
+  never lengthen it past the constant sized against Vercel's maxDuration.
+- **Only suggestion calls are learned.** Item repair (`suggestions._repair_outcome`)
+  sends a short prompt that answers in a second or two; its calls run under
+  `unmeasured()` so they do not pull down the estimates real generation calls
+  are budgeted by.
+- **Persistence is best effort.** Snapshots live in `provider_latency`
+  (migration 009) next to `provider_health`, read and written with the same
+  bounded, error-swallowing rules as `provider_health.py`; losing them only
+  means re-learning from the constants.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Type
+
+from .budget import seconds_left
+
+logger = logging.getLogger(__name__)
+
+# Observations before a learned estimate replaces the static constants.
+MIN_SAMPLES = 5
+
+# Weight of the newest observation in the EWMA.
+EWMA_ALPHA = 0.2
+
+# Histogram counts are multiplied by this on every new observation, so the
+# quantiles describe roughly the last 1 / (1 - DECAY) ≈ 33 calls rather than the
+# whole life of the process.
+HISTOGRAM_DECAY = 0.97
+
+# Log-spaced histogram bucket upper bounds: 0.1s growing by 25% up to ~70s,
+# which covers every provider timeout with room to spare.
+_BUCKET_BASE_S = 0.1
+_BUCKET_GROWTH = 1.25
+_BUCKET_COUNT = 30
+BUCKET_BOUNDS_S: Tuple[float, ...] = tuple(
+    _BUCKET_BASE_S * _BUCKET_GROWTH**i for i in range(_BUCKET_COUNT)
+)
+
+# Headroom over the learned p95 granted as a call timeout.
+TIMEOUT_HEADROOM = 1.25
+
+# A learned minimum slice is never below this, so a burst of instant replies
+# (cached errors, tiny prompts) cannot make a provider look free to start.
+MIN_SLICE_FLOOR_S = 1.0
+
+# Input size buckets by total prompt characters (system + few-shot + user).
+# The fixed prompt is ~6k characters, so the buckets mostly separate TARGET
+# length: a sentence, a paragraph, a page, more.
+SIZE_BUCKETS: Tuple[Tuple[str, int], ...] = (
+    ("s", 8_000),
+    ("m", 12_000),
+    ("l", 20_000),
+)
+LARGEST_SIZE_BUCKET = "xl"
+
+# Model key under which every model of a provider is also aggregated, used where
+# the chain has to size a provider's phase before rotation has picked a model.
+ANY_MODEL = "*"
+
+# Env switch; "off" pins the static constants.
+LATENCY_MODEL_ENV = "LLM_LATENCY_MODEL"
+
+# Bounds on the shared read/write, mirroring provider_health.py.
+SNAPSHOT_TIMEOUT_S = 3.0
+FLUSH_TIMEOUT_S = 2.5
+FLUSH_MIN_SLACK_S = 4.0
+
+# Every request produces samples, unlike refusals, so writing on every request
+# would add a database round trip to the healthy path. A fraction of requests
+# persist the merged state instead; the store converges all the same.
+FLUSH_PROBABILITY = 0.2
+
+
+@dataclass
+class LatencyStats:
+    """Running latency summary for one (provider, model, size bucket)."""
+
+    ewma_s: float = 0.0
+    samples: int = 0
+    histogram: List[float] = field(default_factory=lambda: [0.0] * _BUCKET_COUNT)
+
+    def record(self, seconds: float) -> None:
+        seconds = max(0.0, seconds)
+        if self.samples == 0:
+            self.ewma_s = seconds
+        else:
+            self.ewma_s = EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.ewma_s
+        self.samples += 1
+        self.histogram = [c * HISTOGRAM_DECAY for c in self.histogram]
+        self.histogram[_bucket_index(seconds)] += 1.0
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding quantile `q`, or None when empty."""
+        total = sum(self.histogram)
+        if total <= 0:
+            return None
+        threshold = q * total
+        running = 0.0
+        for bound, count in zip(BUCKET_BOUNDS_S, self.histogram):
+            running += count
+            if running >= threshold:
+                return bound
+        return BUCKET_BOUNDS_S[-1]
+
+
+class LatencyEstimate(NamedTuple):
+    p50_s: float
+    p95_s: float
+    ewma_s: float
+    samples: int
+
+
+class CallBudget(NamedTuple):
+    """What `budget.resolve_call_timeout()` should be given for one call."""
+
+    timeout_s: float
+    min_slice_s: float
+    learned: bool
+
+
+_lock = threading.Lock()
+_stats: Dict[Tuple[str, str, str], LatencyStats] = {}
+_unflushed = 0
+# The snapshot is read once per process: a warm instance's own measurements are
+# newer than anything it could read back.
+_snapshot_attempted = False
+
+
+def reset_latency_state() -> None:
+    """Drop learned latency and the snapshot-read marker (for tests)."""
+    global _unflushed, _snapshot_attempted
+    with _lock:
+        _stats.clear()
+        _unflushed = 0
+        _snapshot_attempted = False
+
+
+def is_latency_model_enabled() -> bool:
+    return (os.environ.get(LATENCY_MODEL_ENV) or "").strip().lower() not in (
+        "off",
+        "0",
+        "false",
+        "static",
+    )
+
+
+def _bucket_index(seconds: float) -> int:
+    if seconds <= _BUCKET_BASE_S:
+        return 0
+    index = math.ceil(math.log(seconds / _BUCKET_BASE_S, _BUCKET_GROWTH))
+    return min(max(index, 0), _BUCKET_COUNT - 1)
+
+
+def size_bucket(input_chars: int) -> str:
+    """Label of the input-size bucket `input_chars` falls into."""
+    for label, limit in SIZE_BUCKETS:
+        if input_chars < limit:
+            return label
+    return LARGEST_SIZE_BUCKET
+
+
+def messages_chars(messages: Sequence[dict]) -> int:
+    """Total prompt characters, the size measure latency is bucketed by."""
+    return sum(len(m.get("content") or "") for m in messages)
+
+
+def record_latency(
+    provider: str,
+    model: Optional[str],
+    input_chars: int,
+    seconds: float,
+) -> None:
+    """Record one call's duration under its model and the provider aggregate."""
+    global _unflushed
+    bucket = size_bucket(input_chars)
+    with _lock:
+        for key_model in {model or ANY_MODEL, ANY_MODEL}:
+            key = (provider, key_model, bucket)
+            _stats.setdefault(key, LatencyStats()).record(seconds)
+        _unflushed += 1
+
+
+# False inside `unmeasured()`. A ContextVar, so a repair running in one chunk
+# task does not silence a generation call in another.
+_measuring: ContextVar[bool] = ContextVar("latency_measuring", default=True)
+
+
+@contextmanager
+def unmeasured() -> Iterator[None]:
+    """Keep the provider calls made inside this block out of latency learning."""
+    token = _measuring.set(False)
+    try:
+        yield
+    finally:
+        _measuring.reset(token)
+
+
+@contextmanager
+def measure(
+    provider: str,
+    model: Optional[str],
+    input_chars: int,
+    *,
+    timeout_s: float,
+    timeout_errors: Tuple[Type[BaseException], ...] = (),
+    clamped: bool = False,
+) -> Iterator[None]:
+    """
+    Time one provider call and record it.
+
+    Answers are recorded at their real duration and timeouts at `timeout_s` (a
+    lower bound on what the call needed). Other failures — refusals, 5xx,
+    malformed bodies — are not recorded: they return fast and would drag the
+    learned p50 below what an answer actually takes. Neither is a timeout on a
+    ``clamped`` call, whose `timeout_s` is what the request deadline left rather
+    than what the model was allowed: recording that short slice would lower
+    p50, shrink the next min slice and invite more clamped calls. Nothing is
+    recorded inside `unmeasured()`.
+    """
+    if not _measuring.get():
+        yield
+        return
+    started = time.monotonic()
+    try:
+        yield
+    except timeout_errors:
+        if not clamped:
+            record_latency(provider, model, input_chars, timeout_s)
+        raise
+    record_latency(provider, model, input_chars, time.monotonic() - started)
+
+
+def estimate(
+    provider: str,
+    model: Optional[str],
+    input_chars: int,
+) -> Optional[LatencyEstimate]:
+    """Learned p50/p95 for this key, or None until `MIN_SAMPLES` were seen."""
+    key = (provider, model or ANY_MODEL, size_bucket(input_chars))
+    with _lock:
+        stats = _stats.get(key)
+        if stats is None or stats.samples < MIN_SAMPLES:
+            return None
+        p50 = stats.quantile(0.5)
+        p95 = stats.quantile(0.95)
+        if p50 is None or p95 is None:
+            return None
+        return LatencyEstimate(p50, p95, stats.ewma_s, stats.samples)
+
+
+def call_budget(
+    provider: str,
+    model: Optional[str],
+    input_chars: int,
+    *,
+    default_timeout: float,
+    default_min_slice: float,
+) -> CallBudget:
+    """
+    (timeout, min_slice) for one call: learned when known, else the constants.
+
+    The learned timeout is capped at `default_timeout`, which is sized against
+    the platform limit and must stay an upper bound whatever was observed.
+    """
+    learned = estimate(provider, model, input_chars) if is_latency_model_enabled() else None
+    if learned is None:
+        return CallBudget(default_timeout, default_min_slice, False)
+    min_slice = min(max(learned.p50_s, MIN_SLICE_FLOOR_S), default_timeout)
+    timeout = min(max(learned.p95_s * TIMEOUT_HEADROOM, min_slice), default_timeout)
+    return CallBudget(timeout, min_slice, True)
+
+
+def seed_latency(rows: Sequence[dict]) -> int:
+    """Load stored snapshots for keys this process has not measured itself."""
+    seeded = 0
+    with _lock:
+        for row in rows or ():
+            provider = row.get("provider") or ""
+            bucket = row.get("sizeBucket") or ""
+            histogram = list(row.get("histogram") or ())
+            if not provider or not bucket or len(histogram) != _BUCKET_COUNT:
+                continue
+            key = (provider, row.get("model") or ANY_MODEL, bucket)
+            if key in _stats:
+                continue
+            _stats[key] = LatencyStats(
+                ewma_s=float(row.get("ewmaS") or 0.0),
+                samples=int(row.get("samples") or 0),
+                histogram=[float(c) for c in histogram],
+            )
+            seeded += 1
+    return seeded
+
+
+def snapshot_records() -> List[tuple]:
+    """(provider, model, size_bucket, ewma_s, samples, histogram) per key."""
+    with _lock:
+        return [
+            (provider, model, bucket, s.ewma_s, s.samples, list(s.histogram))
+            for (provider, model, bucket), s in _stats.items()
+        ]
+
+
+async def load_latency_snapshot() -> int:
+    """Seed learned latency from `provider_latency`. Never raises."""
+    from ..db_helper import fetch_provider_latency
+
+    try:
+        rows = await asyncio.wait_for(
+            fetch_provider_latency(), timeout=SNAPSHOT_TIMEOUT_S
+        )
+    except Exception as e:
+        logger.warning("Latency snapshot read failed; using static budgets: %s", e)
+        return 0
+    return seed_latency(rows)
+
+
+async def ensure_latency_snapshot() -> int:
+    """`load_latency_snapshot()` on the first request of a process only."""
+    global _snapshot_attempted
+    if _snapshot_attempted or not is_latency_model_enabled():
+        return 0
+    _snapshot_attempted = True
+    return await load_latency_snapshot()
+
+
+async def flush_latency(
+    deadline_monotonic: Optional[float] = None,
+    *,
+    force: bool = False,
+) -> int:
+    """
+    Persist the merged latency state for a fraction of requests.
+
+    Returns the number of rows written (0 when skipped or on failure).
+    """
+    global _unflushed
+    if not _unflushed or not is_latency_model_enabled():
+        return 0
+    if not force and random.random() >= FLUSH_PROBABILITY:
+        return 0
+    if seconds_left(deadline_monotonic) < FLUSH_MIN_SLACK_S:
+        return 0
+
+    from ..db_helper import upsert_provider_latency
+
+    records = snapshot_records()
+    try:
+        await asyncio.wait_for(
+            upsert_provider_latency(records), timeout=FLUSH_TIMEOUT_S
+        )
+    except Exception as e:
+        logger.warning("Latency snapshot write failed: %s", e)
+        return 0
+    with _lock:
+        _unflushed = 0
+    return len(records)
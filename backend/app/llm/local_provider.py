@@ -0,0 +1,391 @@
+"""
+Self-hosted OpenAI-compatible provider (llama.cpp server, vLLM, Ollama's /v1).
+
+Modeled on `groq_provider.py`, but nothing about the endpoint is hard-coded:
+`LOCAL_LLM_BASE_URL` is the server's OpenAI base (requests go to
+`{base}/chat/completions`), `LOCAL_LLM_MODELS` lists the served model ids in
+preference order, and `LOCAL_LLM_API_KEY(S)` is an optional key pool
+(`key_pool.load_local_credentials`). The provider is configured only when both
+the base URL and at least one model are set.
+
+Our own hardware has no quota and sits next to the backend, so the chain calls
+it first (`suggestions.CHAIN_ORDER`) and the free-tier clouds only see what it
+cannot absorb: a 429 or 5xx from an overloaded server, a model that is down, or
+a request the remaining budget no longer covers. Cooldowns are scoped per model
+like Groq's, so one wedged model does not take its siblings out of rotation.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import httpx
+from typing import Any, List, Optional, Set
+
+from .budget import describe_skip, resolve_call_timeout
+from .circuit import allow_call, track
+from .http_clients import provider_client
+from .latency import call_budget, measure, messages_chars
+from .provider_output import ProviderOutput
+from .router import is_router_enabled, rank_models
+from .timeline import span
+from .tokens import estimate_messages_tokens, output_token_cap
+from .key_pool import (
+    PoolAvailability,
+    acquire_local,
+    cooldown_status_codes,
+    credential_pool_index,
+    format_credential_ref,
+    in_flight,
+    is_local_configured,
+    load_local_credentials,
+    mark_cooldown,
+    pool_availability,
+    ready_pair_count,
+    release_soonest_cooldown,
+)
+from .provider_health import (
+    clamp_cooldown_seconds,
+    observe_refusal,
+    parse_retry_after,
+)
+
+logger = logging.getLogger(__name__)
+
+LOCAL_BASE_URL_ENV = "LOCAL_LLM_BASE_URL"
+LOCAL_MODELS_ENV = "LOCAL_LLM_MODELS"
+
+# Local generation is bounded by our own GPU rather than a remote queue, so the
+# ceiling is Groq's; the minimum slice is small because there is no network
+# round trip worth speaking of.
+LOCAL_TIMEOUT = 20.0  # seconds
+LOCAL_MIN_SLICE_S = 3.0
+
+# Ceiling on max_tokens, as for Groq and Cloudflare; shorter reviews get less
+# (`tokens.output_token_cap`).
+LOCAL_MAX_TOKENS = 4096
+
+
+class LocalLLMError(Exception):
+    """Error from the self-hosted OpenAI-compatible server."""
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+    ):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class LocalLLMRateLimitError(LocalLLMError):
+    """Local server refused the request (429, e.g. every slot busy)."""
+    pass
+
+
+class LocalLLMServerError(LocalLLMError):
+    """Local server error (5xx)."""
+    pass
+
+
+class LocalLLMTimeoutError(LocalLLMError):
+    """Local server did not answer in time."""
+    pass
+
+
+def get_local_base_url() -> Optional[str]:
+    """The server's OpenAI-compatible base URL (e.g. http://gpu-box:8080/v1)."""
+    base = (os.environ.get(LOCAL_BASE_URL_ENV) or "").strip().rstrip("/")
+    return base or None
+
+
+def get_local_models() -> List[str]:
+    """Served model ids from LOCAL_LLM_MODELS, in preference order."""
+    raw = os.environ.get(LOCAL_MODELS_ENV) or ""
+    return list(dict.fromkeys(m.strip() for m in raw.split(",") if m.strip()))
+
+
+def get_local_model() -> Optional[str]:
+    models = get_local_models()
+    return models[0] if models else None
+
+
+def is_local_provider_configured() -> bool:
+    """A base URL, at least one model, and therefore a credential pool."""
+    return bool(get_local_models()) and is_local_configured()
+
+
+def select_local_models(
+    n: int = 2,
+    *,
+    input_chars: Optional[int] = None,
+    deadline_monotonic: Optional[float] = None,
+) -> List[str]:
+    """
+    Up to n models to attempt for one request.
+
+    The configured order is the operator's preference, so it is kept as is
+    (there is no free-tier quota to spread); `LLM_ROUTER=score` ranks them by
+    recent results instead.
+    """
+    models = get_local_models()
+    if is_router_enabled():
+        models = rank_models(
+            "local",
+            models,
+            input_chars=input_chars,
+            deadline_monotonic=deadline_monotonic,
+        )
+    return models[:n]
+
+
+def _rotation_scopes() -> List[Optional[str]]:
+    return list(get_local_models()) or [None]
+
+
+def local_availability() -> PoolAvailability:
+    """Whether calling the local server could plausibly succeed, from cooldowns."""
+    if not get_local_models():
+        return pool_availability([])
+    return pool_availability(load_local_credentials(), _rotation_scopes())
+
+
+def local_ready_pairs() -> int:
+    """(key, model) pairs the local server could be called on right now."""
+    if not get_local_models():
+        return 0
+    return ready_pair_count(load_local_credentials(), _rotation_scopes())
+
+
+def release_local_cooldown() -> Optional[str]:
+    """Free the soonest-recovering local key so one attempt can still be made."""
+    return release_soonest_cooldown(load_local_credentials(), _rotation_scopes())
+
+
+async def _call_local_once(
+    api_key: str,
+    messages: list[dict[str, str]],
+    resolved_model: str,
+    timeout: float = LOCAL_TIMEOUT,
+) -> str:
+    """Single HTTP attempt; `timeout` is a hard ceiling on the whole attempt."""
+    headers = {"Content-Type": "application/json"}
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    payload: dict[str, Any] = {
+        "model": resolved_model,
+        "messages": messages,
+        "max_tokens": output_token_cap(messages, ceiling=LOCAL_MAX_TOKENS),
+        "temperature": 0.15,
+        # llama.cpp and vLLM both constrain decoding to a JSON object with this.
+        "response_format": {"type": "json_object"},
+    }
+
+    url = f"{get_local_base_url()}/chat/completions"
+    try:
+        response = await asyncio.wait_for(
+            provider_client(url).post(url, headers=headers, json=payload),
+            timeout=timeout,
+        )
+    except (httpx.TimeoutException, asyncio.TimeoutError) as e:
+        raise LocalLLMTimeoutError(
+            f"Local LLM request timed out after {timeout:.1f}s"
+        ) from e
+    except httpx.RequestError as e:
+        # Server down or unreachable: another model on the same box will not
+        # fare better, so this is not retried within the provider.
+        raise LocalLLMError(f"Local LLM request failed: {e}") from e
+
+    if response.status_code == 429:
+        raise LocalLLMRateLimitError(
+            "Local LLM server is at capacity",
+            status_code=429,
+            retry_after=parse_retry_after(response.headers.get("retry-after")),
+        )
+
+    if response.status_code >= 500:
+        raise LocalLLMServerError(
+            f"Local LLM server error: {response.status_code}",
+            status_code=response.status_code,
+        )
+
+    if response.status_code != 200:
+        raise LocalLLMError(
+            f"Local LLM API error: {response.status_code} - {response.text[:200]}",
+            status_code=response.status_code,
+        )
+
+    data = response.json()
+    try:
+        return data["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError) as e:
+        raise LocalLLMError(f"Unexpected local LLM response format: {data}") from e
+
+
+async def call_local(
+    messages: list[dict[str, str]],
+    model: Optional[str] = None,
+    deadline_monotonic: Optional[float] = None,
+) -> str:
+    """
+    Call the local server with the given messages on one model.
+
+    Uses the key pool like `groq_provider.call_groq`: on 401/403/429 the key is
+    cooled down for this model and the next eligible key is tried.
+
+    Raises:
+        LocalLLMError: If not configured or on a non-retriable failure.
+        LocalLLMRateLimitError: If every key is refused or cooled down.
+        LocalLLMServerError: If the server returns 5xx.
+        LocalLLMTimeoutError: If the call times out or no time is left.
+    """
+    if not is_local_provider_configured():
+        raise LocalLLMError(
+            f"{LOCAL_BASE_URL_ENV} and {LOCAL_MODELS_ENV} not configured"
+        )
+
+    resolved_model = model or get_local_model()
+    if not allow_call("local", resolved_model):
+        # Retriable, so rotation tries a sibling model and the chain moves on.
+        raise LocalLLMServerError(
+            f"Local LLM model {resolved_model} skipped: circuit open after "
+            f"repeated server errors or timeouts"
+        )
+    pool = load_local_credentials()
+    attempted: Set[str] = set()
+    last_error: Optional[LocalLLMError] = None
+    cooldown_codes = cooldown_status_codes()
+    input_chars = messages_chars(messages)
+    prompt_tokens = estimate_messages_tokens(messages)
+
+    while True:
+        cred = acquire_local(
+            exclude_ids=list(attempted),
+            cooldown_scope=resolved_model,
+        )
+        if cred is None:
+            raise LocalLLMRateLimitError(
+                f"All local LLM keys are in cooldown or exhausted "
+                f"(pool_size={len(pool)}, model={resolved_model})",
+                status_code=getattr(last_error, "status_code", None) or 429,
+            )
+
+        budget = call_budget(
+            "local",
+            resolved_model,
+            input_chars,
+            default_timeout=LOCAL_TIMEOUT,
+            default_min_slice=LOCAL_MIN_SLICE_S,
+        )
+        timeout = resolve_call_timeout(
+            deadline_monotonic, budget.timeout_s, budget.min_slice_s
+        )
+        if timeout is None:
+            if last_error is not None:
+                raise last_error
+            raise LocalLLMTimeoutError(
+                describe_skip("Local LLM", deadline_monotonic, budget.min_slice_s)
+            )
+
+        attempted.add(cred.id)
+        idx = credential_pool_index(pool, cred.id)
+        cred_ref = format_credential_ref("local", idx, cred.label)
+        try:
+            with measure(
+                "local",
+                resolved_model,
+                input_chars,
+                timeout_s=timeout,
+                timeout_errors=(LocalLLMTimeoutError,),
+                clamped=timeout < budget.timeout_s,
+            ), track(
+                "local",
+                resolved_model,
+                timeout_errors=(LocalLLMTimeoutError,),
+                clamped=timeout < budget.timeout_s,
+            ), in_flight(
+                cred.id, scope=resolved_model, tokens=prompt_tokens
+            ), span("local", key=cred_ref, model=resolved_model) as attempt:
+                text = await _call_local_once(
+                    cred.api_key, messages, resolved_model, timeout
+                )
+                attempt["status"] = 200
+                return text
+        except LocalLLMError as e:
+            status = e.status_code
+            if status in cooldown_codes:
+                cooldown_s = clamp_cooldown_seconds(e.retry_after)
+                mark_cooldown(cred.id, cooldown_s, scope=resolved_model)
+                observe_refusal(
+                    "local",
+                    cred.id,
+                    cooldown_s,
+                    model=resolved_model,
+                    reason=f"HTTP {status}",
+                )
+                logger.warning(
+                    "%s model=%s failed with HTTP %s; cooling down %.0fs for this "
+                    "model and trying next key",
+                    cred_ref,
+                    resolved_model,
+                    status,
+                    cooldown_s,
+                )
+                last_error = e
+                continue
+            raise
+
+
+async def call_local_with_rotation(
+    messages: list[dict[str, str]],
+    deadline_monotonic: Optional[float] = None,
+) -> ProviderOutput:
+    """
+    Call the local server, falling back to a second configured model once.
+
+    Mirrors `groq_provider.call_groq_with_rotation`: a rate-limit, 5xx or
+    timeout on the first model moves to the next one when the phase still has
+    room for it; anything else is raised at once.
+    """
+    models = select_local_models(
+        n=2,
+        input_chars=messages_chars(messages),
+        deadline_monotonic=deadline_monotonic,
+    )
+    if not models:
+        raise LocalLLMError(f"{LOCAL_MODELS_ENV} not configured")
+    first_model = models[0]
+
+    try:
+        return ProviderOutput(
+            await call_local(
+                messages, model=first_model, deadline_monotonic=deadline_monotonic
+            ),
+            first_model,
+        )
+    except (LocalLLMRateLimitError, LocalLLMServerError, LocalLLMTimeoutError):
+        if len(models) < 2:
+            raise
+        second_model = models[1]
+        budget = call_budget(
+            "local",
+            second_model,
+            messages_chars(messages),
+            default_timeout=LOCAL_TIMEOUT,
+            default_min_slice=LOCAL_MIN_SLICE_S,
+        )
+        if (
+            resolve_call_timeout(
+                deadline_monotonic, budget.timeout_s, budget.min_slice_s
+            )
+            is None
+        ):
+            raise
+        return ProviderOutput(
+            await call_local(
+                messages, model=second_model, deadline_monotonic=deadline_monotonic
+            ),
+            second_model,
+        )
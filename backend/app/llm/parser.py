@@ -581,14 +581,204 @@ def has_non_japanese_recommendation(result: ParsedResponse) -> bool:
     bodies spent retry passes — and, once the wall clock ran out, the whole
     request — on a critique that had already given the learner a usable form.
     """
+    return any(
+        _reason_has_non_japanese_recommendation(suggestion.get("reason") or "")
+        for suggestion in result["suggestions"]
+    )
+
+
+def _reason_has_non_japanese_recommendation(reason: str) -> bool:
+    forms = _recommended_forms(reason)
+    if not any(_form_is_non_japanese(form) for form in forms):
+        return False
+    return not any(_form_is_japanese(form) for form in forms)
+
+
+# Per-item problem codes returned by `suggestion_problems()`.
+PROBLEM_JAPANESE_PROSE = "japanese_prose"
+PROBLEM_CORNER_QUOTES = "corner_quotes"
+PROBLEM_CHINESE_RECOMMENDATION = "chinese_recommendation"
+
+
+def suggestion_problems(suggestion: CorrectionSuggestion) -> List[str]:
+    """
+    Which critique-field checks one suggestion's `reason` fails.
+
+    The per-item form of `has_non_chinese_reason()`,
+    `has_japanese_corner_quotes_in_critique()` and
+    `has_non_japanese_recommendation()`, so a caller can repair only the
+    offending items (`repair.py`) instead of regenerating the whole body.
+    Empty when the item is usable.
+    """
+    reason = suggestion.get("reason") or ""
+    problems: List[str] = []
+    if _text_looks_japanese(reason):
+        problems.append(PROBLEM_JAPANESE_PROSE)
+    if _text_has_misused_corner_quotes(reason):
+        problems.append(PROBLEM_CORNER_QUOTES)
+    if _reason_has_non_japanese_recommendation(reason):
+        problems.append(PROBLEM_CHINESE_RECOMMENDATION)
+    return problems
+
+
+def overall_comment_problems(result: ParsedResponse) -> List[str]:
+    """`suggestion_problems()` for the top-level `overallComment`."""
+    comment = result.get("overallComment") or ""
+    problems: List[str] = []
+    if _text_looks_japanese(comment):
+        problems.append(PROBLEM_JAPANESE_PROSE)
+    if _text_has_misused_corner_quotes(comment):
+        problems.append(PROBLEM_CORNER_QUOTES)
+    return problems
+
+
+class ContentFix(TypedDict):
+    """One deterministic edit made by `fix_mechanical_content()`, for auditing."""
+
+    field: str  # "reason" | "overallComment"
+    id: Optional[str]  # suggestion id; None for overallComment
+    fix: str
+    before: str
+    after: str
+
+
+# Fix kinds recorded in `ContentFix.fix`.
+FIX_CORNER_TO_DOUBLE_QUOTES = "corner_quotes_to_double_quotes"
+FIX_CLOSED_UNPAIRED_CORNER = "closed_unpaired_corner_quote"
+FIX_DROPPED_UNPAIRED_CORNER = "dropped_unpaired_corner_quote"
+
+# Characters a quoted Japanese form is made of. Han characters are included
+# because forms start with kanji (行きました), which is also why a run is only
+# trusted as far as its kana reach: Chinese prose right after the form (「行きました
+# 更自然) shares the Han range, and guessing past the last kana would pull it in.
+_JP_FORM_CHAR = re.compile(
+    r'[\u3040-\u30ff\uff66-\uff9d\u4e00-\u9fff々〆ー･・]'
+)
+_KANA_CHAR = re.compile(r'[\u3040-\u30ff\uff66-\uff9d]')
+
+
+def _close_at_form_end(out: List[str], open_at: int, fixes: List[tuple]) -> None:
+    """Close the 「 at `out[open_at]` after the form it cites, or drop it."""
+    end = open_at + 1
+    while end < len(out) and _JP_FORM_CHAR.match(out[end]):
+        end += 1
+    while end > open_at + 1 and not _KANA_CHAR.match(out[end - 1]):
+        end -= 1
+    if end == open_at + 1:
+        out[open_at] = ""
+        fixes.append((FIX_DROPPED_UNPAIRED_CORNER, "「", ""))
+        return
+    cited = "".join(out[open_at + 1 : end])
+    out.insert(end, "」")
+    fixes.append((FIX_CLOSED_UNPAIRED_CORNER, f"「{cited}", f"「{cited}」"))
+
+
+def _close_unpaired_corners(text: str, fixes: List[tuple]) -> str:
+    """Pair every 「 with a 」, closing or reopening around the cited form."""
+    out: List[str] = []
+    open_at: Optional[int] = None  # index in `out` of a 「 not yet closed
+    for ch in text:
+        if ch == "「":
+            if open_at is not None:
+                # A second 「 before any 」: the first one was never closed.
+                _close_at_form_end(out, open_at, fixes)
+            open_at = len(out)
+            out.append(ch)
+        elif ch == "」" and open_at is not None:
+            open_at = None
+            out.append(ch)
+        elif ch == "」":
+            # Opening bracket missing: reopen before the form this one closes,
+            # but only a kana-only form — where a kanji form starts cannot be
+            # told apart from the Chinese prose in front of it.
+            start = len(out)
+            while start > 0 and _KANA_CHAR.match(out[start - 1]):
+                start -= 1
+            if start == len(out) or (
+                start > 0 and _JP_FORM_CHAR.match(out[start - 1])
+            ):
+                fixes.append((FIX_DROPPED_UNPAIRED_CORNER, "」", ""))
+                continue
+            cited = "".join(out[start:])
+            out.insert(start, "「")
+            out.append(ch)
+            fixes.append((FIX_CLOSED_UNPAIRED_CORNER, f"{cited}」", f"「{cited}」"))
+        else:
+            out.append(ch)
+    if open_at is not None:
+        _close_at_form_end(out, open_at, fixes)
+    return "".join(out)
+
+
+def fix_corner_quotes(text: str) -> tuple:
+    """
+    Deterministically repair 「」 misuse in one critique string.
+
+    Unpaired brackets are closed around the Japanese form they cite (or dropped
+    when they cite nothing), then every complete 「…」 that wraps Chinese prose
+    rather than a Japanese TARGET citation is rewritten to “…”. Allowed
+    citations (「叙事詩」「行きました」) are left alone, so the result passes the
+    same `_text_has_misused_corner_quotes()` test the retry loop applies.
+
+    Returns (fixed_text, [(fix_kind, before, after), ...]).
+    """
+    fixes: List[tuple] = []
+    if not text or not _CORNER_QUOTE_CHARS.search(text):
+        return text, fixes
+    fixed = _close_unpaired_corners(text, fixes)
+
+    def requote(match: "re.Match[str]") -> str:
+        inner = match.group(1)
+        if _corner_span_is_allowed_jp_cite(inner):
+            return match.group(0)
+        fixes.append((FIX_CORNER_TO_DOUBLE_QUOTES, match.group(0), f"“{inner}”"))
+        return f"“{inner}”"
+
+    return _CORNER_SPAN_PATTERN.sub(requote, fixed), fixes
+
+
+def fix_mechanical_content(result: ParsedResponse) -> tuple:
+    """
+    Apply deterministic fixers to `reason` / `overallComment` before the
+    content checks run, so a purely mechanical flaw does not cost a retry.
+
+    Currently fixes Japanese corner-bracket misuse (`fix_corner_quotes`), the
+    failure `has_japanese_corner_quotes_in_critique()` reports. `original` and
+    `sourceExcerpt` are never touched. A parse-failure placeholder is returned
+    unchanged.
+
+    Returns (fixed_result, [ContentFix, ...]); the list is empty when nothing
+    changed, in which case `fixed_result` is `result` itself.
+    """
+    if is_json_extraction_failure(result):
+        return result, []
+    applied: List[ContentFix] = []
+
+    def record(field: str, item_id: Optional[str], edits: List[tuple]) -> None:
+        for kind, before, after in edits:
+            applied.append(
+                {
+                    "field": field,
+                    "id": item_id,
+                    "fix": kind,
+                    "before": before,
+                    "after": after,
+                }
+            )
+
+    suggestions = []
     for suggestion in result["suggestions"]:
-        forms = _recommended_forms(suggestion.get("reason") or "")
-        if not any(_form_is_non_japanese(form) for form in forms):
-            continue
-        if any(_form_is_japanese(form) for form in forms):
-            continue
-        return True
-    return False
+        reason, edits = fix_corner_quotes(suggestion.get("reason") or "")
+        if edits:
+            record("reason", suggestion.get("id"), edits)
+            suggestion = {**suggestion, "reason": reason}
+        suggestions.append(suggestion)
+    comment, edits = fix_corner_quotes(result.get("overallComment") or "")
+    record("overallComment", None, edits)
+
+    if not applied:
+        return result, []
+    return {**result, "suggestions": suggestions, "overallComment": comment}, applied
 
 
 def has_weak_critique_reason(result: ParsedResponse) -> bool:
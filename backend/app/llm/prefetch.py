@@ -0,0 +1,218 @@
+"""
+Speculative prefetch of suggestions for queued pending histories.
+
+A client queues a round by creating a pending history with `awaitingPrefetch`
+(migration 011); it then waits for the reviewer's "generate" click. Other
+pending histories, such as the rounds the workspace persists after generating
+them (even with zero suggestions), are never touched. With
+`SUGGESTIONS_PREFETCH=on`, a prefetch tick (`POST /suggestions/prefetch`, from a
+scheduler or an idle client) generates queued rounds ahead of time and stores
+their proposals with the model's source excerpts, so the click becomes a
+database read: `/suggestions` with a `sessionId` first tries to claim a
+prefetched round for the same SOURCE/TARGET (`take_prefetched`).
+
+Prefetch only spends idle quota. Before each history it requires at least
+`SUGGESTIONS_PREFETCH_MIN_READY` (credential, model) pairs not cooled down in
+`key_pool`, so interactive requests always keep headroom, and a rate-limited
+failure ends the tick. Each history is taken under a generation lease
+(migration 010) so two ticks do not generate the same round; storing re-checks
+that the row is still queued, pending and empty, so a round the reviewer
+generated in the meantime is left alone.
+
+Prefetched rounds are generated without an exemplar translation and with the
+shared prompt at the time of the tick, and are only served to requests without
+an exemplar. Unset (the default), nothing is prefetched or looked up.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import uuid
+from typing import Any, Dict, List, Optional
+
+from .batch import BATCH_ITEM_MIN_BUDGET_S
+from .budget import seconds_left
+from .cloudflare_provider import cloudflare_ready_pairs
+from .gemini_provider import gemini_ready_pairs
+from .groq_provider import groq_ready_pairs
+from .local_provider import local_ready_pairs
+from .singleflight import LEASE_TTL_S
+from .suggestions import SuggestionsError, generate_suggestions
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_ENV = "SUGGESTIONS_PREFETCH"
+PREFETCH_MAX_ENV = "SUGGESTIONS_PREFETCH_MAX"
+PREFETCH_MIN_READY_ENV = "SUGGESTIONS_PREFETCH_MIN_READY"
+
+# Histories one tick looks at. Generation is sequential, so more than a few
+# rarely fit in one invocation anyway.
+DEFAULT_PREFETCH_MAX = 3
+
+# Ready (credential, model) pairs required before starting a prefetch: one for
+# the prefetch itself and one left for a reviewer's request.
+DEFAULT_MIN_READY_PAIRS = 2
+
+
+def prefetch_enabled() -> bool:
+    return (os.environ.get(PREFETCH_ENV) or "").strip().lower() in ("1", "on", "true", "yes")
+
+
+def _int_env(name: str, default: int) -> int:
+    raw = (os.environ.get(name) or "").strip()
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        value = -1
+    if value < 1:
+        logger.warning("Ignoring %s=%r", name, raw)
+        return default
+    return value
+
+
+def ready_pairs() -> int:
+    """(credential, model) pairs across providers not cooled down right now."""
+    return (
+        gemini_ready_pairs()
+        + groq_ready_pairs()
+        + cloudflare_ready_pairs()
+        + local_ready_pairs()
+    )
+
+
+def _proposals(result: Dict[str, Any]) -> List[dict]:
+    return [
+        {
+            "proposalId": str(uuid.uuid4()),
+            "originalAfterText": suggestion["original"],
+            "originalReason": suggestion.get("reason"),
+            "sourceExcerpt": suggestion.get("sourceExcerpt") or None,
+        }
+        for suggestion in result.get("suggestions", [])
+    ]
+
+
+def empty_summary(*, enabled: bool) -> Dict[str, Any]:
+    """A tick's summary before any history was looked at."""
+    return {"prefetched": [], "failed": [], "stoppedBecause": None, "enabled": enabled}
+
+
+async def prefetch_pending(
+    *,
+    system_prompt_override: Optional[str] = None,
+    deadline_monotonic: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Generate and store suggestions for queued pending histories.
+
+    Returns a summary: `prefetched` and `failed` history ids, and
+    `stoppedBecause` (`busy`, `rate_limited`, `budget` or None when every
+    candidate was handled).
+    """
+    from ..db_helper import (
+        acquire_generation_lease,
+        fetch_unprefetched_histories,
+        release_generation_lease,
+        store_prefetched_suggestions,
+    )
+
+    if not prefetch_enabled():
+        return empty_summary(enabled=False)
+    summary = empty_summary(enabled=True)
+
+    histories = await fetch_unprefetched_histories(
+        _int_env(PREFETCH_MAX_ENV, DEFAULT_PREFETCH_MAX)
+    )
+    min_ready = _int_env(PREFETCH_MIN_READY_ENV, DEFAULT_MIN_READY_PAIRS)
+    holder = uuid.uuid4().hex
+    for history in histories:
+        if seconds_left(deadline_monotonic) < BATCH_ITEM_MIN_BUDGET_S:
+            summary["stoppedBecause"] = "budget"
+            break
+        if ready_pairs() < min_ready:
+            summary["stoppedBecause"] = "busy"
+            break
+
+        history_id = history["historyId"]
+        lease_key = f"prefetch:{history_id}"
+        try:
+            if not await acquire_generation_lease(lease_key, holder, LEASE_TTL_S):
+                continue
+        except Exception as e:
+            # The store step re-checks the row, so a missing lease table only
+            # risks a wasted generation, never a duplicate round.
+            logger.warning("Prefetch lease unavailable (%s); proceeding", e)
+        try:
+            result = await generate_suggestions(
+                history["originalText"],
+                history["targetText"],
+                None,
+                system_prompt_override,
+                deadline_monotonic=deadline_monotonic,
+            )
+            stored = await store_prefetched_suggestions(
+                history_id,
+                _proposals(result),
+                result.get("overallComment"),
+                result.get("llmProvider"),
+                result.get("llmModel"),
+            )
+        except SuggestionsError as e:
+            logger.warning("Prefetch of history %s failed: %s", history_id, e)
+            summary["failed"].append(history_id)
+            if e.rate_limited or e.timed_out:
+                summary["stoppedBecause"] = "rate_limited" if e.rate_limited else "budget"
+                break
+            continue
+        finally:
+            try:
+                await release_generation_lease(lease_key, holder)
+            except Exception as e:
+                logger.warning("Could not release prefetch lease: %s", e)
+        if stored:
+            logger.info("Prefetched history %s", history_id)
+            summary["prefetched"].append(history_id)
+    return summary
+
+
+async def take_prefetched(
+    session_id: Optional[str], original_text: str, target_text: str
+) -> Optional[Dict[str, Any]]:
+    """
+    The `/suggestions` body for a prefetched round of this request, or None.
+
+    Claiming is atomic, so each prefetched round is served once. The body
+    carries `prefetchedHistoryId`: the round is already persisted with its
+    proposals (whose ids the suggestions use), so the client adopts it instead
+    of saving a second one. Database trouble means "not prefetched".
+    """
+    if not prefetch_enabled() or not session_id:
+        return None
+    from ..db_helper import claim_prefetched_history
+
+    try:
+        history = await claim_prefetched_history(session_id, original_text, target_text)
+    except Exception as e:
+        logger.warning("Prefetched suggestions unavailable: %s", e)
+        return None
+    if history is None:
+        return None
+    logger.info("Serving prefetched history %s", history["historyId"])
+    return {
+        "suggestions": [
+            {
+                "id": proposal["proposalId"],
+                "original": proposal["originalAfterText"],
+                "reason": proposal["originalReason"] or "",
+                "sourceExcerpt": proposal.get("sourceExcerpt") or "",
+            }
+            for proposal in history["proposals"]
+        ],
+        "overallComment": history.get("overallComment") or "",
+        "llmProvider": history.get("llmProvider"),
+        "llmModel": history.get("llmModel"),
+        "prefetchedHistoryId": history["historyId"],
+    }
@@ -158,6 +158,8 @@ enforced mechanically outside the prompt; see
 `suggestions._content_usable()`.
 """
 
+import json
+
 # Primary correction brief — core task framing (also repeated in the user message).
 CORRECTION_TASK_BRIEF = (
     "意味の不一致、文法、流暢さ、スペルミスに焦点を当てて、この課題を添削してください。"
@@ -301,3 +303,49 @@ def build_messages(
             ),
         },
     ]
+
+
+# Compact prompt for item-level repair (`repair.py`): only the suggestions that
+# failed a critique-field check are sent back, so the request is a fraction of
+# the full prompt and the good items are never regenerated.
+REPAIR_SYSTEM_PROMPT = """你是日语译文添削的校对助手。下面每条指摘的 reason 写法不合格，请逐条改写 reason，只改写法，不改内容：
+- reason 必须是自然的简体中文；禁止日语说明文、禁止です/ます。
+- 中文引用用 "" / “”；「」只用于引用日语词形，禁止用「」包中文说明词。
+- 推荐形必须用日语写出（可用「」），禁止把中文词当成修正后的形。
+- 保留原 reason 指出的问题、推荐改法和理由；不要新增或删除指摘。
+- 只输出 JSON：{"suggestions":[{"id":"…","reason":"…"}]}，id 与输入一致，不要其他文字。"""
+
+# Per-problem hint shown next to each item, keyed by parser problem code.
+REPAIR_PROBLEM_HINTS = {
+    "japanese_prose": "说明文混入了日语",
+    "corner_quotes": "用「」包了中文说明或括号不成对",
+    "chinese_recommendation": "推荐形写成了中文",
+}
+
+
+def build_repair_messages(items: list[dict]) -> list[dict]:
+    """
+    Build the message list for repairing individual suggestion reasons.
+
+    `items` are `{"id", "original", "reason", "problems"}` dicts; `problems`
+    holds parser problem codes and is rendered as a short Chinese hint.
+    """
+    payload = [
+        {
+            "id": item["id"],
+            "original": item.get("original") or "",
+            "reason": item.get("reason") or "",
+            "问题": "；".join(
+                REPAIR_PROBLEM_HINTS.get(code, code)
+                for code in item.get("problems") or ()
+            ),
+        }
+        for item in items
+    ]
+    return [
+        {"role": "system", "content": REPAIR_SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": json.dumps({"suggestions": payload}, ensure_ascii=False),
+        },
+    ]
@@ -26,6 +26,10 @@ Three properties are load-bearing:
 - **It never holds a secret.** Rows identify a credential by a hash prefix. A
   pool index would be shorter but is positional: reordering `GEMINI_API_KEYS`
   would silently re-point every row at a different key.
+
+Open circuits (`circuit.py`) travel through the same table: a row whose
+fingerprint is `CIRCUIT_FINGERPRINT` marks the model itself as degraded until
+`recover_at`, whichever key is used.
 """
 
 from __future__ import annotations
@@ -36,14 +40,16 @@ import logging
 import re
 from datetime import datetime, timedelta, timezone
 from email.utils import parsedate_to_datetime
-from typing import Iterable, List, NamedTuple, Optional, Sequence
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence
 
 from .budget import seconds_left
 from .key_pool import (
     DEFAULT_COOLDOWN_SECONDS,
+    RateLimitReading,
     load_cloudflare_credentials,
     load_gemini_credentials,
     load_groq_credentials,
+    load_local_credentials,
     mark_cooldown,
 )
 
@@ -72,10 +78,15 @@ SHARED_STATE_TIMEOUT_S = 3.0
 # read). The cap only stops an unflushable buffer from growing without bound.
 MAX_PENDING_OBSERVATIONS = 32
 
+# Stands in for a credential fingerprint on rows recording an open circuit. Real
+# fingerprints are 16 hex digits, so this cannot collide with one.
+CIRCUIT_FINGERPRINT = "circuit"
+
 _PROVIDER_LOADERS = {
     "gemini": load_gemini_credentials,
     "groq": load_groq_credentials,
     "cloudflare": load_cloudflare_credentials,
+    "local": load_local_credentials,
 }
 
 
@@ -158,6 +169,40 @@ def parse_duration_hint(value: Optional[str]) -> Optional[float]:
         return None
 
 
+def _header_number(headers: Mapping[str, str], name: str) -> Optional[float]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        return None
+
+
+def parse_rate_limit_headers(headers: Mapping[str, str]) -> Dict[str, RateLimitReading]:
+    """
+    Remaining request/token limits from OpenAI-style `x-ratelimit-*` headers.
+
+    Groq sends `x-ratelimit-{limit,remaining,reset}-{requests,tokens}` on every
+    response, resets in the compact duration form (`2m59.56s`). A kind whose
+    `remaining` header is missing or malformed is left out, so a provider that
+    sends none of these yields an empty dict and nothing is recorded.
+    """
+    readings: Dict[str, RateLimitReading] = {}
+    if not isinstance(headers, Mapping):
+        return readings
+    for kind in ("requests", "tokens"):
+        remaining = _header_number(headers, f"x-ratelimit-remaining-{kind}")
+        if remaining is None:
+            continue
+        readings[kind] = RateLimitReading(
+            remaining=remaining,
+            limit=_header_number(headers, f"x-ratelimit-limit-{kind}"),
+            reset_s=parse_duration_hint(headers.get(f"x-ratelimit-reset-{kind}")),
+        )
+    return readings
+
+
 def seed_cooldowns(rows: Sequence[dict]) -> int:
     """
     Apply what earlier requests learned to this process's cooldowns.
@@ -178,7 +223,7 @@ def seed_cooldowns(rows: Sequence[dict]) -> int:
     if not rows:
         return 0
     now = datetime.now(timezone.utc)
-    seeded = 0
+    seeded = _seed_circuits(rows, now)
     for provider, loader in _PROVIDER_LOADERS.items():
         matching = [r for r in rows if (r.get("provider") or "") == provider]
         if not matching:
@@ -190,13 +235,8 @@ def seed_cooldowns(rows: Sequence[dict]) -> int:
             cred = by_fingerprint.get(row.get("credentialFingerprint") or "")
             if cred is None:
                 continue
-            recover_at = row.get("recoverAt")
-            if not isinstance(recover_at, datetime):
-                continue
-            if recover_at.tzinfo is None:
-                recover_at = recover_at.replace(tzinfo=timezone.utc)
-            remaining = (recover_at - now).total_seconds()
-            if remaining <= 0:
+            remaining = _remaining_s(row, now)
+            if remaining is None:
                 continue
             mark_cooldown(
                 cred.id,
@@ -212,6 +252,36 @@ def seed_cooldowns(rows: Sequence[dict]) -> int:
     return seeded
 
 
+def _remaining_s(row: dict, now: datetime) -> Optional[float]:
+    recover_at = row.get("recoverAt")
+    if not isinstance(recover_at, datetime):
+        return None
+    if recover_at.tzinfo is None:
+        recover_at = recover_at.replace(tzinfo=timezone.utc)
+    remaining = (recover_at - now).total_seconds()
+    return remaining if remaining > 0 else None
+
+
+def _seed_circuits(rows: Sequence[dict], now: datetime) -> int:
+    """Open the circuits earlier requests opened; returns how many."""
+    from .circuit import seed_open
+
+    seeded = 0
+    for row in rows:
+        if row.get("credentialFingerprint") != CIRCUIT_FINGERPRINT:
+            continue
+        remaining = _remaining_s(row, now)
+        if remaining is None:
+            continue
+        seed_open(
+            row.get("provider") or "",
+            row.get("model") or "",
+            min(remaining, MAX_COOLDOWN_S),
+        )
+        seeded += 1
+    return seeded
+
+
 def observe_refusal(
     provider: str,
     credential_id: str,
@@ -235,6 +305,27 @@ def observe_refusal(
     )
 
 
+def observe_circuit_open(
+    provider: str,
+    model: Optional[str],
+    open_seconds: float,
+    reason: str = "",
+) -> None:
+    """Remember an opened circuit for later requests, like a refusal."""
+    if len(_pending) >= MAX_PENDING_OBSERVATIONS:
+        return
+    _pending.append(
+        Observation(
+            provider=provider,
+            model=model or "",
+            fingerprint=CIRCUIT_FINGERPRINT,
+            recover_at=datetime.now(timezone.utc)
+            + timedelta(seconds=max(0.0, open_seconds)),
+            reason=f"circuit open: {reason}"[:200],
+        )
+    )
+
+
 async def load_shared_state(setting_key: str) -> tuple[Optional[dict], List[dict]]:
     """
     Read the stored setting row and the in-effect availability rows together.
@@ -0,0 +1,111 @@
+"""
+Item-level repair of suggestion bodies that failed a critique-field check.
+
+A single `reason` written in Japanese, wrapping Chinese prose in 「」 or offering
+a Chinese recommended form used to send `generate_suggestions()` round the whole
+Gemini → Groq → Cloudflare pass again, regenerating every good item with it. The
+repair stage instead sends only the offending items to a fast model with the
+compact `prompts.REPAIR_SYSTEM_PROMPT` and splices the rewritten reasons back
+into the body. The full pass stays the fallback, so a repair that fails costs
+one short call and changes nothing else.
+
+Repair is attempted only when the rest of the body is sound: it parses, the
+`overallComment` passes its checks, and at most `REPAIR_MAX_ITEMS` items are
+bad. A body that is wrong throughout is better regenerated with the full prompt
+than patched item by item.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from .parser import (
+    ParsedResponse,
+    is_json_extraction_failure,
+    overall_comment_problems,
+    safe_json_parse,
+    suggestion_problems,
+)
+
+# Above this many offending items a full pass is the better retry.
+REPAIR_MAX_ITEMS = 8
+
+# Ceiling on one repair call. The payload is a few hundred characters, so a
+# fast model answers in 1-3s; past this the full retry is the better use of the
+# remaining budget.
+REPAIR_TIMEOUT_S = 8.0
+
+# Below this much budget left a repair is not started at all.
+REPAIR_MIN_BUDGET_S = 3.0
+
+
+def plan_repair(result: ParsedResponse) -> Optional[List[dict]]:
+    """
+    The items to send for repair, or None when the body is not repairable.
+
+    Each item is `{"id", "original", "reason", "problems"}` as expected by
+    `prompts.build_repair_messages()`.
+    """
+    if is_json_extraction_failure(result):
+        return None
+    if overall_comment_problems(result):
+        return None
+    items = []
+    for suggestion in result["suggestions"]:
+        problems = suggestion_problems(suggestion)
+        if problems:
+            items.append(
+                {
+                    "id": suggestion["id"],
+                    "original": suggestion.get("original") or "",
+                    "reason": suggestion.get("reason") or "",
+                    "problems": problems,
+                }
+            )
+    if not items or len(items) > REPAIR_MAX_ITEMS:
+        return None
+    return items
+
+
+def _repaired_reasons(raw_output: str) -> Dict[str, str]:
+    data = safe_json_parse(raw_output or "")
+    if not isinstance(data, dict):
+        return {}
+    items = data.get("suggestions")
+    if not isinstance(items, list):
+        return {}
+    reasons: Dict[str, str] = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        item_id = str(item.get("id") or "").strip()
+        reason = item.get("reason")
+        if item_id and isinstance(reason, str) and reason.strip():
+            reasons[item_id] = reason.strip()
+    return reasons
+
+
+def apply_repair(
+    result: ParsedResponse,
+    items: List[dict],
+    raw_output: str,
+) -> Optional[ParsedResponse]:
+    """
+    Splice repaired reasons from `raw_output` into `result`.
+
+    Returns None unless every item in `items` came back and now passes its
+    checks: a half-repaired body would still fail `_content_usable()` and the
+    full retry would run anyway, after this call had already spent its time.
+    """
+    reasons = _repaired_reasons(raw_output)
+    wanted = {item["id"] for item in items}
+    if not wanted.issubset(reasons):
+        return None
+    repaired = []
+    for suggestion in result["suggestions"]:
+        if suggestion["id"] in wanted:
+            suggestion = {**suggestion, "reason": reasons[suggestion["id"]]}
+            if suggestion_problems(suggestion):
+                return None
+        repaired.append(suggestion)
+    return {**result, "suggestions": repaired}
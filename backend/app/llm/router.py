@@ -0,0 +1,228 @@
+"""
+Score-based ordering of providers and models, as an opt-in alternative to the
+fixed Gemini → Groq → Cloudflare chain.
+
+`suggestions.CHAIN_ORDER` encodes critique quality as measured once by hand, so
+it stays the default. A deployment whose providers behave differently — a
+Gemini tier that is constantly rate-limited, a Groq model that keeps answering
+in Japanese — can set `LLM_ROUTER=score` and let recent behaviour decide the
+order instead. Each provider (and each model within a rotating provider) is
+scored per request from:
+
+- **success**: share of recent calls that produced an answer at all;
+- **usable**: share of those answers that passed the content checks, which is
+  the quality signal the fixed order was standing in for;
+- **latency**: learned p50 (`latency.estimate`) against the budget left, so a
+  provider that cannot answer in the time remaining scores nothing here;
+- **quota**: (credential, model) pairs not known to be cooled down.
+
+Weights come from `LLM_ROUTER_WEIGHTS` (`success=1,usable=2,latency=1,quota=0.5`
+by default). Components are in [0, 1]; rates start at a neutral prior and
+unlearned latency scores neutral, so on a cold process only quota separates
+providers and the static chain breaks ties rather than noise. Providers whose
+p50 does not fit the remaining budget always go last: trying them first would
+spend the time a faster provider needs.
+
+The scoreboard is process-local and rolling (`WINDOW` most recent results); it
+is not persisted — it is cheap to re-learn and the latency half already is.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from .budget import seconds_left
+from .latency import ANY_MODEL, estimate
+
+logger = logging.getLogger(__name__)
+
+ROUTER_ENV = "LLM_ROUTER"
+ROUTER_WEIGHTS_ENV = "LLM_ROUTER_WEIGHTS"
+
+DEFAULT_WEIGHTS: Dict[str, float] = {
+    "success": 1.0,
+    "usable": 2.0,
+    "latency": 1.0,
+    "quota": 0.5,
+}
+
+# Recent results kept per (provider, model).
+WINDOW = 50
+
+# Ready (credential, model) pairs at which the quota component saturates: a
+# request and its retries rarely need more than this many distinct pairs.
+QUOTA_SATURATION_PAIRS = 3
+
+# Latency component for a provider or model with no learned p50 yet.
+NEUTRAL_LATENCY = 0.5
+
+# Latency reference when the caller set no deadline (tests, scripts).
+NO_DEADLINE_REFERENCE_S = 45.0
+
+
+_lock = threading.Lock()
+_results: Dict[Tuple[str, str], Deque[Tuple[bool, Optional[bool]]]] = {}
+
+
+def reset_router_state() -> None:
+    """Drop the scoreboard (for tests)."""
+    with _lock:
+        _results.clear()
+
+
+def is_router_enabled() -> bool:
+    """Whether `LLM_ROUTER=score` replaces the static chain order."""
+    return (os.environ.get(ROUTER_ENV) or "").strip().lower() == "score"
+
+
+def router_weights() -> Dict[str, float]:
+    """`DEFAULT_WEIGHTS` overridden by `LLM_ROUTER_WEIGHTS` (`name=value,...`)."""
+    weights = dict(DEFAULT_WEIGHTS)
+    raw = os.environ.get(ROUTER_WEIGHTS_ENV) or ""
+    for part in raw.split(","):
+        if not part.strip():
+            continue
+        name, _, value = part.partition("=")
+        name = name.strip().lower()
+        try:
+            weight = float(value)
+        except ValueError:
+            weight = -1.0
+        if name not in weights or weight < 0:
+            logger.warning("Ignoring %s entry %r", ROUTER_WEIGHTS_ENV, part.strip())
+            continue
+        weights[name] = weight
+    return weights
+
+
+def record_result(
+    provider: str,
+    model: Optional[str],
+    *,
+    answered: bool,
+    usable: Optional[bool] = None,
+) -> None:
+    """
+    Record one provider call under its model and the provider aggregate.
+
+    A failed call is usually charged to the provider only: the rotation wrapper
+    may have tried two models, and the exception does not say which one failed.
+    """
+    with _lock:
+        for key_model in {model or ANY_MODEL, ANY_MODEL}:
+            window = _results.setdefault((provider, key_model), deque(maxlen=WINDOW))
+            window.append((answered, usable if answered else None))
+
+
+def _rates(provider: str, model: str) -> Tuple[float, float]:
+    """(success, usable) rates with a one-and-one prior, so unseen starts at 0.5."""
+    with _lock:
+        window = list(_results.get((provider, model), ()))
+    answered = sum(1 for ok, _ in window if ok)
+    usable = sum(1 for ok, good in window if ok and good)
+    return (answered + 1) / (len(window) + 2), (usable + 1) / (answered + 2)
+
+
+def _latency_component(p50_s: float, budget_s: float) -> float:
+    if budget_s <= 0:
+        return 0.0
+    return max(0.0, 1.0 - p50_s / budget_s)
+
+
+def _score(
+    provider: str,
+    model: str,
+    *,
+    p50_s: Optional[float],
+    budget_s: float,
+    ready_pairs: Optional[int],
+    weights: Mapping[str, float],
+) -> float:
+    success, usable = _rates(provider, model)
+    score = weights["success"] * success + weights["usable"] * usable
+    latency = (
+        _latency_component(p50_s, budget_s) if p50_s is not None else NEUTRAL_LATENCY
+    )
+    score += weights["latency"] * latency
+    if ready_pairs is not None:
+        score += weights["quota"] * min(1.0, ready_pairs / QUOTA_SATURATION_PAIRS)
+    return score
+
+
+def order_providers(
+    names: Sequence[str],
+    *,
+    input_chars: int,
+    deadline_monotonic: Optional[float],
+    ready_pairs: Mapping[str, int],
+    default_p50_s: Mapping[str, float],
+) -> Tuple[str, ...]:
+    """
+    `names` in the order this request should try them.
+
+    `names` is the static order and is returned unchanged unless the router is
+    enabled. `default_p50_s` stands in for providers with no learned latency
+    yet when deciding whether they fit the remaining budget (their static
+    minimum slice is the right cold-start guess).
+    """
+    if not is_router_enabled():
+        return tuple(names)
+    weights = router_weights()
+    left = seconds_left(deadline_monotonic)
+    budget_s = NO_DEADLINE_REFERENCE_S if left == float("inf") else left
+    ranked = []
+    for position, name in enumerate(names):
+        learned = estimate(name, ANY_MODEL, input_chars)
+        p50 = learned.p50_s if learned is not None else default_p50_s[name]
+        score = _score(
+            name,
+            ANY_MODEL,
+            p50_s=learned.p50_s if learned is not None else None,
+            budget_s=budget_s,
+            ready_pairs=ready_pairs.get(name),
+            weights=weights,
+        )
+        ranked.append((p50 > budget_s, -score, position, name))
+    order = tuple(name for *_, name in sorted(ranked))
+    if order != tuple(names):
+        logger.info("Router order for this request: %s", " → ".join(order))
+    return order
+
+
+def rank_models(
+    provider: str,
+    models: Sequence[str],
+    *,
+    input_chars: Optional[int] = None,
+    deadline_monotonic: Optional[float] = None,
+) -> List[str]:
+    """
+    `models` best-first by their own scoreboard and learned latency.
+
+    Shuffled before the (stable) sort, so models the router knows nothing
+    about keep the random spread rotation relies on.
+    """
+    weights = router_weights()
+    left = seconds_left(deadline_monotonic)
+    budget_s = NO_DEADLINE_REFERENCE_S if left == float("inf") else left
+    shuffled = random.sample(list(models), len(models))
+
+    def score(model: str) -> float:
+        learned = (
+            estimate(provider, model, input_chars) if input_chars is not None else None
+        )
+        return _score(
+            provider,
+            model,
+            p50_s=learned.p50_s if learned is not None else None,
+            budget_s=budget_s,
+            ready_pairs=None,
+            weights=weights,
+        )
+
+    return sorted(shuffled, key=lambda model: -score(model))
@@ -0,0 +1,244 @@
+"""
+Single-flight coalescing of identical `/suggestions` generations.
+
+A double-click, a second tab or a frontend retry used to start the same
+generation twice at once: twice the quota and twice the 429 pressure for one
+answer. Requests are now keyed by a hash of the messages they would send
+(`generation_key`), and `run_once` lets every concurrent request with the same
+key await one shared generation task in this process.
+
+The shared task outlives any single waiter: a waiter that is cancelled (its
+client disconnected) only cancels the generation if nobody else is waiting.
+Each waiter gets its own copy of the result.
+
+With `SUGGESTIONS_SINGLEFLIGHT=shared` the process that starts a generation
+also takes a short-lived lease row (`generation_leases`, migration 010), so a
+different serverless instance receiving the same request waits for that
+result instead of generating its own. A lease whose holder died simply
+expires; any database trouble, including a lease query slower than
+`LEASE_DB_TIMEOUT_S`, falls back to generating locally, since coalescing is
+only ever an optimization. A waiter also stops waiting while a local generation
+still fits in what is left of its budget. `off` disables coalescing entirely.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .budget import PLATFORM_MAX_DURATION_S, seconds_left
+from .prompts import build_messages
+from .provider_health import SHARED_STATE_TIMEOUT_S
+
+logger = logging.getLogger(__name__)
+
+SINGLEFLIGHT_ENV = "SUGGESTIONS_SINGLEFLIGHT"
+MODES = ("off", "local", "shared")
+
+# A lease can never need to outlive the invocation that holds it.
+LEASE_TTL_S = PLATFORM_MAX_DURATION_S
+# How long a finished result stays readable by waiters in other processes.
+RESULT_TTL_S = 15.0
+# How often a waiter in another process checks the lease row.
+LEASE_POLL_S = 1.0
+# Bound on each lease query, like the other shared-state reads: a slow database
+# must not eat the budget the generation itself needs.
+LEASE_DB_TIMEOUT_S = SHARED_STATE_TIMEOUT_S
+# A waiter gives up while this much budget is left, so a lease that never
+# delivers can still be answered by generating here: one provider answer plus
+# parsing, as `batch.BATCH_ITEM_MIN_BUDGET_S`.
+LOCAL_GENERATION_RESERVE_S = 10.0
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    loop: asyncio.AbstractEventLoop
+    waiters: int = 0
+
+
+_flights: Dict[str, _Flight] = {}
+
+
+def reset_singleflight_state() -> None:
+    """Forget in-flight generations (for tests)."""
+    _flights.clear()
+
+
+def singleflight_mode() -> str:
+    """`SUGGESTIONS_SINGLEFLIGHT`: `local` (default), `shared` or `off`."""
+    mode = (os.environ.get(SINGLEFLIGHT_ENV) or "local").strip().lower()
+    if mode not in MODES:
+        logger.warning("Ignoring unknown %s=%r", SINGLEFLIGHT_ENV, mode)
+        return "local"
+    return mode
+
+
+def generation_key(
+    original_text: str,
+    target_text: str,
+    exemplar_translation: Optional[str] = None,
+    system_prompt_override: Optional[str] = None,
+    chunk_paragraphs: Optional[bool] = None,
+) -> str:
+    """Hash of the built messages (and chunking choice) a request would send."""
+    messages = build_messages(
+        original_text, target_text, exemplar_translation, system_prompt_override
+    )
+    canonical = json.dumps(
+        {"messages": messages, "chunk": chunk_paragraphs},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+async def run_once(
+    key: str,
+    generate: Callable[[], Awaitable[Dict[str, Any]]],
+    *,
+    deadline_monotonic: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Await the generation for `key`, starting it with `generate()` unless an
+    identical one is already in flight in this process.
+    """
+    mode = singleflight_mode()
+    if mode == "off":
+        return await generate()
+
+    loop = asyncio.get_running_loop()
+    flight = _flights.get(key)
+    if flight is None or flight.task.done() or flight.loop is not loop:
+        work = (
+            _run_under_lease(key, generate, deadline_monotonic)
+            if mode == "shared"
+            else generate()
+        )
+        flight = _Flight(asyncio.ensure_future(work), loop)
+        _flights[key] = flight
+        flight.task.add_done_callback(
+            lambda _task, key=key, flight=flight: _forget(key, flight)
+        )
+    else:
+        logger.info("Joining in-flight generation %s", key[:12])
+
+    flight.waiters += 1
+    try:
+        result = await asyncio.shield(flight.task)
+    except asyncio.CancelledError:
+        if flight.waiters == 1 and not flight.task.done():
+            flight.task.cancel()
+        raise
+    finally:
+        flight.waiters -= 1
+    return copy.deepcopy(result)
+
+
+def _forget(key: str, flight: _Flight) -> None:
+    if _flights.get(key) is flight:
+        del _flights[key]
+
+
+async def _run_under_lease(
+    key: str,
+    generate: Callable[[], Awaitable[Dict[str, Any]]],
+    deadline_monotonic: Optional[float],
+) -> Dict[str, Any]:
+    """Generate under a lease, or wait for the process that holds one."""
+    from ..db_helper import (
+        acquire_generation_lease,
+        complete_generation_lease,
+        fetch_generation_lease,
+        release_generation_lease,
+    )
+
+    holder = uuid.uuid4().hex
+    try:
+        acquired = await _bounded(acquire_generation_lease(key, holder, LEASE_TTL_S))
+    except Exception as e:
+        # A timed-out insert may still have taken the lease, so generate as its
+        # holder: publishing and releasing only ever touch our own row.
+        logger.warning("Generation lease unavailable (%r); generating locally", e)
+        acquired = True
+
+    if not acquired:
+        shared = await _await_other_process(
+            key,
+            lambda lease_key: _bounded(fetch_generation_lease(lease_key)),
+            deadline_monotonic,
+        )
+        if shared is not None:
+            return shared
+        return await generate()
+
+    try:
+        result = await generate()
+    except BaseException:
+        try:
+            await _bounded(release_generation_lease(key, holder))
+        except Exception as e:
+            logger.warning("Could not release generation lease: %r", e)
+        raise
+    try:
+        await _bounded(
+            complete_generation_lease(
+                key,
+                holder,
+                json.dumps(result, ensure_ascii=False, default=str),
+                RESULT_TTL_S,
+            )
+        )
+    except Exception as e:
+        logger.warning("Could not publish shared generation result: %r", e)
+    return result
+
+
+async def _bounded(query: Awaitable[Any]) -> Any:
+    return await asyncio.wait_for(query, timeout=LEASE_DB_TIMEOUT_S)
+
+
+async def _await_other_process(
+    key: str,
+    fetch_lease: Callable[[str], Awaitable[Optional[Dict[str, Any]]]],
+    deadline_monotonic: Optional[float],
+) -> Optional[Dict[str, Any]]:
+    """
+    Poll another process's lease until its result appears.
+
+    None means generate locally: the lease was released (that generation
+    failed) or expired (its holder died), or waiting any longer would leave
+    less than `LOCAL_GENERATION_RESERVE_S` to generate in.
+    """
+    logger.info("Generation %s is running in another process; waiting", key[:12])
+    started = time.monotonic()
+    while (
+        seconds_left(deadline_monotonic)
+        > LEASE_POLL_S + LEASE_DB_TIMEOUT_S + LOCAL_GENERATION_RESERVE_S
+    ):
+        await asyncio.sleep(LEASE_POLL_S)
+        try:
+            lease = await fetch_lease(key)
+        except Exception as e:
+            logger.warning("Could not read generation lease: %r", e)
+            return None
+        if lease is None:
+            return None
+        if lease.get("result"):
+            logger.info(
+                "Shared generation %s arrived after %.1fs",
+                key[:12],
+                time.monotonic() - started,
+            )
+            return json.loads(lease["result"])
+        if lease.get("expired"):
+            return None
+    return None
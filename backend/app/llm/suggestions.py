@@ -1,6 +1,7 @@
 """
 AI suggestions generation with provider failover.
-Gemini (primary) -> Groq (secondary) -> Cloudflare Workers AI (tertiary).
+Gemini (primary) -> Groq (secondary) -> Cloudflare Workers AI (tertiary),
+preceded by a self-hosted OpenAI-compatible server when one is configured.
 
 Two independent, composable retry axes exist across this module and its
 providers:
@@ -8,9 +9,9 @@ providers:
 1. Network-level retry (existing, unaffected by this module's own retry
    loop): `gemini_provider.call_gemini_with_rotation()` retries once against
    a second Gemini Flash model on a retriable HTTP failure (429/5xx/timeout)
-   before this module falls over to Groq, then Cloudflare. Groq has its own
-   in-provider model rotation. This axis handles *transport* failures —
-   the provider never returned usable content.
+   before this module falls over to Groq, then Cloudflare. Groq and Cloudflare
+   have their own in-provider model rotation. This axis handles *transport*
+   failures — the provider never returned usable content.
 
 2. Content-quality-level retry (`MAX_PARSE_RETRY_ATTEMPTS` below): a
    provider call can succeed at the network level yet return content that
@@ -72,13 +73,40 @@ call could start, not when it could finish: two Gemini timeouts (44s) followed
 by one Groq timeout (25s) passed every check here and still ran 69s into
 Vercel's 60s limit, which is the FUNCTION_INVOCATION_TIMEOUT this module now
 cannot produce (`fix-function-invocation-timeout`).
+
+Long multi-paragraph input can optionally be split into aligned paragraph
+chunks (`chunking.py`, `SUGGESTIONS_CHUNKING`). Each chunk runs the retry loop
+above on its own prompt, concurrently and under the same request deadline, and
+the bodies are merged with renumbered ids, so latency follows the longest
+paragraph rather than the whole document.
+
+Before a content retry, a body whose only flaws are a few bad `reason`s is
+repaired item by item (`repair.py`): the offending items alone go to a fast
+model (Groq, else Gemini) with a compact rewrite prompt, and the rewritten
+reasons are spliced into the otherwise good body. The full pass with a nudge
+remains the fallback when the repair call fails or its output still fails a
+check. Purely mechanical flaws (「」 misuse) never get that far: they are fixed
+deterministically right after parsing (`parser.fix_mechanical_content`) and
+reported in the response's `contentFixes`.
+
+With `SUGGESTIONS_ACCEPT_POLICY` set (`acceptance.py`), a body whose items
+mostly pass the per-item checks is not even repaired: the failing items are
+dropped or flagged, listed in `itemDiagnostics`, and the body is returned by the
+provider that wrote it, with no further provider or pass.
+
+The chain order above is the default. With `LLM_ROUTER=score` each pass orders
+the providers (and Gemini/Groq their models) from a rolling scoreboard of
+recent outcomes instead (`router.py`); every rule in this docstring then
+applies to that order, with "the last provider" meaning the last in it.
 """
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import os
 import time
-from typing import NamedTuple, Optional
+from typing import List, NamedTuple, Optional, Sequence, Tuple
 
 from .budget import (
     PLATFORM_MAX_DURATION_S,
@@ -87,8 +115,18 @@ from .budget import (
     resolve_call_timeout,
     seconds_left,
 )
-from .prompts import build_messages
+from .chunking import TextChunk, merge_chunk_results, plan_chunks
+from .prompts import build_messages, build_repair_messages
+from .acceptance import accept_partially
+from .repair import (
+    REPAIR_MIN_BUDGET_S,
+    REPAIR_TIMEOUT_S,
+    apply_repair,
+    plan_repair,
+)
 from .parser import (
+    ContentFix,
+    fix_mechanical_content,
     parse_model_output,
     is_json_extraction_failure,
     has_non_chinese_reason,
@@ -97,16 +135,22 @@ from .parser import (
     ParsedResponse,
 )
 from .provider_output import ProviderOutput
+from .latency import CallBudget, call_budget, messages_chars, unmeasured
+from .router import is_router_enabled, order_providers, record_result
+from .thinking import pass_scope, record_usable
+from .timeline import span
 from .key_pool import (
     load_cloudflare_credentials,
     load_gemini_credentials,
     load_groq_credentials,
+    load_local_credentials,
 )
 from .groq_provider import (
     call_groq_with_rotation,
     get_groq_api_key,
     get_groq_model,
     groq_availability,
+    groq_ready_pairs,
     release_groq_cooldown,
     GROQ_MIN_SLICE_S,
     GROQ_TIMEOUT,
@@ -117,18 +161,37 @@ from .groq_provider import (
     GroqJsonValidateError,
 )
 from .cloudflare_provider import (
-    call_cloudflare,
+    call_cloudflare_with_rotation,
     cloudflare_availability,
+    cloudflare_ready_pairs,
     get_cloudflare_credentials,
+    get_cloudflare_model,
     release_cloudflare_cooldown,
     CloudflareError,
+    CloudflareRateLimitError,
+    CloudflareServerError,
+    CloudflareTimeoutError,
     CF_MIN_SLICE_S,
-    CF_MODEL,
     CF_TIMEOUT,
 )
+from .local_provider import (
+    call_local_with_rotation,
+    get_local_model,
+    is_local_provider_configured,
+    local_availability,
+    local_ready_pairs,
+    release_local_cooldown,
+    LOCAL_MIN_SLICE_S,
+    LOCAL_TIMEOUT,
+    LocalLLMError,
+    LocalLLMRateLimitError,
+    LocalLLMServerError,
+    LocalLLMTimeoutError,
+)
 from .gemini_provider import (
     call_gemini_with_rotation,
     gemini_availability,
+    gemini_ready_pairs,
     get_gemini_api_key,
     get_gemini_model,
     release_gemini_cooldown,
@@ -178,6 +241,11 @@ SUGGESTIONS_WALL_CLOCK_S = PLATFORM_MAX_DURATION_S - PLATFORM_RESERVE_S
 # aborted mid-flight (which used to discard an already-usable earlier body).
 RETRY_BUDGET_MARGIN = 1.1
 
+# Opt-in paragraph chunking for long multi-paragraph input (`chunking.py`).
+# Off by default: a chunked critique trades one document-wide overallComment
+# for per-part comments, which is a product decision, not only a latency one.
+CHUNKING_ENV = "SUGGESTIONS_CHUNKING"
+
 # Appended on language-check retries only (not JSON-parse failures) so the
 # next pass gets an explicit correction signal without changing the base
 # prompt for the first attempt.
@@ -222,6 +290,8 @@ class SuggestionsError(Exception):
         groq_pool_size: int = 0,
         cf_pool_size: int = 0,
         gemini_pool_size: int = 0,
+        local_error: Optional[str] = None,
+        local_pool_size: int = 0,
     ):
         super().__init__(message)
         self.groq_error = groq_error
@@ -234,6 +304,8 @@ class SuggestionsError(Exception):
         self.groq_pool_size = groq_pool_size
         self.cf_pool_size = cf_pool_size
         self.gemini_pool_size = gemini_pool_size
+        self.local_error = local_error
+        self.local_pool_size = local_pool_size
 
 
 class NoProvidersConfiguredError(SuggestionsError):
@@ -262,7 +334,12 @@ def are_providers_configured() -> bool:
     groq_key = get_groq_api_key()
     cf_account, cf_token = get_cloudflare_credentials()
     gemini_key = get_gemini_api_key()
-    return bool(groq_key) or (bool(cf_account) and bool(cf_token)) or bool(gemini_key)
+    return (
+        bool(groq_key)
+        or (bool(cf_account) and bool(cf_token))
+        or bool(gemini_key)
+        or is_local_provider_configured()
+    )
 
 
 def _content_usable(result: ParsedResponse) -> bool:
@@ -284,6 +361,42 @@ class GenerationOutcome(NamedTuple):
     result: ParsedResponse
     provider: Optional[str] = None
     model: Optional[str] = None
+    # Deterministic edits made to the body after parsing (`parser.ContentFix`).
+    fixes: Tuple[ContentFix, ...] = ()
+    # Items dropped or flagged by the acceptance policy (`acceptance.py`); a
+    # non-empty tuple means the body was accepted despite failing a check.
+    diagnostics: Tuple[dict, ...] = ()
+
+
+def _parse_output(
+    raw_output: str,
+    provider: str,
+    model: Optional[str],
+) -> GenerationOutcome:
+    """
+    Parse a provider's raw text and apply the deterministic content fixers.
+
+    Fixing before `_content_usable()` runs is the point: a body whose only flaw
+    is mechanical (「」 around Chinese prose, an unpaired bracket) is accepted as
+    fixed instead of costing a whole retry pass. Every edit is logged and kept
+    on the outcome so the response can show what was changed.
+    """
+    with span("parse", provider=provider, model=model) as parsed:
+        result, fixes = fix_mechanical_content(parse_model_output(raw_output))
+        if fixes:
+            parsed["fixes"] = len(fixes)
+    for fix in fixes:
+        logger.info(
+            "Content fix on %s model=%s: %s in %s%s: %r -> %r",
+            provider,
+            model,
+            fix["fix"],
+            fix["field"],
+            f" #{fix['id']}" if fix["id"] else "",
+            fix["before"],
+            fix["after"],
+        )
+    return GenerationOutcome(result, provider, model, tuple(fixes))
 
 
 def _text_and_model(
@@ -294,8 +407,8 @@ def _text_and_model(
     Normalize a provider call result to (text, model).
 
     Rotating providers return ProviderOutput so the model that actually
-    answered is known. Cloudflare has a single fixed model and returns plain
-    text, in which case the caller's configured/default model id is used.
+    answered is known. A plain string (a test double, or a script wrapping a
+    single-model call) is attributed to the caller's configured model id.
     """
     if isinstance(output, ProviderOutput):
         return output.text, output.model
@@ -316,34 +429,89 @@ def _prefer_outcome(
     return secondary
 
 
-def _pool_sizes() -> tuple[int, int, int]:
+def _pool_sizes() -> tuple[int, int, int, int]:
     return (
         len(load_gemini_credentials()),
         len(load_groq_credentials()),
         len(load_cloudflare_credentials()),
+        len(load_local_credentials()) if is_local_provider_configured() else 0,
     )
 
 
-CHAIN_ORDER = ("gemini", "groq", "cloudflare")
+# A self-hosted server (`local_provider.py`) goes first when configured: it has
+# no quota to protect and answers without a WAN round trip, so the free-tier
+# clouds only take what it cannot. Unconfigured, it is skipped without a call.
+CHAIN_ORDER = ("local", "gemini", "groq", "cloudflare")
 
-# Preference order encodes critique quality, so it is fixed. Availability decides
-# which providers are *in* the chain, never in what order they are preferred: a
-# provider is not promoted for being faster, because that would trade output
-# quality for latency without anyone asking (see design.md — Non-Goals).
+# Preference order encodes critique quality, so it is the default. Availability
+# decides which providers are *in* the chain, never in what order they are
+# preferred: a provider is not promoted for being faster, because that would
+# trade output quality for latency without anyone asking (see design.md —
+# Non-Goals). A deployment can ask, with `LLM_ROUTER=score` (`router.py`), and
+# even then the content-usable rate carries the largest default weight.
 _AVAILABILITY_CHECKS = {
     "gemini": gemini_availability,
     "groq": groq_availability,
     "cloudflare": cloudflare_availability,
+    "local": local_availability,
+}
+# Hand-tuned (timeout, min slice) per provider: the cold-start values and
+# ceilings for the learned latency model (`latency.call_budget`).
+_STATIC_CALL_BUDGETS = {
+    "gemini": (GEMINI_TIMEOUT, GEMINI_MIN_SLICE_S),
+    "groq": (GROQ_TIMEOUT, GROQ_MIN_SLICE_S),
+    "cloudflare": (CF_TIMEOUT, CF_MIN_SLICE_S),
+    "local": (LOCAL_TIMEOUT, LOCAL_MIN_SLICE_S),
 }
 _COOLDOWN_RELEASES = {
     "gemini": release_gemini_cooldown,
     "groq": release_groq_cooldown,
     "cloudflare": release_cloudflare_cooldown,
+    "local": release_local_cooldown,
 }
 _PROVIDER_LABELS = {
     "gemini": "Gemini",
     "groq": "Groq",
     "cloudflare": "Cloudflare",
+    "local": "Local LLM",
+}
+_CONFIGURED_CHECKS = {
+    "gemini": lambda: bool(get_gemini_api_key()),
+    "groq": lambda: bool(get_groq_api_key()),
+    "cloudflare": lambda: all(get_cloudflare_credentials()),
+    "local": is_local_provider_configured,
+}
+_READY_PAIRS = {
+    "gemini": gemini_ready_pairs,
+    "groq": groq_ready_pairs,
+    "cloudflare": cloudflare_ready_pairs,
+    "local": local_ready_pairs,
+}
+_NOT_CONFIGURED_ERRORS = {
+    "gemini": "Gemini API key not configured",
+    "groq": "Groq API key not configured",
+    "cloudflare": "Cloudflare credentials not configured",
+    "local": "Local LLM server not configured",
+}
+# (base error, errors worth only a warning because the next provider may well
+# answer). Anything else of the base type is logged as an error.
+_PROVIDER_ERRORS = {
+    "gemini": (
+        GeminiError,
+        (GeminiRateLimitError, GeminiServerError, GeminiTimeoutError),
+    ),
+    "groq": (
+        GroqError,
+        (GroqRateLimitError, GroqServerError, GroqTimeoutError, GroqJsonValidateError),
+    ),
+    "cloudflare": (
+        CloudflareError,
+        (CloudflareRateLimitError, CloudflareServerError, CloudflareTimeoutError),
+    ),
+    "local": (
+        LocalLLMError,
+        (LocalLLMRateLimitError, LocalLLMServerError, LocalLLMTimeoutError),
+    ),
 }
 
 
@@ -420,35 +588,55 @@ def _plan_providers() -> dict[str, _ProviderPlan]:
     return plans
 
 
+def _provider_call_budget(name: str, input_chars: Optional[int]) -> CallBudget:
+    """
+    (timeout, min slice) to plan `name`'s phase with.
+
+    Learned across the provider's models for this input size once enough calls
+    were seen; the static constants before that, or when no size is known.
+    """
+    timeout, min_slice = _STATIC_CALL_BUDGETS[name]
+    if input_chars is None:
+        return CallBudget(timeout, min_slice, False)
+    return call_budget(
+        name,
+        None,
+        input_chars,
+        default_timeout=timeout,
+        default_min_slice=min_slice,
+    )
+
+
 def _later_provider_reserve(
     *,
     after: str,
     plan: Optional[dict[str, _ProviderPlan]] = None,
+    input_chars: Optional[int] = None,
+    order: Sequence[str] = CHAIN_ORDER,
 ) -> float:
     """
-    Seconds the providers *after* `after` need to each get a turn.
+    Seconds the providers *after* `after` in `order` need to each get a turn.
 
     Only their minimum useful slice is held back, not their full timeout: the
     point is that a slow primary cannot starve a fast secondary (Groq answers in
-    1-3s), not that every provider is guaranteed its maximum.
+    1-3s), not that every provider is guaranteed its maximum. With `input_chars`
+    the slice is the learned one for that prompt size (`latency.py`).
 
     A provider that will be skipped holds back nothing — reserving for a call
     that is not going to happen would shrink the slice of the provider that is.
     """
 
-    def will_be_called(name: str, configured: bool) -> bool:
+    def will_be_called(name: str) -> bool:
         if plan is None:
-            return configured
+            return _CONFIGURED_CHECKS[name]()
         return plan[name].usable
 
-    reserve = 0.0
-    if after == "gemini" and will_be_called("groq", bool(get_groq_api_key())):
-        reserve += GROQ_MIN_SLICE_S
-    if after in ("gemini", "groq"):
-        cf_account, cf_token = get_cloudflare_credentials()
-        if will_be_called("cloudflare", bool(cf_account and cf_token)):
-            reserve += CF_MIN_SLICE_S
-    return reserve
+    later = list(order)[list(order).index(after) + 1 :]
+    return sum(
+        _provider_call_budget(name, input_chars).min_slice_s
+        for name in later
+        if will_be_called(name)
+    )
 
 
 def _phase_deadline(
@@ -456,6 +644,8 @@ def _phase_deadline(
     *,
     after: str,
     plan: Optional[dict[str, _ProviderPlan]] = None,
+    input_chars: Optional[int] = None,
+    order: Sequence[str] = CHAIN_ORDER,
 ) -> Optional[float]:
     """
     Deadline for one provider's phase of the chain.
@@ -470,7 +660,9 @@ def _phase_deadline(
     """
     if deadline_monotonic is None:
         return None
-    return deadline_monotonic - _later_provider_reserve(after=after, plan=plan)
+    return deadline_monotonic - _later_provider_reserve(
+        after=after, plan=plan, input_chars=input_chars, order=order
+    )
 
 
 class _PhaseBudget(NamedTuple):
@@ -491,9 +683,17 @@ def _phase_budget(
     provider_timeout: float,
     min_slice: float,
     plan: Optional[dict[str, _ProviderPlan]] = None,
+    input_chars: Optional[int] = None,
+    order: Sequence[str] = CHAIN_ORDER,
 ) -> _PhaseBudget:
     """Resolve one provider's share of the request budget."""
-    deadline = _phase_deadline(deadline_monotonic, after=after, plan=plan)
+    deadline = _phase_deadline(
+        deadline_monotonic,
+        after=after,
+        plan=plan,
+        input_chars=input_chars,
+        order=order,
+    )
     call_timeout = resolve_call_timeout(deadline, provider_timeout, min_slice)
     return _PhaseBudget(
         deadline=deadline,
@@ -528,14 +728,70 @@ def _unusable_reason(result: ParsedResponse) -> str:
     return "non-Chinese reason/overallComment"
 
 
+def _provider_entry_point(name: str):
+    """The provider's call function, looked up at call time so tests can patch it."""
+    return {
+        "gemini": call_gemini_with_rotation,
+        "groq": call_groq_with_rotation,
+        "cloudflare": call_cloudflare_with_rotation,
+        "local": call_local_with_rotation,
+    }[name]
+
+
+def _configured_model(name: str) -> str:
+    """Model id to attribute a plain-text answer to (the configured one)."""
+    if name == "gemini":
+        return get_gemini_model()
+    if name == "groq":
+        return get_groq_model()
+    if name == "local":
+        return get_local_model() or ""
+    return get_cloudflare_model()
+
+
+def first_provider_ready_pairs() -> Optional[int]:
+    """
+    Ready (credential, model) pairs of the provider the chain calls first.
+
+    That is the first provider in `CHAIN_ORDER` that is configured and not
+    wholly cooled down; None when there is none.
+    """
+    for name in CHAIN_ORDER:
+        state = _AVAILABILITY_CHECKS[name]()
+        if state.configured and not state.all_cooled:
+            return _READY_PAIRS[name]()
+    return None
+
+
+def _chain_order(
+    plan: dict[str, _ProviderPlan],
+    *,
+    input_chars: int,
+    deadline_monotonic: Optional[float],
+) -> Tuple[str, ...]:
+    """`CHAIN_ORDER`, or the router's order for this request when enabled."""
+    if not is_router_enabled():
+        return CHAIN_ORDER
+    return order_providers(
+        CHAIN_ORDER,
+        input_chars=input_chars,
+        deadline_monotonic=deadline_monotonic,
+        ready_pairs={
+            name: _READY_PAIRS[name]() for name in CHAIN_ORDER if plan[name].usable
+        },
+        default_p50_s={name: _STATIC_CALL_BUDGETS[name][1] for name in CHAIN_ORDER},
+    )
+
+
 async def _generate_suggestions_once(
     messages: list[dict],
     *,
     deadline_monotonic: Optional[float],
 ) -> GenerationOutcome:
     """
-    Single generate+parse pass: Gemini → Groq → Cloudflare on network
-    failure *or* unusable content (same-pass salvage).
+    Single generate+parse pass: Gemini → Groq → Cloudflare (or the router's
+    order, `router.py`) on network failure *or* unusable content (same-pass
+    salvage).
 
     May return an outcome whose body is itself a parse failure or still fails
     a content check — the outer retry loop in `generate_suggestions()` decides
@@ -547,216 +803,122 @@ async def _generate_suggestions_once(
             level (no usable HTTP body from any provider), or if the
             wall-clock budget is exhausted.
     """
-    groq_error: Optional[str] = None
-    cf_error: Optional[str] = None
-    gemini_error: Optional[str] = None
+    errors: dict[str, Optional[str]] = {name: None for name in CHAIN_ORDER}
     best_soft: Optional[GenerationOutcome] = None
     budget_constrained = False
-    gemini_pool_size, groq_pool_size, cf_pool_size = _pool_sizes()
+    gemini_pool_size, groq_pool_size, cf_pool_size, local_pool_size = _pool_sizes()
     logger.info(
-        "LLM credential pools: gemini_pool_size=%s groq_pool_size=%s cf_pool_size=%s",
+        "LLM credential pools: gemini_pool_size=%s groq_pool_size=%s "
+        "cf_pool_size=%s local_pool_size=%s",
         gemini_pool_size,
         groq_pool_size,
         cf_pool_size,
+        local_pool_size,
     )
 
     plan = _plan_providers()
-    gemini_budget = _phase_budget(
-        deadline_monotonic,
-        after="gemini",
-        provider_timeout=GEMINI_TIMEOUT,
-        min_slice=GEMINI_MIN_SLICE_S,
-        plan=plan,
+    input_chars = messages_chars(messages)
+    order = _chain_order(
+        plan, input_chars=input_chars, deadline_monotonic=deadline_monotonic
     )
-    if not plan["gemini"].configured:
-        logger.info("Gemini not configured, trying Groq directly")
-        gemini_error = "Gemini API key not configured"
-    elif plan["gemini"].unavailable_reason:
-        gemini_error = plan["gemini"].unavailable_reason
-        logger.info(gemini_error)
-    elif gemini_budget.call_timeout is None:
-        # Skipped rather than started-and-clamped: a call shorter than the
-        # model's own latency would time out and spend seconds Groq still needs.
-        gemini_error = describe_skip(
-            "Gemini", gemini_budget.deadline, GEMINI_MIN_SLICE_S
+    for name in order:
+        label = _PROVIDER_LABELS[name]
+        # The last provider's phase is the whole remaining request budget.
+        provider_call = _provider_call_budget(name, input_chars)
+        phase = _phase_budget(
+            deadline_monotonic,
+            after=name,
+            provider_timeout=provider_call.timeout_s,
+            min_slice=provider_call.min_slice_s,
+            plan=plan,
+            input_chars=input_chars,
+            order=order,
         )
-        budget_constrained = True
-        logger.warning(gemini_error)
-    else:
-        budget_constrained = budget_constrained or gemini_budget.constrained
-        try:
-            logger.info("Attempting Gemini inference...")
-            raw_output, gemini_model = _text_and_model(
-                await call_gemini_with_rotation(
-                    messages,
-                    deadline_monotonic=gemini_budget.deadline,
-                ),
-                get_gemini_model(),
-            )
-            # Empty/whitespace content is a successful HTTP response but unusable;
-            # fall through to Groq instead of burning parse-retry budget.
-            if not (raw_output or "").strip():
-                logger.warning(
-                    "Gemini returned empty content, falling back to Groq"
-                )
-                gemini_error = "Gemini returned empty content"
-            else:
-                logger.info(
-                    f"Gemini inference successful (model={gemini_model}), "
-                    f"raw output length: {len(raw_output)}"
-                )
-                logger.debug(f"Gemini raw output: {raw_output[:500]}...")
-                gemini_result = parse_model_output(raw_output)
-                gemini_outcome = GenerationOutcome(
-                    gemini_result, "gemini", gemini_model
-                )
-                if _content_usable(gemini_result):
-                    logger.info(
-                        f"Parsed result: {len(gemini_result['suggestions'])} suggestions"
-                    )
-                    return gemini_outcome
-                reason = _unusable_reason(gemini_result)
-                logger.warning(
-                    f"Gemini content unusable ({reason}); trying Groq salvage"
-                )
-                gemini_error = f"Gemini content unusable: {reason}"
-                best_soft = gemini_outcome
-        except (
-            GeminiRateLimitError,
-            GeminiServerError,
-            GeminiTimeoutError,
-        ) as e:
-            logger.warning(
-                f"Gemini failed with retriable error, falling back to Groq: {e}"
-            )
-            gemini_error = str(e)
-        except GeminiError as e:
-            logger.error(f"Gemini failed with non-retriable error: {e}")
-            gemini_error = str(e)
-
-    groq_budget = _phase_budget(
-        deadline_monotonic,
-        after="groq",
-        provider_timeout=GROQ_TIMEOUT,
-        min_slice=GROQ_MIN_SLICE_S,
-        plan=plan,
-    )
-    if not plan["groq"].configured:
-        logger.info("Groq not configured, trying Cloudflare directly")
-        groq_error = "Groq API key not configured"
-    elif plan["groq"].unavailable_reason:
-        groq_error = plan["groq"].unavailable_reason
-        logger.info(groq_error)
-    elif groq_budget.call_timeout is None:
-        groq_error = describe_skip("Groq", groq_budget.deadline, GROQ_MIN_SLICE_S)
-        budget_constrained = True
-        logger.warning(groq_error)
-        if best_soft is not None:
-            # Nothing later in the chain can fit either, so stop here with the
-            # body already in hand rather than walking to the final raise.
-            return best_soft
-    else:
-        budget_constrained = budget_constrained or groq_budget.constrained
+        if not plan[name].configured:
+            logger.info("%s not configured, trying the next provider", label)
+            errors[name] = _NOT_CONFIGURED_ERRORS[name]
+            continue
+        if plan[name].unavailable_reason:
+            errors[name] = plan[name].unavailable_reason
+            logger.info(errors[name])
+            continue
+        if phase.call_timeout is None:
+            # Skipped rather than started-and-clamped: a call shorter than the
+            # model's own latency would time out and spend seconds the next
+            # provider still needs.
+            errors[name] = describe_skip(label, phase.deadline, provider_call.min_slice_s)
+            budget_constrained = True
+            logger.warning(errors[name])
+            if best_soft is not None:
+                # Nothing later in the chain can fit either, so stop here with
+                # the body already in hand rather than walking to the final raise.
+                return best_soft
+            continue
+
+        budget_constrained = budget_constrained or phase.constrained
+        base_error, retriable_errors = _PROVIDER_ERRORS[name]
         try:
-            logger.info("Attempting Groq inference...")
-            raw_output, groq_model = _text_and_model(
-                await call_groq_with_rotation(
+            logger.info("Attempting %s inference...", label)
+            raw_output, model = _text_and_model(
+                await _provider_entry_point(name)(
                     messages,
-                    deadline_monotonic=groq_budget.deadline,
+                    deadline_monotonic=phase.deadline,
                 ),
-                get_groq_model(),
+                _configured_model(name),
             )
-            if not (raw_output or "").strip():
-                logger.warning(
-                    "Groq returned empty content, falling back to Cloudflare"
-                )
-                groq_error = "Groq returned empty content"
-            else:
-                logger.info(
-                    f"Groq inference successful (model={groq_model}), "
-                    f"raw output length: {len(raw_output)}"
-                )
-                logger.debug(f"Groq raw output: {raw_output[:500]}...")
-                groq_result = parse_model_output(raw_output)
-                groq_outcome = GenerationOutcome(groq_result, "groq", groq_model)
-                if _content_usable(groq_result):
-                    logger.info(
-                        f"Parsed result: {len(groq_result['suggestions'])} suggestions"
-                    )
-                    return groq_outcome
-                reason = _unusable_reason(groq_result)
-                logger.warning(
-                    f"Groq content unusable ({reason}); trying Cloudflare salvage"
-                )
-                groq_error = f"Groq content unusable: {reason}"
-                best_soft = _prefer_outcome(best_soft, groq_outcome)
-        except (
-            GroqRateLimitError,
-            GroqServerError,
-            GroqTimeoutError,
-            GroqJsonValidateError,
-        ) as e:
+        except retriable_errors as e:
             logger.warning(
-                f"Groq failed with retriable error, falling back to Cloudflare: {e}"
-            )
-            groq_error = str(e)
-        except GroqError as e:
-            logger.error(f"Groq failed with non-retriable error: {e}")
-            groq_error = str(e)
-
-    # Last in the chain, so its phase is the whole remaining request budget.
-    cf_budget = _phase_budget(
-        deadline_monotonic,
-        after="cloudflare",
-        provider_timeout=CF_TIMEOUT,
-        min_slice=CF_MIN_SLICE_S,
-        plan=plan,
-    )
-    if not plan["cloudflare"].configured:
-        cf_error = "Cloudflare credentials not configured"
-    elif plan["cloudflare"].unavailable_reason:
-        cf_error = plan["cloudflare"].unavailable_reason
-        logger.info(cf_error)
-    elif cf_budget.call_timeout is None:
-        cf_error = describe_skip("Cloudflare", cf_budget.deadline, CF_MIN_SLICE_S)
-        budget_constrained = True
-        logger.warning(cf_error)
-    else:
-        budget_constrained = budget_constrained or cf_budget.constrained
-        try:
-            logger.info("Attempting Cloudflare Workers AI inference...")
-            raw_output = await call_cloudflare(
-                messages, deadline_monotonic=cf_budget.deadline
+                f"{label} failed with retriable error, trying the next provider: {e}"
             )
+            errors[name] = str(e)
+            record_result(name, None, answered=False)
+            continue
+        except base_error as e:
+            logger.error(f"{label} failed with non-retriable error: {e}")
+            errors[name] = str(e)
+            record_result(name, None, answered=False)
+            continue
+
+        # Empty/whitespace content is a successful HTTP response but unusable;
+        # fall through instead of burning parse-retry budget.
+        if not (raw_output or "").strip():
+            logger.warning(f"{label} returned empty content, trying the next provider")
+            errors[name] = f"{label} returned empty content"
+            record_result(name, model, answered=False)
+            continue
+        logger.info(
+            f"{label} inference successful (model={model}), "
+            f"raw output length: {len(raw_output)}"
+        )
+        logger.debug(f"{label} raw output: {raw_output[:500]}...")
+        outcome = _parse_output(raw_output, name, model)
+        with span("checks", provider=name) as checked:
+            usable = _content_usable(outcome.result)
+            checked["usable"] = usable
+            partial = None if usable else accept_partially(outcome.result)
+            if partial is not None:
+                checked["partial"] = len(partial[1])
+        record_result(name, model, answered=True, usable=usable)
+        if name == "gemini":
+            record_usable(usable)
+        if usable:
             logger.info(
-                f"Cloudflare inference successful, raw output length: {len(raw_output)}"
-            )
-            logger.debug(f"Cloudflare raw output: {raw_output[:500]}...")
-            cf_result = parse_model_output(raw_output)
-            cf_outcome = GenerationOutcome(cf_result, "cloudflare", CF_MODEL)
-            if _content_usable(cf_result):
-                logger.info(
-                    f"Parsed result: {len(cf_result['suggestions'])} suggestions"
-                )
-                return cf_outcome
-            logger.warning(
-                "Cloudflare content unusable; returning best soft result"
+                f"Parsed result: {len(outcome.result['suggestions'])} suggestions"
             )
-            cf_error = "Cloudflare content unusable"
-            return _prefer_outcome(best_soft, cf_outcome)
-        except CloudflareError as e:
-            logger.error(f"Cloudflare failed: {e}")
-            cf_error = str(e)
+            return outcome
+        if partial is not None:
+            accepted, diagnostics = partial
+            return outcome._replace(result=accepted, diagnostics=diagnostics)
+        reason = _unusable_reason(outcome.result)
+        logger.warning(f"{label} content unusable ({reason}); trying salvage")
+        errors[name] = f"{label} content unusable: {reason}"
+        best_soft = _prefer_outcome(best_soft, outcome)
 
     if best_soft is not None:
         # Soft bodies from earlier providers: let outer retry nudge language/JSON.
         return best_soft
 
-    rate_limited = (
-        _error_looks_rate_limited(gemini_error)
-        or _error_looks_rate_limited(groq_error)
-        or _error_looks_rate_limited(cf_error)
-    )
+    rate_limited = any(_error_looks_rate_limited(e) for e in errors.values())
     if rate_limited:
         message = "All LLM providers rate-limited or quota exhausted"
     elif budget_constrained:
@@ -776,9 +938,9 @@ async def _generate_suggestions_once(
         message = "All LLM providers failed"
     raise SuggestionsError(
         message,
-        groq_error=groq_error,
-        cf_error=cf_error,
-        gemini_error=gemini_error,
+        groq_error=errors["groq"],
+        cf_error=errors["cloudflare"],
+        gemini_error=errors["gemini"],
         rate_limited=rate_limited,
         # Both can be true — a rate-limited primary that also ate the budget.
         # The flags are reported as facts; the client picks which advice leads.
@@ -786,6 +948,102 @@ async def _generate_suggestions_once(
         groq_pool_size=groq_pool_size,
         cf_pool_size=cf_pool_size,
         gemini_pool_size=gemini_pool_size,
+        local_error=errors["local"],
+        local_pool_size=local_pool_size,
+    )
+
+
+def is_chunking_enabled() -> bool:
+    """Whether `SUGGESTIONS_CHUNKING` turns paragraph chunking on by default."""
+    return (os.environ.get(CHUNKING_ENV) or "").strip().lower() in (
+        "1",
+        "true",
+        "yes",
+        "on",
+    )
+
+
+def _chunk_concurrency(chunk_count: int) -> int:
+    """
+    How many chunks may be in flight at once.
+
+    Bounded by the largest credential pool: the key pool round-robins
+    concurrent calls across keys, so more simultaneous calls than keys would
+    only queue on per-key rate limits and come back as 429s.
+    """
+    largest_pool = max(_pool_sizes())
+    return max(1, min(chunk_count, largest_pool))
+
+
+def _merge_provenance(values: Sequence[Optional[str]]) -> Optional[str]:
+    """One provider/model label, or the distinct ones in order when chunks differ."""
+    distinct = list(dict.fromkeys(v for v in values if v))
+    if not distinct:
+        return None
+    return ",".join(distinct)
+
+
+async def _generate_chunked(
+    chunks: Sequence[TextChunk],
+    exemplar_translation: Optional[str],
+    system_prompt_override: Optional[str],
+    *,
+    deadline_monotonic: float,
+) -> GenerationOutcome:
+    """
+    Generate every chunk concurrently and merge the bodies in chunk order.
+
+    All chunks share the request deadline, so latency tracks the slowest chunk
+    rather than the whole document. A chunk that fails outright is left out of
+    the merge; only when every chunk fails is the first error raised. The
+    exemplar is passed whole to each chunk since it is not paragraph-aligned
+    with the input.
+    """
+    semaphore = asyncio.Semaphore(_chunk_concurrency(len(chunks)))
+    logger.info(
+        "Generating %s paragraph chunks (concurrency=%s)",
+        len(chunks),
+        _chunk_concurrency(len(chunks)),
+    )
+
+    async def run(chunk: TextChunk) -> GenerationOutcome:
+        async with semaphore:
+            messages = build_messages(
+                chunk.original_text,
+                chunk.target_text,
+                exemplar_translation,
+                system_prompt_override,
+            )
+            return await _generate_with_retries(
+                messages, deadline_monotonic=deadline_monotonic
+            )
+
+    settled = await asyncio.gather(
+        *(run(chunk) for chunk in chunks), return_exceptions=True
+    )
+    outcomes: List[Optional[GenerationOutcome]] = []
+    first_error: Optional[BaseException] = None
+    for chunk, item in zip(chunks, settled):
+        if isinstance(item, BaseException):
+            if not isinstance(item, SuggestionsError):
+                raise item
+            logger.warning("Chunk %s/%s failed: %s", chunk.index, len(chunks), item)
+            first_error = first_error or item
+            outcomes.append(None)
+        else:
+            outcomes.append(item)
+    if all(o is None for o in outcomes):
+        assert first_error is not None
+        raise first_error
+
+    present = [o for o in outcomes if o is not None]
+    return GenerationOutcome(
+        merge_chunk_results([o.result if o else None for o in outcomes]),
+        _merge_provenance([o.provider for o in present]),
+        _merge_provenance([o.model for o in present]),
+        # The merge renumbers suggestions, so chunk-local ids no longer apply.
+        tuple({**fix, "id": None} for o in present for fix in o.fixes),
+        tuple({**d, "id": None} for o in present for d in o.diagnostics),
     )
 
 
@@ -797,11 +1055,16 @@ def _with_provenance(outcome: GenerationOutcome) -> dict:
         outcome.model,
         len(outcome.result["suggestions"]),
     )
-    return {
+    body = {
         **outcome.result,
         "llmProvider": outcome.provider,
         "llmModel": outcome.model,
     }
+    if outcome.fixes:
+        body["contentFixes"] = list(outcome.fixes)
+    if outcome.diagnostics:
+        body["itemDiagnostics"] = list(outcome.diagnostics)
+    return body
 
 
 async def generate_suggestions(
@@ -810,6 +1073,7 @@ async def generate_suggestions(
     exemplar_translation: Optional[str] = None,
     system_prompt_override: Optional[str] = None,
     deadline_monotonic: Optional[float] = None,
+    chunk_paragraphs: Optional[bool] = None,
 ) -> dict:
     """
     Generate AI correction suggestions for the given text.
@@ -834,6 +1098,10 @@ async def generate_suggestions(
             from when the request arrived, so work done before generation
             (auth, the stored-prompt lookup) counts against the same platform
             limit. Defaults to SUGGESTIONS_WALL_CLOCK_S from now.
+        chunk_paragraphs: Split aligned multi-paragraph input into chunks
+            generated concurrently (see `chunking.plan_chunks`). None reads
+            `SUGGESTIONS_CHUNKING`; input that is short or whose paragraph
+            counts differ is sent whole either way.
 
     Returns:
         The parsed suggestions and overall comment, plus `llmProvider` and
@@ -854,7 +1122,27 @@ async def generate_suggestions(
         raise NoProvidersConfiguredError(
             "No LLM providers configured. Set GROQ_API_KEY(S), "
             "CLOUDFLARE_ACCOUNT_ID(S) + CLOUDFLARE_API_TOKEN(S), "
-            "or GEMINI_API_KEY(S)."
+            "GEMINI_API_KEY(S), or LOCAL_LLM_BASE_URL + LOCAL_LLM_MODELS."
+        )
+
+    if deadline_monotonic is None:
+        deadline_monotonic = time.monotonic() + SUGGESTIONS_WALL_CLOCK_S
+    if chunk_paragraphs is None:
+        chunk_paragraphs = is_chunking_enabled()
+
+    chunks = (
+        plan_chunks(original_text, target_text)
+        if chunk_paragraphs
+        else [TextChunk(1, original_text, target_text)]
+    )
+    if len(chunks) > 1:
+        return _with_provenance(
+            await _generate_chunked(
+                chunks,
+                exemplar_translation,
+                system_prompt_override,
+                deadline_monotonic=deadline_monotonic,
+            )
         )
 
     base_messages = build_messages(
@@ -863,15 +1151,91 @@ async def generate_suggestions(
         exemplar_translation,
         system_prompt_override,
     )
+    return _with_provenance(
+        await _generate_with_retries(
+            base_messages, deadline_monotonic=deadline_monotonic
+        )
+    )
+
+
+async def _repair_outcome(
+    outcome: GenerationOutcome,
+    *,
+    deadline_monotonic: Optional[float],
+) -> Optional[GenerationOutcome]:
+    """
+    Rewrite only the offending reasons of `outcome` with one short call.
+
+    Returns the spliced outcome, or None when the body is not repairable, no
+    fast provider is available, or the repair did not produce usable items —
+    in every such case the caller falls back to a full pass. Provenance stays
+    with the provider that wrote the critique; the repair only rewords it.
+    """
+    items = plan_repair(outcome.result)
+    if items is None:
+        return None
+    if seconds_left(deadline_monotonic) < REPAIR_MIN_BUDGET_S:
+        return None
+    repair_deadline = time.monotonic() + REPAIR_TIMEOUT_S
+    if deadline_monotonic is not None:
+        repair_deadline = min(repair_deadline, deadline_monotonic)
+    messages = build_repair_messages(items)
+
+    for name, call, errors in (
+        ("local", call_local_with_rotation, LocalLLMError),
+        ("groq", call_groq_with_rotation, GroqError),
+        ("gemini", call_gemini_with_rotation, GeminiError),
+    ):
+        state = _AVAILABILITY_CHECKS[name]()
+        if not state.configured or state.all_cooled:
+            continue
+        try:
+            # A repair prompt is a fraction of a suggestion prompt; timing it
+            # would lower the latency real generation calls are budgeted by.
+            with span("repair", provider=name, items=len(items)), unmeasured():
+                raw_output, model = _text_and_model(
+                    await call(messages, deadline_monotonic=repair_deadline), ""
+                )
+        except errors as e:
+            logger.warning("Item repair via %s failed: %s", name, e)
+            continue
+        repaired = apply_repair(outcome.result, items, raw_output)
+        if repaired is None or not _content_usable(repaired):
+            logger.warning(
+                "Item repair via %s (model=%s) did not fix %s item(s); "
+                "falling back to a full pass",
+                name,
+                model,
+                len(items),
+            )
+            return None
+        logger.info(
+            "Repaired %s item(s) via %s (model=%s) instead of a full pass",
+            len(items),
+            name,
+            model,
+        )
+        return outcome._replace(result=repaired)
+    return None
+
+
+async def _generate_with_retries(
+    base_messages: list[dict],
+    *,
+    deadline_monotonic: float,
+) -> GenerationOutcome:
+    """
+    Run passes until one yields a usable body or the retry budget is spent.
 
+    See `generate_suggestions()` for the retry rules; this is that loop for one
+    prompt, shared by the whole-document and the per-chunk paths.
+    """
     best_outcome: Optional[GenerationOutcome] = None
     language_failed_last = False
     parse_failed_last = False
     recommendation_failed_last = False
     recommendation_failures = 0
     last_pass_seconds = 0.0
-    if deadline_monotonic is None:
-        deadline_monotonic = time.monotonic() + SUGGESTIONS_WALL_CLOCK_S
     for attempt in range(1, MAX_PARSE_RETRY_ATTEMPTS + 1):
         if attempt > 1 and not _can_afford_another_pass(
             deadline_monotonic, last_pass_seconds
@@ -897,10 +1261,11 @@ async def generate_suggestions(
 
         pass_started = time.monotonic()
         try:
-            outcome = await _generate_suggestions_once(
-                messages,
-                deadline_monotonic=deadline_monotonic,
-            )
+            with span("pass", attempt=attempt), pass_scope(attempt):
+                outcome = await _generate_suggestions_once(
+                    messages,
+                    deadline_monotonic=deadline_monotonic,
+                )
         except SuggestionsError:
             # A body already in hand beats a 503: the earlier pass failed only a
             # content check, which the caller can still read and act on.
@@ -915,8 +1280,13 @@ async def generate_suggestions(
             break
         last_pass_seconds = time.monotonic() - pass_started
         result = outcome.result
-        if _content_usable(result):
-            return _with_provenance(outcome)
+        if _content_usable(result) or outcome.diagnostics:
+            return outcome
+        repaired = await _repair_outcome(
+            outcome, deadline_monotonic=deadline_monotonic
+        )
+        if repaired is not None:
+            return repaired
         parse_failed = is_json_extraction_failure(result)
         language_failed_last = (not parse_failed) and (
             has_non_chinese_reason(result)
@@ -954,4 +1324,4 @@ async def generate_suggestions(
     # raising, matching the pre-existing "degrade gracefully" behavior of
     # surfacing a best-effort/placeholder response rather than a 503.
     assert best_outcome is not None  # loop runs at least once (MAX_PARSE_RETRY_ATTEMPTS >= 1)
-    return _with_provenance(best_outcome)
+    return best_outcome
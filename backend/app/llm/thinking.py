@@ -0,0 +1,132 @@
+"""
+Which retry pass a Gemini call belongs to, and what each thinking level has
+cost and delivered.
+
+`gemini_provider.thinking_level_for()` picks the thinking level per call from
+the prompt size, the time left and the pass: a pass after one that failed the
+content checks may think harder. The pass number is known only to the retry
+loop in `suggestions._generate_with_retries()`, several calls above the
+payload builder, so the loop opens a `pass_scope()` and the provider reads it
+back here instead of threading an argument through every provider signature.
+Like the timeline recorder it lives in a `ContextVar`, so concurrent chunk
+tasks each see their own pass.
+
+Each level's observed latency and usable rate are kept in a process-local
+scoreboard (`level_stats()`). Every Gemini call logs its level and time, and
+every pass it answered logs whether the answer was usable together with that
+level's usable rate over its last `WINDOW` passes, so the policy's thresholds
+can be tuned from production logs. Like the router's scoreboard it is not
+persisted.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Recent calls kept per level.
+WINDOW = 50
+
+
+@dataclass
+class _Pass:
+    attempt: int
+    # Level of the Gemini call that answered in this pass, if one did.
+    answered_level: Optional[str] = None
+
+
+@dataclass
+class _LevelStats:
+    # (seconds, answered) of recent calls; timeouts count as not answered.
+    calls: Deque[tuple] = field(default_factory=lambda: deque(maxlen=WINDOW))
+    # Whether each answer passed the content checks.
+    usable: Deque[bool] = field(default_factory=lambda: deque(maxlen=WINDOW))
+
+
+_current: ContextVar[Optional[_Pass]] = ContextVar("gemini_pass", default=None)
+
+_lock = threading.Lock()
+_stats: Dict[str, _LevelStats] = {}
+
+
+def reset_thinking_state() -> None:
+    """Drop the per-level scoreboard (for tests)."""
+    with _lock:
+        _stats.clear()
+
+
+@contextmanager
+def pass_scope(attempt: int) -> Iterator[None]:
+    """Mark the calls made in this context as belonging to retry pass `attempt`."""
+    token = _current.set(_Pass(attempt))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def current_pass_attempt() -> int:
+    """The enclosing pass number; 1 outside any pass (repair, batch, scripts)."""
+    current = _current.get()
+    return current.attempt if current is not None else 1
+
+
+def record_call(level: str, seconds: float, *, answered: bool) -> None:
+    """Record one Gemini call's wall time under the level it was sent with."""
+    with _lock:
+        _stats.setdefault(level, _LevelStats()).calls.append((seconds, answered))
+    current = _current.get()
+    if answered and current is not None:
+        current.answered_level = level
+    logger.info(
+        "Gemini thinking=%s %s in %.1fs",
+        level,
+        "answered" if answered else "timed out",
+        seconds,
+    )
+
+
+def record_usable(usable: bool) -> None:
+    """Record whether this pass's Gemini answer passed the content checks."""
+    current = _current.get()
+    if current is None or current.answered_level is None:
+        return
+    level, current.answered_level = current.answered_level, None
+    with _lock:
+        history = _stats.setdefault(level, _LevelStats()).usable
+        history.append(usable)
+        rate, window = sum(history) / len(history), len(history)
+    logger.info(
+        "Gemini thinking=%s pass %s %s (usable rate %.0f%% of last %s)",
+        level,
+        current.attempt,
+        "usable" if usable else "not usable",
+        rate * 100,
+        window,
+    )
+
+
+def level_stats() -> Dict[str, dict]:
+    """Per level: calls, timeouts, p50 seconds of answered calls, usable rate."""
+    with _lock:
+        snapshot = {
+            level: (list(stats.calls), list(stats.usable))
+            for level, stats in _stats.items()
+        }
+    result: Dict[str, dict] = {}
+    for level, (calls, usable) in snapshot.items():
+        answered = sorted(seconds for seconds, ok in calls if ok)
+        result[level] = {
+            "calls": len(calls),
+            "timeouts": len(calls) - len(answered),
+            "p50_s": answered[len(answered) // 2] if answered else None,
+            "usable_rate": sum(usable) / len(usable) if usable else None,
+        }
+    return result
@@ -0,0 +1,146 @@
+"""
+Per-request phase timeline for `/suggestions`.
+
+A 40s generation used to be explained only by scattered `logger.info` lines.
+The endpoint now opens a `recording()` scope, and the phases that can take
+time record themselves into it as spans: the shared-state DB read, every
+provider attempt (credential ref, model, HTTP status), parsing, content checks,
+repair, each retry pass and the health/latency flush. The result is returned
+as a `Server-Timing` header (visible in browser devtools without any client
+change) and, when the request body sets `debug`, as `debug.timeline`. The
+header reaches every browser, so it leaves out credential refs; only the debug
+timeline names the key an attempt used.
+
+The recorder lives in a `ContextVar`, so the concurrent chunk tasks of one
+request write into the same timeline while concurrent requests never share
+one. Outside a recording scope (batch items, scripts, most tests) `span()` is a
+no-op, and nothing here ever raises into the code it measures.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+# Entries beyond this are left out of the header (not of `debug.timeline`):
+# proxies commonly cap a single header at 8 KiB.
+MAX_SERVER_TIMING_ENTRIES = 40
+
+# Span attributes kept out of the header: a credential ref carries the pool
+# index and part of the key, which until the header existed only reached logs.
+HEADER_OMITTED_ATTRS = frozenset({"key"})
+
+_UNSAFE_DESC = re.compile(r'[^\x20-\x7e]|["\\]')
+
+
+@dataclass
+class TimelineEntry:
+    name: str
+    start_s: float
+    duration_s: float
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+
+class Timeline:
+    """Spans recorded for one request, relative to when recording started."""
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.entries: List[TimelineEntry] = []
+
+    def add(
+        self, name: str, started: float, ended: float, attrs: Dict[str, Any]
+    ) -> None:
+        self.entries.append(
+            TimelineEntry(name, started - self.started, ended - started, dict(attrs))
+        )
+
+    def elapsed_s(self) -> float:
+        return time.monotonic() - self.started
+
+    def as_debug(self) -> List[dict]:
+        """Entries for the response's `debug.timeline`, in start order."""
+        return [
+            {
+                "name": entry.name,
+                "startMs": round(entry.start_s * 1000, 1),
+                "durationMs": round(entry.duration_s * 1000, 1),
+                **entry.attrs,
+            }
+            for entry in sorted(self.entries, key=lambda e: e.start_s)
+        ]
+
+    def server_timing(self) -> str:
+        """
+        `Server-Timing` header value: one metric per span plus `total`.
+
+        Repeated names get a `-2`, `-3`… suffix so devtools lists every attempt;
+        attributes other than `HEADER_OMITTED_ATTRS` go into `desc`, reduced to
+        printable ASCII since header values are Latin-1.
+        """
+        seen: Dict[str, int] = {}
+        metrics = []
+        entries = sorted(self.entries, key=lambda e: e.start_s)
+        for entry in entries[:MAX_SERVER_TIMING_ENTRIES]:
+            seen[entry.name] = seen.get(entry.name, 0) + 1
+            count = seen[entry.name]
+            name = entry.name if count == 1 else f"{entry.name}-{count}"
+            metric = f"{name};dur={entry.duration_s * 1000:.1f}"
+            desc = " ".join(
+                f"{key}={value}"
+                for key, value in entry.attrs.items()
+                if value is not None and key not in HEADER_OMITTED_ATTRS
+            )
+            if desc:
+                metric += f';desc="{_UNSAFE_DESC.sub("", desc)}"'
+            metrics.append(metric)
+        metrics.append(f"total;dur={self.elapsed_s() * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+_current: ContextVar[Optional[Timeline]] = ContextVar("llm_timeline", default=None)
+
+
+@contextmanager
+def recording() -> Iterator[Timeline]:
+    """Record spans from this context (and tasks it starts) into a new timeline."""
+    timeline = Timeline()
+    token = _current.set(timeline)
+    try:
+        yield timeline
+    finally:
+        _current.reset(token)
+
+
+def current_timeline() -> Optional[Timeline]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Time the enclosed block as one timeline entry.
+
+    Yields the attribute dict so the block can add what it learns (e.g. the
+    HTTP status). An exception is recorded as `error` (and its `status_code`,
+    when it has one) and re-raised unchanged.
+    """
+    timeline = _current.get()
+    if timeline is None:
+        yield attrs
+        return
+    started = time.monotonic()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs.setdefault("error", type(e).__name__)
+        status = getattr(e, "status_code", None)
+        if status is not None:
+            attrs.setdefault("status", status)
+        raise
+    finally:
+        timeline.add(name, started, time.monotonic(), attrs)
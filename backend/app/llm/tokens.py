@@ -0,0 +1,154 @@
+"""
+Token estimates for mixed Japanese/Chinese prompts, and what they drive.
+
+Every call used to request the same output budget — 16384 tokens from Gemini,
+4096 from Groq and Cloudflare — for a one-sentence correction and a ten-
+paragraph essay alike, and nothing checked whether a prompt fit the model it
+was sent to. An oversize prompt was only discovered as a 400 or a timeout after
+the call had spent its budget.
+
+No provider tokenizer is available offline, so tokens are estimated per
+character class. BPE/SentencePiece vocabularies put roughly one token on a
+kanji/hanzi or kana character and three to four ASCII characters into one, so
+those are the rates used, rounded up: every consumer of the estimate is safer
+with an over-count (a cap slightly too generous, a model skipped slightly
+early) than with an under-count.
+
+Consumers:
+
+- `output_token_cap()` sizes each call's `max_tokens` / `maxOutputTokens` from
+  the size of the text under review (`review_tokens()`), under the provider's
+  own static ceiling.
+- `gemini_provider` picks a lighter thinking level for short reviews.
+- `prompt_fits()` lets the providers skip a model whose context window cannot
+  hold the prompt plus its output budget, failing fast instead of timing out.
+"""
+
+from __future__ import annotations
+
+import math
+import unicodedata
+from typing import Callable, List, Optional, Sequence
+
+from .prompts import FEW_SHOT_EXAMPLE
+
+# Tokens per character by class. See module docstring for why these round up.
+CJK_TOKENS_PER_CHAR = 1.0
+ASCII_WORD_TOKENS_PER_CHAR = 0.3
+ASCII_OTHER_TOKENS_PER_CHAR = 0.5
+WHITESPACE_TOKENS_PER_CHAR = 0.1
+OTHER_TOKENS_PER_CHAR = 1.0
+
+# Per-message overhead (role markers, separators) in chat templates.
+MESSAGE_OVERHEAD_TOKENS = 8
+
+# Expected critique size: a fixed JSON skeleton plus output proportional to the
+# text under review. Live probes used 1.2k-2.1k completion tokens for a dense
+# multi-paragraph critique; any review message long enough to produce one gets
+# a cap above that.
+OUTPUT_BASE_TOKENS = 1024
+OUTPUT_TOKENS_PER_REVIEW_TOKEN = 1.5
+
+# No call is capped below this: a truncated JSON body costs a whole retry pass,
+# which is far more than the few seconds a tighter cap could ever save.
+MIN_OUTPUT_TOKENS = 2048
+
+# Review messages up to this size count as short: the user prompt's fixed
+# framing is ~550 tokens, leaving a sentence or two of SOURCE and TARGET.
+SHORT_REVIEW_TOKENS = 1000
+
+
+def estimate_tokens(text: str) -> int:
+    """Conservative token count for `text` (see module docstring)."""
+    total = 0.0
+    for char in text or "":
+        if char.isspace():
+            total += WHITESPACE_TOKENS_PER_CHAR
+        elif char.isascii():
+            total += (
+                ASCII_WORD_TOKENS_PER_CHAR
+                if char.isalnum()
+                else ASCII_OTHER_TOKENS_PER_CHAR
+            )
+        elif unicodedata.east_asian_width(char) in ("W", "F"):
+            total += CJK_TOKENS_PER_CHAR
+        else:
+            total += OTHER_TOKENS_PER_CHAR
+    return math.ceil(total)
+
+
+def estimate_messages_tokens(messages: Sequence[dict]) -> int:
+    """Prompt tokens for a chat message list, including per-message overhead."""
+    return sum(
+        estimate_tokens(m.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+        for m in messages
+    )
+
+
+def review_tokens(messages: Sequence[dict]) -> int:
+    """
+    Tokens of the text under review.
+
+    `prompts.build_messages()` sends the fixed system prompt and few-shot
+    example first and SOURCE, TARGET and exemplar in their own user message;
+    the critique's length follows that message, not the whole prompt. It is
+    the longest user message other than the few-shot — retry nudges appended
+    after it are a few lines, and repair prompts are a single user message.
+    """
+    sizes = [
+        estimate_tokens(m.get("content") or "")
+        for m in messages
+        if (m.get("role") or "user") == "user"
+        and m.get("content") != FEW_SHOT_EXAMPLE
+    ]
+    return max(sizes, default=0)
+
+
+def is_short_review(messages: Sequence[dict]) -> bool:
+    return review_tokens(messages) <= SHORT_REVIEW_TOKENS
+
+
+def output_token_cap(
+    messages: Sequence[dict],
+    *,
+    ceiling: int,
+    reserved: int = 0,
+    floor: int = MIN_OUTPUT_TOKENS,
+) -> int:
+    """
+    Output budget for one call.
+
+    `reserved` covers tokens the model spends before the answer and that count
+    against the same limit (thinking / reasoning). The result never exceeds
+    `ceiling`, the provider's static maximum.
+    """
+    expected = OUTPUT_BASE_TOKENS + OUTPUT_TOKENS_PER_REVIEW_TOKEN * review_tokens(
+        messages
+    )
+    return int(min(ceiling, max(floor, reserved + math.ceil(expected))))
+
+
+def prompt_fits(
+    messages: Sequence[dict],
+    context_window: Optional[int],
+    output_tokens: int,
+) -> bool:
+    """Whether prompt plus output fit `context_window` (None: unknown, assume so)."""
+    if context_window is None:
+        return True
+    return estimate_messages_tokens(messages) + output_tokens <= context_window
+
+
+def fitting_models(
+    messages: Sequence[dict],
+    models: Sequence[str],
+    *,
+    context_window: Callable[[str], Optional[int]],
+    output_tokens: Callable[[str], int],
+) -> List[str]:
+    """The subset of `models` (order kept) whose context window holds the call."""
+    return [
+        model
+        for model in models
+        if prompt_fits(messages, context_window(model), output_tokens(model))
+    ]
@@ -1,3 +1,5 @@
+import asyncio
+import json
 import os
 import sys
 import time
@@ -6,6 +8,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from uuid import uuid4
 from pathlib import Path
 from contextlib import asynccontextmanager
+from typing import Optional
 from dotenv import load_dotenv
 
 # 環境変数からアプリケーションルートを取得
@@ -44,7 +47,7 @@ from .db_helper import (
 from uuid import uuid4
 from datetime import datetime
 from fastapi import APIRouter
-from fastapi import Body, Depends, HTTPException
+from fastapi import Body, Depends, HTTPException, Request, Response
 
 from .auth import get_current_user
 
@@ -112,8 +115,17 @@ else:
     # 本番環境: 厳密な設定
     cors_origins = get_cors_origins()
 
+# プロバイダー共有HTTPクライアント（llm/http_clients.py）をシャットダウン時に閉じる
+@asynccontextmanager
+async def lifespan(_app):
+    yield
+    from .llm.http_clients import close_provider_clients
+
+    await close_provider_clients()
+
+
 # FastAPIアプリケーションの作成
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # CORSミドルウェアを追加
 app.add_middleware(
@@ -221,6 +233,8 @@ async def create_history(payload: dict = Body(...)):
             'llm_provider': payload.get('llmProvider'),
             'llm_model': payload.get('llmModel'),
             'client_job_id': payload.get('clientJobId'),
+            # Queues a pending round for SUGGESTIONS_PREFETCH (llm/prefetch.py).
+            'awaiting_prefetch': _payload_flag(payload.get('awaitingPrefetch')) is True,
         }
         # 必須項目チェック
         # NOTE: this must raise (not `return {"error": ...}`) so the response is a
@@ -372,11 +386,26 @@ async def delete_prompt_setting_route():
 
 # AI提案生成エンドポイント
 @router.post("/suggestions")
-async def generate_ai_suggestions(payload: dict = Body(...)):
+async def generate_ai_suggestions(
+    request: Request, response: Response, payload: dict = Body(...)
+):
     """
     Generate AI correction suggestions using cloud LLM providers.
     Primary: Gemini, then Groq, then Cloudflare Workers AI.
     WebLLM remains available on frontend as offline fallback.
+
+    Every answer carries a `Server-Timing` header with the request's phase
+    timeline (`llm/timeline.py`), without credential refs; `debug: true` in
+    the body adds the same timeline, with the key each attempt used, as
+    `debug.timeline`.
+
+    If the client disconnects, the generation (including any provider call in
+    flight) is cancelled and no further passes run; health observations and
+    latency gathered so far are still flushed.
+
+    With `sessionId` in the body and prefetch enabled (`llm/prefetch.py`), a
+    round already generated for the same SOURCE/TARGET in that session is
+    returned at once, with its `prefetchedHistoryId`.
     """
     from .llm import generate_suggestions
     from .llm.suggestions import (
@@ -384,11 +413,15 @@ async def generate_ai_suggestions(payload: dict = Body(...)):
         SuggestionsError,
         NoProvidersConfiguredError,
     )
+    from .llm.latency import ensure_latency_snapshot, flush_latency
     from .llm.provider_health import (
         flush_observations,
         load_shared_state,
         seed_cooldowns,
     )
+    from .llm.prefetch import prefetch_enabled, take_prefetched
+    from .llm.singleflight import generation_key, run_once
+    from .llm.timeline import recording, span
     from .prompt_settings import SETTING_KEY, prompt_override_from_row
     from fastapi.responses import JSONResponse
 
@@ -401,6 +434,11 @@ async def generate_ai_suggestions(payload: dict = Body(...)):
     target_text = payload.get("targetText", "")
     # Optional 模範回答訳文: reference calibration only, never required.
     exemplar_translation = (payload.get("exemplarTranslation") or "").strip()
+    # Optional per-request override of SUGGESTIONS_CHUNKING (None = env default).
+    chunk_paragraphs = _payload_flag(payload.get("chunkParagraphs"))
+    debug = _payload_flag(payload.get("debug")) is True
+    # Optional: lets a round prefetched for this session be served instead.
+    session_id = payload.get("sessionId")
     
     if not original_text or not target_text:
         return JSONResponse(
@@ -408,71 +446,309 @@ async def generate_ai_suggestions(payload: dict = Body(...)):
             content={"error": "originalText and targetText are required", "fallback_available": True}
         )
     
+    with recording() as timeline:
+        # Prefetched rounds are generated without an exemplar or a chunking
+        # override, so only a request without either can be served one.
+        prefetched = None
+        if prefetch_enabled() and not exemplar_translation and chunk_paragraphs is None:
+            with span("prefetch"):
+                prefetched = await take_prefetched(session_id, original_text, target_text)
+        if prefetched is not None:
+            status_code = None
+            content = prefetched
+        else:
+            try:
+                # One connection for both: the stored prompt (missing/unreadable =>
+                # the built-in default) and what earlier requests learned about
+                # which credentials are rate-limited, so this request can route
+                # around them instead of re-collecting the same 429s. A cold process
+                # also reads the learned provider latency alongside, on its own
+                # connection.
+                with span("db"):
+                    (setting_row, health_rows), _ = await asyncio.gather(
+                        load_shared_state(SETTING_KEY),
+                        ensure_latency_snapshot(),
+                    )
+                system_prompt_override = prompt_override_from_row(setting_row)
+                seed_cooldowns(health_rows)
+                # Identical concurrent requests (double-click, second tab) share
+                # one generation instead of each spending quota on it.
+                key = generation_key(
+                    original_text,
+                    target_text,
+                    exemplar_translation,
+                    system_prompt_override,
+                    chunk_paragraphs,
+                )
+                try:
+                    result = await _cancel_on_disconnect(
+                        request,
+                        run_once(
+                            key,
+                            lambda: generate_suggestions(
+                                original_text,
+                                target_text,
+                                exemplar_translation,
+                                system_prompt_override,
+                                deadline_monotonic=deadline_monotonic,
+                                chunk_paragraphs=chunk_paragraphs,
+                            ),
+                            deadline_monotonic=deadline_monotonic,
+                        ),
+                    )
+                finally:
+                    # Refusals seen here are worth the next request's while, whether
+                    # this one ended up succeeding on a later provider or failing
+                    # outright.
+                    with span("flush"):
+                        await asyncio.gather(
+                            flush_observations(deadline_monotonic),
+                            flush_latency(deadline_monotonic),
+                        )
+                status_code = None
+                content = result
+            except NoProvidersConfiguredError as e:
+                status_code = 503
+                content = {
+                    "error": str(e),
+                    "fallback_available": True,
+                    "message": "LLM providers not configured. Use WebLLM offline mode."
+                }
+            except SuggestionsError as e:
+                status_code = 503
+                content = _suggestions_error_content(e)
+            except ClientDisconnected:
+                status_code = CLIENT_CLOSED_REQUEST
+                content = {"error": "Client disconnected before suggestions were ready"}
+
+    if debug:
+        content = {**content, "debug": {"timeline": timeline.as_debug()}}
+    headers = {"Server-Timing": timeline.server_timing()}
+    if status_code is None:
+        response.headers.update(headers)
+        return content
+    return JSONResponse(status_code=status_code, content=content, headers=headers)
+
+
+# nginx's "client closed request". Nobody reads the response; the status only
+# keeps abandoned requests apart from provider failures in access logs.
+CLIENT_CLOSED_REQUEST = 499
+
+# How often a running generation checks whether its client is still there.
+DISCONNECT_POLL_S = 0.5
+
+
+class ClientDisconnected(Exception):
+    """The client went away before the awaited work finished."""
+
+
+async def _cancel_on_disconnect(
+    request: Request, awaitable, poll_s: float = DISCONNECT_POLL_S
+):
+    """
+    Await `awaitable`, cancelling it if the client disconnects first.
+
+    A closed tab would otherwise keep the chain walking through every provider
+    and retry pass — quota and a serverless slot spent on an answer nobody
+    reads. Cancellation reaches the provider HTTP call in flight, and the
+    `finally` blocks below it still run.
+    """
+    task = asyncio.ensure_future(awaitable)
     try:
-        # One connection for both: the stored prompt (missing/unreadable => the
-        # built-in default) and what earlier requests learned about which
-        # credentials are rate-limited, so this request can route around them
-        # instead of re-collecting the same 429s.
-        setting_row, health_rows = await load_shared_state(SETTING_KEY)
-        system_prompt_override = prompt_override_from_row(setting_row)
-        seed_cooldowns(health_rows)
-        try:
-            result = await generate_suggestions(
-                original_text,
-                target_text,
-                exemplar_translation,
-                system_prompt_override,
-                deadline_monotonic=deadline_monotonic,
-            )
-        finally:
-            # Refusals seen here are worth the next request's while, whether this
-            # one ended up succeeding on a later provider or failing outright.
-            await flush_observations(deadline_monotonic)
-        return result
-    except NoProvidersConfiguredError as e:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_s)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                print("[suggestions] Client disconnected; generation cancelled")
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+def _payload_flag(value) -> Optional[bool]:
+    """
+    A JSON boolean, or a string spelled like the env flags ("1"/"on"/"true"/
+    "yes" and "0"/"off"/"false"/"no"); anything else is None (use the default).
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in ("1", "on", "true", "yes"):
+            return True
+        if text in ("0", "off", "false", "no"):
+            return False
+    return None
+
+
+def _suggestions_error_content(e) -> dict:
+    """503 body for a SuggestionsError: per-provider errors plus client advice."""
+    if getattr(e, "rate_limited", False):
+        client_message = (
+            "Cloud providers are rate-limited or quota-exhausted. "
+            "The API key pool spreads load across accounts but does not raise "
+            "per-account RPD/quota limits — check the Groq/Cloudflare/Gemini "
+            "dashboards. Retry later, or enable WebLLM offline mode."
+        )
+    elif getattr(e, "timed_out", False):
+        # Distinct advice: nothing is misconfigured, the chain simply ran
+        # out of time, and a retry usually succeeds.
+        client_message = (
+            "Cloud generation ran out of time before any provider returned "
+            "a usable answer. Retry, shorten the text, or enable WebLLM "
+            "offline mode."
+        )
+    else:
+        client_message = (
+            "All cloud providers failed. Try WebLLM offline mode."
+        )
+    return {
+        "error": str(e),
+        "groq_error": e.groq_error,
+        "cf_error": e.cf_error,
+        "gemini_error": getattr(e, "gemini_error", None),
+        "local_error": getattr(e, "local_error", None),
+        "fallback_available": True,
+        "rate_limited": bool(getattr(e, "rate_limited", False)),
+        "timed_out": bool(getattr(e, "timed_out", False)),
+        "groq_pool_size": int(getattr(e, "groq_pool_size", 0) or 0),
+        "cf_pool_size": int(getattr(e, "cf_pool_size", 0) or 0),
+        "gemini_pool_size": int(getattr(e, "gemini_pool_size", 0) or 0),
+        "local_pool_size": int(getattr(e, "local_pool_size", 0) or 0),
+        "message": client_message,
+    }
+
+
+# AI提案一括生成エンドポイント
+@router.post("/suggestions/batch")
+async def generate_ai_suggestions_batch(payload: dict = Body(...)):
+    """
+    Generate suggestions for several items in one request.
+
+    Items are scheduled over the ready (credential, model) pairs instead of
+    racing for the same key (see app/llm/batch.py). With `"stream": true` the
+    response is NDJSON, one per-item result per line in completion order;
+    otherwise a JSON object whose `results` are in item order.
+    """
+    from .llm.batch import BATCH_MAX_ITEMS, run_batch
+    from .llm.latency import ensure_latency_snapshot, flush_latency
+    from .llm.suggestions import SUGGESTIONS_WALL_CLOCK_S, are_providers_configured
+    from .llm.provider_health import (
+        flush_observations,
+        load_shared_state,
+        seed_cooldowns,
+    )
+    from .prompt_settings import SETTING_KEY, prompt_override_from_row
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    deadline_monotonic = time.monotonic() + SUGGESTIONS_WALL_CLOCK_S
+
+    items = payload.get("items")
+    if not isinstance(items, list) or not items:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "items must be a non-empty list", "fallback_available": True},
+        )
+    if len(items) > BATCH_MAX_ITEMS:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "error": f"At most {BATCH_MAX_ITEMS} items per batch",
+                "fallback_available": True,
+            },
+        )
+    items = [item if isinstance(item, dict) else {} for item in items]
+    if not are_providers_configured():
         return JSONResponse(
             status_code=503,
             content={
-                "error": str(e),
+                "error": "No LLM providers configured",
                 "fallback_available": True,
                 "message": "LLM providers not configured. Use WebLLM offline mode."
             }
         )
-    except SuggestionsError as e:
-        if getattr(e, "rate_limited", False):
-            client_message = (
-                "Cloud providers are rate-limited or quota-exhausted. "
-                "The API key pool spreads load across accounts but does not raise "
-                "per-account RPD/quota limits — check the Groq/Cloudflare/Gemini "
-                "dashboards. Retry later, or enable WebLLM offline mode."
-            )
-        elif getattr(e, "timed_out", False):
-            # Distinct advice: nothing is misconfigured, the chain simply ran
-            # out of time, and a retry usually succeeds.
-            client_message = (
-                "Cloud generation ran out of time before any provider returned "
-                "a usable answer. Retry, shorten the text, or enable WebLLM "
-                "offline mode."
-            )
-        else:
-            client_message = (
-                "All cloud providers failed. Try WebLLM offline mode."
+
+    (setting_row, health_rows), _ = await asyncio.gather(
+        load_shared_state(SETTING_KEY),
+        ensure_latency_snapshot(),
+    )
+    seed_cooldowns(health_rows)
+
+    async def results():
+        try:
+            async for item_result in run_batch(
+                items,
+                system_prompt_override=prompt_override_from_row(setting_row),
+                deadline_monotonic=deadline_monotonic,
+                error_details=_suggestions_error_content,
+            ):
+                yield item_result
+        finally:
+            await asyncio.gather(
+                flush_observations(deadline_monotonic),
+                flush_latency(deadline_monotonic),
             )
+
+    if _payload_flag(payload.get("stream")):
+        async def ndjson():
+            async for item_result in results():
+                yield json.dumps(item_result, ensure_ascii=False, default=str) + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    collected = [item_result async for item_result in results()]
+    return {"results": sorted(collected, key=lambda r: r["index"])}
+
+
+# 先読み生成エンドポイント（スケジューラや待機中のクライアントから呼び出す）
+@router.post("/suggestions/prefetch")
+async def prefetch_ai_suggestions():
+    """
+    Generate suggestions ahead of time for queued pending histories.
+
+    One tick of `llm/prefetch.py`: only while enough quota is idle, and a no-op
+    unless `SUGGESTIONS_PREFETCH` is on. Returns which histories were filled.
+    """
+    from .llm.latency import ensure_latency_snapshot, flush_latency
+    from .llm.prefetch import empty_summary, prefetch_enabled, prefetch_pending
+    from .llm.provider_health import (
+        flush_observations,
+        load_shared_state,
+        seed_cooldowns,
+    )
+    from .llm.suggestions import SUGGESTIONS_WALL_CLOCK_S, are_providers_configured
+    from .prompt_settings import SETTING_KEY, prompt_override_from_row
+    from fastapi.responses import JSONResponse
+
+    deadline_monotonic = time.monotonic() + SUGGESTIONS_WALL_CLOCK_S
+    if not prefetch_enabled():
+        return empty_summary(enabled=False)
+    if not are_providers_configured():
         return JSONResponse(
             status_code=503,
-            content={
-                "error": str(e),
-                "groq_error": e.groq_error,
-                "cf_error": e.cf_error,
-                "gemini_error": getattr(e, "gemini_error", None),
-                "fallback_available": True,
-                "rate_limited": bool(getattr(e, "rate_limited", False)),
-                "timed_out": bool(getattr(e, "timed_out", False)),
-                "groq_pool_size": int(getattr(e, "groq_pool_size", 0) or 0),
-                "cf_pool_size": int(getattr(e, "cf_pool_size", 0) or 0),
-                "gemini_pool_size": int(getattr(e, "gemini_pool_size", 0) or 0),
-                "message": client_message,
-            }
+            content={"error": "No LLM providers configured", "fallback_available": True},
+        )
+
+    (setting_row, health_rows), _ = await asyncio.gather(
+        load_shared_state(SETTING_KEY),
+        ensure_latency_snapshot(),
+    )
+    # Pacing reads key_pool cooldowns, so they must include what other
+    # instances have learned before the first readiness check.
+    seed_cooldowns(health_rows)
+    try:
+        return await prefetch_pending(
+            system_prompt_override=prompt_override_from_row(setting_row),
+            deadline_monotonic=deadline_monotonic,
+        )
+    finally:
+        await asyncio.gather(
+            flush_observations(deadline_monotonic),
+            flush_latency(deadline_monotonic),
         )
 
 
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Micro-benchmark of `key_pool` selection and availability on large pools.
+
+For each pool size, BENCH_COOLED of the (key, model) pairs are cooled down and
+the script times, per operation:
+
+- load:          `load_groq_credentials()` (cached) against a fresh env parse;
+- acquire:       `acquire_groq(cooldown_scope=model)`;
+- availability:  `pool_availability(pool, models)`;
+- ready_pairs:   `ready_pair_count(pool, models)`;
+
+each against `linear_*`, a copy of the scans they replaced (list of eligible
+indices rebuilt per call, ring walk with `in`, one lookup per pair), run over
+the same cooldown state. No network and no provider is involved:
+
+  cd backend && PYTHONPATH=. python scripts/bench_key_pool.py
+
+Env knobs:
+  BENCH_POOL_SIZES  comma-separated key counts (default 10,100,1000)
+  BENCH_MODELS      models (cooldown scopes) per key (default 4)
+  BENCH_COOLED      share of pairs cooled down, 0..1 (default 0.5)
+  BENCH_OPS         timed calls per operation (default 2000)
+"""
+from __future__ import annotations
+
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.llm import key_pool  # noqa: E402
+from app.llm.key_pool import (  # noqa: E402
+    _parse_groq_credentials,
+    acquire_groq,
+    load_groq_credentials,
+    mark_cooldown,
+    pool_availability,
+    ready_pair_count,
+    reset_key_pool_state,
+)
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name) or default)
+
+
+def linear_acquire(
+    credentials: Sequence, scope: Optional[str], rr: Dict[str, int]
+) -> Optional[object]:
+    """The previous `_acquire`: eligible list per call, ring walk with `in`."""
+    now = time.monotonic()
+    eligible = [
+        i
+        for i, c in enumerate(credentials)
+        if key_pool._live_cooldown(c.id, now, scope) is None
+    ]
+    if not eligible:
+        return None
+    start = rr.get("groq", 0) % len(credentials)
+    for idx in list(range(start, len(credentials))) + list(range(0, start)):
+        if idx in eligible:
+            rr["groq"] = (idx + 1) % len(credentials)
+            return credentials[idx]
+    return None
+
+
+def linear_availability(credentials: Sequence, scopes: Sequence[str]) -> bool:
+    """The previous `pool_availability` / `ready_pair_count` scan."""
+    now = time.monotonic()
+    return any(
+        key_pool._live_cooldown(c.id, now, scope) is None
+        for c in credentials
+        for scope in scopes
+    )
+
+
+def linear_ready_pairs(credentials: Sequence, scopes: Sequence[str]) -> int:
+    now = time.monotonic()
+    return sum(
+        1
+        for c in credentials
+        for scope in scopes
+        if key_pool._live_cooldown(c.id, now, scope) is None
+    )
+
+
+def _per_op_us(fn: Callable[[], object], ops: int) -> float:
+    started = time.perf_counter()
+    for _ in range(ops):
+        fn()
+    return (time.perf_counter() - started) / ops * 1e6
+
+
+def run(size: int, n_models: int, cooled: float, ops: int) -> List[tuple]:
+    reset_key_pool_state()
+    os.environ["GROQ_API_KEYS"] = ",".join(f"gsk_bench_{i:05d}" for i in range(size))
+    pool = load_groq_credentials()
+    models = [f"model-{m}" for m in range(n_models)]
+    rng = random.Random(0)
+    pairs = [(c, m) for c in pool for m in models]
+    # Cooled far past the run, so the state is the same for every call.
+    for cred, model in rng.sample(pairs, int(len(pairs) * cooled)):
+        mark_cooldown(cred.id, 3600, scope=model)
+    scope = models[0]
+    rr: Dict[str, int] = {}
+    return [
+        (
+            "load",
+            _per_op_us(load_groq_credentials, ops),
+            _per_op_us(_parse_groq_credentials, ops),
+        ),
+        (
+            "acquire",
+            _per_op_us(lambda: acquire_groq(cooldown_scope=scope), ops),
+            _per_op_us(lambda: linear_acquire(pool, scope, rr), ops),
+        ),
+        (
+            "availability",
+            _per_op_us(lambda: pool_availability(pool, models), ops),
+            _per_op_us(lambda: linear_availability(pool, models), ops),
+        ),
+        (
+            "ready_pairs",
+            _per_op_us(lambda: ready_pair_count(pool, models), ops),
+            _per_op_us(lambda: linear_ready_pairs(pool, models), ops),
+        ),
+    ]
+
+
+def main() -> int:
+    sizes = [
+        int(s) for s in (os.environ.get("BENCH_POOL_SIZES") or "10,100,1000").split(",")
+    ]
+    n_models = _env_int("BENCH_MODELS", 4)
+    cooled = float(os.environ.get("BENCH_COOLED") or 0.5)
+    ops = _env_int("BENCH_OPS", 2000)
+
+    print(
+        f"models={n_models} cooled={cooled:.0%} ops={ops} (microseconds per call)"
+    )
+    print(f"{'keys':>6} {'operation':<13} {'indexed':>10} {'linear':>10} {'speedup':>8}")
+    for size in sizes:
+        for name, indexed_us, linear_us in run(size, n_models, cooled, ops):
+            print(
+                f"{size:>6} {name:<13} {indexed_us:>10.2f} {linear_us:>10.2f} "
+                f"{linear_us / indexed_us:>7.1f}x"
+            )
+    reset_key_pool_state()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""Throughput / latency benchmark of `generate_suggestions()` end to end.
+
+Runs BENCH_REQUESTS generations, BENCH_CONCURRENCY at a time, each with the
+same wall-clock deadline `/suggestions` uses, and reports throughput,
+p50/p95/p99 latency, answers per provider, failures per error type and
+deadline violations:
+
+- over_budget:   finished after SUGGESTIONS_WALL_CLOCK_S (the app-level 503
+                 should have fired first);
+- over_platform: finished after PLATFORM_MAX_DURATION_S (on Vercel this
+                 request would have been a FUNCTION_INVOCATION_TIMEOUT).
+
+By default the providers are pointed at an in-process `stub_llm_server.py`
+running STUB_LLM_SCENARIO, with placeholder keys, so no quota is spent:
+
+  cd backend && STUB_LLM_SCENARIO=429-storm PYTHONPATH=. \\
+    python scripts/bench_suggestions.py
+
+With BENCH_STUB=0 the current env is used as-is — real keys, or
+LLM_CASSETTE_MODE=replay for recorded traffic.
+
+Env knobs:
+  BENCH_REQUESTS      generations to run (default 40)
+  BENCH_CONCURRENCY   generations in flight at once (default 4)
+  BENCH_FIXTURE       short | epic — SOURCE/TARGET pair to send (default short)
+  BENCH_STUB          1 (default) start the stub; 0 use the env as-is
+  STUB_LLM_SCENARIO   stub preset or scenario JSON path (default healthy)
+  STUB_LLM_SEED       stub RNG seed (default 0 for repeatable runs)
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.llm.budget import PLATFORM_MAX_DURATION_S  # noqa: E402
+from app.llm.http_clients import close_provider_clients  # noqa: E402
+from app.llm.suggestions import (  # noqa: E402
+    SUGGESTIONS_WALL_CLOCK_S,
+    generate_suggestions,
+)
+from scripts.stub_llm_server import create_app, load_scenario, provider_env  # noqa: E402
+from tests.fixtures.epic_shi_source_target import (  # noqa: E402
+    EPIC_SOURCE_TEXT,
+    EPIC_TARGET_TEXT,
+)
+from tests.fixtures.primate_sleep_source_target import (  # noqa: E402
+    PRIMATE_SLEEP_SOURCE_TEXT,
+    PRIMATE_SLEEP_TARGET_TEXT,
+)
+
+REQUESTS = int(os.environ.get("BENCH_REQUESTS", "40"))
+CONCURRENCY = max(1, int(os.environ.get("BENCH_CONCURRENCY", "4")))
+FIXTURES = {
+    "short": (PRIMATE_SLEEP_SOURCE_TEXT, PRIMATE_SLEEP_TARGET_TEXT),
+    "epic": (EPIC_SOURCE_TEXT, EPIC_TARGET_TEXT),
+}
+
+# Placeholder credentials for the stub, which ignores them.
+STUB_KEYS = {
+    "GEMINI_API_KEYS": "stub-gemini-key-1,stub-gemini-key-2",
+    "GROQ_API_KEYS": "stub-groq-key-1,stub-groq-key-2",
+    "CLOUDFLARE_ACCOUNT_IDS": "stub-account",
+    "CLOUDFLARE_API_TOKENS": "stub-cf-token",
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stub(scenario: str, seed: int):
+    """Serve the stub on a free port from a daemon thread; returns (server, url)."""
+    import uvicorn
+
+    port = _free_port()
+    app = create_app(load_scenario(scenario), seed=seed)
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("stub server did not start")
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile; None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+async def run_one(n: int, source: str, target: str) -> Dict:
+    started = time.monotonic()
+    try:
+        result = await generate_suggestions(
+            source,
+            target,
+            deadline_monotonic=started + SUGGESTIONS_WALL_CLOCK_S,
+        )
+        outcome = {"ok": True, "provider": result.get("llmProvider")}
+    except Exception as e:  # noqa: BLE001 — the benchmark counts every failure
+        outcome = {"ok": False, "error": type(e).__name__}
+    return {"n": n, "elapsed_s": time.monotonic() - started, **outcome}
+
+
+async def run(source: str, target: str) -> List[Dict]:
+    gate = asyncio.Semaphore(CONCURRENCY)
+
+    async def bounded(n: int) -> Dict:
+        async with gate:
+            row = await run_one(n, source, target)
+        print(json.dumps({**row, "elapsed_s": round(row["elapsed_s"], 2)}), flush=True)
+        return row
+
+    try:
+        return await asyncio.gather(*(bounded(n) for n in range(1, REQUESTS + 1)))
+    finally:
+        await close_provider_clients()
+
+
+def summarize(rows: List[Dict], wall_s: float) -> Dict:
+    latencies = [row["elapsed_s"] for row in rows]
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value * 1000, 1)
+
+    return {
+        "requests": len(rows),
+        "concurrency": CONCURRENCY,
+        "wall_s": round(wall_s, 2),
+        "throughput_rps": round(len(rows) / wall_s, 3) if wall_s > 0 else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "ok": sum(1 for row in rows if row["ok"]),
+        "by_provider": dict(Counter(row["provider"] for row in rows if row["ok"])),
+        "errors": dict(Counter(row["error"] for row in rows if not row["ok"])),
+        "over_budget": sum(1 for t in latencies if t > SUGGESTIONS_WALL_CLOCK_S),
+        "over_platform": sum(1 for t in latencies if t > PLATFORM_MAX_DURATION_S),
+    }
+
+
+def main() -> int:
+    fixture = os.environ.get("BENCH_FIXTURE", "short")
+    source, target = FIXTURES[fixture]
+    server = None
+    if os.environ.get("BENCH_STUB", "1") != "0":
+        scenario = os.environ.get("STUB_LLM_SCENARIO", "healthy")
+        server, url = start_stub(scenario, int(os.environ.get("STUB_LLM_SEED", "0")))
+        for name in ("GEMINI_API_KEY", "GROQ_API_KEY", "CLOUDFLARE_ACCOUNT_ID"):
+            os.environ.pop(name, None)
+        os.environ.update({**STUB_KEYS, **provider_env(url)})
+        print(f"stub scenario={scenario} at {url}", flush=True)
+
+    started = time.monotonic()
+    rows = asyncio.run(run(source, target))
+    summary = summarize(rows, time.monotonic() - started)
+    if server is not None:
+        stats = server.config.app.state.stub.stats
+        summary["stub_served"] = {name: dict(c) for name, c in stats.items()}
+        server.should_exit = True
+
+    print("---SUMMARY---")
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -27,6 +27,7 @@ BACKEND_DIR = Path(__file__).resolve().parent.parent
 if str(BACKEND_DIR) not in sys.path:
     sys.path.insert(0, str(BACKEND_DIR))
 
+from app.llm import cloudflare_provider as cfp  # noqa: E402
 from app.llm import groq_provider as gp  # noqa: E402
 from app.llm import suggestions as sug_mod  # noqa: E402
 from app.llm.parser import (  # noqa: E402
@@ -48,7 +49,7 @@ HARD_BACKOFF_BASE_S = float(os.environ.get("LIVE_CHINESE_HARD_BACKOFF_S", "8"))
 last_model = {"provider": None, "model": None}
 
 _orig_call_groq = gp.call_groq
-_orig_call_cf = sug_mod.call_cloudflare
+_orig_call_cf = cfp.call_cloudflare
 
 
 async def _call_groq_capture(messages, model=None, **kwargs):
@@ -57,10 +58,10 @@ async def _call_groq_capture(messages, model=None, **kwargs):
     return await _orig_call_groq(messages, model=model, **kwargs)
 
 
-async def _call_cf_capture(messages, *a, **kw):
+async def _call_cf_capture(messages, *a, model=None, **kw):
     last_model["provider"] = "cloudflare"
-    last_model["model"] = "cloudflare-workers-ai"
-    return await _orig_call_cf(messages, *a, **kw)
+    last_model["model"] = model or cfp.get_cloudflare_model()
+    return await _orig_call_cf(messages, *a, model=model, **kw)
 
 
 def failing_fields(result) -> list[str]:
@@ -129,7 +130,7 @@ async def main() -> int:
     # Patch the underlying call sites (not the wrappers themselves) so
     # generate_suggestions' Groq→Cloudflare failover stays intact.
     gp.call_groq = _call_groq_capture
-    sug_mod.call_cloudflare = _call_cf_capture
+    cfp.call_cloudflare = _call_cf_capture
 
     print(f"GROQ_API_KEY set: {bool(os.environ.get('GROQ_API_KEY'))}")
     print(f"GROQ_MODEL pin: {os.environ.get('GROQ_MODEL') or '(rotation)'}")
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""Local stub of the LLM provider APIs, for failover and load benchmarks.
+
+Speaks just enough of each API for the providers in `app/llm/` to run
+unmodified against it:
+
+  POST /v1beta/models/{model}:generateContent          (Gemini)
+  POST /openai/v1/chat/completions                     (Groq, OpenAI-compatible)
+  POST /client/v4/accounts/{account}/ai/run/{model}    (Cloudflare Workers AI)
+  POST /local/v1/chat/completions                      (self-hosted server)
+  GET  /stats                                          (what was served so far)
+
+Point the backend at it with:
+  GEMINI_API_BASE=http://127.0.0.1:8787/v1beta/models
+  GROQ_API_URL=http://127.0.0.1:8787/openai/v1/chat/completions
+  CLOUDFLARE_API_BASE=http://127.0.0.1:8787/client/v4
+and any non-empty keys (the stub ignores them). `scripts/bench_suggestions.py`
+starts it in-process and does this for you. The self-hosted slot is opt-in:
+  LOCAL_LLM_BASE_URL=http://127.0.0.1:8787/local/v1 LOCAL_LLM_MODELS=stub
+
+Usage:
+  cd backend && PYTHONPATH=. python scripts/stub_llm_server.py
+
+Env knobs:
+  STUB_LLM_SCENARIO   preset name (see PRESETS) or path to a scenario JSON file
+                      (default "healthy")
+  STUB_LLM_PORT       listen port (default 8787)
+  STUB_LLM_SEED       RNG seed, for repeatable runs (default unset)
+
+A scenario maps provider name (gemini / groq / cloudflare / local) to:
+  latency        {"median_s": 3, "p95_s": 9} lognormal, or {"fixed_s": 2}
+  errors         {"429": 0.3, "500": 0.05, "timeout": 0.02} — probabilities;
+                 "timeout" holds the connection for `hang_s` (default 120)
+  retry_after_s  `retry-after` header sent with 429s (omit for none)
+  bodies         {"valid": 0.8, "truncated": 0.1, "prose": 0.1, "empty": 0}
+                 weights over the body templates returned with a 200
+  templates      optional per-template text overrides; "@path" reads a file
+Missing providers and keys fall back to the "healthy" values.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+PROVIDERS = ("gemini", "groq", "cloudflare", "local")
+
+VALID_BODY = json.dumps(
+    {
+        "指摘": [
+            {
+                "番号": 1,
+                "箇所": "史詩を紙に印する文字として読む",
+                "コメント": "“印する”不是自然的日语，应改为“印刷された文字として読む”。",
+            },
+            {
+                "番号": 2,
+                "箇所": "皆さんが囲みながら",
+                "コメント": "“皆さん”是对听众的称呼，这里应为“人々が輪になって”。",
+            },
+        ],
+        "全体講評": "整体意思传达基本准确，但有几处直译导致日语不自然。",
+    },
+    ensure_ascii=False,
+)
+
+# Japanese prose instead of the Chinese JSON critique: the failure the content
+# checks exist to catch.
+PROSE_BODY = (
+    "全体的によく訳されていますが、いくつかの表現が不自然です。"
+    "「印する」は「印刷された」とするのが自然でしょう。"
+)
+
+TEMPLATES: Dict[str, str] = {
+    "valid": VALID_BODY,
+    # Cut mid-JSON, as a MAX_TOKENS / length stop would leave it.
+    "truncated": VALID_BODY[: len(VALID_BODY) * 2 // 3],
+    "prose": PROSE_BODY,
+    "empty": "",
+}
+
+HEALTHY: Dict[str, Any] = {
+    "latency": {"median_s": 2.0, "p95_s": 5.0},
+    "errors": {},
+    "retry_after_s": None,
+    "bodies": {"valid": 1.0},
+    "hang_s": 120.0,
+}
+
+PRESETS: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "healthy": {},
+    # Gemini free tier exhausted: most calls 429, the chain must fail over fast.
+    "429-storm": {
+        "gemini": {"errors": {"429": 0.9}, "retry_after_s": 30},
+        "groq": {"errors": {"429": 0.5}, "retry_after_s": 8},
+    },
+    # Heavy tail on the primary: occasional calls longer than the whole budget.
+    "slow-tail": {
+        "gemini": {"latency": {"median_s": 6.0, "p95_s": 40.0}},
+        "groq": {"latency": {"median_s": 2.0, "p95_s": 15.0}},
+    },
+    "truncated": {
+        name: {"bodies": {"valid": 0.5, "truncated": 0.5}} for name in PROVIDERS
+    },
+    "prose": {
+        "gemini": {"bodies": {"valid": 0.6, "prose": 0.4}},
+        "groq": {"bodies": {"valid": 0.3, "prose": 0.7}},
+        "cloudflare": {"bodies": {"valid": 0.5, "prose": 0.5}},
+    },
+}
+
+# z-score of the 95th percentile, for fitting a lognormal from median and p95.
+_Z95 = 1.645
+
+
+def load_scenario(spec: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Per-provider settings for `spec` (preset name or JSON path), defaults filled."""
+    spec = spec or os.environ.get("STUB_LLM_SCENARIO") or "healthy"
+    if spec in PRESETS:
+        raw = PRESETS[spec]
+    else:
+        raw = json.loads(Path(spec).read_text(encoding="utf-8"))
+    scenario = {}
+    for name in PROVIDERS:
+        settings = {**HEALTHY, **(raw.get(name) or {})}
+        templates = dict(TEMPLATES)
+        for key, text in (settings.get("templates") or {}).items():
+            if text.startswith("@"):
+                text = Path(text[1:]).read_text(encoding="utf-8")
+            templates[key] = text
+        settings["templates"] = templates
+        scenario[name] = settings
+    return scenario
+
+
+class Stub:
+    """Draws latency, errors and bodies for each call from a scenario."""
+
+    def __init__(self, scenario: Dict[str, Dict[str, Any]], seed: Optional[int] = None):
+        self.scenario = scenario
+        self.rng = random.Random(seed)
+        self.stats: Dict[str, Counter] = {name: Counter() for name in PROVIDERS}
+
+    def latency_s(self, provider: str) -> float:
+        latency = self.scenario[provider]["latency"]
+        if "fixed_s" in latency:
+            return float(latency["fixed_s"])
+        median = float(latency["median_s"])
+        p95 = max(float(latency.get("p95_s", median)), median)
+        sigma = math.log(p95 / median) / _Z95 if median > 0 else 0.0
+        return median * math.exp(self.rng.gauss(0.0, sigma))
+
+    def outcome(self, provider: str) -> str:
+        """An error name from `errors`, else a body template name."""
+        roll = self.rng.random()
+        for name, probability in self.scenario[provider]["errors"].items():
+            if roll < probability:
+                return str(name)
+            roll -= probability
+        bodies = self.scenario[provider]["bodies"]
+        return self.rng.choices(list(bodies), weights=list(bodies.values()))[0]
+
+    async def serve(self, provider: str, model: str, envelope) -> JSONResponse:
+        settings = self.scenario[provider]
+        outcome = self.outcome(provider)
+        self.stats[provider][outcome] += 1
+        if outcome == "timeout":
+            await asyncio.sleep(float(settings["hang_s"]))
+            return JSONResponse({"error": "stub hang elapsed"}, status_code=504)
+        await asyncio.sleep(self.latency_s(provider))
+        if outcome.isdigit():
+            headers = {}
+            if outcome == "429" and settings.get("retry_after_s") is not None:
+                headers["retry-after"] = str(settings["retry_after_s"])
+            return JSONResponse(
+                {"error": {"code": int(outcome), "message": "stub error"}},
+                status_code=int(outcome),
+                headers=headers,
+            )
+        return JSONResponse(envelope(settings["templates"][outcome], model, outcome))
+
+
+def _gemini_envelope(text: str, model: str, outcome: str) -> dict:
+    return {
+        "candidates": [
+            {
+                "content": {"parts": [{"text": text}], "role": "model"},
+                "finishReason": "MAX_TOKENS" if outcome == "truncated" else "STOP",
+            }
+        ],
+        "usageMetadata": {"candidatesTokenCount": len(text)},
+        "modelVersion": model,
+    }
+
+
+def _openai_envelope(text: str, model: str, outcome: str) -> dict:
+    return {
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "length" if outcome == "truncated" else "stop",
+            }
+        ],
+    }
+
+
+def _cloudflare_envelope(text: str, model: str, outcome: str) -> dict:
+    return {"result": {"response": text}, "success": True, "errors": []}
+
+
+def create_app(
+    scenario: Optional[Dict[str, Dict[str, Any]]] = None,
+    seed: Optional[int] = None,
+) -> FastAPI:
+    stub = Stub(scenario or load_scenario(), seed=seed)
+    app = FastAPI(title="mjai stub LLM server")
+    app.state.stub = stub
+
+    @app.post("/v1beta/models/{model}:generateContent")
+    async def gemini(model: str, request: Request):
+        return await stub.serve("gemini", model, _gemini_envelope)
+
+    @app.post("/openai/v1/chat/completions")
+    async def groq(request: Request):
+        body = await request.json()
+        return await stub.serve("groq", body.get("model", ""), _openai_envelope)
+
+    @app.post("/client/v4/accounts/{account}/ai/run/{model:path}")
+    async def cloudflare(account: str, model: str, request: Request):
+        return await stub.serve("cloudflare", model, _cloudflare_envelope)
+
+    @app.post("/local/v1/chat/completions")
+    async def local(request: Request):
+        body = await request.json()
+        return await stub.serve("local", body.get("model", ""), _openai_envelope)
+
+    @app.get("/stats")
+    async def stats():
+        return {name: dict(counter) for name, counter in stub.stats.items()}
+
+    return app
+
+
+def provider_env(base_url: str) -> Dict[str, str]:
+    """Env that points all three providers at a stub listening on `base_url`."""
+    base_url = base_url.rstrip("/")
+    return {
+        "GEMINI_API_BASE": f"{base_url}/v1beta/models",
+        "GROQ_API_URL": f"{base_url}/openai/v1/chat/completions",
+        "CLOUDFLARE_API_BASE": f"{base_url}/client/v4",
+    }
+
+
+def main() -> int:
+    import uvicorn
+
+    port = int(os.environ.get("STUB_LLM_PORT", "8787"))
+    seed_raw = os.environ.get("STUB_LLM_SEED")
+    app = create_app(seed=int(seed_raw) if seed_raw else None)
+    for key, value in provider_env(f"http://127.0.0.1:{port}").items():
+        print(f"{key}={value}")
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
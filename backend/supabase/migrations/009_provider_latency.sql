@@ -0,0 +1,51 @@
+-- Learned LLM call latency, so budget decisions follow how fast each model actually is.
+-- Apply to shared Supabase (SQL editor or CLI) before/with the deploy that reads these rows.
+--
+-- The failover chain decides whether to start or skip each provider from a minimum useful
+-- slice and a timeout per provider (GEMINI_MIN_SLICE_S, GROQ_TIMEOUT, ...). Those were
+-- measured once by hand; backend/app/llm/latency.py now learns them from completed calls.
+-- Each serverless invocation starts cold, so without these rows every instance would
+-- re-learn from the hand-tuned constants.
+--
+-- Rows are state, not history: one decayed summary per (provider, model, input size bucket),
+-- overwritten in place, so cardinality is bounded by providers x models x 4 buckets.
+--
+-- The table's absence is not an error: the application then plans with the static constants,
+-- so this migration and the deploy are order-independent.
+
+CREATE TABLE IF NOT EXISTS provider_latency (
+    -- 'gemini' | 'groq' | 'cloudflare'
+    provider TEXT NOT NULL,
+    -- Model id, or '*' for the provider-wide aggregate used to size a phase before a
+    -- model has been picked.
+    model TEXT NOT NULL,
+    -- Prompt size class by total characters: 's' | 'm' | 'l' | 'xl'.
+    size_bucket TEXT NOT NULL,
+    ewma_s DOUBLE PRECISION NOT NULL,
+    samples INTEGER NOT NULL,
+    -- Decayed counts per log-spaced latency bucket; p50/p95 are read from these.
+    histogram DOUBLE PRECISION[] NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (provider, model, size_bucket)
+);
+
+COMMENT ON TABLE provider_latency IS 'Learned LLM call latency per model and prompt size; shared across serverless invocations';
+COMMENT ON COLUMN provider_latency.model IS 'Model id, or * for the aggregate across the provider''s models';
+COMMENT ON COLUMN provider_latency.histogram IS 'Decayed observation counts per log-spaced latency bucket (see latency.BUCKET_BOUNDS_S)';
+
+ALTER TABLE provider_latency ENABLE ROW LEVEL SECURITY;
+
+-- Same permissive policy as the other tables (per-user scoping is deferred).
+-- Guarded so re-running this migration does not fail on an existing policy.
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_policies
+        WHERE tablename = 'provider_latency'
+          AND policyname = 'Allow all operations for authenticated users'
+    ) THEN
+        CREATE POLICY "Allow all operations for authenticated users"
+            ON provider_latency FOR ALL USING (true);
+    END IF;
+END
+$$;
@@ -0,0 +1,43 @@
+-- Short-lived leases that let serverless instances share one in-flight generation.
+-- Only read when SUGGESTIONS_SINGLEFLIGHT=shared (backend/app/llm/singleflight.py).
+--
+-- A double-click or a second tab can send the same /suggestions request to two
+-- instances at once. The first to insert the lease row generates; the other polls
+-- the row and returns the published result instead of spending its own quota.
+--
+-- Rows are transient: a lease lives at most one request's wall-clock budget, a
+-- published result a few seconds more, and an expired row is taken over in place by
+-- the next request with the same key. Nothing here is history.
+--
+-- The table's absence is not an error: a failed lease read falls back to
+-- generating locally, so this migration and the deploy are order-independent.
+
+CREATE TABLE IF NOT EXISTS generation_leases (
+    -- sha256 of the built messages (singleflight.generation_key); no prompt text.
+    lease_key TEXT PRIMARY KEY,
+    -- Random id of the generating invocation.
+    holder TEXT NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    -- The generation's JSON response once finished; NULL while in flight.
+    result TEXT
+);
+
+COMMENT ON TABLE generation_leases IS 'In-flight /suggestions generations shared across serverless invocations';
+COMMENT ON COLUMN generation_leases.result IS 'Finished response JSON, readable until expires_at; NULL while generating';
+
+ALTER TABLE generation_leases ENABLE ROW LEVEL SECURITY;
+
+-- Same permissive policy as the other tables (per-user scoping is deferred).
+-- Guarded so re-running this migration does not fail on an existing policy.
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_policies
+        WHERE tablename = 'generation_leases'
+          AND policyname = 'Allow all operations for authenticated users'
+    ) THEN
+        CREATE POLICY "Allow all operations for authenticated users"
+            ON generation_leases FOR ALL USING (true);
+    END IF;
+END
+$$;
@@ -0,0 +1,34 @@
+-- Track the rounds queued for speculative prefetch, and keep the source
+-- excerpts of the proposals it stores.
+-- Only read when SUGGESTIONS_PREFETCH is on (backend/app/llm/prefetch.py).
+--
+-- A pending history with no proposals is not necessarily waiting for anything:
+-- the workspace persists every round it generates as pending, including rounds
+-- that came back with zero suggestions. Prefetch therefore only picks rows a
+-- client created with `awaitingPrefetch`:
+--
+--   'queued'  created for prefetch, no proposals yet
+--   'ready'   proposals stored by prefetch, not yet claimed by a client
+--   NULL      everything else, including a claimed prefetched round
+--
+-- Kept apart from `provider`, which keeps recording the transport that
+-- produced the round (api | webllm).
+--
+-- Without this migration prefetch finds nothing to do; every other history read
+-- and write is unaffected, so it and the deploy are order-independent.
+
+ALTER TABLE correction_histories
+  ADD COLUMN IF NOT EXISTS prefetch_state TEXT
+  CHECK (prefetch_state IN ('queued', 'ready'));
+
+ALTER TABLE ai_proposals
+  ADD COLUMN IF NOT EXISTS source_excerpt TEXT;
+
+-- The prefetch tick and the claim read only rows in the queue, which is tiny
+-- compared with the table, so index only those.
+CREATE INDEX IF NOT EXISTS idx_correction_histories_prefetch_state
+  ON correction_histories (prefetch_state, timestamp)
+  WHERE prefetch_state IS NOT NULL;
+
+COMMENT ON COLUMN correction_histories.prefetch_state IS 'queued | ready (prefetched, unclaimed) for SUGGESTIONS_PREFETCH; NULL otherwise';
+COMMENT ON COLUMN ai_proposals.source_excerpt IS 'SOURCE TEXT excerpt the model cited for this proposal (prefetched rounds)';
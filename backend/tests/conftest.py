@@ -12,17 +12,44 @@ if str(BACKEND_DIR) not in sys.path:
 @pytest.fixture(autouse=True)
 def _isolate_provider_state():
     """
-    Clear credential cooldowns and buffered health observations between tests.
+    Clear credential cooldowns, buffered health observations, learned latency,
+    the router scoreboard, cassette replay positions, in-flight generations,
+    Gemini context-cache entries, shared provider HTTP clients, circuit
+    breakers and the thinking-level scoreboard between tests.
 
     These are process-global by design — the failover chain now skips a provider
     whose whole pool is cooled down — so a cooldown left behind by one test would
     silently change which provider another test's chain calls.
     """
+    from app.llm.cassette import reset_cassette_state
+    from app.llm.circuit import reset_circuit_state
+    from app.llm.gemini_cache import reset_gemini_cache_state
+    from app.llm.http_clients import reset_http_clients
     from app.llm.key_pool import reset_key_pool_state
+    from app.llm.latency import reset_latency_state
     from app.llm.provider_health import reset_provider_health_state
+    from app.llm.router import reset_router_state
+    from app.llm.singleflight import reset_singleflight_state
+    from app.llm.thinking import reset_thinking_state
 
     reset_key_pool_state()
     reset_provider_health_state()
+    reset_latency_state()
+    reset_router_state()
+    reset_cassette_state()
+    reset_singleflight_state()
+    reset_gemini_cache_state()
+    reset_http_clients()
+    reset_circuit_state()
+    reset_thinking_state()
     yield
     reset_key_pool_state()
     reset_provider_health_state()
+    reset_latency_state()
+    reset_router_state()
+    reset_cassette_state()
+    reset_singleflight_state()
+    reset_gemini_cache_state()
+    reset_http_clients()
+    reset_circuit_state()
+    reset_thinking_state()
@@ -0,0 +1,121 @@
+"""
+Tests for backend/app/llm/cloudflare_provider.py model selection and rotation
+(ALLOWED_CF_MODELS, per-model cooldown scopes).
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.llm.cloudflare_provider import (
+    ALLOWED_CF_MODELS,
+    CF_MODEL,
+    CloudflareError,
+    CloudflareRateLimitError,
+    CloudflareServerError,
+    call_cloudflare_with_rotation,
+    cloudflare_availability,
+    get_cloudflare_model,
+    select_cloudflare_models,
+)
+from app.llm.key_pool import load_cloudflare_credentials, mark_cooldown
+from app.llm.prompts import build_messages
+from app.llm.provider_output import ProviderOutput
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+OK_BODY = {
+    "success": True,
+    "result": {"response": '{"suggestions":[],"overallComment":"ok"}'},
+}
+
+
+class _FakeResponse:
+    def __init__(self, status_code=200, payload=None):
+        self.status_code = status_code
+        self.text = ""
+        self.headers = {}
+        self._payload = payload or OK_BODY
+
+    def json(self):
+        return self._payload
+
+
+@pytest.fixture
+def cf_env(monkeypatch):
+    monkeypatch.setenv("CLOUDFLARE_ACCOUNT_ID", "acc")
+    monkeypatch.setenv("CLOUDFLARE_API_TOKEN", "tok")
+    monkeypatch.delenv("CLOUDFLARE_MODEL", raising=False)
+
+
+class TestModelSelection:
+    def test_tries_the_70b_before_its_fallback(self, cf_env):
+        for _ in range(10):
+            assert select_cloudflare_models(2) == ALLOWED_CF_MODELS
+        assert select_cloudflare_models(1) == [CF_MODEL]
+        assert get_cloudflare_model() == CF_MODEL
+
+    def test_pinned_model_disables_rotation(self, cf_env, monkeypatch):
+        monkeypatch.setenv("CLOUDFLARE_MODEL", "@cf/custom/model")
+        assert select_cloudflare_models(2) == ["@cf/custom/model"]
+
+    def test_one_models_cooldown_leaves_the_pool_usable(self, cf_env):
+        cred = load_cloudflare_credentials()[0]
+        mark_cooldown(cred.id, 60, scope=ALLOWED_CF_MODELS[0])
+        assert not cloudflare_availability().all_cooled
+        mark_cooldown(cred.id, 60, scope=ALLOWED_CF_MODELS[1])
+        assert cloudflare_availability().all_cooled
+
+
+@pytest.mark.asyncio
+class TestRotation:
+    async def test_rate_limit_moves_to_the_sibling_model(self, cf_env):
+        client = AsyncMock()
+        client.post.side_effect = [_FakeResponse(429), _FakeResponse()]
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            with patch(
+                "app.llm.cloudflare_provider.select_cloudflare_models",
+                return_value=list(ALLOWED_CF_MODELS),
+            ):
+                result = await call_cloudflare_with_rotation(MESSAGES)
+
+        assert result == ProviderOutput(
+            OK_BODY["result"]["response"], ALLOWED_CF_MODELS[1]
+        )
+        urls = [c.args[0] for c in client.post.call_args_list]
+        assert urls[0].endswith(ALLOWED_CF_MODELS[0])
+        assert urls[1].endswith(ALLOWED_CF_MODELS[1])
+        # The 429 cooled the pair down for the first model only.
+        assert not cloudflare_availability().all_cooled
+
+    async def test_server_error_is_typed_and_rotated(self, cf_env):
+        client = AsyncMock()
+        client.post.side_effect = [_FakeResponse(503), _FakeResponse(503)]
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            with pytest.raises(CloudflareServerError):
+                await call_cloudflare_with_rotation(MESSAGES)
+        assert client.post.call_count == 2
+
+    async def test_pinned_model_is_not_retried(self, cf_env, monkeypatch):
+        monkeypatch.setenv("CLOUDFLARE_MODEL", CF_MODEL)
+        client = AsyncMock()
+        client.post.return_value = _FakeResponse(429)
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            with pytest.raises(CloudflareRateLimitError):
+                await call_cloudflare_with_rotation(MESSAGES)
+        assert client.post.call_count == 1
+
+    async def test_long_prompt_only_goes_to_the_model_that_holds_it(self, cf_env):
+        messages = build_messages("原文" * 20_000, "訳文" * 20_000)
+        client = AsyncMock()
+        client.post.return_value = _FakeResponse()
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            result = await call_cloudflare_with_rotation(messages)
+        assert result.model == "@cf/meta/llama-4-scout-17b-16e-instruct"
+
+    async def test_prompt_no_model_holds_fails_without_a_call(self, cf_env):
+        messages = build_messages("原文" * 100_000, "訳文" * 100_000)
+        client = AsyncMock()
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            with pytest.raises(CloudflareError, match="context window"):
+                await call_cloudflare_with_rotation(messages)
+        client.post.assert_not_called()
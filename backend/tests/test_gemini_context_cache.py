@@ -0,0 +1,167 @@
+"""
+Tests for Gemini context caching (`backend/app/llm/gemini_cache.py`) and its use
+in `gemini_provider._call_gemini_once`.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.llm import gemini_cache
+from app.llm.gemini_provider import (
+    GEMINI_API_BASE,
+    _call_gemini_once,
+    _messages_to_gemini_payload,
+)
+from app.llm.prompts import build_messages
+from app.llm.suggestions import LANGUAGE_RETRY_NUDGE
+
+MODEL = "gemini-3.7-flash"
+MESSAGES = build_messages("原文", "訳文")
+
+
+class _FakeResponse:
+    def __init__(self, status_code=200, payload=None):
+        self.status_code = status_code
+        self.text = ""
+        self.headers = {}
+        self._payload = payload or {
+            "candidates": [{"content": {"parts": [{"text": "{}"}]}}]
+        }
+
+    def json(self):
+        return self._payload
+
+
+def _client(*responses):
+    client = AsyncMock()
+    client.post.side_effect = list(responses)
+    client.__aenter__.return_value = client
+    client.__aexit__.return_value = False
+    return client
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setenv("GEMINI_CONTEXT_CACHE", "on")
+
+
+async def _prepare(messages=MESSAGES, api_key="key-one"):
+    payload = _messages_to_gemini_payload(messages)
+    cached = gemini_cache.prepare(api_key, MODEL, messages, payload, GEMINI_API_BASE)
+    # Let a creation this call started finish.
+    await asyncio.gather(*gemini_cache._creating.values())
+    return payload, cached
+
+
+@pytest.mark.asyncio
+class TestPrepare:
+    async def test_off_by_default(self, monkeypatch):
+        monkeypatch.delenv("GEMINI_CONTEXT_CACHE", raising=False)
+        client = _client()
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            _, cached = await _prepare()
+        assert cached is None
+        client.post.assert_not_called()
+
+    async def test_first_call_creates_then_later_calls_reference_it(self, enabled):
+        client = _client(_FakeResponse(payload={"name": "cachedContents/abc"}))
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            _, first = await _prepare()
+            payload, second = await _prepare()
+
+        assert first is None
+        url = client.post.call_args.args[0]
+        assert url.endswith("/v1beta/cachedContents")
+        body = client.post.call_args.kwargs["json"]
+        assert body["model"] == f"models/{MODEL}"
+        assert body["systemInstruction"] == payload["system_instruction"]
+        assert body["contents"] == payload["contents"][:1]
+
+        assert second.payload["cachedContent"] == "cachedContents/abc"
+        assert second.payload["contents"] == payload["contents"][-1:]
+        assert "system_instruction" not in second.payload
+        assert second.payload["generationConfig"] == payload["generationConfig"]
+
+    async def test_nudged_retry_reuses_the_base_entry(self, enabled):
+        nudged = MESSAGES + [{"role": "user", "content": LANGUAGE_RETRY_NUDGE}]
+        base_payload = _messages_to_gemini_payload(MESSAGES)
+        nudged_payload = _messages_to_gemini_payload(nudged)
+        assert gemini_cache.prefix_key(
+            "key-one", MODEL, nudged_payload
+        ) == gemini_cache.prefix_key("key-one", MODEL, base_payload)
+
+        client = _client(_FakeResponse(payload={"name": "cachedContents/abc"}))
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            await _prepare()
+            _, cached = await _prepare(nudged)
+
+        assert client.post.call_count == 1
+        assert cached.payload["cachedContent"] == "cachedContents/abc"
+        # The per-request prompt and the nudge are sent, not cached.
+        assert cached.payload["contents"] == nudged_payload["contents"][1:]
+
+    async def test_failed_creation_is_not_retried_at_once(self, enabled):
+        client = _client(_FakeResponse(status_code=400), _FakeResponse(status_code=400))
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            await _prepare()
+            _, cached = await _prepare()
+        assert cached is None
+        assert client.post.call_count == 1
+
+    async def test_prompt_variants_keep_their_own_entries(self, enabled):
+        # With and without an exemplar the system prompt differs: mixed traffic
+        # must keep both entries rather than each creation deleting the other.
+        with_exemplar = build_messages("原文", "訳文", "模範訳")
+        client = _client(
+            _FakeResponse(payload={"name": "cachedContents/plain"}),
+            _FakeResponse(payload={"name": "cachedContents/exemplar"}),
+        )
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            await _prepare()
+            await _prepare(with_exemplar)
+            _, plain = await _prepare()
+            _, exemplar = await _prepare(with_exemplar)
+
+        assert plain.payload["cachedContent"] == "cachedContents/plain"
+        assert exemplar.payload["cachedContent"] == "cachedContents/exemplar"
+        assert client.post.call_count == 2
+        client.delete.assert_not_called()
+
+    async def test_each_key_gets_its_own_entry(self, enabled):
+        client = _client(_FakeResponse(payload={"name": "cachedContents/abc"}))
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            await _prepare(api_key="key-one")
+            _, cached = await _prepare(api_key="key-two")
+        assert cached is None
+
+    async def test_short_prefix_is_not_cached(self, enabled):
+        short = [
+            {"role": "system", "content": "short"},
+            {"role": "user", "content": "hi"},
+        ]
+        client = _client()
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            _, cached = await _prepare(short)
+        assert cached is None
+        client.post.assert_not_called()
+
+
+@pytest.mark.asyncio
+class TestCachedCall:
+    async def test_rejected_cache_is_retried_uncached(self, enabled):
+        client = _client(
+            _FakeResponse(payload={"name": "cachedContents/gone"}),
+            _FakeResponse(status_code=404),
+            _FakeResponse(),
+        )
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            await _prepare()
+            assert await _call_gemini_once("key-one", MESSAGES, MODEL) == "{}"
+
+        _create, first, second = (c.kwargs["json"] for c in client.post.call_args_list)
+        assert first["cachedContent"] == "cachedContents/gone"
+        assert "cachedContent" not in second
+        assert "system_instruction" in second
+        assert not any(e.name for e in gemini_cache._entries.values())
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import time
 from unittest.mock import AsyncMock, patch
 
 import pytest
@@ -10,18 +11,23 @@ from app.llm.gemini_provider import (
     ALLOWED_GEMINI_MODELS,
     DEFAULT_GEMINI_THINKING_LEVEL,
     GEMINI_MAX_OUTPUT_TOKENS,
+    SHORT_REVIEW_THINKING_LEVEL,
     GeminiError,
     GeminiRateLimitError,
     call_gemini,
     call_gemini_with_rotation,
+    get_gemini_api_base,
     get_gemini_model,
     get_thinking_level,
     is_rotation_enabled,
+    thinking_level_for,
     select_gemini_models,
     _extract_text_from_response,
     _messages_to_gemini_payload,
 )
 from app.llm.key_pool import reset_key_pool_state
+from app.llm.thinking import pass_scope
+from app.llm.tokens import MIN_OUTPUT_TOKENS
 
 # Advertised outputTokenLimit of every model in ALLOWED_GEMINI_MODELS, confirmed
 # via live `GET /v1beta/models/{model}` probes (2026-08). Requesting more than
@@ -52,6 +58,16 @@ class _FakeResponse:
         return self._payload
 
 
+class TestApiBase:
+    def test_default(self, monkeypatch):
+        monkeypatch.delenv("GEMINI_API_BASE", raising=False)
+        assert get_gemini_api_base().startswith("https://generativelanguage.")
+
+    def test_env_override_drops_trailing_slash(self, monkeypatch):
+        monkeypatch.setenv("GEMINI_API_BASE", "http://127.0.0.1:8787/v1beta/models/")
+        assert get_gemini_api_base() == "http://127.0.0.1:8787/v1beta/models"
+
+
 class TestModelSelection:
     def test_pin_disables_rotation(self, monkeypatch):
         monkeypatch.setenv("GEMINI_MODEL", "gemini-flash-latest")
@@ -78,7 +94,9 @@ class TestMessageMapping:
         assert payload["system_instruction"]["parts"][0]["text"] == "sys"
         assert payload["contents"][0]["role"] == "user"
         assert payload["generationConfig"]["responseMimeType"] == "application/json"
-        assert payload["generationConfig"]["maxOutputTokens"] >= 16384
+        # Sized to the prompt (`tokens.output_token_cap`), never above the ceiling.
+        max_output = payload["generationConfig"]["maxOutputTokens"]
+        assert MIN_OUTPUT_TOKENS <= max_output <= GEMINI_MAX_OUTPUT_TOKENS
 
 
 class TestTokenBudget:
@@ -94,11 +112,19 @@ class TestTokenBudget:
 class TestThinkingConfig:
     def test_default_requests_reduced_thinking(self, monkeypatch):
         monkeypatch.delenv("GEMINI_THINKING_LEVEL", raising=False)
-        payload = _messages_to_gemini_payload([{"role": "user", "content": "hi"}])
+        long_review = [{"role": "user", "content": "添削対象" * 500}]
+        payload = _messages_to_gemini_payload(long_review)
         thinking = payload["generationConfig"]["thinkingConfig"]
         assert thinking == {"thinkingLevel": DEFAULT_GEMINI_THINKING_LEVEL}
         assert DEFAULT_GEMINI_THINKING_LEVEL == "low"
 
+    def test_short_review_thinks_least(self, monkeypatch):
+        monkeypatch.delenv("GEMINI_THINKING_LEVEL", raising=False)
+        payload = _messages_to_gemini_payload([{"role": "user", "content": "hi"}])
+        assert payload["generationConfig"]["thinkingConfig"] == {
+            "thinkingLevel": SHORT_REVIEW_THINKING_LEVEL
+        }
+
     def test_uses_thinking_level_not_thinking_budget(self, monkeypatch):
         # gemini-3.6-flash rejects `thinkingBudget` with HTTP 400, so the pooled
         # request must never carry that field.
@@ -124,6 +150,49 @@ class TestThinkingConfig:
         assert get_thinking_level() == DEFAULT_GEMINI_THINKING_LEVEL
 
 
+class TestThinkingPolicy:
+    LONG = [{"role": "user", "content": "添削対象" * 500}]
+    SHORT = [{"role": "user", "content": "hi"}]
+
+    @pytest.fixture(autouse=True)
+    def _unpinned(self, monkeypatch):
+        monkeypatch.delenv("GEMINI_THINKING_LEVEL", raising=False)
+
+    def test_retry_pass_thinks_one_level_harder(self):
+        assert thinking_level_for(self.LONG, attempt=2) == "medium"
+        assert thinking_level_for(self.SHORT, attempt=2) == "low"
+
+    def test_retry_pass_reads_the_enclosing_pass(self):
+        with pass_scope(2):
+            payload = _messages_to_gemini_payload(self.LONG)
+        assert payload["generationConfig"]["thinkingConfig"] == {
+            "thinkingLevel": "medium"
+        }
+
+    def test_close_deadline_forces_minimal(self):
+        deadline = time.monotonic() + 8.0
+        assert thinking_level_for(self.LONG, deadline_monotonic=deadline) == "minimal"
+        assert (
+            thinking_level_for(self.LONG, deadline_monotonic=deadline, attempt=3)
+            == "minimal"
+        )
+
+    def test_retry_without_room_keeps_first_pass_level(self):
+        deadline = time.monotonic() + 20.0
+        assert (
+            thinking_level_for(self.LONG, deadline_monotonic=deadline, attempt=2)
+            == DEFAULT_GEMINI_THINKING_LEVEL
+        )
+
+    def test_pinned_level_is_not_adapted(self, monkeypatch):
+        monkeypatch.setenv("GEMINI_THINKING_LEVEL", "high")
+        deadline = time.monotonic() + 8.0
+        assert (
+            thinking_level_for(self.SHORT, deadline_monotonic=deadline, attempt=2)
+            == "high"
+        )
+
+
 class TestUsageMetadataLogging:
     def test_logs_usage_token_counts(self, caplog):
         import logging
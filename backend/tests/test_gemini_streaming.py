@@ -0,0 +1,164 @@
+"""
+Tests for Gemini's SSE streaming transport (`GEMINI_STREAMING=on` in
+`backend/app/llm/gemini_provider.py`).
+"""
+
+import json
+from contextlib import asynccontextmanager
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.llm.gemini_provider import (
+    GeminiRateLimitError,
+    GeminiServerError,
+    call_gemini_with_rotation,
+)
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+ANSWER = '{"suggestions": [], "overallComment": "好"}'
+
+
+def frame(text, **extra):
+    candidate = {"content": {"parts": [{"text": text}]}, **extra}
+    return "data: " + json.dumps({"candidates": [candidate]}, ensure_ascii=False)
+
+
+class _StreamResponse:
+    def __init__(self, status_code=200, lines=(), body=None):
+        self.status_code = status_code
+        self.headers = {}
+        self._lines = list(lines)
+        self._body = body or {}
+        self.text = json.dumps(self._body)
+        self.read_lines = 0
+
+    async def aiter_lines(self):
+        for line in self._lines:
+            self.read_lines += 1
+            yield line
+
+    async def aread(self):
+        return self.text.encode()
+
+    def json(self):
+        return self._body
+
+
+def streaming_client(*responses):
+    client = MagicMock()
+    calls = []
+    queue = list(responses)
+
+    @asynccontextmanager
+    async def stream(method, url, **kwargs):
+        calls.append((method, url, kwargs))
+        yield queue.pop(0)
+
+    client.stream = stream
+    client.calls = calls
+    return client
+
+
+@pytest.fixture(autouse=True)
+def streaming(monkeypatch):
+    monkeypatch.setenv("GEMINI_STREAMING", "on")
+    monkeypatch.setenv("GEMINI_API_KEY", "key-one")
+    monkeypatch.delenv("GEMINI_API_KEYS", raising=False)
+
+
+@pytest.mark.asyncio
+class TestStreaming:
+    async def test_stops_reading_once_the_answer_is_whole(self, monkeypatch):
+        monkeypatch.setenv("GEMINI_MODEL", "gemini-3.7-flash")
+        response = _StreamResponse(
+            lines=[
+                frame(ANSWER[:20]),
+                "",
+                frame(ANSWER[20:]),
+                frame("", finishReason="STOP"),
+                'data: {"usageMetadata": {"totalTokenCount": 9}}',
+            ]
+        )
+        client = streaming_client(response)
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            result = await call_gemini_with_rotation(MESSAGES)
+
+        assert result.text == ANSWER
+        assert response.read_lines == 3
+        method, url, kwargs = client.calls[0]
+        assert method == "POST"
+        assert url.endswith("/gemini-3.7-flash:streamGenerateContent?alt=sse")
+        assert kwargs["headers"]["x-goog-api-key"] == "key-one"
+
+    async def test_unfinished_answer_returns_what_arrived(self, monkeypatch):
+        monkeypatch.setenv("GEMINI_MODEL", "gemini-3.7-flash")
+        client = streaming_client(
+            _StreamResponse(lines=[frame('{"suggestions": ['), frame("", finishReason="MAX_TOKENS")])
+        )
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            result = await call_gemini_with_rotation(MESSAGES)
+        assert result.text == '{"suggestions": ['
+
+    async def test_metadata_is_logged_once_per_stream(self, monkeypatch, caplog):
+        monkeypatch.setenv("GEMINI_MODEL", "gemini-3.7-flash")
+
+        def counted(text, tokens, **extra):
+            candidate = {"content": {"parts": [{"text": text}]}, **extra}
+            return "data: " + json.dumps(
+                {"candidates": [candidate], "usageMetadata": {"totalTokenCount": tokens}}
+            )
+
+        client = streaming_client(
+            _StreamResponse(
+                lines=[
+                    counted('{"suggestions": [', 5),
+                    counted('{"id": "1"', 9),
+                    counted("", 12, finishReason="MAX_TOKENS"),
+                ]
+            )
+        )
+        with caplog.at_level("INFO", logger="app.llm.gemini_provider"):
+            with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+                await call_gemini_with_rotation(MESSAGES)
+
+        usage = [r.message for r in caplog.records if "Gemini usage" in r.message]
+        finish = [r.message for r in caplog.records if "finishReason" in r.message]
+        assert len(usage) == 1 and "total=12" in usage[0]
+        assert finish == ["Gemini finishReason=MAX_TOKENS"]
+
+    async def test_rate_limit_is_typed_and_rotates_models(self, monkeypatch):
+        monkeypatch.delenv("GEMINI_MODEL", raising=False)
+        retry_info = {
+            "error": {
+                "details": [
+                    {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "37s"}
+                ]
+            }
+        }
+        client = streaming_client(
+            _StreamResponse(status_code=429, body=retry_info),
+            _StreamResponse(lines=[frame(ANSWER)]),
+        )
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            with patch(
+                "app.llm.gemini_provider.select_gemini_models",
+                return_value=["gemini-3.7-flash", "gemini-3.6-flash"],
+            ):
+                result = await call_gemini_with_rotation(MESSAGES)
+
+        assert result == (ANSWER, "gemini-3.6-flash")
+
+    async def test_pinned_model_raises_the_typed_error(self, monkeypatch):
+        monkeypatch.setenv("GEMINI_MODEL", "gemini-3.7-flash")
+        client = streaming_client(_StreamResponse(status_code=429))
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            with pytest.raises(GeminiRateLimitError):
+                await call_gemini_with_rotation(MESSAGES)
+
+    async def test_server_error_is_typed(self, monkeypatch):
+        monkeypatch.setenv("GEMINI_MODEL", "gemini-3.7-flash")
+        client = streaming_client(_StreamResponse(status_code=503))
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            with pytest.raises(GeminiServerError):
+                await call_gemini_with_rotation(MESSAGES)
@@ -13,6 +13,8 @@ import pytest
 from app.llm.groq_provider import (
     ALLOWED_GROQ_MODELS,
     DEFAULT_GROQ_MODEL,
+    GROQ_API_URL,
+    get_groq_api_url,
     get_groq_model,
     is_rotation_enabled,
     select_groq_models,
@@ -23,6 +25,7 @@ from app.llm.groq_provider import (
     GroqServerError,
     GroqTimeoutError,
 )
+from app.llm.http_clients import reset_http_clients
 
 
 class TestGetGroqModel:
@@ -42,6 +45,17 @@ class TestGetGroqModel:
         assert get_groq_model() == DEFAULT_GROQ_MODEL
 
 
+class TestGetGroqApiUrl:
+    def test_default_when_unset(self, monkeypatch):
+        monkeypatch.delenv("GROQ_API_URL", raising=False)
+        assert get_groq_api_url() == GROQ_API_URL
+
+    def test_env_override(self, monkeypatch):
+        url = "http://127.0.0.1:8787/openai/v1/chat/completions"
+        monkeypatch.setenv("GROQ_API_URL", url)
+        assert get_groq_api_url() == url
+
+
 class TestIsRotationEnabled:
     def test_enabled_when_unset(self, monkeypatch):
         monkeypatch.delenv("GROQ_MODEL", raising=False)
@@ -87,6 +101,7 @@ class TestSelectGroqModels:
 
 class _FakeResponse:
     status_code = 200
+    headers: dict = {}
 
     def json(self):
         return {"choices": [{"message": {"content": "{}"}}]}
@@ -169,6 +184,9 @@ class TestCallGroqUsesConfiguredModel:
         monkeypatch.delenv("GROQ_MODEL", raising=False)
 
         for model in ("openai/gpt-oss-120b", "openai/gpt-oss-20b"):
+            # Each model gets a fresh mock, so drop the shared client built on
+            # the previous one.
+            reset_http_clients()
             mock_client = AsyncMock()
             mock_client.post.return_value = _FakeResponse()
             mock_client.__aenter__.return_value = mock_client
@@ -0,0 +1,145 @@
+"""
+Tests for Groq's SSE streaming transport (`GROQ_STREAMING=on` in
+`backend/app/llm/groq_provider.py`).
+"""
+
+import json
+from contextlib import asynccontextmanager
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.llm.groq_provider import (
+    GroqRateLimitError,
+    GroqServerError,
+    _ThinkFilter,
+    call_groq,
+)
+from app.llm.timeline import recording
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+ANSWER = '{"suggestions": [], "overallComment": "好"}'
+
+
+def chunk(content=None, reasoning=None, **extra):
+    delta = {}
+    if content is not None:
+        delta["content"] = content
+    if reasoning is not None:
+        delta["reasoning"] = reasoning
+    body = {"choices": [{"index": 0, "delta": delta}], **extra}
+    return "data: " + json.dumps(body, ensure_ascii=False)
+
+
+class _StreamResponse:
+    def __init__(self, status_code=200, lines=(), text="", headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = text
+        self._lines = list(lines)
+        self.read_lines = 0
+
+    async def aiter_lines(self):
+        for line in self._lines:
+            self.read_lines += 1
+            yield line
+
+    async def aread(self):
+        return self.text.encode()
+
+
+def streaming_client(*responses):
+    client = MagicMock()
+    calls = []
+    queue = list(responses)
+
+    @asynccontextmanager
+    async def stream(method, url, **kwargs):
+        calls.append((method, url, kwargs))
+        yield queue.pop(0)
+
+    client.stream = stream
+    client.calls = calls
+    return client
+
+
+@pytest.fixture(autouse=True)
+def streaming(monkeypatch):
+    monkeypatch.setenv("GROQ_STREAMING", "on")
+    monkeypatch.setenv("GROQ_API_KEY", "key-one")
+    monkeypatch.delenv("GROQ_API_KEYS", raising=False)
+    monkeypatch.setenv("GROQ_MODEL", "openai/gpt-oss-20b")
+
+
+@pytest.mark.asyncio
+class TestStreaming:
+    async def test_drops_reasoning_and_stops_once_the_answer_is_whole(self):
+        response = _StreamResponse(
+            lines=[
+                chunk(reasoning="The user wants {a review}."),
+                chunk(content=ANSWER[:15]),
+                "",
+                chunk(content=ANSWER[15:]),
+                chunk(content="\n"),
+                "data: [DONE]",
+            ]
+        )
+        client = streaming_client(response)
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            with recording() as timeline:
+                assert await call_groq(MESSAGES) == ANSWER
+
+        assert response.read_lines == 4
+        method, url, kwargs = client.calls[0]
+        assert method == "POST"
+        assert url.endswith("/chat/completions")
+        assert kwargs["json"]["stream"] is True
+        assert "response_format" not in kwargs["json"]
+        stream_span = next(e for e in timeline.as_debug() if e["name"] == "groq_stream")
+        assert stream_span["model"] == "openai/gpt-oss-20b"
+        assert stream_span["ttfb_ms"] >= 0
+        assert stream_span["tokens"] > 0
+
+    async def test_reported_usage_counts_tokens(self):
+        response = _StreamResponse(
+            lines=[
+                chunk(content='{"suggestions": ['),
+                chunk(x_groq={"usage": {"completion_tokens": 42}}),
+                "data: [DONE]",
+            ]
+        )
+        with patch(
+            "app.llm.http_clients.httpx.AsyncClient",
+            return_value=streaming_client(response),
+        ):
+            with recording() as timeline:
+                assert await call_groq(MESSAGES) == '{"suggestions": ['
+        stream_span = next(e for e in timeline.as_debug() if e["name"] == "groq_stream")
+        assert stream_span["tokens"] == 42
+
+    async def test_rate_limit_is_typed_with_retry_hint(self):
+        client = streaming_client(
+            _StreamResponse(status_code=429, headers={"retry-after": "7"})
+        )
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            with pytest.raises(GroqRateLimitError):
+                await call_groq(MESSAGES)
+
+    async def test_server_error_is_typed(self):
+        client = streaming_client(_StreamResponse(status_code=503))
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            with pytest.raises(GroqServerError):
+                await call_groq(MESSAGES)
+
+
+class TestThinkFilter:
+    def test_drops_think_blocks_split_across_deltas(self):
+        think = _ThinkFilter()
+        parts = ["<thi", "nk>plan {x}</th", "ink>", '{"a"', ": 1}"]
+        assert "".join(think.feed(p) for p in parts) == '{"a": 1}'
+
+    def test_passes_plain_text_through(self):
+        think = _ThinkFilter()
+        assert think.feed("a < b") == "a < b"
+        assert think.feed("<") == ""
+        assert think.feed("p>") == "<p>"
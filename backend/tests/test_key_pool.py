@@ -18,8 +18,14 @@ from app.llm.key_pool import (
     load_cloudflare_credentials,
     load_gemini_credentials,
     load_groq_credentials,
+    RateLimitReading,
+    in_flight,
     mark_cooldown,
+    note_rate_limits,
+    pool_availability,
+    ready_pair_count,
     redact_secret,
+    release_soonest_cooldown,
     reset_key_pool_state,
 )
 from app.llm.groq_provider import (
@@ -29,6 +35,7 @@ from app.llm.groq_provider import (
 )
 from app.llm.cloudflare_provider import call_cloudflare, CloudflareRateLimitError
 from app.llm.gemini_provider import call_gemini, GeminiRateLimitError
+from app.llm.provider_health import parse_rate_limit_headers
 
 
 @pytest.fixture(autouse=True)
@@ -177,6 +184,148 @@ class TestAcquireAndCooldown:
         assert acquire_groq() is None
 
 
+class TestPoolIndex:
+    def test_pool_is_parsed_once_until_env_changes(self, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEYS", "k1,k2")
+        first = load_groq_credentials()
+        assert load_groq_credentials() is first
+        monkeypatch.setenv("GROQ_API_KEYS", "k1,k2,k3")
+        assert [c.api_key for c in load_groq_credentials()] == ["k1", "k2", "k3"]
+
+    def test_cooldown_marked_before_the_index_exists(self, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEYS", "k1,k2")
+        k1 = load_groq_credentials()[0]
+        mark_cooldown(k1.id, seconds=60, scope="m")
+        assert ready_pair_count(load_groq_credentials(), ["m", "other"]) == 3
+        assert acquire_groq(cooldown_scope="m").api_key == "k2"
+
+    def test_expired_cooldown_returns_to_the_ready_set(self, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEYS", "k1,k2")
+        creds = load_groq_credentials()
+        assert ready_pair_count(creds) == 2
+        mark_cooldown(creds[0].id, seconds=0.05)
+        assert ready_pair_count(creds) == 1
+        time.sleep(0.08)
+        assert ready_pair_count(creds) == 2
+
+    def test_later_cooldown_supersedes_an_earlier_expiry(self, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEYS", "k1")
+        creds = load_groq_credentials()
+        mark_cooldown(creds[0].id, seconds=0.05)
+        mark_cooldown(creds[0].id, seconds=60)
+        time.sleep(0.08)
+        state = pool_availability(creds)
+        assert state.all_cooled is True
+        assert state.recover_in_s > 50
+
+    def test_release_frees_the_soonest_pair(self, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEYS", "k1,k2")
+        k1, k2 = creds = load_groq_credentials()
+        mark_cooldown(k1.id, seconds=120, scope="m")
+        mark_cooldown(k2.id, seconds=30, scope="other")
+        mark_cooldown(k2.id, seconds=60, scope="m")
+        assert release_soonest_cooldown(creds, ["m"]) == k2.id
+        assert acquire_groq(cooldown_scope="m").api_key == "k2"
+        assert acquire_groq(cooldown_scope="other").api_key == "k1"
+
+
+class TestLeastLoadedSelection:
+    def test_round_robin_ignores_load_by_default(self, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEYS", "k1,k2")
+        k1 = load_groq_credentials()[0]
+        with in_flight(k1.id):
+            assert acquire_groq().api_key == "k1"
+
+    def test_busy_key_is_passed_over(self, monkeypatch):
+        monkeypatch.setenv("LLM_KEY_SELECTION", "least_loaded")
+        monkeypatch.setenv("GROQ_API_KEYS", "k1,k2,k3")
+        k1, k2, _ = load_groq_credentials()
+        with in_flight(k1.id, scope="m"), in_flight(k2.id, scope="m"):
+            assert acquire_groq(cooldown_scope="m").api_key == "k3"
+            # Load on another model does not count against this one.
+            assert acquire_groq(cooldown_scope="other").api_key == "k1"
+        # Released on exit: all idle again, so the ring order decides.
+        assert acquire_groq(cooldown_scope="m").api_key == "k2"
+        assert acquire_groq(cooldown_scope="m").api_key == "k3"
+
+    def test_recent_token_spend_breaks_equal_in_flight(self, monkeypatch):
+        monkeypatch.setenv("LLM_KEY_SELECTION", "least_loaded")
+        monkeypatch.setenv("GROQ_API_KEYS", "k1,k2")
+        k1 = load_groq_credentials()[0]
+        with in_flight(k1.id, tokens=5000):
+            pass
+        assert [acquire_groq().api_key for _ in range(2)] == ["k2", "k2"]
+
+    def test_spend_is_trimmed_without_least_loaded_reads(self, monkeypatch):
+        from app.llm import key_pool
+
+        monkeypatch.setattr(key_pool, "LOAD_WINDOW_S", 0.0)
+        for _ in range(5):
+            with in_flight("groq:k1", tokens=100):
+                pass
+        assert len(key_pool._spend["groq:k1"]) == 1
+
+    def test_cooled_down_key_is_never_least_loaded(self, monkeypatch):
+        monkeypatch.setenv("LLM_KEY_SELECTION", "least_loaded")
+        monkeypatch.setenv("GROQ_API_KEYS", "k1,k2")
+        k1, k2 = load_groq_credentials()
+        mark_cooldown(k2.id, seconds=60)
+        with in_flight(k1.id):
+            assert acquire_groq().api_key == "k1"
+
+
+class TestSoftCooldown:
+    def test_nearly_exhausted_key_is_passed_over(self, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEYS", "k1,k2")
+        k1 = load_groq_credentials()[0]
+        note_rate_limits(
+            k1.id, {"requests": RateLimitReading(remaining=0, limit=30, reset_s=60)}
+        )
+        assert [acquire_groq().api_key for _ in range(3)] == ["k2", "k2", "k2"]
+
+    def test_soft_cooled_key_is_used_when_alone(self, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEYS", "k1,k2")
+        k1, k2 = load_groq_credentials()
+        mark_cooldown(k2.id, seconds=60)
+        note_rate_limits(k1.id, {"tokens": RateLimitReading(remaining=100)})
+        assert acquire_groq().api_key == "k1"
+
+    def test_readings_are_scoped(self, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEYS", "k1,k2")
+        k1 = load_groq_credentials()[0]
+        note_rate_limits(
+            k1.id, {"requests": RateLimitReading(remaining=0)}, scope="model-a"
+        )
+        assert acquire_groq(cooldown_scope="model-a").api_key == "k2"
+        assert acquire_groq(cooldown_scope="model-b").api_key == "k1"
+
+    def test_bucket_refills_towards_reset(self, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEYS", "k1,k2")
+        k1 = load_groq_credentials()[0]
+        note_rate_limits(
+            k1.id,
+            {"tokens": RateLimitReading(remaining=0, limit=6000, reset_s=0.05)},
+        )
+        assert acquire_groq().api_key == "k2"
+        time.sleep(0.08)
+        assert acquire_groq().api_key == "k1"
+
+    def test_parses_groq_headers(self):
+        readings = parse_rate_limit_headers(
+            {
+                "x-ratelimit-limit-requests": "1000",
+                "x-ratelimit-remaining-requests": "998",
+                "x-ratelimit-reset-requests": "2m52.8s",
+                "x-ratelimit-limit-tokens": "6000",
+                "x-ratelimit-remaining-tokens": "1200",
+                "x-ratelimit-reset-tokens": "48s",
+            }
+        )
+        assert readings["requests"] == RateLimitReading(998, 1000, 172.8)
+        assert readings["tokens"] == RateLimitReading(1200, 6000, 48.0)
+        assert parse_rate_limit_headers({}) == {}
+
+
 class _FakeResponse:
     def __init__(self, status_code=200, text="", payload=None, headers=None):
         self.status_code = status_code
@@ -368,6 +517,32 @@ class TestProviderKeyFallback:
             with pytest.raises(CloudflareRateLimitError):
                 await call_cloudflare([{"role": "user", "content": "hi"}])
 
+    async def test_groq_success_headers_steer_next_key(self, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEYS", "key-a,key-b")
+        monkeypatch.delenv("GROQ_API_KEY", raising=False)
+        monkeypatch.delenv("GROQ_MODEL", raising=False)
+
+        low = {
+            "x-ratelimit-limit-tokens": "6000",
+            "x-ratelimit-remaining-tokens": "300",
+            "x-ratelimit-reset-tokens": "50s",
+        }
+        mock_client = AsyncMock()
+        mock_client.post.side_effect = [
+            _FakeResponse(status_code=200, headers=low),
+            _FakeResponse(status_code=200),
+            _FakeResponse(status_code=200),
+        ]
+        with patch("app.llm.groq_provider.httpx.AsyncClient", return_value=mock_client):
+            for _ in range(3):
+                await call_groq([{"role": "user", "content": "hi"}])
+
+        auth_headers = [
+            c.kwargs["headers"]["Authorization"] for c in mock_client.post.call_args_list
+        ]
+        # key-a reported its token budget nearly spent: key-b takes the rest.
+        assert auth_headers == ["Bearer key-a", "Bearer key-b", "Bearer key-b"]
+
 
 class TestCloudflareAcquire:
     def test_acquire_cloudflare_round_robin(self, monkeypatch):
@@ -0,0 +1,93 @@
+"""
+Tests for partial acceptance (`backend/app/llm/acceptance.py`) and its place in
+`generate_suggestions()`.
+
+The policy must never change anything when unset, must only ever accept a body
+whose failures are confined to a minority of items, and must say which items it
+dropped or flagged.
+"""
+
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.llm.acceptance import accept_partially
+from app.llm.parser import JSON_EXTRACTION_FAILURE_MESSAGE, PROBLEM_JAPANESE_PROSE
+from app.llm.suggestions import generate_suggestions
+from tests.test_llm_repair import GOOD_REASON, JAPANESE_REASON, body, repair_reply
+
+MOSTLY_GOOD = body(*([GOOD_REASON] * 4), JAPANESE_REASON)
+
+
+@pytest.fixture
+def drop(monkeypatch):
+    monkeypatch.setenv("SUGGESTIONS_ACCEPT_POLICY", "drop")
+
+
+class TestAcceptPartially:
+    def test_off_by_default(self, monkeypatch):
+        monkeypatch.delenv("SUGGESTIONS_ACCEPT_POLICY", raising=False)
+        assert accept_partially(MOSTLY_GOOD) is None
+
+    def test_drop_removes_failing_items(self, drop):
+        accepted, diagnostics = accept_partially(MOSTLY_GOOD)
+        assert [s["id"] for s in accepted["suggestions"]] == ["1", "2", "3", "4"]
+        assert diagnostics == (
+            {"id": "5", "problems": [PROBLEM_JAPANESE_PROSE], "action": "dropped"},
+        )
+
+    def test_flag_keeps_items_with_their_problems(self, monkeypatch):
+        monkeypatch.setenv("SUGGESTIONS_ACCEPT_POLICY", "flag")
+        accepted, diagnostics = accept_partially(MOSTLY_GOOD)
+        assert len(accepted["suggestions"]) == 5
+        assert accepted["suggestions"][4]["problems"] == [PROBLEM_JAPANESE_PROSE]
+        assert "problems" not in accepted["suggestions"][0]
+        assert diagnostics[0]["action"] == "flagged"
+
+    def test_below_the_threshold_is_not_accepted(self, drop, monkeypatch):
+        assert accept_partially(body(GOOD_REASON, JAPANESE_REASON)) is None
+        monkeypatch.setenv("SUGGESTIONS_ACCEPT_MIN_SHARE", "0.5")
+        assert accept_partially(body(GOOD_REASON, JAPANESE_REASON)) is not None
+
+    def test_bad_overall_comment_is_never_accepted(self, drop):
+        bad_comment = {**MOSTLY_GOOD, "overallComment": JAPANESE_REASON}
+        assert accept_partially(bad_comment) is None
+
+    def test_parse_failure_is_never_accepted(self, drop):
+        failure = {"suggestions": [], "overallComment": JSON_EXTRACTION_FAILURE_MESSAGE}
+        assert accept_partially(failure) is None
+
+    def test_clean_body_needs_nothing(self, drop):
+        assert accept_partially(body(GOOD_REASON)) is None
+
+
+@pytest.mark.asyncio
+class TestAcceptanceInTheChain:
+    async def test_accepted_body_needs_no_repair_or_retry(self):
+        first = json.dumps(MOSTLY_GOOD, ensure_ascii=False)
+        env = {"GROQ_API_KEY": "test-key", "SUGGESTIONS_ACCEPT_POLICY": "drop"}
+        with patch.dict("os.environ", env, clear=True):
+            with patch(
+                "app.llm.suggestions.call_groq_with_rotation",
+                new=AsyncMock(return_value=first),
+            ) as mock_groq:
+                result = await generate_suggestions("原文", "訳文")
+
+        assert mock_groq.call_count == 1
+        assert len(result["suggestions"]) == 4
+        assert result["itemDiagnostics"][0]["id"] == "5"
+        assert result["llmProvider"] == "groq"
+
+    async def test_unset_policy_keeps_the_repair_path(self):
+        first = json.dumps(MOSTLY_GOOD, ensure_ascii=False)
+        with patch.dict("os.environ", {"GROQ_API_KEY": "test-key"}, clear=True):
+            with patch(
+                "app.llm.suggestions.call_groq_with_rotation", new_callable=AsyncMock
+            ) as mock_groq:
+                mock_groq.side_effect = [first, repair_reply(**{"5": GOOD_REASON})]
+                result = await generate_suggestions("原文", "訳文")
+
+        assert mock_groq.call_count == 2
+        assert len(result["suggestions"]) == 5
+        assert "itemDiagnostics" not in result
@@ -0,0 +1,261 @@
+"""
+Tests for batch generation (`backend/app/llm/batch.py`) and the
+`POST /suggestions/batch` endpoint.
+
+The scheduler's job is to keep in-flight items at the number of ready
+(credential, model) pairs, so the concurrency assertions below are the point;
+result shape and ordering come second.
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.llm import batch
+from app.llm.batch import (
+    BATCH_MAX_CONCURRENCY,
+    NOT_ATTEMPTED_ERROR,
+    batch_concurrency,
+    run_batch,
+)
+from app.llm.key_pool import load_groq_credentials, mark_cooldown
+from app.llm.suggestions import SuggestionsError
+from tests.test_llm_suggestions import FakeClock, VALID_LLM_RESPONSE
+
+
+def items(n):
+    return [{"originalText": f"原{i}", "targetText": f"訳{i}"} for i in range(n)]
+
+
+async def collect(gen):
+    return [r async for r in gen]
+
+
+@pytest.fixture(autouse=True)
+def _groq_pool(monkeypatch):
+    for name in (
+        "GEMINI_API_KEY",
+        "GEMINI_API_KEYS",
+        "CLOUDFLARE_ACCOUNT_ID",
+        "CLOUDFLARE_ACCOUNT_IDS",
+        "GROQ_API_KEY",
+    ):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("GROQ_API_KEYS", "k1,k2,k3")
+    # One model, so the pool has exactly one ready pair per key.
+    monkeypatch.setenv("GROQ_MODEL", "m1")
+
+
+class TestConcurrency:
+    def test_bounded_by_ready_pairs(self):
+        assert batch_concurrency() == 3
+
+    def test_cooldowns_narrow_the_bound(self):
+        for cred in load_groq_credentials()[:2]:
+            mark_cooldown(cred.id, 60.0, scope="m1")
+        assert batch_concurrency() == 1
+
+    def test_never_zero_even_when_everything_is_cooled(self):
+        for cred in load_groq_credentials():
+            mark_cooldown(cred.id, 60.0, scope="m1")
+        assert batch_concurrency() == 1
+
+    def test_bounded_by_the_first_provider_only(self, monkeypatch):
+        # Gemini is first in the chain: every item starts there, so Groq's three
+        # pairs must not widen the fan-out onto Gemini's two.
+        monkeypatch.setenv("GEMINI_API_KEYS", "g1,g2")
+        monkeypatch.setenv("GEMINI_MODEL", "gemini-3.7-flash")
+        assert batch_concurrency() == 2
+
+    def test_cooled_first_provider_hands_the_bound_on(self, monkeypatch):
+        monkeypatch.setenv("GEMINI_API_KEYS", "g1")
+        monkeypatch.setenv("GEMINI_MODEL", "gemini-3.7-flash")
+        from app.llm.key_pool import load_gemini_credentials
+
+        mark_cooldown(
+            load_gemini_credentials()[0].id, 60.0, scope="gemini-3.7-flash"
+        )
+        assert batch_concurrency() == 3
+
+    def test_capped_for_large_pools(self, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEYS", ",".join(f"k{i}" for i in range(20)))
+        assert batch_concurrency() == BATCH_MAX_CONCURRENCY
+
+
+@pytest.mark.asyncio
+class TestRunBatch:
+    async def test_in_flight_items_never_exceed_the_pool(self):
+        in_flight = 0
+        peak = 0
+
+        async def generate(original, target, *args, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {"suggestions": [], "overallComment": original}
+
+        with patch.object(batch, "generate_suggestions", new=generate):
+            results = await collect(run_batch(items(7)))
+
+        assert peak == 3
+        assert sorted(r["index"] for r in results) == list(range(7))
+        assert all(r["ok"] for r in results)
+        assert results[0]["result"]["overallComment"].startswith("原")
+
+    async def test_a_refusal_mid_batch_slows_the_rest(self):
+        in_flight = 0
+        peaks = []
+
+        async def generate(original, target, *args, **kwargs):
+            nonlocal in_flight
+            in_flight += 1
+            peaks.append(in_flight)
+            if original == "原0":
+                for cred in load_groq_credentials()[:2]:
+                    mark_cooldown(cred.id, 60.0, scope="m1")
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {"suggestions": [], "overallComment": ""}
+
+        with patch.object(batch, "generate_suggestions", new=generate):
+            await collect(run_batch(items(6)))
+
+        # The first wave started before the refusal; after it, one at a time.
+        assert peaks[:3] == [1, 2, 3]
+        assert max(peaks[3:]) == 1
+
+    async def test_item_failures_are_reported_per_item(self):
+        async def generate(original, target, *args, **kwargs):
+            if original == "原1":
+                raise SuggestionsError("all providers failed", rate_limited=True)
+            return {"suggestions": [], "overallComment": ""}
+
+        def details(e):
+            return {"error": "ignored", "rate_limited": e.rate_limited}
+
+        bad = {"originalText": "", "targetText": "訳"}
+        with patch.object(batch, "generate_suggestions", new=generate):
+            results = await collect(
+                run_batch(items(2) + [bad], error_details=details)
+            )
+
+        by_index = {r["index"]: r for r in results}
+        assert by_index[0]["ok"] is True
+        assert by_index[1]["status"] == 503
+        assert by_index[1]["error"] == "all providers failed"
+        assert by_index[1]["rate_limited"] is True
+        assert by_index[2]["status"] == 400
+
+    async def test_an_unexpected_error_fails_only_its_item(self):
+        async def generate(original, target, *args, **kwargs):
+            if original == "原0":
+                raise KeyError("choices")
+            return {"suggestions": [], "overallComment": ""}
+
+        with patch.object(batch, "generate_suggestions", new=generate):
+            results = await collect(run_batch(items(3)))
+
+        by_index = {r["index"]: r for r in results}
+        assert by_index[0]["ok"] is False
+        assert by_index[0]["status"] == 500
+        assert by_index[1]["ok"] and by_index[2]["ok"]
+
+    async def test_items_that_cannot_start_in_time_are_not_attempted(self):
+        clock = FakeClock()
+        started = []
+
+        async def generate(original, target, *args, **kwargs):
+            started.append(original)
+            clock.advance(40.0)
+            return {"suggestions": [], "overallComment": ""}
+
+        with patch.object(batch, "generate_suggestions", new=generate):
+            with patch("app.llm.batch.seconds_left", lambda d: d - clock()):
+                results = await collect(
+                    run_batch(items(5), deadline_monotonic=clock() + 45.0)
+                )
+
+        assert len(started) == 3
+        skipped = [r for r in results if not r["ok"]]
+        assert [r["error"] for r in skipped] == [NOT_ATTEMPTED_ERROR] * 2
+
+
+class TestBatchEndpoint:
+    @pytest.fixture
+    def client(self, monkeypatch):
+        import time as time_module
+
+        import jwt
+        from fastapi.testclient import TestClient
+
+        secret = "test-secret-value"
+        email = "owner@example.com"
+        monkeypatch.setenv("SUPABASE_JWT_SECRET", secret)
+        monkeypatch.setenv("ALLOWED_USER_EMAIL", email)
+        monkeypatch.setenv("ALLOWED_USER_EMAILS", email)
+
+        now = int(time_module.time())
+        token = jwt.encode(
+            {"email": email, "aud": "authenticated", "iat": now, "exp": now + 3600},
+            secret,
+            algorithm="HS256",
+        )
+        from app.main import app
+
+        async def shared_read(_key):
+            return None, []
+
+        with patch("app.db_helper.fetch_setting_and_provider_health", new=shared_read):
+            with patch(
+                "app.llm.suggestions.call_groq_with_rotation",
+                new=AsyncMock(return_value=VALID_LLM_RESPONSE),
+            ):
+                yield TestClient(app), {"Authorization": f"Bearer {token}"}
+
+    def test_results_come_back_in_item_order(self, client):
+        test_client, headers = client
+        response = test_client.post(
+            "/suggestions/batch", headers=headers, json={"items": items(4)}
+        )
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["index"] for r in results] == [0, 1, 2, 3]
+        assert all(r["result"]["llmProvider"] == "groq" for r in results)
+
+    def test_streaming_returns_one_json_line_per_item(self, client):
+        test_client, headers = client
+        response = test_client.post(
+            "/api/suggestions/batch",
+            headers=headers,
+            json={"items": items(3), "stream": True},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert sorted(line["index"] for line in lines) == [0, 1, 2]
+
+    def test_stream_false_string_returns_one_json_body(self, client):
+        test_client, headers = client
+        response = test_client.post(
+            "/suggestions/batch",
+            headers=headers,
+            json={"items": items(2), "stream": "false"},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/json")
+        assert len(response.json()["results"]) == 2
+
+    def test_rejects_an_empty_or_oversized_batch(self, client):
+        test_client, headers = client
+        assert test_client.post(
+            "/suggestions/batch", headers=headers, json={"items": []}
+        ).status_code == 400
+        assert test_client.post(
+            "/suggestions/batch",
+            headers=headers,
+            json={"items": items(batch.BATCH_MAX_ITEMS + 1)},
+        ).status_code == 400
@@ -127,7 +127,7 @@ class TestProviderCallsCannotOutliveTheDeadline:
         clock = FakeClock()
         granted: list[float] = []
 
-        async def capture(api_key, messages, model, timeout):
+        async def capture(api_key, messages, model, timeout, **_kwargs):
             granted.append(timeout)
             return VALID_LLM_RESPONSE
 
@@ -167,7 +167,7 @@ class TestProviderCallsCannotOutliveTheDeadline:
         clock = FakeClock()
         granted: list[float] = []
 
-        async def timing_out(api_key, messages, model, timeout):
+        async def timing_out(api_key, messages, model, timeout, **_kwargs):
             granted.append(timeout)
             clock.advance(timeout)
             raise GeminiRateLimitError("429", status_code=429)
@@ -298,7 +298,7 @@ class TestChainStaysInsideThePlatformLimit:
         ):
             with patch("app.llm.suggestions.call_gemini_with_rotation", new=gemini):
                 with patch("app.llm.suggestions.call_groq_with_rotation", new=groq):
-                    with patch("app.llm.suggestions.call_cloudflare", new=cloudflare):
+                    with patch("app.llm.suggestions.call_cloudflare_with_rotation", new=cloudflare):
                         with patch("time.monotonic", clock):
                             started = clock()
                             with pytest.raises(SuggestionsError) as exc_info:
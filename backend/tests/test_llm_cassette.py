@@ -0,0 +1,152 @@
+"""
+Tests for provider HTTP record/replay (`backend/app/llm/cassette.py`).
+
+The upstream is an `httpx.MockTransport`, so these go through the providers'
+real request building and response parsing without a network.
+"""
+
+import json
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from app.llm import cassette
+from app.llm.cassette import ReplayTransport, cassette_transport
+from app.llm.cloudflare_provider import call_cloudflare
+from app.llm.groq_provider import GroqError, call_groq
+from app.llm.key_pool import reset_key_pool_state
+
+MESSAGES = [{"role": "user", "content": "原文と訳文"}]
+
+
+def chat_completion(content):
+    return {"choices": [{"message": {"content": content}}]}
+
+
+class Upstream:
+    """Scripted upstream that counts the requests it served."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        status, body = self.responses[min(len(self.requests), len(self.responses)) - 1]
+        return httpx.Response(status, json=body, headers={"retry-after": "1"})
+
+
+@pytest.fixture
+def cassettes(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_CASSETTE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def record_with(upstream, monkeypatch):
+    monkeypatch.setenv("LLM_CASSETTE_MODE", "record")
+    return patch.object(
+        cassette.httpx, "AsyncHTTPTransport", return_value=httpx.MockTransport(upstream)
+    )
+
+
+def replay(monkeypatch, scale="0"):
+    monkeypatch.setenv("LLM_CASSETTE_MODE", "replay")
+    monkeypatch.setenv("LLM_CASSETTE_LATENCY_SCALE", scale)
+    cassette.reset_cassette_state()
+    # Cooldowns from the recording would otherwise skip the replayed calls.
+    reset_key_pool_state()
+
+
+class TestMode:
+    def test_off_by_default(self, monkeypatch):
+        monkeypatch.delenv("LLM_CASSETTE_MODE", raising=False)
+        assert cassette_transport() is None
+
+    def test_unknown_mode_is_off(self, monkeypatch):
+        monkeypatch.setenv("LLM_CASSETTE_MODE", "rewind")
+        assert cassette_transport() is None
+
+    def test_replay_mode(self, monkeypatch):
+        monkeypatch.setenv("LLM_CASSETTE_MODE", "replay")
+        assert isinstance(cassette_transport(), ReplayTransport)
+
+
+@pytest.mark.asyncio
+class TestRoundTrip:
+    async def test_groq_replays_without_network(self, cassettes, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEY", "gsk_secret_value")
+        upstream = Upstream((200, chat_completion('{"suggestions": []}')))
+        with record_with(upstream, monkeypatch):
+            recorded = await call_groq(MESSAGES, model="m1")
+
+        (path,) = cassettes.glob("*.json")
+        assert "gsk_secret_value" not in path.read_text(encoding="utf-8")
+
+        replay(monkeypatch)
+        assert await call_groq(MESSAGES, model="m1") == recorded
+        assert len(upstream.requests) == 1
+
+    async def test_cloudflare_account_id_is_redacted(self, cassettes, monkeypatch):
+        monkeypatch.setenv("CLOUDFLARE_ACCOUNT_ID", "acct1234")
+        monkeypatch.setenv("CLOUDFLARE_API_TOKEN", "cf_token_value")
+        upstream = Upstream((200, {"result": {"response": "{}"}, "success": True}))
+        with record_with(upstream, monkeypatch):
+            await call_cloudflare(MESSAGES)
+
+        (path,) = cassettes.glob("*.json")
+        text = path.read_text(encoding="utf-8")
+        assert "acct1234" not in text and "cf_token_value" not in text
+        assert "/accounts/REDACTED/" in json.loads(text)["request"]["url"]
+
+        replay(monkeypatch)
+        monkeypatch.setenv("CLOUDFLARE_ACCOUNT_ID", "other_account")
+        assert await call_cloudflare(MESSAGES) == "{}"
+
+    async def test_repeated_requests_replay_in_order(self, cassettes, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEYS", "gsk_key_one,gsk_key_two")
+        monkeypatch.delenv("GROQ_API_KEY", raising=False)
+        upstream = Upstream((429, {}), (200, chat_completion("ok")))
+        with record_with(upstream, monkeypatch):
+            assert await call_groq(MESSAGES, model="m1") == "ok"
+        (path,) = cassettes.glob("*.json")
+        recorded = json.loads(path.read_text(encoding="utf-8"))["responses"]
+        assert [r["status"] for r in recorded] == [429, 200]
+
+        replay(monkeypatch)
+        assert await call_groq(MESSAGES, model="m1") == "ok"
+        assert await call_groq(MESSAGES, model="m1") == "ok"
+        assert len(upstream.requests) == 2
+
+    async def test_other_model_falls_back_to_a_recording(self, cassettes, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEY", "gsk_key_one")
+        with record_with(Upstream((200, chat_completion("ok"))), monkeypatch):
+            await call_groq(MESSAGES, model="m1")
+
+        replay(monkeypatch)
+        assert await call_groq(MESSAGES, model="m2") == "ok"
+
+    async def test_unrecorded_request_is_a_connection_failure(
+        self, cassettes, monkeypatch
+    ):
+        monkeypatch.setenv("GROQ_API_KEY", "gsk_key_one")
+        replay(monkeypatch)
+        with pytest.raises(GroqError, match="No cassette"):
+            await call_groq(MESSAGES, model="m1")
+
+
+@pytest.mark.asyncio
+async def test_replay_sleeps_scaled_recorded_latency(cassettes, monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_key_one")
+    with record_with(Upstream((200, chat_completion("ok"))), monkeypatch):
+        await call_groq(MESSAGES, model="m1")
+    (path,) = cassettes.glob("*.json")
+    recorded = json.loads(path.read_text(encoding="utf-8"))
+    recorded["responses"][0]["elapsedS"] = 2.0
+    path.write_text(json.dumps(recorded), encoding="utf-8")
+
+    replay(monkeypatch, scale="0.5")
+    sleep = AsyncMock()
+    with patch.object(cassette.asyncio, "sleep", new=sleep):
+        await call_groq(MESSAGES, model="m1")
+    sleep.assert_awaited_once_with(1.0)
@@ -0,0 +1,229 @@
+"""
+Tests for paragraph chunking (`backend/app/llm/chunking.py`) and the chunked
+path through `generate_suggestions()`.
+
+The point of chunking is latency: a long document is generated as concurrent
+per-paragraph calls instead of one call that grows with the whole text. So the
+chain-level tests below assert that the chunks were actually in flight at the
+same time, not only that the merged body looks right.
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.llm.chunking import (
+    CHUNK_MIN_TARGET_CHARS,
+    MAX_CHUNKS,
+    merge_chunk_results,
+    plan_chunks,
+    split_paragraphs,
+)
+from app.llm.parser import JSON_EXTRACTION_FAILURE_MESSAGE
+from app.llm.suggestions import SuggestionsError, generate_suggestions
+from app.llm.groq_provider import GroqServerError
+
+
+def paragraphs(n, size=300, mark="段"):
+    return "\n\n".join(f"{mark}{i}" + "あ" * size for i in range(1, n + 1))
+
+
+def body(*items, comment="整体不错"):
+    import json
+
+    return json.dumps(
+        {
+            "suggestions": [
+                {"id": str(i), "original": o, "reason": r}
+                for i, (o, r) in enumerate(items, start=1)
+            ],
+            "overallComment": comment,
+        },
+        ensure_ascii=False,
+    )
+
+
+class TestPlanChunks:
+    def test_short_input_is_sent_whole(self):
+        chunks = plan_chunks("原文\n原文", "訳文\n訳文")
+        assert len(chunks) == 1
+        assert chunks[0].target_text == "訳文\n訳文"
+
+    def test_aligned_long_input_splits_by_paragraph(self):
+        original = paragraphs(3, mark="原")
+        target = paragraphs(3, mark="訳")
+        chunks = plan_chunks(original, target)
+        assert len(chunks) == 3
+        assert [c.index for c in chunks] == [1, 2, 3]
+        # Each chunk keeps its SOURCE paragraph beside its TARGET paragraph.
+        for i, chunk in enumerate(chunks, start=1):
+            assert chunk.original_text.startswith(f"原{i}")
+            assert chunk.target_text.startswith(f"訳{i}")
+
+    def test_mismatched_paragraph_counts_are_not_guessed(self):
+        chunks = plan_chunks(paragraphs(2), paragraphs(3))
+        assert len(chunks) == 1
+
+    def test_short_paragraphs_are_packed_together(self):
+        original = "\n".join(f"原{i}" for i in range(40))
+        target = "\n".join(f"訳{i}" + "い" * 30 for i in range(40))
+        assert len(target) >= CHUNK_MIN_TARGET_CHARS
+        chunks = plan_chunks(original, target)
+        assert 1 < len(chunks) <= MAX_CHUNKS
+        # Nothing is dropped or reordered by packing.
+        rejoined = "\n".join(c.target_text for c in chunks)
+        assert split_paragraphs(rejoined) == split_paragraphs(target)
+
+
+class TestMergeChunkResults:
+    def test_renumbers_and_drops_duplicates(self):
+        first = {
+            "suggestions": [
+                {"id": "1", "original": "あ", "reason": "理由一", "sourceExcerpt": ""},
+                {"id": "2", "original": "い", "reason": "理由二", "sourceExcerpt": ""},
+            ],
+            "overallComment": "第一段不错",
+        }
+        second = {
+            "suggestions": [
+                {"id": "1", "original": "い ", "reason": "理由二", "sourceExcerpt": ""},
+                {"id": "2", "original": "う", "reason": "理由三", "sourceExcerpt": ""},
+            ],
+            "overallComment": "第二段尚可",
+        }
+        merged = merge_chunk_results([first, second])
+        assert [s["id"] for s in merged["suggestions"]] == ["1", "2", "3"]
+        assert [s["original"] for s in merged["suggestions"]] == ["あ", "い", "う"]
+        assert "第一段不错" in merged["overallComment"]
+        assert "第二段尚可" in merged["overallComment"]
+
+    def test_parse_failure_chunk_contributes_nothing(self):
+        good = {
+            "suggestions": [
+                {"id": "1", "original": "あ", "reason": "理由", "sourceExcerpt": ""}
+            ],
+            "overallComment": "不错",
+        }
+        failed = {"suggestions": [], "overallComment": JSON_EXTRACTION_FAILURE_MESSAGE}
+        merged = merge_chunk_results([failed, good])
+        assert len(merged["suggestions"]) == 1
+        assert JSON_EXTRACTION_FAILURE_MESSAGE not in merged["overallComment"]
+
+    def test_all_failed_chunks_keep_the_placeholder(self):
+        failed = {"suggestions": [], "overallComment": JSON_EXTRACTION_FAILURE_MESSAGE}
+        assert merge_chunk_results([failed, failed]) == failed
+
+
+@pytest.mark.asyncio
+class TestChunkedGeneration:
+    @pytest.fixture(autouse=True)
+    def _groq_pool(self, monkeypatch):
+        for name in (
+            "GEMINI_API_KEY",
+            "GEMINI_API_KEYS",
+            "CLOUDFLARE_ACCOUNT_ID",
+            "CLOUDFLARE_ACCOUNT_IDS",
+            "GROQ_API_KEY",
+        ):
+            monkeypatch.delenv(name, raising=False)
+        monkeypatch.setenv("GROQ_API_KEYS", "k1,k2,k3")
+
+    async def test_chunks_run_concurrently_and_merge(self):
+        in_flight = 0
+        peak = 0
+
+        async def groq(messages, deadline_monotonic=None):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            target = messages[-1]["content"].split("添削対象：")[-1]
+            return body((target[:2], "这里需要修改"), comment=f"{target[:2]}不错")
+
+        with patch("app.llm.suggestions.call_groq_with_rotation", new=groq):
+            result = await generate_suggestions(
+                paragraphs(3, mark="原"),
+                paragraphs(3, mark="訳"),
+                chunk_paragraphs=True,
+            )
+
+        assert peak == 3
+        assert [s["original"] for s in result["suggestions"]] == ["訳1", "訳2", "訳3"]
+        assert [s["id"] for s in result["suggestions"]] == ["1", "2", "3"]
+        assert result["llmProvider"] == "groq"
+
+    async def test_disabled_by_default_sends_one_call(self, monkeypatch):
+        monkeypatch.delenv("SUGGESTIONS_CHUNKING", raising=False)
+        calls = []
+
+        async def groq(messages, deadline_monotonic=None):
+            calls.append(messages)
+            return body(("訳", "这里需要修改"))
+
+        with patch("app.llm.suggestions.call_groq_with_rotation", new=groq):
+            await generate_suggestions(paragraphs(3), paragraphs(3))
+
+        assert len(calls) == 1
+
+    async def test_env_switch_enables_chunking(self, monkeypatch):
+        monkeypatch.setenv("SUGGESTIONS_CHUNKING", "1")
+        calls = []
+
+        async def groq(messages, deadline_monotonic=None):
+            calls.append(messages)
+            return body(("訳", f"这里需要修改{len(calls)}"))
+
+        with patch("app.llm.suggestions.call_groq_with_rotation", new=groq):
+            await generate_suggestions(paragraphs(2), paragraphs(2))
+
+        assert len(calls) == 2
+
+    async def test_one_failed_chunk_does_not_fail_the_document(self):
+        async def groq(messages, deadline_monotonic=None):
+            if "訳2" in messages[-1]["content"]:
+                raise GroqServerError("boom", status_code=500)
+            return body(("訳", "这里需要修改"))
+
+        with patch("app.llm.suggestions.call_groq_with_rotation", new=groq):
+            result = await generate_suggestions(
+                paragraphs(3, mark="原"),
+                paragraphs(3, mark="訳"),
+                chunk_paragraphs=True,
+            )
+
+        # Identical items from the two surviving chunks collapse to one.
+        assert len(result["suggestions"]) == 1
+
+    async def test_every_chunk_failing_raises(self):
+        async def groq(messages, deadline_monotonic=None):
+            raise GroqServerError("boom", status_code=500)
+
+        with patch("app.llm.suggestions.call_groq_with_rotation", new=groq):
+            with pytest.raises(SuggestionsError):
+                await generate_suggestions(
+                    paragraphs(3), paragraphs(3), chunk_paragraphs=True
+                )
+
+
+class TestChunkParagraphsFlag:
+    """`chunkParagraphs` on `POST /suggestions` is parsed, not truth-tested."""
+
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            (True, True),
+            (False, False),
+            ("true", True),
+            ("false", False),
+            ("0", False),
+            ("on", True),
+            (None, None),
+            ("maybe", None),
+        ],
+    )
+    def test_payload_flag(self, value, expected):
+        from app.main import _payload_flag
+
+        assert _payload_flag(value) is expected
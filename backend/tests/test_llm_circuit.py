@@ -0,0 +1,203 @@
+"""
+Tests for the per-(provider, model) circuit breaker (`backend/app/llm/circuit.py`)
+and its persistence through `provider_health`.
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.llm import circuit, groq_provider, provider_health
+from app.llm.circuit import (
+    CLOSED,
+    FAILURE_THRESHOLD,
+    HALF_OPEN,
+    OPEN,
+    allow_call,
+    circuit_state,
+    record_failure,
+    record_success,
+    track,
+)
+from app.llm.gemini_provider import call_gemini_with_rotation
+from app.llm.groq_provider import (
+    GroqRateLimitError,
+    GroqServerError,
+    GroqTimeoutError,
+    call_groq,
+)
+from app.llm.key_pool import reset_key_pool_state
+from app.llm.provider_health import CIRCUIT_FINGERPRINT, seed_cooldowns
+
+MODEL = "openai/gpt-oss-20b"
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+class _FakeResponse:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.text = ""
+        self.headers = {}
+
+    def json(self):
+        return {"choices": [{"message": {"content": "{}"}}]}
+
+
+def _expire(provider, model):
+    """Let an open circuit's wait run out."""
+    circuit._circuits[(provider, model)].open_until = 0.0
+
+
+def circuit_row(provider, model, in_seconds=60.0):
+    return {
+        "provider": provider,
+        "model": model,
+        "credentialFingerprint": CIRCUIT_FINGERPRINT,
+        "recoverAt": datetime.now(timezone.utc) + timedelta(seconds=in_seconds),
+        "reason": "circuit open",
+    }
+
+
+@pytest.fixture
+def groq_pinned(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "key-one")
+    monkeypatch.setenv("GROQ_MODEL", MODEL)
+
+
+class TestStateMachine:
+    def test_opens_after_consecutive_failures(self):
+        for _ in range(FAILURE_THRESHOLD - 1):
+            record_failure("groq", MODEL, "HTTP 503")
+        assert circuit_state("groq", MODEL) == CLOSED
+        record_failure("groq", MODEL, "HTTP 503")
+        assert circuit_state("groq", MODEL) == OPEN
+        assert not allow_call("groq", MODEL)
+        assert allow_call("groq", "other-model")
+
+    def test_success_resets_the_streak(self):
+        for _ in range(FAILURE_THRESHOLD - 1):
+            record_failure("groq", MODEL, "HTTP 503")
+        record_success("groq", MODEL)
+        record_failure("groq", MODEL, "HTTP 503")
+        assert circuit_state("groq", MODEL) == CLOSED
+
+    def test_half_open_lets_a_single_probe_through(self):
+        for _ in range(FAILURE_THRESHOLD):
+            record_failure("groq", MODEL, "timeout")
+        _expire("groq", MODEL)
+        assert circuit_state("groq", MODEL) == HALF_OPEN
+        assert allow_call("groq", MODEL)
+        assert not allow_call("groq", MODEL)
+        record_success("groq", MODEL)
+        assert circuit_state("groq", MODEL) == CLOSED
+
+    def test_failed_probe_reopens(self):
+        for _ in range(FAILURE_THRESHOLD):
+            record_failure("groq", MODEL, "timeout")
+        _expire("groq", MODEL)
+        assert allow_call("groq", MODEL)
+        record_failure("groq", MODEL, "timeout")
+        assert circuit_state("groq", MODEL) == OPEN
+
+    def test_deadline_clamped_timeouts_do_not_count(self):
+        for _ in range(FAILURE_THRESHOLD):
+            with pytest.raises(GroqTimeoutError):
+                with track(
+                    "groq", MODEL, timeout_errors=(GroqTimeoutError,), clamped=True
+                ):
+                    raise GroqTimeoutError("timed out after 6.0s")
+        assert circuit_state("groq", MODEL) == CLOSED
+        # A clamped call's server error still says the model is failing.
+        with pytest.raises(GroqServerError):
+            with track("groq", MODEL, clamped=True):
+                raise GroqServerError("HTTP 503", status_code=503)
+        assert len(circuit._circuits[("groq", MODEL)].failures) == 1
+
+    def test_disabled_by_env(self, monkeypatch):
+        monkeypatch.setenv("LLM_CIRCUIT_BREAKER", "off")
+        for _ in range(FAILURE_THRESHOLD):
+            record_failure("groq", MODEL, "HTTP 503")
+        assert allow_call("groq", MODEL)
+
+
+@pytest.mark.asyncio
+class TestProviderCalls:
+    async def test_open_circuit_skips_the_call(self, groq_pinned):
+        client = AsyncMock()
+        client.post.return_value = _FakeResponse(503)
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            for _ in range(FAILURE_THRESHOLD):
+                with pytest.raises(GroqServerError):
+                    await call_groq(MESSAGES)
+            with pytest.raises(GroqServerError, match="circuit open"):
+                await call_groq(MESSAGES)
+        assert client.post.call_count == FAILURE_THRESHOLD
+
+    async def test_timeouts_on_a_short_slice_do_not_count(self, groq_pinned):
+        once = AsyncMock(side_effect=GroqTimeoutError("timed out"))
+        with patch.object(groq_provider, "_call_groq_once", new=once):
+            for _ in range(FAILURE_THRESHOLD):
+                with pytest.raises(GroqTimeoutError):
+                    # 10s left: the call gets a slice well under GROQ_TIMEOUT.
+                    await call_groq(
+                        MESSAGES, deadline_monotonic=time.monotonic() + 10.0
+                    )
+        assert circuit_state("groq", MODEL) == CLOSED
+
+    async def test_refusals_do_not_count(self, groq_pinned):
+        client = AsyncMock()
+        client.post.return_value = _FakeResponse(429)
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            for _ in range(FAILURE_THRESHOLD):
+                with pytest.raises(GroqRateLimitError):
+                    await call_groq(MESSAGES)
+                # Clear the refusal's cooldown so the next call goes out.
+                reset_key_pool_state()
+        assert circuit_state("groq", MODEL) == CLOSED
+
+    async def test_rotation_moves_past_an_open_model(self, monkeypatch):
+        monkeypatch.setenv("GEMINI_API_KEY", "key-one")
+        monkeypatch.delenv("GEMINI_MODEL", raising=False)
+        for _ in range(FAILURE_THRESHOLD):
+            record_failure("gemini", "gemini-3.7-flash", "timeout")
+        client = AsyncMock()
+        client.post.return_value.status_code = 200
+        client.post.return_value.headers = {}
+        client.post.return_value.json = lambda: {
+            "candidates": [{"content": {"parts": [{"text": "{}"}]}}]
+        }
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            with patch(
+                "app.llm.gemini_provider.select_gemini_models",
+                return_value=["gemini-3.7-flash", "gemini-3.6-flash"],
+            ):
+                result = await call_gemini_with_rotation(MESSAGES)
+        assert result.model == "gemini-3.6-flash"
+        assert client.post.call_count == 1
+
+
+class TestPersistence:
+    def test_opening_is_buffered_for_later_requests(self):
+        for _ in range(FAILURE_THRESHOLD):
+            record_failure("groq", MODEL, "HTTP 503")
+        (observation,) = provider_health._pending
+        assert observation.provider == "groq"
+        assert observation.model == MODEL
+        assert observation.fingerprint == CIRCUIT_FINGERPRINT
+        assert observation.reason.startswith("circuit open")
+
+    def test_stored_circuit_is_seeded_open(self):
+        assert seed_cooldowns([circuit_row("gemini", "gemini-3.7-flash")]) == 1
+        assert circuit_state("gemini", "gemini-3.7-flash") == OPEN
+        assert allow_call("gemini", "gemini-3.6-flash")
+
+    def test_recovered_circuit_ignores_its_stale_row(self):
+        for _ in range(FAILURE_THRESHOLD):
+            record_failure("groq", MODEL, "HTTP 503")
+        _expire("groq", MODEL)
+        assert allow_call("groq", MODEL)
+        record_success("groq", MODEL)
+        seed_cooldowns([circuit_row("groq", MODEL)])
+        assert circuit_state("groq", MODEL) == CLOSED
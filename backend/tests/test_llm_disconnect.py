@@ -0,0 +1,101 @@
+"""
+Tests for cancelling `/suggestions` generation when the client disconnects
+(`_cancel_on_disconnect` in `backend/app/main.py`).
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import Response
+
+from app.main import (
+    CLIENT_CLOSED_REQUEST,
+    ClientDisconnected,
+    _cancel_on_disconnect,
+    generate_ai_suggestions,
+)
+
+POLL_S = 0.01
+
+
+class FakeRequest:
+    """Stand-in for `starlette.requests.Request` that disconnects on cue."""
+
+    def __init__(self, disconnect_after_polls=None):
+        self.polls = 0
+        self.disconnect_after_polls = disconnect_after_polls
+
+    async def is_disconnected(self):
+        self.polls += 1
+        return (
+            self.disconnect_after_polls is not None
+            and self.polls >= self.disconnect_after_polls
+        )
+
+
+@pytest.mark.asyncio
+class TestCancelOnDisconnect:
+    async def test_result_when_client_stays(self):
+        async def work():
+            await asyncio.sleep(POLL_S * 3)
+            return "done"
+
+        request = FakeRequest()
+        assert await _cancel_on_disconnect(request, work(), poll_s=POLL_S) == "done"
+        assert request.polls >= 1
+
+    async def test_disconnect_cancels_the_work(self):
+        cancelled = asyncio.Event()
+
+        async def provider_call():
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with pytest.raises(ClientDisconnected):
+            await _cancel_on_disconnect(
+                FakeRequest(disconnect_after_polls=2), provider_call(), poll_s=POLL_S
+            )
+        assert cancelled.is_set()
+
+    async def test_errors_from_the_work_propagate(self):
+        async def failing():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError, match="boom"):
+            await _cancel_on_disconnect(FakeRequest(), failing(), poll_s=POLL_S)
+
+
+@pytest.mark.asyncio
+async def test_endpoint_stops_generating_but_still_flushes(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "k")
+    passes = []
+
+    async def slow_generation(*args, **kwargs):
+        passes.append(1)
+        await asyncio.sleep(60)
+
+    async def shared_read(_key):
+        return None, []
+
+    flush = AsyncMock()
+    with patch(
+        "app.db_helper.fetch_setting_and_provider_health", new=shared_read
+    ), patch("app.llm.generate_suggestions", new=slow_generation), patch(
+        "app.llm.provider_health.flush_observations", new=flush
+    ):
+        result = await asyncio.wait_for(
+            generate_ai_suggestions(
+                FakeRequest(disconnect_after_polls=1),
+                Response(),
+                {"originalText": "原文", "targetText": "訳文"},
+            ),
+            timeout=5,
+        )
+
+    assert result.status_code == CLIENT_CLOSED_REQUEST
+    assert passes == [1]
+    flush.assert_awaited_once()
@@ -0,0 +1,73 @@
+"""
+Tests for the shared provider HTTP clients (`backend/app/llm/http_clients.py`).
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.llm.gemini_provider import GeminiTimeoutError, _call_gemini_once, call_gemini
+from app.llm.http_clients import close_provider_clients, provider_client
+
+
+class _FakeResponse:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.text = ""
+        self.headers = {}
+
+    def json(self):
+        return {"candidates": [{"content": {"parts": [{"text": "{}"}]}}]}
+
+
+@pytest.mark.asyncio
+class TestProviderClient:
+    async def test_one_client_per_origin(self):
+        a = provider_client("https://api.groq.com/openai/v1/chat/completions")
+        b = provider_client("https://api.groq.com/other")
+        c = provider_client("https://api.cloudflare.com/client/v4")
+        assert a is b
+        assert a is not c
+        await close_provider_clients()
+
+    async def test_close_empties_the_registry(self):
+        client = provider_client("https://api.groq.com/x")
+        await close_provider_clients()
+        assert client.is_closed
+        assert provider_client("https://api.groq.com/x") is not client
+        await close_provider_clients()
+
+    async def test_key_retries_reuse_the_connection_pool(self, monkeypatch):
+        monkeypatch.setenv("GEMINI_API_KEYS", "key-one,key-two")
+        monkeypatch.setenv("GEMINI_MODEL", "gemini-3.7-flash")
+        mock_client = AsyncMock()
+        mock_client.post.side_effect = [_FakeResponse(429), _FakeResponse()]
+        with patch(
+            "app.llm.http_clients.httpx.AsyncClient", return_value=mock_client
+        ) as factory:
+            assert await call_gemini([{"role": "user", "content": "hi"}]) == "{}"
+        assert mock_client.post.call_count == 2
+        assert factory.call_count == 1
+
+    async def test_attempts_keep_the_hard_ceiling(self, monkeypatch):
+        monkeypatch.setenv("GEMINI_API_KEY", "key-one")
+        monkeypatch.setenv("GEMINI_MODEL", "gemini-3.7-flash")
+
+        async def hang(*_args, **_kwargs):
+            await asyncio.sleep(10)
+
+        mock_client = AsyncMock()
+        mock_client.post.side_effect = hang
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=mock_client):
+            with pytest.raises(GeminiTimeoutError):
+                await _call_gemini_once(
+                    "key-one", [{"role": "user", "content": "hi"}], "gemini-3.7-flash", 0.05
+                )
+
+
+def test_each_event_loop_gets_its_own_client():
+    async def grab():
+        return provider_client("https://api.groq.com/x")
+
+    assert asyncio.run(grab()) is not asyncio.run(grab())
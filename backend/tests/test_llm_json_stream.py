@@ -0,0 +1,39 @@
+"""Tests for incremental JSON completion detection (`backend/app/llm/json_stream.py`)."""
+
+from app.llm.json_stream import JsonObjectTracker
+
+
+def feed_all(*fragments):
+    tracker = JsonObjectTracker()
+    results = [tracker.feed(f) for f in fragments]
+    return tracker, results
+
+
+class TestJsonObjectTracker:
+    def test_reports_the_object_when_it_closes(self):
+        tracker, results = feed_all('{"suggestions": [', '{"id": "1"}', '], "a": 1}', "\n")
+        assert results == [None, None, '{"suggestions": [{"id": "1"}], "a": 1}', None]
+        assert tracker.done
+
+    def test_braces_inside_strings_do_not_count(self):
+        _, results = feed_all('{"reason": "用 } 和 { 以及 \\"}\\""', "}")
+        assert results[-1] == '{"reason": "用 } 和 { 以及 \\"}\\""}'
+
+    def test_escape_split_across_fragments(self):
+        _, results = feed_all('{"a": "x\\', '"}', '"}')
+        assert results == [None, None, '{"a": "x\\"}"}']
+
+    def test_leading_fence_is_skipped(self):
+        _, results = feed_all("```json\n", '{"a": 1}', "\n```")
+        assert results[1] == '{"a": 1}'
+
+    def test_unparseable_object_is_left_to_the_parser(self):
+        tracker, results = feed_all('{"a": [1,],}', " more")
+        assert results == [None, None]
+        assert tracker.done and tracker.complete is None
+        assert tracker.text == '{"a": [1,],} more'
+
+    def test_unclosed_object_never_completes(self):
+        tracker, results = feed_all('{"a": {"b": 1}')
+        assert results == [None]
+        assert not tracker.done
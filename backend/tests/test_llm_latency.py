@@ -0,0 +1,268 @@
+"""
+Tests for the learned latency model (`backend/app/llm/latency.py`) and how the
+providers and the failover chain plan with it.
+
+The properties that matter operationally: the hand-tuned constants still apply
+until enough calls were seen, a learned timeout never exceeds the constant, and
+a fast provider's learned slice actually shrinks what the chain holds back for
+it.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.llm import latency
+from app.llm.latency import (
+    ANY_MODEL,
+    MIN_SAMPLES,
+    MIN_SLICE_FLOOR_S,
+    LatencyStats,
+    call_budget,
+    estimate,
+    measure,
+    record_latency,
+    seed_latency,
+    size_bucket,
+    snapshot_records,
+    unmeasured,
+)
+from app.llm.groq_provider import GROQ_MIN_SLICE_S, GROQ_TIMEOUT, GroqTimeoutError
+from app.llm.cloudflare_provider import CF_MIN_SLICE_S
+
+
+def learn(provider, model, seconds, n=MIN_SAMPLES, chars=1000):
+    for _ in range(n):
+        record_latency(provider, model, chars, seconds)
+
+
+class TestStats:
+    def test_quantiles_bound_the_observations(self):
+        stats = LatencyStats()
+        for s in [1.0] * 18 + [8.0] * 2:
+            stats.record(s)
+        assert 1.0 <= stats.quantile(0.5) < 1.3
+        assert 8.0 <= stats.quantile(0.95) < 10.0
+
+    def test_old_observations_fade(self):
+        stats = LatencyStats()
+        for _ in range(50):
+            stats.record(10.0)
+        for _ in range(100):
+            stats.record(1.0)
+        assert stats.quantile(0.5) < 2.0
+        assert stats.ewma_s < 2.0
+
+    def test_size_buckets(self):
+        assert size_bucket(100) == "s"
+        assert size_bucket(50_000) == latency.LARGEST_SIZE_BUCKET
+
+
+class TestCallBudget:
+    def test_cold_start_uses_the_static_constants(self):
+        learn("groq", "m1", 1.0, n=MIN_SAMPLES - 1)
+        budget = call_budget(
+            "groq",
+            "m1",
+            1000,
+            default_timeout=GROQ_TIMEOUT,
+            default_min_slice=GROQ_MIN_SLICE_S,
+        )
+        assert budget == (GROQ_TIMEOUT, GROQ_MIN_SLICE_S, False)
+
+    def test_fast_model_gets_a_smaller_slice_and_timeout(self):
+        learn("groq", "m1", 2.0)
+        budget = call_budget(
+            "groq",
+            "m1",
+            1000,
+            default_timeout=GROQ_TIMEOUT,
+            default_min_slice=GROQ_MIN_SLICE_S,
+        )
+        assert budget.learned
+        assert 2.0 <= budget.min_slice_s < GROQ_MIN_SLICE_S
+        assert budget.min_slice_s <= budget.timeout_s < GROQ_TIMEOUT
+
+    def test_slow_model_is_capped_at_the_static_timeout(self):
+        learn("groq", "m1", 60.0)
+        budget = call_budget(
+            "groq",
+            "m1",
+            1000,
+            default_timeout=GROQ_TIMEOUT,
+            default_min_slice=GROQ_MIN_SLICE_S,
+        )
+        assert budget.timeout_s == GROQ_TIMEOUT
+        assert budget.min_slice_s == GROQ_TIMEOUT
+
+    def test_instant_replies_do_not_make_a_provider_free(self):
+        learn("groq", "m1", 0.01)
+        budget = call_budget(
+            "groq",
+            "m1",
+            1000,
+            default_timeout=GROQ_TIMEOUT,
+            default_min_slice=GROQ_MIN_SLICE_S,
+        )
+        assert budget.min_slice_s == MIN_SLICE_FLOOR_S
+
+    def test_sizes_are_learned_separately(self):
+        learn("groq", "m1", 2.0, chars=1000)
+        assert estimate("groq", "m1", 1000) is not None
+        assert estimate("groq", "m1", 30_000) is None
+
+    def test_every_model_also_feeds_the_provider_aggregate(self):
+        learn("groq", "m1", 2.0, n=3)
+        learn("groq", "m2", 2.0, n=3)
+        assert estimate("groq", "m1", 1000) is None
+        assert estimate("groq", ANY_MODEL, 1000) is not None
+
+    def test_off_switch_pins_the_constants(self, monkeypatch):
+        learn("groq", "m1", 2.0)
+        monkeypatch.setenv("LLM_LATENCY_MODEL", "off")
+        budget = call_budget(
+            "groq",
+            "m1",
+            1000,
+            default_timeout=GROQ_TIMEOUT,
+            default_min_slice=GROQ_MIN_SLICE_S,
+        )
+        assert not budget.learned
+
+
+class TestMeasure:
+    def test_timeouts_are_recorded_at_the_timeout(self):
+        for _ in range(MIN_SAMPLES):
+            with pytest.raises(GroqTimeoutError):
+                with measure(
+                    "groq",
+                    "m1",
+                    1000,
+                    timeout_s=7.0,
+                    timeout_errors=(GroqTimeoutError,),
+                ):
+                    raise GroqTimeoutError("slow")
+        assert estimate("groq", "m1", 1000).p50_s >= 7.0
+
+    def test_deadline_clamped_timeouts_are_not_recorded(self):
+        with pytest.raises(GroqTimeoutError):
+            with measure(
+                "groq",
+                "m1",
+                1000,
+                timeout_s=3.0,
+                timeout_errors=(GroqTimeoutError,),
+                clamped=True,
+            ):
+                raise GroqTimeoutError("slice ran out")
+        assert snapshot_records() == []
+
+    def test_calls_inside_unmeasured_are_not_recorded(self):
+        with unmeasured():
+            with measure("groq", "m1", 1000, timeout_s=7.0):
+                pass
+        with measure("groq", "m1", 1000, timeout_s=7.0):
+            pass
+        samples = {record[1]: record[4] for record in snapshot_records()}
+        assert samples["m1"] == 1
+
+    def test_other_failures_are_not_recorded(self):
+        with pytest.raises(RuntimeError):
+            with measure("groq", "m1", 1000, timeout_s=7.0):
+                raise RuntimeError("HTTP 429")
+        assert snapshot_records() == []
+
+
+class TestProviderWiring:
+    def test_groq_call_uses_the_learned_timeout(self, monkeypatch):
+        from app.llm import groq_provider
+
+        monkeypatch.setenv("GROQ_API_KEY", "k")
+        monkeypatch.delenv("GROQ_API_KEYS", raising=False)
+        messages = [{"role": "user", "content": "x"}]
+        learn("groq", "m1", 2.0, chars=1)
+        once = AsyncMock(return_value="{}")
+
+        with patch.object(groq_provider, "_call_groq_once", new=once):
+            asyncio.run(groq_provider.call_groq(messages, model="m1"))
+
+        timeout = once.call_args.args[3]
+        assert timeout < GROQ_TIMEOUT
+        # The successful call was itself recorded.
+        assert estimate("groq", "m1", 1).samples == MIN_SAMPLES + 1
+
+    def test_chain_reserves_the_learned_slice(self, monkeypatch):
+        from app.llm.suggestions import _later_provider_reserve
+
+        monkeypatch.setenv("GROQ_API_KEY", "k")
+        monkeypatch.setenv("CLOUDFLARE_ACCOUNT_ID", "a")
+        monkeypatch.setenv("CLOUDFLARE_API_TOKEN", "t")
+        static = GROQ_MIN_SLICE_S + CF_MIN_SLICE_S
+        assert _later_provider_reserve(after="gemini", input_chars=1000) == static
+
+        learn("groq", "m1", 2.0)
+        assert _later_provider_reserve(after="gemini", input_chars=1000) < static
+        # Without a prompt size the static reserve still applies.
+        assert _later_provider_reserve(after="gemini") == static
+
+
+class TestPersistence:
+    def test_snapshot_round_trips(self):
+        learn("gemini", "g1", 8.0)
+        rows = [
+            {
+                "provider": p,
+                "model": m,
+                "sizeBucket": b,
+                "ewmaS": e,
+                "samples": n,
+                "histogram": h,
+            }
+            for p, m, b, e, n, h in snapshot_records()
+        ]
+        latency.reset_latency_state()
+
+        assert seed_latency(rows) == 2
+        assert estimate("gemini", "g1", 1000).p50_s >= 8.0
+
+    def test_own_measurements_win_over_the_snapshot(self):
+        learn("gemini", "g1", 2.0)
+        row = {
+            "provider": "gemini",
+            "model": "g1",
+            "sizeBucket": size_bucket(1000),
+            "ewmaS": 20.0,
+            "samples": 100,
+            "histogram": [0.0] * (len(latency.BUCKET_BOUNDS_S) - 1) + [100.0],
+        }
+        assert seed_latency([row]) == 0
+        assert estimate("gemini", "g1", 1000).p50_s < 3.0
+
+    def test_malformed_rows_are_ignored(self):
+        assert seed_latency([{"provider": "groq", "histogram": [1.0]}]) == 0
+
+    def test_flush_writes_once_then_waits_for_new_samples(self):
+        learn("groq", "m1", 2.0)
+        with patch(
+            "app.db_helper.upsert_provider_latency", new_callable=AsyncMock
+        ) as write:
+            assert asyncio.run(latency.flush_latency(None, force=True)) == 2
+            assert asyncio.run(latency.flush_latency(None, force=True)) == 0
+        write.assert_called_once()
+
+    def test_unsampled_requests_skip_the_write(self, monkeypatch):
+        learn("groq", "m1", 2.0)
+        monkeypatch.setattr(latency, "FLUSH_PROBABILITY", 0.0)
+        with patch(
+            "app.db_helper.upsert_provider_latency", new_callable=AsyncMock
+        ) as write:
+            assert asyncio.run(latency.flush_latency(None)) == 0
+        write.assert_not_called()
+
+    def test_a_failing_read_falls_back_to_static(self):
+        with patch(
+            "app.db_helper.fetch_provider_latency",
+            new=AsyncMock(side_effect=RuntimeError("no such table")),
+        ):
+            assert asyncio.run(latency.load_latency_snapshot()) == 0
@@ -16,6 +16,9 @@ from app.llm.parser import (
     has_non_japanese_recommendation,
     has_weak_critique_reason,
     has_japanese_corner_quotes_in_critique,
+    fix_corner_quotes,
+    fix_mechanical_content,
+    JSON_EXTRACTION_FAILURE_MESSAGE,
 )
 from tests.fixtures.semantic_reason_cases import (
     CASE_A_BAD_REASON,
@@ -904,3 +907,70 @@ class TestHasNonJapaneseRecommendation:
         assert has_non_japanese_recommendation(
             {"suggestions": [], "overallComment": ""}
         ) is False
+
+
+class TestMechanicalContentFixes:
+    """Deterministic fixes that spare a retry pass (`fix_mechanical_content`)."""
+
+    def _result(self, reason, comment="整体清楚"):
+        return {
+            "suggestions": [{"id": "1", "original": "行きます", "reason": reason}],
+            "overallComment": comment,
+        }
+
+    def test_chinese_prose_in_corner_quotes_becomes_double_quotes(self):
+        fixed, fixes = fix_corner_quotes("这里的「时态」不一致")
+        assert fixed == "这里的“时态”不一致"
+        assert [f[0] for f in fixes] == ["corner_quotes_to_double_quotes"]
+
+    def test_japanese_citations_are_kept(self):
+        text = "应改为「行きました」，「叙事詩」也可以"
+        assert fix_corner_quotes(text) == (text, [])
+
+    def test_unclosed_bracket_is_closed_after_the_cited_form(self):
+        fixed, _ = fix_corner_quotes("应改为「行きました更自然")
+        assert fixed == "应改为「行きました」更自然"
+
+    def test_unopened_kana_form_is_reopened(self):
+        fixed, _ = fix_corner_quotes("改用 ございます」更礼貌")
+        assert fixed == "改用 「ございます」更礼貌"
+
+    def test_unopened_bracket_after_kanji_is_dropped_not_guessed(self):
+        # Where a kanji-led form starts cannot be told from the Chinese before it.
+        fixed, _ = fix_corner_quotes("应改为行きました」。")
+        assert fixed == "应改为行きました。"
+
+    def test_bracket_without_a_citable_form_is_dropped(self):
+        fixed, fixes = fix_corner_quotes("应写「叙事詩更好")
+        assert fixed == "应写叙事詩更好"
+        assert fixes[0][0] == "dropped_unpaired_corner_quote"
+
+    def test_fixed_body_passes_the_corner_quote_check(self):
+        from tests.fixtures.gemini_quality_bar_cases import (
+            QUALITY_BAR_CN_PROSE_CORNER_MISUSE,
+        )
+
+        result = self._result(QUALITY_BAR_CN_PROSE_CORNER_MISUSE, "存在「时态」问题")
+        assert has_japanese_corner_quotes_in_critique(result) is True
+        fixed, fixes = fix_mechanical_content(result)
+        assert has_japanese_corner_quotes_in_critique(fixed) is False
+        assert {f["field"] for f in fixes} == {"reason", "overallComment"}
+        assert fixes[0]["id"] == "1"
+
+    def test_original_and_source_excerpt_are_never_touched(self):
+        result = self._result("「时态」不对")
+        result["suggestions"][0]["original"] = "「時制」"
+        result["suggestions"][0]["sourceExcerpt"] = "「时态」"
+        fixed, _ = fix_mechanical_content(result)
+        assert fixed["suggestions"][0]["original"] == "「時制」"
+        assert fixed["suggestions"][0]["sourceExcerpt"] == "「时态」"
+
+    def test_clean_body_is_returned_as_is(self):
+        result = self._result("应改为「行きました」，因为时态需要一致")
+        fixed, fixes = fix_mechanical_content(result)
+        assert fixed is result
+        assert fixes == []
+
+    def test_parse_failure_placeholder_is_left_alone(self):
+        result = {"suggestions": [], "overallComment": JSON_EXTRACTION_FAILURE_MESSAGE}
+        assert fix_mechanical_content(result) == (result, [])
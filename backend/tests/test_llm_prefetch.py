@@ -0,0 +1,224 @@
+"""
+Tests for speculative prefetch of queued pending histories
+(`backend/app/llm/prefetch.py`) and the `/suggestions` read path it feeds.
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.llm import prefetch
+from app.llm.prefetch import prefetch_pending, take_prefetched
+from app.llm.suggestions import SuggestionsError
+
+RESULT = {
+    "suggestions": [
+        {"id": "1", "original": "訳文", "reason": "Tense.", "sourceExcerpt": "原文"}
+    ],
+    "overallComment": "Good overall.",
+    "llmProvider": "groq",
+    "llmModel": "llama-3.3-70b-versatile",
+}
+
+QUEUED = [
+    {"historyId": f"h{n}", "sessionId": "s1", "originalText": "原文", "targetText": "訳文"}
+    for n in (1, 2)
+]
+
+CLAIMED = {
+    "historyId": "h1",
+    "overallComment": "Good overall.",
+    "llmProvider": "groq",
+    "llmModel": "llama-3.3-70b-versatile",
+    "proposals": [
+        {
+            "proposalId": "p1",
+            "originalAfterText": "訳文",
+            "originalReason": "Tense.",
+            "sourceExcerpt": "原文",
+        }
+    ],
+}
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setenv("SUGGESTIONS_PREFETCH", "on")
+    monkeypatch.setattr(prefetch, "ready_pairs", lambda: 4)
+
+
+@pytest.fixture
+def db():
+    calls = {
+        "fetch_unprefetched_histories": AsyncMock(return_value=list(QUEUED)),
+        "store_prefetched_suggestions": AsyncMock(return_value=True),
+        "acquire_generation_lease": AsyncMock(return_value=True),
+        "release_generation_lease": AsyncMock(),
+        "claim_prefetched_history": AsyncMock(return_value=CLAIMED),
+    }
+    with patch.multiple("app.db_helper", **calls):
+        yield calls
+
+
+@pytest.mark.asyncio
+class TestPrefetchPending:
+    async def test_off_by_default(self, db, monkeypatch):
+        monkeypatch.delenv("SUGGESTIONS_PREFETCH", raising=False)
+        summary = await prefetch_pending()
+        assert summary["enabled"] is False
+        db["fetch_unprefetched_histories"].assert_not_called()
+
+    async def test_stores_proposals_for_each_queued_history(self, enabled, db):
+        with patch.object(
+            prefetch, "generate_suggestions", new=AsyncMock(return_value=RESULT)
+        ) as generate:
+            summary = await prefetch_pending(system_prompt_override="rules")
+
+        assert summary["prefetched"] == ["h1", "h2"]
+        assert summary["stoppedBecause"] is None
+        assert generate.call_args.args == ("原文", "訳文", None, "rules")
+        history_id, proposals, comment, provider, model = (
+            db["store_prefetched_suggestions"].call_args.args
+        )
+        assert history_id == "h2"
+        assert proposals[0]["originalAfterText"] == "訳文"
+        assert proposals[0]["originalReason"] == "Tense."
+        assert proposals[0]["sourceExcerpt"] == "原文"
+        assert (comment, provider, model) == (
+            "Good overall.",
+            "groq",
+            "llama-3.3-70b-versatile",
+        )
+        assert db["release_generation_lease"].await_count == 2
+
+    async def test_waits_while_quota_is_busy(self, enabled, db, monkeypatch):
+        monkeypatch.setattr(prefetch, "ready_pairs", lambda: 1)
+        generate = AsyncMock(return_value=RESULT)
+        with patch.object(prefetch, "generate_suggestions", new=generate):
+            summary = await prefetch_pending()
+        assert summary["stoppedBecause"] == "busy"
+        generate.assert_not_called()
+
+    async def test_rate_limit_ends_the_tick(self, enabled, db):
+        error = SuggestionsError("all providers failed", rate_limited=True)
+        generate = AsyncMock(side_effect=error)
+        with patch.object(prefetch, "generate_suggestions", new=generate):
+            summary = await prefetch_pending()
+        assert summary["failed"] == ["h1"]
+        assert summary["stoppedBecause"] == "rate_limited"
+        assert generate.call_count == 1
+
+    async def test_history_leased_elsewhere_is_skipped(self, enabled, db):
+        db["acquire_generation_lease"].side_effect = [False, True]
+        generate = AsyncMock(return_value=RESULT)
+        with patch.object(prefetch, "generate_suggestions", new=generate):
+            summary = await prefetch_pending()
+        assert summary["prefetched"] == ["h2"]
+        assert generate.call_count == 1
+
+    async def test_round_generated_meanwhile_is_not_reported(self, enabled, db):
+        db["store_prefetched_suggestions"].return_value = False
+        with patch.object(
+            prefetch, "generate_suggestions", new=AsyncMock(return_value=RESULT)
+        ):
+            summary = await prefetch_pending()
+        assert summary["prefetched"] == []
+
+
+@pytest.mark.asyncio
+class TestTakePrefetched:
+    async def test_claimed_round_becomes_a_suggestions_body(self, enabled, db):
+        body = await take_prefetched("s1", "原文", "訳文")
+        assert body["prefetchedHistoryId"] == "h1"
+        assert body["suggestions"] == [
+            {"id": "p1", "original": "訳文", "reason": "Tense.", "sourceExcerpt": "原文"}
+        ]
+        assert body["llmProvider"] == "groq"
+        db["claim_prefetched_history"].assert_awaited_once_with("s1", "原文", "訳文")
+
+    async def test_needs_a_session(self, enabled, db):
+        assert await take_prefetched(None, "原文", "訳文") is None
+        db["claim_prefetched_history"].assert_not_called()
+
+    async def test_database_trouble_means_not_prefetched(self, enabled, db):
+        db["claim_prefetched_history"].side_effect = OSError("pooler down")
+        assert await take_prefetched("s1", "原文", "訳文") is None
+
+
+class TestEndpoint:
+    @pytest.fixture
+    def client(self, monkeypatch, enabled, db):
+        import time as time_module
+
+        import jwt
+        from fastapi.testclient import TestClient
+
+        secret = "test-secret-value"
+        email = "owner@example.com"
+        monkeypatch.setenv("SUPABASE_JWT_SECRET", secret)
+        monkeypatch.setenv("ALLOWED_USER_EMAIL", email)
+        monkeypatch.setenv("ALLOWED_USER_EMAILS", email)
+        monkeypatch.setenv("GROQ_API_KEY", "k")
+        for name in ("GEMINI_API_KEY", "GEMINI_API_KEYS", "CLOUDFLARE_ACCOUNT_ID"):
+            monkeypatch.delenv(name, raising=False)
+
+        now = int(time_module.time())
+        token = jwt.encode(
+            {"email": email, "aud": "authenticated", "iat": now, "exp": now + 3600},
+            secret,
+            algorithm="HS256",
+        )
+        from app.main import app
+
+        with patch(
+            "app.llm.suggestions.call_groq_with_rotation", new=AsyncMock()
+        ) as mock_groq:
+            yield TestClient(app), {"Authorization": f"Bearer {token}"}, mock_groq
+
+    def test_prefetched_round_is_served_without_generating(self, client):
+        test_client, headers, mock_groq = client
+        response = test_client.post(
+            "/suggestions",
+            headers=headers,
+            json={"originalText": "原文", "targetText": "訳文", "sessionId": "s1"},
+        )
+        assert response.status_code == 200
+        assert response.json()["prefetchedHistoryId"] == "h1"
+        assert "prefetch;" in response.headers["server-timing"]
+        mock_groq.assert_not_called()
+
+    def test_disabled_tick_does_not_touch_the_database(
+        self, client, db, monkeypatch
+    ):
+        monkeypatch.delenv("SUGGESTIONS_PREFETCH", raising=False)
+        test_client, headers, _ = client
+        with patch("app.llm.prefetch.prefetch_pending", new=AsyncMock()) as tick:
+            response = test_client.post("/suggestions/prefetch", headers=headers)
+        assert response.status_code == 200
+        assert response.json() == {
+            "prefetched": [],
+            "failed": [],
+            "stoppedBecause": None,
+            "enabled": False,
+        }
+        tick.assert_not_called()
+        db["fetch_unprefetched_histories"].assert_not_called()
+
+    def test_exemplar_requests_are_never_served_a_prefetch(self, client, db):
+        test_client, headers, _ = client
+
+        async def shared_read(_key):
+            return None, []
+
+        with patch("app.db_helper.fetch_setting_and_provider_health", new=shared_read):
+            test_client.post(
+                "/suggestions",
+                headers=headers,
+                json={
+                    "originalText": "原文",
+                    "targetText": "訳文",
+                    "sessionId": "s1",
+                    "exemplarTranslation": "模範",
+                },
+            )
+        db["claim_prefetched_history"].assert_not_called()
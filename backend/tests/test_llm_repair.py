@@ -0,0 +1,175 @@
+"""
+Tests for item-level repair (`backend/app/llm/repair.py`) and its place in the
+retry loop of `generate_suggestions()`.
+
+What the repair stage must guarantee: only the offending items are sent, the
+good items come back untouched, and anything short of a fully fixed body falls
+back to the full pass it replaced.
+"""
+
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.llm.latency import measure, messages_chars, snapshot_records
+from app.llm.parser import (
+    JSON_EXTRACTION_FAILURE_MESSAGE,
+    PROBLEM_CHINESE_RECOMMENDATION,
+    PROBLEM_JAPANESE_PROSE,
+    suggestion_problems,
+)
+from app.llm.prompts import REPAIR_SYSTEM_PROMPT, build_repair_messages
+from app.llm.repair import REPAIR_MAX_ITEMS, apply_repair, plan_repair
+from app.llm.suggestions import LANGUAGE_RETRY_NUDGE, generate_suggestions
+
+GOOD_REASON = "这里用词不够自然，应改为「行きました」，因为过去时态需要一致。"
+JAPANESE_REASON = "ここは不自然です。過去形にしてください。"
+CHINESE_FORM_REASON = "这里不够自然，应该改为“理论上”以使语言更为流畅"
+
+
+def body(*reasons, comment="整体不错，但时态有问题"):
+    return {
+        "suggestions": [
+            {"id": str(i), "original": f"訳{i}", "reason": r, "sourceExcerpt": ""}
+            for i, r in enumerate(reasons, start=1)
+        ],
+        "overallComment": comment,
+    }
+
+
+def repair_reply(**reasons):
+    return json.dumps(
+        {"suggestions": [{"id": k, "reason": v} for k, v in reasons.items()]},
+        ensure_ascii=False,
+    )
+
+
+class TestSuggestionProblems:
+    def test_good_reason_has_none(self):
+        assert suggestion_problems({"reason": GOOD_REASON}) == []
+
+    def test_codes_name_the_failed_check(self):
+        assert PROBLEM_JAPANESE_PROSE in suggestion_problems(
+            {"reason": JAPANESE_REASON}
+        )
+        assert suggestion_problems({"reason": CHINESE_FORM_REASON}) == [
+            PROBLEM_CHINESE_RECOMMENDATION
+        ]
+
+
+class TestPlanRepair:
+    def test_only_offending_items_are_planned(self):
+        items = plan_repair(body(GOOD_REASON, JAPANESE_REASON, GOOD_REASON))
+        assert [item["id"] for item in items] == ["2"]
+        assert items[0]["problems"] == [PROBLEM_JAPANESE_PROSE]
+
+    def test_clean_body_needs_no_repair(self):
+        assert plan_repair(body(GOOD_REASON)) is None
+
+    def test_bad_overall_comment_is_left_to_a_full_pass(self):
+        result = body(JAPANESE_REASON, comment="全体的に良いです。")
+        assert plan_repair(result) is None
+
+    def test_parse_failure_is_left_to_a_full_pass(self):
+        result = {"suggestions": [], "overallComment": JSON_EXTRACTION_FAILURE_MESSAGE}
+        assert plan_repair(result) is None
+
+    def test_a_body_wrong_throughout_is_regenerated_instead(self):
+        result = body(*([JAPANESE_REASON] * (REPAIR_MAX_ITEMS + 1)))
+        assert plan_repair(result) is None
+
+
+class TestApplyRepair:
+    def test_splices_reasons_and_keeps_good_items(self):
+        result = body(GOOD_REASON, JAPANESE_REASON)
+        items = plan_repair(result)
+        repaired = apply_repair(result, items, repair_reply(**{"2": GOOD_REASON}))
+        assert [s["reason"] for s in repaired["suggestions"]] == [GOOD_REASON] * 2
+        assert repaired["suggestions"][0] is result["suggestions"][0]
+        assert repaired["overallComment"] == result["overallComment"]
+
+    def test_missing_item_rejects_the_repair(self):
+        result = body(JAPANESE_REASON, JAPANESE_REASON)
+        items = plan_repair(result)
+        assert apply_repair(result, items, repair_reply(**{"1": GOOD_REASON})) is None
+
+    def test_still_bad_item_rejects_the_repair(self):
+        result = body(JAPANESE_REASON)
+        items = plan_repair(result)
+        assert apply_repair(result, items, repair_reply(**{"1": JAPANESE_REASON})) is None
+
+    def test_unparseable_reply_rejects_the_repair(self):
+        result = body(JAPANESE_REASON)
+        assert apply_repair(result, plan_repair(result), "sorry") is None
+
+
+class TestRepairMessages:
+    def test_payload_holds_only_the_items_given(self):
+        messages = build_repair_messages(plan_repair(body(GOOD_REASON, JAPANESE_REASON)))
+        assert messages[0]["content"] == REPAIR_SYSTEM_PROMPT
+        payload = json.loads(messages[1]["content"])
+        assert [item["id"] for item in payload["suggestions"]] == ["2"]
+        assert payload["suggestions"][0]["问题"]
+
+
+@pytest.mark.asyncio
+class TestRepairInTheChain:
+    async def test_repair_replaces_the_full_retry(self):
+        first = json.dumps(body(GOOD_REASON, JAPANESE_REASON), ensure_ascii=False)
+        with patch.dict("os.environ", {"GROQ_API_KEY": "test-key"}, clear=True):
+            with patch(
+                "app.llm.suggestions.call_groq_with_rotation", new_callable=AsyncMock
+            ) as mock_groq:
+                mock_groq.side_effect = [first, repair_reply(**{"2": GOOD_REASON})]
+                result = await generate_suggestions("原文", "訳文")
+
+        assert mock_groq.call_count == 2
+        repair_messages = mock_groq.call_args_list[1].args[0]
+        assert repair_messages[0]["content"] == REPAIR_SYSTEM_PROMPT
+        assert [s["reason"] for s in result["suggestions"]] == [GOOD_REASON] * 2
+        assert result["llmProvider"] == "groq"
+
+    async def test_repair_calls_are_kept_out_of_latency_learning(self):
+        first = json.dumps(body(GOOD_REASON, JAPANESE_REASON), ensure_ascii=False)
+        replies = iter([first, repair_reply(**{"2": GOOD_REASON})])
+
+        async def timed_groq(messages, **_kwargs):
+            with measure("groq", "m1", messages_chars(messages), timeout_s=25.0):
+                return next(replies)
+
+        with patch.dict("os.environ", {"GROQ_API_KEY": "test-key"}, clear=True):
+            with patch(
+                "app.llm.suggestions.call_groq_with_rotation", new=timed_groq
+            ):
+                await generate_suggestions("原文", "訳文")
+
+        # Only the suggestion call is timed; the repair call is not.
+        samples = {record[1]: record[4] for record in snapshot_records()}
+        assert samples["m1"] == 1
+
+    async def test_failed_repair_falls_back_to_the_nudged_pass(self):
+        first = json.dumps(body(GOOD_REASON, JAPANESE_REASON), ensure_ascii=False)
+        clean = json.dumps(body(GOOD_REASON), ensure_ascii=False)
+        with patch.dict("os.environ", {"GROQ_API_KEY": "test-key"}, clear=True):
+            with patch(
+                "app.llm.suggestions.call_groq_with_rotation", new_callable=AsyncMock
+            ) as mock_groq:
+                mock_groq.side_effect = [first, "not json", clean]
+                result = await generate_suggestions("原文", "訳文")
+
+        assert mock_groq.call_count == 3
+        assert mock_groq.call_args_list[2].args[0][-1]["content"] == LANGUAGE_RETRY_NUDGE
+        assert len(result["suggestions"]) == 1
+
+    async def test_gemini_repairs_when_groq_is_absent(self):
+        first = json.dumps(body(JAPANESE_REASON), ensure_ascii=False)
+        with patch.dict("os.environ", {"GEMINI_API_KEY": "gem-key"}, clear=True):
+            with patch(
+                "app.llm.suggestions.call_gemini_with_rotation", new_callable=AsyncMock
+            ) as mock_gemini:
+                mock_gemini.side_effect = [first, repair_reply(**{"1": GOOD_REASON})]
+                result = await generate_suggestions("原文", "訳文")
+
+        assert mock_gemini.call_count == 2
+        assert result["suggestions"][0]["reason"] == GOOD_REASON
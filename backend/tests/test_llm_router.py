@@ -0,0 +1,158 @@
+"""
+Tests for the score-based router (`backend/app/llm/router.py`) and how the
+failover chain follows its order.
+
+The router is opt-in, so the first thing that must hold is that nothing changes
+without `LLM_ROUTER=score`; after that, that bad recent behaviour demotes a
+provider and a provider that cannot fit the budget never leads.
+"""
+
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.llm.cloudflare_provider import CF_MIN_SLICE_S
+from app.llm.gemini_provider import GEMINI_MIN_SLICE_S, GeminiServerError
+from app.llm.latency import MIN_SAMPLES, record_latency
+from app.llm.router import (
+    DEFAULT_WEIGHTS,
+    order_providers,
+    rank_models,
+    record_result,
+    router_weights,
+)
+from app.llm.suggestions import _later_provider_reserve, generate_suggestions
+from tests.test_llm_suggestions import VALID_LLM_RESPONSE
+
+# The cloud part of `suggestions.CHAIN_ORDER`; the local server is unconfigured.
+STATIC_ORDER = ("gemini", "groq", "cloudflare")
+READY = {"gemini": 2, "groq": 2, "cloudflare": 2}
+DEFAULT_P50 = {"gemini": 8.0, "groq": 3.0, "cloudflare": 5.0}
+
+
+def order(deadline=None, ready=READY):
+    return order_providers(
+        STATIC_ORDER,
+        input_chars=1000,
+        deadline_monotonic=deadline,
+        ready_pairs=ready,
+        default_p50_s=DEFAULT_P50,
+    )
+
+
+def fail(provider, n=10):
+    for _ in range(n):
+        record_result(provider, None, answered=False)
+
+
+@pytest.fixture
+def router_on(monkeypatch):
+    monkeypatch.setenv("LLM_ROUTER", "score")
+
+
+class TestOrder:
+    def test_static_order_without_opt_in(self):
+        fail("gemini")
+        assert order() == STATIC_ORDER
+
+    def test_cold_start_keeps_the_static_order(self, router_on):
+        assert order() == STATIC_ORDER
+
+    def test_failing_provider_is_demoted(self, router_on):
+        fail("gemini")
+        assert order() == ("groq", "cloudflare", "gemini")
+
+    def test_unusable_answers_count_against_a_provider(self, router_on):
+        for _ in range(10):
+            record_result("gemini", "g1", answered=True, usable=False)
+        assert order()[0] == "groq"
+
+    def test_provider_that_cannot_fit_the_budget_goes_last(self, router_on):
+        for _ in range(MIN_SAMPLES):
+            record_latency("gemini", "g1", 1000, 20.0)
+        for _ in range(10):
+            record_result("gemini", "g1", answered=True, usable=True)
+        assert order(deadline=time.monotonic() + 10.0)[-1] == "gemini"
+
+    def test_quota_breaks_otherwise_equal_scores(self, router_on):
+        ready = {"gemini": 0, "groq": 3, "cloudflare": 3}
+        assert order(ready=ready)[-1] == "gemini"
+
+
+class TestWeights:
+    def test_defaults(self):
+        assert router_weights() == DEFAULT_WEIGHTS
+
+    def test_overrides_and_ignores_junk(self, monkeypatch):
+        monkeypatch.setenv("LLM_ROUTER_WEIGHTS", "usable=5, speed=2, quota=x")
+        weights = router_weights()
+        assert weights["usable"] == 5.0
+        assert weights["quota"] == DEFAULT_WEIGHTS["quota"]
+        assert "speed" not in weights
+
+    def test_zero_weight_removes_a_signal(self, router_on, monkeypatch):
+        monkeypatch.setenv("LLM_ROUTER_WEIGHTS", "success=0,usable=0")
+        fail("gemini")
+        assert order() == STATIC_ORDER
+
+
+class TestModels:
+    def test_unusable_model_is_ranked_last(self):
+        for _ in range(10):
+            record_result("groq", "bad", answered=True, usable=False)
+            record_result("groq", "good", answered=True, usable=True)
+        assert rank_models("groq", ["bad", "other", "good"]) == ["good", "other", "bad"]
+
+    def test_rotation_takes_the_best_models(self, router_on, monkeypatch):
+        from app.llm.groq_provider import ALLOWED_GROQ_MODELS, select_groq_models
+
+        monkeypatch.delenv("GROQ_MODEL", raising=False)
+        worst = ALLOWED_GROQ_MODELS[0]
+        for _ in range(10):
+            record_result("groq", worst, answered=True, usable=False)
+        assert worst not in select_groq_models(n=len(ALLOWED_GROQ_MODELS) - 1)
+
+
+class TestReserve:
+    def test_reserve_follows_the_order(self, monkeypatch):
+        monkeypatch.setenv("GEMINI_API_KEY", "g")
+        monkeypatch.setenv("CLOUDFLARE_ACCOUNT_ID", "a")
+        monkeypatch.setenv("CLOUDFLARE_API_TOKEN", "t")
+        reserve = _later_provider_reserve(
+            after="groq", order=("groq", "gemini", "cloudflare")
+        )
+        assert reserve == GEMINI_MIN_SLICE_S + CF_MIN_SLICE_S
+
+
+@pytest.mark.asyncio
+class TestChain:
+    async def test_demoted_primary_is_tried_after_the_secondary(self, router_on):
+        fail("gemini")
+        env = {"LLM_ROUTER": "score", "GEMINI_API_KEY": "g", "GROQ_API_KEY": "k"}
+        with patch.dict("os.environ", env, clear=True):
+            with patch(
+                "app.llm.suggestions.call_gemini_with_rotation", new_callable=AsyncMock
+            ) as mock_gemini, patch(
+                "app.llm.suggestions.call_groq_with_rotation",
+                new=AsyncMock(return_value=VALID_LLM_RESPONSE),
+            ):
+                result = await generate_suggestions("原文", "訳文")
+
+        assert result["llmProvider"] == "groq"
+        mock_gemini.assert_not_called()
+
+    async def test_chain_outcomes_feed_the_scoreboard(self, router_on):
+        env = {"LLM_ROUTER": "score", "GEMINI_API_KEY": "g", "GROQ_API_KEY": "k"}
+        with patch.dict("os.environ", env, clear=True):
+            with patch(
+                "app.llm.suggestions.call_gemini_with_rotation",
+                new=AsyncMock(side_effect=GeminiServerError("HTTP 503")),
+            ), patch(
+                "app.llm.suggestions.call_groq_with_rotation",
+                new=AsyncMock(return_value=VALID_LLM_RESPONSE),
+            ):
+                for _ in range(3):
+                    await generate_suggestions("原文", "訳文")
+
+        assert order()[0] == "groq"
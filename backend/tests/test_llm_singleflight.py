@@ -0,0 +1,193 @@
+"""
+Tests for single-flight coalescing of identical generations
+(`backend/app/llm/singleflight.py`).
+"""
+
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.llm import singleflight
+from app.llm.singleflight import generation_key, run_once
+
+RESULT = {"suggestions": [{"id": 1}], "llmProvider": "groq"}
+
+
+class Generator:
+    """Counts calls; each call waits until `release` is set."""
+
+    def __init__(self, result=RESULT):
+        self.calls = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+        self.result = result
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return self.result
+
+
+class TestGenerationKey:
+    def test_same_request_same_key(self):
+        assert generation_key("原文", "訳文") == generation_key("原文", "訳文")
+
+    def test_every_input_changes_the_key(self):
+        base = generation_key("原文", "訳文")
+        assert generation_key("原文", "訳文。") != base
+        assert generation_key("原文", "訳文", "模範") != base
+        assert generation_key("原文", "訳文", None, "custom rules") != base
+        assert generation_key("原文", "訳文", chunk_paragraphs=True) != base
+
+
+@pytest.mark.asyncio
+class TestLocal:
+    async def test_concurrent_identical_requests_share_one_generation(self):
+        generate = Generator()
+        first = asyncio.create_task(run_once("k", generate))
+        second = asyncio.create_task(run_once("k", generate))
+        await asyncio.sleep(0)
+        generate.release.set()
+        a, b = await asyncio.gather(first, second)
+
+        assert generate.calls == 1
+        assert a == b == RESULT
+        assert a is not b
+
+    async def test_different_keys_generate_separately(self):
+        generate = Generator()
+        generate.release.set()
+        await asyncio.gather(run_once("k1", generate), run_once("k2", generate))
+        assert generate.calls == 2
+
+    async def test_finished_generation_is_not_reused(self):
+        generate = Generator()
+        generate.release.set()
+        await run_once("k", generate)
+        await run_once("k", generate)
+        assert generate.calls == 2
+
+    async def test_off_disables_coalescing(self, monkeypatch):
+        monkeypatch.setenv("SUGGESTIONS_SINGLEFLIGHT", "off")
+        generate = Generator()
+        generate.release.set()
+        await asyncio.gather(run_once("k", generate), run_once("k", generate))
+        assert generate.calls == 2
+
+    async def test_one_waiter_leaving_keeps_the_generation(self):
+        generate = Generator()
+        leaving = asyncio.create_task(run_once("k", generate))
+        staying = asyncio.create_task(run_once("k", generate))
+        await asyncio.sleep(0)
+        leaving.cancel()
+        await asyncio.sleep(0)
+        generate.release.set()
+
+        assert await staying == RESULT
+        assert generate.cancelled == 0
+
+    async def test_last_waiter_leaving_cancels_the_generation(self):
+        generate = Generator()
+        only = asyncio.create_task(run_once("k", generate))
+        await asyncio.sleep(0)
+        only.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await only
+        await asyncio.sleep(0)
+        assert generate.cancelled == 1
+
+    async def test_errors_reach_every_waiter(self):
+        async def failing():
+            await asyncio.sleep(0)
+            raise RuntimeError("all providers failed")
+
+        results = await asyncio.gather(
+            run_once("k", failing), run_once("k", failing), return_exceptions=True
+        )
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.fixture
+def shared(monkeypatch):
+    monkeypatch.setenv("SUGGESTIONS_SINGLEFLIGHT", "shared")
+    monkeypatch.setattr(singleflight, "LEASE_POLL_S", 0.0)
+    leases = {
+        "acquire_generation_lease": AsyncMock(return_value=True),
+        "fetch_generation_lease": AsyncMock(return_value=None),
+        "complete_generation_lease": AsyncMock(),
+        "release_generation_lease": AsyncMock(),
+    }
+    with patch.multiple("app.db_helper", **leases):
+        yield leases
+
+
+@pytest.mark.asyncio
+class TestShared:
+    async def test_lease_holder_generates_and_publishes(self, shared):
+        generate = Generator()
+        generate.release.set()
+        assert await run_once("k", generate) == RESULT
+
+        key, holder, published, _ttl = shared["complete_generation_lease"].call_args.args
+        assert key == "k" and holder
+        assert json.loads(published) == RESULT
+
+    async def test_other_process_result_is_used(self, shared):
+        shared["acquire_generation_lease"].return_value = False
+        shared["fetch_generation_lease"].side_effect = [
+            {"result": None, "expired": False},
+            {"result": json.dumps(RESULT), "expired": False},
+        ]
+        generate = Generator()
+        assert await run_once("k", generate) == RESULT
+        assert generate.calls == 0
+
+    async def test_released_lease_means_generate_locally(self, shared):
+        shared["acquire_generation_lease"].return_value = False
+        generate = Generator()
+        generate.release.set()
+        assert await run_once("k", generate) == RESULT
+        assert generate.calls == 1
+
+    async def test_failed_generation_releases_the_lease(self, shared):
+        async def failing():
+            raise RuntimeError("all providers failed")
+
+        with pytest.raises(RuntimeError):
+            await run_once("k", failing)
+        shared["release_generation_lease"].assert_awaited_once()
+        shared["complete_generation_lease"].assert_not_called()
+
+    async def test_database_trouble_falls_back_to_local(self, shared):
+        shared["acquire_generation_lease"].side_effect = OSError("pooler down")
+        generate = Generator()
+        generate.release.set()
+        assert await run_once("k", generate) == RESULT
+
+    async def test_slow_lease_query_falls_back_to_local(self, shared, monkeypatch):
+        monkeypatch.setattr(singleflight, "LEASE_DB_TIMEOUT_S", 0.01)
+
+        async def slow_acquire(*_args):
+            await asyncio.sleep(1.0)
+
+        shared["acquire_generation_lease"].side_effect = slow_acquire
+        generate = Generator()
+        generate.release.set()
+        assert await run_once("k", generate) == RESULT
+        assert generate.calls == 1
+
+    async def test_no_waiting_once_only_a_local_generation_still_fits(self, shared):
+        shared["acquire_generation_lease"].return_value = False
+        generate = Generator()
+        generate.release.set()
+        deadline = time.monotonic() + singleflight.LOCAL_GENERATION_RESERVE_S
+        assert await run_once("k", generate, deadline_monotonic=deadline) == RESULT
+        shared["fetch_generation_lease"].assert_not_called()
+        assert generate.calls == 1
@@ -2,11 +2,11 @@
 Tests for backend/app/llm/suggestions.py with mock providers.
 
 Note: suggestions.py calls call_gemini_with_rotation() / call_groq_with_rotation()
-(not the single-model helpers) so in-provider model rotation/retry happens
-before falling over Gemini → Groq → Cloudflare. Tests here mock
-call_gemini_with_rotation / call_groq_with_rotation / call_cloudflare to
-exercise the failover chain without needing to also mock the rotation
-internals (those are covered by provider unit tests).
+/ call_cloudflare_with_rotation() (not the single-model helpers) so in-provider
+model rotation/retry happens before falling over Gemini → Groq → Cloudflare.
+Tests here mock the rotation wrappers to exercise the failover chain without
+needing to also mock the rotation internals (those are covered by provider
+unit tests).
 """
 
 import pytest
@@ -109,7 +109,7 @@ class TestGenerateSuggestionsGroqFailCFSuccess:
             'CLOUDFLARE_API_TOKEN': 'tok'
         }, clear=True):
             with patch('app.llm.suggestions.call_groq_with_rotation', new_callable=AsyncMock) as mock_groq:
-                with patch('app.llm.suggestions.call_cloudflare', new_callable=AsyncMock) as mock_cf:
+                with patch('app.llm.suggestions.call_cloudflare_with_rotation', new_callable=AsyncMock) as mock_cf:
                     # call_groq_with_rotation already exhausts its internal
                     # 2-model retry before raising, so a raised error here
                     # means both attempted Groq models failed.
@@ -130,7 +130,7 @@ class TestGenerateSuggestionsGroqFailCFSuccess:
             'CLOUDFLARE_API_TOKEN': 'tok'
         }, clear=True):
             with patch('app.llm.suggestions.call_groq_with_rotation', new_callable=AsyncMock) as mock_groq:
-                with patch('app.llm.suggestions.call_cloudflare', new_callable=AsyncMock) as mock_cf:
+                with patch('app.llm.suggestions.call_cloudflare_with_rotation', new_callable=AsyncMock) as mock_cf:
                     mock_groq.side_effect = GroqServerError("Server error", status_code=500)
                     mock_cf.return_value = VALID_LLM_RESPONSE
                     
@@ -146,7 +146,7 @@ class TestGenerateSuggestionsGroqFailCFSuccess:
             'CLOUDFLARE_API_TOKEN': 'tok'
         }, clear=True):
             with patch('app.llm.suggestions.call_groq_with_rotation', new_callable=AsyncMock) as mock_groq:
-                with patch('app.llm.suggestions.call_cloudflare', new_callable=AsyncMock) as mock_cf:
+                with patch('app.llm.suggestions.call_cloudflare_with_rotation', new_callable=AsyncMock) as mock_cf:
                     mock_groq.side_effect = GroqTimeoutError("Timeout")
                     mock_cf.return_value = VALID_LLM_RESPONSE
 
@@ -162,7 +162,7 @@ class TestGenerateSuggestionsGroqFailCFSuccess:
             'CLOUDFLARE_API_TOKEN': 'tok'
         }, clear=True):
             with patch('app.llm.suggestions.call_groq_with_rotation', new_callable=AsyncMock) as mock_groq:
-                with patch('app.llm.suggestions.call_cloudflare', new_callable=AsyncMock) as mock_cf:
+                with patch('app.llm.suggestions.call_cloudflare_with_rotation', new_callable=AsyncMock) as mock_cf:
                     mock_groq.return_value = "   "
                     mock_cf.return_value = VALID_LLM_RESPONSE
 
@@ -181,7 +181,7 @@ class TestGenerateSuggestionsGroqFailCFSuccess:
             'CLOUDFLARE_API_TOKEN': 'tok'
         }, clear=True):
             with patch('app.llm.groq_provider.call_groq', new_callable=AsyncMock) as mock_call_groq:
-                with patch('app.llm.suggestions.call_cloudflare', new_callable=AsyncMock) as mock_cf:
+                with patch('app.llm.suggestions.call_cloudflare_with_rotation', new_callable=AsyncMock) as mock_cf:
                     mock_call_groq.side_effect = [
                         GroqRateLimitError("Rate limit", status_code=429),
                         GroqRateLimitError("Rate limit", status_code=429),
@@ -207,7 +207,7 @@ class TestGenerateSuggestionsBothFail:
             'CLOUDFLARE_API_TOKEN': 'tok'
         }, clear=True):
             with patch('app.llm.suggestions.call_groq_with_rotation', new_callable=AsyncMock) as mock_groq:
-                with patch('app.llm.suggestions.call_cloudflare', new_callable=AsyncMock) as mock_cf:
+                with patch('app.llm.suggestions.call_cloudflare_with_rotation', new_callable=AsyncMock) as mock_cf:
                     mock_groq.side_effect = GroqRateLimitError("Rate limit", status_code=429)
                     mock_cf.side_effect = CloudflareError("CF error")
                     
@@ -235,7 +235,7 @@ class TestGenerateSuggestionsBothFail:
             'GEMINI_API_KEYS': 'gem-a,gem-b',
         }, clear=True):
             with patch('app.llm.suggestions.call_groq_with_rotation', new_callable=AsyncMock) as mock_groq:
-                with patch('app.llm.suggestions.call_cloudflare', new_callable=AsyncMock) as mock_cf:
+                with patch('app.llm.suggestions.call_cloudflare_with_rotation', new_callable=AsyncMock) as mock_cf:
                     with patch(
                         'app.llm.suggestions.call_gemini_with_rotation',
                         new_callable=AsyncMock,
@@ -269,7 +269,7 @@ class TestGenerateSuggestionsCloudflareOnly:
             'CLOUDFLARE_ACCOUNT_ID': 'acc',
             'CLOUDFLARE_API_TOKEN': 'tok'
         }, clear=True):
-            with patch('app.llm.suggestions.call_cloudflare', new_callable=AsyncMock) as mock_cf:
+            with patch('app.llm.suggestions.call_cloudflare_with_rotation', new_callable=AsyncMock) as mock_cf:
                 mock_cf.return_value = VALID_LLM_RESPONSE
                 
                 result = await generate_suggestions("原文", "訳文")
@@ -289,7 +289,7 @@ class TestGenerateSuggestionsGeminiPrimary:
             'GEMINI_API_KEY': 'gem-key',
         }, clear=True):
             with patch('app.llm.suggestions.call_groq_with_rotation', new_callable=AsyncMock) as mock_groq:
-                with patch('app.llm.suggestions.call_cloudflare', new_callable=AsyncMock) as mock_cf:
+                with patch('app.llm.suggestions.call_cloudflare_with_rotation', new_callable=AsyncMock) as mock_cf:
                     with patch(
                         'app.llm.suggestions.call_gemini_with_rotation',
                         new_callable=AsyncMock,
@@ -312,7 +312,7 @@ class TestGenerateSuggestionsGeminiPrimary:
             'GEMINI_API_KEY': 'gem-key',
         }, clear=True):
             with patch('app.llm.suggestions.call_groq_with_rotation', new_callable=AsyncMock) as mock_groq:
-                with patch('app.llm.suggestions.call_cloudflare', new_callable=AsyncMock) as mock_cf:
+                with patch('app.llm.suggestions.call_cloudflare_with_rotation', new_callable=AsyncMock) as mock_cf:
                     with patch(
                         'app.llm.suggestions.call_gemini_with_rotation',
                         new_callable=AsyncMock,
@@ -346,7 +346,7 @@ class TestGenerateSuggestionsGeminiPrimary:
             'GEMINI_API_KEY': 'gem-key',
         }, clear=True):
             with patch('app.llm.suggestions.call_groq_with_rotation', new_callable=AsyncMock) as mock_groq:
-                with patch('app.llm.suggestions.call_cloudflare', new_callable=AsyncMock) as mock_cf:
+                with patch('app.llm.suggestions.call_cloudflare_with_rotation', new_callable=AsyncMock) as mock_cf:
                     with patch(
                         'app.llm.suggestions.call_gemini_with_rotation',
                         new_callable=AsyncMock,
@@ -375,7 +375,7 @@ class TestGenerateSuggestionsContentSalvage:
             'CLOUDFLARE_API_TOKEN': 'tok'
         }, clear=True):
             with patch('app.llm.suggestions.call_groq_with_rotation', new_callable=AsyncMock) as mock_groq:
-                with patch('app.llm.suggestions.call_cloudflare', new_callable=AsyncMock) as mock_cf:
+                with patch('app.llm.suggestions.call_cloudflare_with_rotation', new_callable=AsyncMock) as mock_cf:
                     mock_groq.return_value = NON_CHINESE_LLM_RESPONSE
                     mock_cf.return_value = VALID_LLM_RESPONSE
 
@@ -393,7 +393,7 @@ class TestGenerateSuggestionsContentSalvage:
             'CLOUDFLARE_API_TOKEN': 'tok'
         }, clear=True):
             with patch('app.llm.suggestions.call_groq_with_rotation', new_callable=AsyncMock) as mock_groq:
-                with patch('app.llm.suggestions.call_cloudflare', new_callable=AsyncMock) as mock_cf:
+                with patch('app.llm.suggestions.call_cloudflare_with_rotation', new_callable=AsyncMock) as mock_cf:
                     mock_groq.return_value = UNPARSEABLE_LLM_RESPONSE
                     mock_cf.return_value = VALID_LLM_RESPONSE
 
@@ -453,7 +453,7 @@ class TestGenerateSuggestionsParseFailureRetry:
             'CLOUDFLARE_API_TOKEN': 'tok'
         }, clear=True):
             with patch('app.llm.suggestions.call_groq_with_rotation', new_callable=AsyncMock) as mock_groq:
-                with patch('app.llm.suggestions.call_cloudflare', new_callable=AsyncMock) as mock_cf:
+                with patch('app.llm.suggestions.call_cloudflare_with_rotation', new_callable=AsyncMock) as mock_cf:
                     mock_groq.side_effect = GroqRateLimitError("Rate limit", status_code=429)
                     mock_cf.side_effect = CloudflareError("CF error")
 
@@ -882,7 +882,7 @@ class TestProviderModelProvenance:
         assert result["llmProvider"] == "groq"
         assert result["llmModel"] == "openai/gpt-oss-120b"
 
-    async def test_cloudflare_success_reports_its_fixed_model(self):
+    async def test_cloudflare_plain_text_reports_its_configured_model(self):
         from app.llm.cloudflare_provider import CF_MODEL
 
         with patch.dict(
@@ -891,7 +891,7 @@ class TestProviderModelProvenance:
             clear=True,
         ):
             with patch(
-                "app.llm.suggestions.call_cloudflare", new_callable=AsyncMock
+                "app.llm.suggestions.call_cloudflare_with_rotation", new_callable=AsyncMock
             ) as mock_cf:
                 mock_cf.return_value = VALID_LLM_RESPONSE
                 result = await generate_suggestions("原文", "訳文")
@@ -920,6 +920,13 @@ class TestProviderModelProvenance:
 class TestChineseRecommendationRetry:
     """A Chinese recommended form is unusable content, so the pass retries."""
 
+    @pytest.fixture(autouse=True)
+    def _no_item_repair(self, monkeypatch):
+        """These cover the full-pass fallback, so item repair never succeeds."""
+        monkeypatch.setattr(
+            "app.llm.suggestions._repair_outcome", AsyncMock(return_value=None)
+        )
+
     CHINESE_RECOMMENDATION = (
         '{"suggestions":[{"id":"1","original":"論理的に言えば",'
         '"reason":"这里不够自然，应该改为“理论上”以使语言更为流畅"}],'
@@ -975,6 +982,47 @@ class TestChineseRecommendationRetry:
         assert result["suggestions"][0]["original"] == "論理的に言えば"
 
 
+@pytest.mark.asyncio
+class TestMechanicalFixesSpareARetry:
+    """「」 misuse is fixed locally, so it no longer costs a provider round trip."""
+
+    CORNER_MISUSE = (
+        '{"suggestions":[{"id":"1","original":"行きます",'
+        '"reason":"这里的「时态」不一致，应改为「行きました」，因为前文是过去的事"}],'
+        '"overallComment":"整体质量良好"}'
+    )
+
+    async def test_fixed_body_is_accepted_on_the_first_pass(self):
+        with patch.dict("os.environ", {"GROQ_API_KEY": "test-key"}, clear=True):
+            with patch(
+                "app.llm.suggestions.call_groq_with_rotation", new_callable=AsyncMock
+            ) as mock_groq:
+                mock_groq.return_value = self.CORNER_MISUSE
+                result = await generate_suggestions("原文", "訳文")
+
+        assert mock_groq.call_count == 1
+        assert result["suggestions"][0]["reason"].startswith("这里的“时态”")
+        assert result["contentFixes"] == [
+            {
+                "field": "reason",
+                "id": "1",
+                "fix": "corner_quotes_to_double_quotes",
+                "before": "「时态」",
+                "after": "“时态”",
+            }
+        ]
+
+    async def test_clean_body_carries_no_fix_record(self):
+        with patch.dict("os.environ", {"GROQ_API_KEY": "test-key"}, clear=True):
+            with patch(
+                "app.llm.suggestions.call_groq_with_rotation", new_callable=AsyncMock
+            ) as mock_groq:
+                mock_groq.return_value = VALID_LLM_RESPONSE
+                result = await generate_suggestions("原文", "訳文")
+
+        assert "contentFixes" not in result
+
+
 @pytest.mark.asyncio
 class TestSoftBodySurvivesRetryFailure:
     """
@@ -987,6 +1035,13 @@ class TestSoftBodySurvivesRetryFailure:
     (`fix-suggestion-retry-budget-hard-failure`).
     """
 
+    @pytest.fixture(autouse=True)
+    def _no_item_repair(self, monkeypatch):
+        """These cover the full-pass fallback, so item repair never succeeds."""
+        monkeypatch.setattr(
+            "app.llm.suggestions._repair_outcome", AsyncMock(return_value=None)
+        )
+
     SOFT_BODY = (
         '{"suggestions":[{"id":"1","original":"論理的に言えば",'
         '"reason":"这里不够自然，应该改为“理论上”以使语言更为流畅"}],'
@@ -0,0 +1,80 @@
+"""
+Tests for the per-level thinking scoreboard (`backend/app/llm/thinking.py`) and
+how the retry loop feeds it.
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.llm.suggestions import generate_suggestions
+from app.llm.thinking import (
+    current_pass_attempt,
+    level_stats,
+    pass_scope,
+    record_call,
+    record_usable,
+)
+from tests.test_llm_suggestions import VALID_LLM_RESPONSE
+
+
+class TestScoreboard:
+    def test_latency_and_timeouts_per_level(self):
+        record_call("low", 8.0, answered=True)
+        record_call("low", 12.0, answered=True)
+        record_call("low", 22.0, answered=False)
+        record_call("minimal", 3.0, answered=True)
+        stats = level_stats()
+        assert stats["low"]["calls"] == 3
+        assert stats["low"]["timeouts"] == 1
+        assert stats["low"]["p50_s"] == 12.0
+        assert stats["minimal"]["p50_s"] == 3.0
+
+    def test_usable_is_charged_to_the_level_that_answered(self):
+        with pass_scope(2):
+            assert current_pass_attempt() == 2
+            record_call("medium", 9.0, answered=True)
+            record_usable(False)
+            # Nothing answered since: a later provider's result is not Gemini's.
+            record_usable(True)
+        assert level_stats()["medium"]["usable_rate"] == 0.0
+
+    def test_usable_result_and_rate_are_logged(self, caplog):
+        with caplog.at_level("INFO", logger="app.llm.thinking"):
+            with pass_scope(1):
+                record_call("low", 8.0, answered=True)
+                record_usable(True)
+                record_call("low", 9.0, answered=True)
+                record_usable(False)
+        assert "thinking=low pass 1 not usable (usable rate 50% of last 2)" in (
+            caplog.text
+        )
+
+    def test_outside_a_pass_nothing_is_charged(self):
+        assert current_pass_attempt() == 1
+        record_call("low", 8.0, answered=True)
+        record_usable(True)
+        assert level_stats()["low"]["usable_rate"] is None
+
+
+@pytest.mark.asyncio
+async def test_chain_records_gemini_usable_rate_per_level():
+    client = AsyncMock()
+    client.post.return_value.status_code = 200
+    client.post.return_value.headers = {}
+    client.post.return_value.json = lambda: {
+        "candidates": [{"content": {"parts": [{"text": VALID_LLM_RESPONSE}]}}]
+    }
+    with patch.dict(
+        "os.environ",
+        {"GEMINI_API_KEY": "gem-key", "GEMINI_MODEL": "gemini-3.7-flash"},
+        clear=True,
+    ):
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            result = await generate_suggestions("原文", "訳文")
+
+    assert result["llmProvider"] == "gemini"
+    # A sentence on each side is a short review: the first pass thinks least.
+    stats = level_stats()["minimal"]
+    assert stats["calls"] == 1
+    assert stats["usable_rate"] == 1.0
@@ -0,0 +1,160 @@
+"""
+Tests for the per-request phase timeline (`backend/app/llm/timeline.py`) and
+its `Server-Timing` / `debug.timeline` output on `POST /suggestions`.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.llm import groq_provider
+from app.llm.groq_provider import GroqRateLimitError
+from app.llm.timeline import (
+    MAX_SERVER_TIMING_ENTRIES,
+    current_timeline,
+    recording,
+    span,
+)
+from tests.test_llm_suggestions import VALID_LLM_RESPONSE
+
+
+class TestSpan:
+    def test_no_op_outside_a_recording(self):
+        with span("parse") as attrs:
+            attrs["fixes"] = 1
+        assert current_timeline() is None
+
+    def test_failure_records_error_and_status(self):
+        with recording() as timeline:
+            with pytest.raises(GroqRateLimitError):
+                with span("groq", key="groq[0]"):
+                    raise GroqRateLimitError("HTTP 429", status_code=429)
+        (entry,) = timeline.entries
+        assert entry.attrs == {
+            "key": "groq[0]",
+            "error": "GroqRateLimitError",
+            "status": 429,
+        }
+
+    def test_tasks_started_inside_share_the_timeline(self):
+        async def chunk(i):
+            with span("pass", chunk=i):
+                await asyncio.sleep(0)
+
+        async def run():
+            with recording() as timeline:
+                await asyncio.gather(chunk(1), chunk(2))
+            return timeline
+
+        timeline = asyncio.run(run())
+        assert sorted(e.attrs["chunk"] for e in timeline.entries) == [1, 2]
+
+
+class TestServerTiming:
+    def test_repeated_names_are_numbered_and_desc_is_ascii(self):
+        with recording() as timeline:
+            with span("groq", key="groq[0] 鍵", model='a"b'):
+                pass
+            with span("groq", key="groq[1]"):
+                pass
+        header = timeline.server_timing()
+        header.encode("latin-1")
+        assert header.startswith('groq;dur=')
+        assert 'desc="model=ab"' in header
+        assert "key=" not in header
+        assert ", groq-2;dur=" in header
+        assert header.split(", ")[-1].startswith("total;dur=")
+
+    def test_header_is_capped(self):
+        with recording() as timeline:
+            for _ in range(MAX_SERVER_TIMING_ENTRIES + 5):
+                with span("parse"):
+                    pass
+        metrics = timeline.server_timing().split(", ")
+        assert len(metrics) == MAX_SERVER_TIMING_ENTRIES + 1
+        assert len(timeline.as_debug()) == MAX_SERVER_TIMING_ENTRIES + 5
+
+
+class TestProviderAttempts:
+    def test_each_key_attempt_is_a_span(self, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEYS", "k1,k2")
+        monkeypatch.delenv("GROQ_API_KEY", raising=False)
+        once = AsyncMock(
+            side_effect=[GroqRateLimitError("HTTP 429", status_code=429), "{}"]
+        )
+        with patch.object(groq_provider, "_call_groq_once", new=once):
+            with recording() as timeline:
+                asyncio.run(
+                    groq_provider.call_groq(
+                        [{"role": "user", "content": "x"}], model="m1"
+                    )
+                )
+
+        attempts = [e.attrs for e in timeline.entries if e.name == "groq"]
+        assert [a["status"] for a in attempts] == [429, 200]
+        assert all(a["model"] == "m1" and a["key"] for a in attempts)
+
+
+class TestEndpoint:
+    @pytest.fixture
+    def client(self, monkeypatch):
+        import time as time_module
+
+        import jwt
+        from fastapi.testclient import TestClient
+
+        secret = "test-secret-value"
+        email = "owner@example.com"
+        monkeypatch.setenv("SUPABASE_JWT_SECRET", secret)
+        monkeypatch.setenv("ALLOWED_USER_EMAIL", email)
+        monkeypatch.setenv("ALLOWED_USER_EMAILS", email)
+        monkeypatch.setenv("GROQ_API_KEY", "k")
+        for name in ("GEMINI_API_KEY", "GEMINI_API_KEYS", "CLOUDFLARE_ACCOUNT_ID"):
+            monkeypatch.delenv(name, raising=False)
+
+        now = int(time_module.time())
+        token = jwt.encode(
+            {"email": email, "aud": "authenticated", "iat": now, "exp": now + 3600},
+            secret,
+            algorithm="HS256",
+        )
+        from app.main import app
+
+        async def shared_read(_key):
+            return None, []
+
+        with patch("app.db_helper.fetch_setting_and_provider_health", new=shared_read):
+            with patch(
+                "app.llm.suggestions.call_groq_with_rotation",
+                new=AsyncMock(return_value=VALID_LLM_RESPONSE),
+            ):
+                yield TestClient(app), {"Authorization": f"Bearer {token}"}
+
+    def test_server_timing_on_every_answer(self, client):
+        test_client, headers = client
+        response = test_client.post(
+            "/suggestions",
+            headers=headers,
+            json={"originalText": "原文", "targetText": "訳文"},
+        )
+        assert response.status_code == 200
+        timing = response.headers["server-timing"]
+        for phase in ("db;", "pass;", "parse;", "checks;", "flush;", "total;"):
+            assert phase in timing
+        assert "debug" not in response.json()
+
+    def test_debug_timeline_on_request(self, client):
+        test_client, headers = client
+        response = test_client.post(
+            "/suggestions",
+            headers=headers,
+            json={"originalText": "原文", "targetText": "訳文", "debug": True},
+        )
+        timeline = response.json()["debug"]["timeline"]
+        names = [entry["name"] for entry in timeline]
+        assert names[0] == "db"
+        assert {"pass", "parse", "checks", "flush"} <= set(names)
+        checks = next(entry for entry in timeline if entry["name"] == "checks")
+        assert checks["provider"] == "groq" and checks["usable"] is True
+        assert all(entry["durationMs"] >= 0 for entry in timeline)
@@ -0,0 +1,118 @@
+"""
+Tests for prompt token estimation (`backend/app/llm/tokens.py`) and the
+per-call output caps and context-window checks the providers derive from it.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.llm import cloudflare_provider, groq_provider
+from app.llm.cloudflare_provider import CloudflareError
+from app.llm.gemini_provider import GEMINI_MAX_OUTPUT_TOKENS, gemini_output_tokens
+from app.llm.groq_provider import (
+    GROQ_MAX_TOKENS,
+    GroqError,
+    call_groq_with_rotation,
+    groq_output_tokens,
+)
+from app.llm.prompts import FEW_SHOT_EXAMPLE, build_messages
+from app.llm.tokens import (
+    MIN_OUTPUT_TOKENS,
+    estimate_tokens,
+    is_short_review,
+    output_token_cap,
+    prompt_fits,
+    review_tokens,
+)
+
+SENTENCE = ("今日は学校に行きました。", "今天我去了学校。")
+ESSAY = ("今日は学校に行きました。" * 200, "今天我去了学校。" * 200)
+
+
+class TestEstimate:
+    def test_cjk_counts_about_one_token_per_character(self):
+        assert estimate_tokens("今天我去了学校") == 7
+        assert estimate_tokens("今日は学校") == 5
+
+    def test_ascii_packs_several_characters_per_token(self):
+        assert estimate_tokens("suggestions") < len("suggestions") / 2
+
+    def test_review_is_the_user_prompt_not_the_few_shot(self):
+        messages = build_messages(*SENTENCE)
+        assert review_tokens(messages) < estimate_tokens(FEW_SHOT_EXAMPLE)
+        assert is_short_review(messages)
+        assert not is_short_review(build_messages(*ESSAY))
+
+    def test_retry_nudge_does_not_shrink_the_review(self):
+        messages = build_messages(*ESSAY)
+        nudged = messages + [{"role": "user", "content": "只输出完整 JSON"}]
+        assert review_tokens(nudged) == review_tokens(messages)
+
+
+class TestOutputCaps:
+    def test_short_review_gets_a_smaller_cap(self):
+        short = output_token_cap(build_messages(*SENTENCE), ceiling=16384)
+        long = output_token_cap(build_messages(*ESSAY), ceiling=16384)
+        assert MIN_OUTPUT_TOKENS <= short < long
+
+    def test_cap_never_exceeds_the_provider_ceiling(self):
+        messages = build_messages(*ESSAY)
+        assert groq_output_tokens(messages, "openai/gpt-oss-120b") == GROQ_MAX_TOKENS
+        assert gemini_output_tokens(messages, "high") <= GEMINI_MAX_OUTPUT_TOKENS
+
+    def test_default_thinking_keeps_the_full_gemini_budget(self):
+        messages = build_messages(*SENTENCE)
+        assert gemini_output_tokens(messages, "none") == GEMINI_MAX_OUTPUT_TOKENS
+        assert gemini_output_tokens(messages, "minimal") < GEMINI_MAX_OUTPUT_TOKENS
+
+    def test_groq_sends_the_sized_cap(self, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEY", "k")
+        captured = {}
+
+        class Client:
+            def __init__(self, *args, **kwargs):
+                pass
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def post(self, url, headers=None, json=None):
+                captured.update(json)
+                raise groq_provider.httpx.ConnectError("stop here")
+
+        messages = build_messages(*SENTENCE)
+        model = "openai/gpt-oss-20b"
+        with patch.object(groq_provider.httpx, "AsyncClient", Client):
+            with pytest.raises(GroqError):
+                asyncio.run(groq_provider._call_groq_once("k", messages, model, 5.0))
+        assert captured["max_tokens"] == groq_output_tokens(messages, model)
+        assert captured["max_tokens"] < GROQ_MAX_TOKENS
+
+
+class TestContextWindows:
+    def test_unknown_window_always_fits(self):
+        assert prompt_fits([{"role": "user", "content": "x" * 10**6}], None, 4096)
+
+    def test_oversize_prompt_skips_cloudflare_without_a_call(self, monkeypatch):
+        monkeypatch.setenv("CLOUDFLARE_ACCOUNT_ID", "a")
+        monkeypatch.setenv("CLOUDFLARE_API_TOKEN", "t")
+        once = AsyncMock(return_value="{}")
+        messages = build_messages("原文" * 20_000, "訳文" * 20_000)
+        with patch.object(cloudflare_provider, "_call_cloudflare_once", new=once):
+            with pytest.raises(CloudflareError, match="context window"):
+                asyncio.run(cloudflare_provider.call_cloudflare(messages))
+        once.assert_not_called()
+
+    def test_oversize_prompt_skips_every_groq_model(self, monkeypatch):
+        monkeypatch.setenv("GROQ_API_KEY", "k")
+        monkeypatch.delenv("GROQ_MODEL", raising=False)
+        messages = build_messages("原文" * 70_000, "訳文" * 70_000)
+        with patch.object(groq_provider, "call_groq", new_callable=AsyncMock) as call:
+            with pytest.raises(GroqError, match="context window"):
+                asyncio.run(call_groq_with_rotation(messages))
+        call.assert_not_called()
@@ -0,0 +1,161 @@
+"""
+Tests for the self-hosted OpenAI-compatible provider
+(`backend/app/llm/local_provider.py`) and its place in the failover chain.
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from app.llm.key_pool import load_local_credentials, mark_cooldown
+from app.llm.local_provider import (
+    LocalLLMError,
+    LocalLLMServerError,
+    call_local_with_rotation,
+    is_local_provider_configured,
+    local_availability,
+)
+from app.llm.provider_output import ProviderOutput
+from app.llm.suggestions import generate_suggestions
+from scripts.stub_llm_server import create_app, load_scenario
+from tests.test_llm_suggestions import VALID_LLM_RESPONSE
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+_RealAsyncClient = httpx.AsyncClient
+
+
+class _FakeResponse:
+    def __init__(self, status_code=200, content="{}"):
+        self.status_code = status_code
+        self.text = ""
+        self.headers = {}
+        self._content = content
+
+    def json(self):
+        return {"choices": [{"message": {"content": self._content}}]}
+
+
+@pytest.fixture
+def local_env(monkeypatch):
+    monkeypatch.setenv("LOCAL_LLM_BASE_URL", "http://gpu-box:8080/v1/")
+    monkeypatch.setenv("LOCAL_LLM_MODELS", "qwen-local, llama-local")
+    monkeypatch.delenv("LOCAL_LLM_API_KEY", raising=False)
+    monkeypatch.delenv("LOCAL_LLM_API_KEYS", raising=False)
+
+
+class TestConfiguration:
+    def test_needs_base_url_and_models(self, monkeypatch):
+        monkeypatch.setenv("LOCAL_LLM_BASE_URL", "http://gpu-box:8080/v1")
+        monkeypatch.delenv("LOCAL_LLM_MODELS", raising=False)
+        assert not is_local_provider_configured()
+        assert not local_availability().configured
+
+    def test_keyless_server_gets_one_credential(self, local_env):
+        assert [c.api_key for c in load_local_credentials()] == [""]
+        assert is_local_provider_configured()
+
+    def test_key_pool(self, local_env, monkeypatch):
+        monkeypatch.setenv("LOCAL_LLM_API_KEYS", "k1,k2,k1")
+        assert [c.api_key for c in load_local_credentials()] == ["k1", "k2"]
+
+
+@pytest.mark.asyncio
+class TestCalls:
+    async def test_posts_to_the_configured_server(self, local_env):
+        client = AsyncMock()
+        client.post.return_value = _FakeResponse(content=VALID_LLM_RESPONSE)
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            result = await call_local_with_rotation(MESSAGES)
+
+        assert result == ProviderOutput(VALID_LLM_RESPONSE, "qwen-local")
+        url = client.post.call_args.args[0]
+        assert url == "http://gpu-box:8080/v1/chat/completions"
+        assert "Authorization" not in client.post.call_args.kwargs["headers"]
+        assert client.post.call_args.kwargs["json"]["model"] == "qwen-local"
+
+    async def test_server_error_moves_to_the_next_model(self, local_env):
+        client = AsyncMock()
+        client.post.side_effect = [_FakeResponse(503), _FakeResponse()]
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            result = await call_local_with_rotation(MESSAGES)
+        assert result.model == "llama-local"
+
+    async def test_rate_limit_cools_down_only_that_model(self, local_env):
+        client = AsyncMock()
+        client.post.side_effect = [_FakeResponse(429), _FakeResponse()]
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            result = await call_local_with_rotation(MESSAGES)
+        assert result.model == "llama-local"
+        assert not local_availability().all_cooled
+
+    async def test_unreachable_server_is_not_retried(self, local_env):
+        client = AsyncMock()
+        client.post.side_effect = httpx.ConnectError("refused")
+        with patch("app.llm.http_clients.httpx.AsyncClient", return_value=client):
+            with pytest.raises(LocalLLMError) as exc_info:
+                await call_local_with_rotation(MESSAGES)
+        assert not isinstance(exc_info.value, LocalLLMServerError)
+        assert client.post.call_count == 1
+
+    async def test_against_the_stub_server(self, monkeypatch):
+        monkeypatch.setenv("LOCAL_LLM_BASE_URL", "http://stub/local/v1")
+        monkeypatch.setenv("LOCAL_LLM_MODELS", "stub")
+        scenario = load_scenario("healthy")
+        scenario["local"]["latency"] = {"fixed_s": 0}
+        app = create_app(scenario, seed=1)
+
+        def client(**_kwargs):
+            return _RealAsyncClient(transport=httpx.ASGITransport(app=app))
+
+        with patch("app.llm.http_clients.httpx.AsyncClient", side_effect=client):
+            result = await call_local_with_rotation(MESSAGES)
+        assert result.model == "stub"
+        assert "指摘" in result.text
+        assert app.state.stub.stats["local"]["valid"] == 1
+
+
+@pytest.mark.asyncio
+class TestChain:
+    async def test_local_server_answers_before_the_clouds(self, local_env, monkeypatch):
+        monkeypatch.setenv("GEMINI_API_KEY", "gemini-key")
+        with patch(
+            "app.llm.suggestions.call_local_with_rotation",
+            new_callable=AsyncMock,
+            return_value=ProviderOutput(VALID_LLM_RESPONSE, "qwen-local"),
+        ), patch(
+            "app.llm.suggestions.call_gemini_with_rotation", new_callable=AsyncMock
+        ) as gemini:
+            result = await generate_suggestions("原文", "訳文")
+
+        assert (result["llmProvider"], result["llmModel"]) == ("local", "qwen-local")
+        gemini.assert_not_called()
+
+    async def test_failure_falls_over_to_the_clouds(self, local_env, monkeypatch):
+        monkeypatch.setenv("GEMINI_API_KEY", "gemini-key")
+        with patch(
+            "app.llm.suggestions.call_local_with_rotation",
+            new_callable=AsyncMock,
+            side_effect=LocalLLMServerError("busy", status_code=503),
+        ), patch(
+            "app.llm.suggestions.call_gemini_with_rotation",
+            new_callable=AsyncMock,
+            return_value=ProviderOutput(VALID_LLM_RESPONSE, "gemini-3.7-flash"),
+        ):
+            result = await generate_suggestions("原文", "訳文")
+        assert result["llmProvider"] == "gemini"
+
+    async def test_cooled_down_server_is_skipped(self, local_env, monkeypatch):
+        monkeypatch.setenv("GEMINI_API_KEY", "gemini-key")
+        cred = load_local_credentials()[0]
+        for model in ("qwen-local", "llama-local"):
+            mark_cooldown(cred.id, 60, scope=model)
+        with patch(
+            "app.llm.suggestions.call_local_with_rotation", new_callable=AsyncMock
+        ) as local, patch(
+            "app.llm.suggestions.call_gemini_with_rotation",
+            new_callable=AsyncMock,
+            return_value=ProviderOutput(VALID_LLM_RESPONSE, "gemini-3.7-flash"),
+        ):
+            await generate_suggestions("原文", "訳文")
+        local.assert_not_called()
@@ -53,6 +53,8 @@ class _FakeConnection:
         # columns; flip to False to simulate a database that has not been
         # migrated yet.
         self.has_provenance_columns = True
+        # Likewise for migration 011's prefetch queue columns.
+        self.has_prefetch_columns = True
 
     async def execute(self, query, *params):
         self.executed.append((query, params))
@@ -62,9 +64,17 @@ class _FakeConnection:
         # Deliberately not recorded in `executed`: schema introspection is not
         # a data query, and the tests below assert on `executed[0]`.
         if "information_schema.columns" in query:
+            if "prefetch_state" in query:
+                return self.has_prefetch_columns
             return self.has_provenance_columns
         return None
 
+    async def executemany(self, query, rows):
+        self.executed.append((query, tuple(rows)))
+
+    def transaction(self):
+        return _FakeDbContext(None)
+
     async def fetch(self, query, *params):
         self.executed.append((query, params))
         return self.fetch_result
@@ -96,6 +106,7 @@ def fake_pg_connection(monkeypatch):
     # The probe result is cached for the process, so it must not leak between
     # tests that simulate migrated and un-migrated databases.
     monkeypatch.setattr(db_helper, "_HAS_PROVENANCE_COLUMNS", None)
+    monkeypatch.setattr(db_helper, "_HAS_PREFETCH_COLUMNS", None)
     return conn
 
 
@@ -450,3 +461,104 @@ class TestDatabaseWithoutProvenanceColumns:
         assert "llm_model" not in query
         assert "gemini-3.7-flash" not in params
         assert "status = $1" in query
+
+
+class TestPrefetchQueue:
+    """Only rounds created with `awaitingPrefetch` are prefetched (migration 011).
+
+    The workspace persists every round it generates as pending, including
+    rounds with zero suggestions; those must never be regenerated.
+    """
+
+    def test_queued_round_is_flagged(self, client, auth_headers, fake_pg_connection):
+        response = client.post(
+            "/histories",
+            json={
+                "sessionId": "sess-1",
+                "originalText": "原文",
+                "targetText": "訳文",
+                "status": "pending",
+                "awaitingPrefetch": True,
+            },
+            headers=auth_headers,
+        )
+
+        assert response.status_code == 200
+        query, params = fake_pg_connection.executed[0]
+        assert "prefetch_state" in query
+        assert params[-1] == "queued"
+
+    def test_generated_pending_round_is_not_flagged(
+        self, client, auth_headers, fake_pg_connection
+    ):
+        response = client.post(
+            "/histories",
+            json={
+                "sessionId": "sess-1",
+                "originalText": "原文",
+                "targetText": "訳文",
+                "status": "pending",
+                "provider": "api",
+            },
+            headers=auth_headers,
+        )
+
+        assert response.status_code == 200
+        query, _ = fake_pg_connection.executed[0]
+        assert "prefetch_state" not in query
+
+    @pytest.mark.asyncio
+    async def test_tick_selects_only_queued_rounds(self, fake_pg_connection):
+        await db_helper.fetch_unprefetched_histories(3)
+
+        query, params = fake_pg_connection.executed[0]
+        assert "h.prefetch_state = $2" in query
+        assert params == (3, "queued")
+
+    @pytest.mark.asyncio
+    async def test_stored_round_keeps_its_provider_and_excerpts(
+        self, fake_pg_connection
+    ):
+        fake_pg_connection.fetchrow_result = _FakeRecord({"history_id": "h1"})
+        proposal = {
+            "proposalId": "p1",
+            "originalAfterText": "訳文",
+            "originalReason": "Tense.",
+            "sourceExcerpt": "原文",
+        }
+
+        stored = await db_helper.store_prefetched_suggestions(
+            "h1", [proposal], "Good.", "groq", "llama-3.3-70b-versatile"
+        )
+
+        assert stored is True
+        (check, check_params), (insert, rows), (update, params) = (
+            fake_pg_connection.executed
+        )
+        assert "h.prefetch_state = $2" in check
+        assert check_params == ("h1", "queued")
+        assert "source_excerpt" in insert
+        assert rows[0][-1] == "原文"
+        assert "prefetch_state = $2" in update
+        assert "provider = 'api'" in update
+        assert "prefetch'" not in update
+        assert params[:3] == ("h1", "ready", "Good.")
+
+    @pytest.mark.asyncio
+    async def test_claim_clears_the_state_and_not_the_provider(
+        self, fake_pg_connection
+    ):
+        await db_helper.claim_prefetched_history("s1", "原文", "訳文")
+
+        query, _ = fake_pg_connection.executed[0]
+        assert "SET prefetch_state = NULL" in query
+        assert "prefetch_state = 'ready'" in query
+        assert "provider" not in query.split("RETURNING")[0]
+
+    @pytest.mark.asyncio
+    async def test_nothing_is_queued_before_the_migration(self, fake_pg_connection):
+        fake_pg_connection.has_prefetch_columns = False
+
+        assert await db_helper.fetch_unprefetched_histories(3) == []
+        assert await db_helper.claim_prefetched_history("s1", "原文", "訳文") is None
+        assert fake_pg_connection.executed == []
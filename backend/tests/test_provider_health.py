@@ -654,7 +654,7 @@ class TestProviderRecordsWhatItWasTold:
         monkeypatch.delenv("GEMINI_API_KEYS", raising=False)
         monkeypatch.setenv("GEMINI_MODEL", "gemini-3.7-flash")
 
-        async def refuse(api_key, messages, model, timeout):
+        async def refuse(api_key, messages, model, timeout, **_kwargs):
             raise GeminiRateLimitError("429", status_code=429, retry_after=12.0)
 
         with patch.object(gemini_provider, "_call_gemini_once", new=refuse):
@@ -48,4 +48,14 @@ describe("suggestionsAPI.generate — optional exemplarTranslation", () => {
       exemplarTranslation: "模範の訳文",
     })
   })
+
+  it("sends the session id only when one is provided", async () => {
+    await suggestionsAPI.generate("原文", "対象", "", "session-1")
+
+    expect(sentBody()).toEqual({
+      originalText: "原文",
+      targetText: "対象",
+      sessionId: "session-1",
+    })
+  })
 })
@@ -299,6 +299,11 @@ export type SuggestionsResponse = {
   llmProvider?: string | null;
   /** Exact model id, e.g. gemini-3.7-flash (providers rotate per request). */
   llmModel?: string | null;
+  /**
+   * Set when the backend served a round it had prefetched: that pending
+   * history and its proposals (whose ids the suggestions carry) already exist.
+   */
+  prefetchedHistoryId?: string | null;
 };
 
 export type SuggestionsErrorResponse = {
@@ -445,10 +450,12 @@ export const suggestionsAPI = {
   // `exemplarTranslation` (模範回答訳文) is optional reference calibration.
   // The key is omitted entirely when blank so the request body — and therefore
   // the prompt the backend builds — is unchanged for users without an exemplar.
+  // `sessionId` lets the backend serve a round it prefetched for that session.
   generate: async (
     originalText: string,
     targetText: string,
     exemplarTranslation?: string,
+    sessionId?: string,
   ): Promise<SuggestionsResponse> => {
     const fullUrl = `${API_BASE_URL}/suggestions`;
     const { data: { session } } = await supabase.auth.getSession();
@@ -470,6 +477,7 @@ export const suggestionsAPI = {
           originalText,
           targetText,
           ...(trimmedExemplar ? { exemplarTranslation: trimmedExemplar } : {}),
+          ...(sessionId ? { sessionId } : {}),
         }),
       });
     } catch (networkError) {
@@ -734,6 +734,8 @@ export default function TextCorrectionApp() {
       let source: 'api' | 'webllm' = 'api'
       let llmProvider: string | undefined
       let llmModel: string | undefined
+      // A round the backend prefetched is already saved as a pending history.
+      let prefetchedHistoryId: string | undefined
 
       if (offlineMode) {
         // WebLLM ONLY when オフラインモード is explicitly ON (no API auto-fallback).
@@ -760,7 +762,12 @@ export default function TextCorrectionApp() {
       } else {
         // Cloud API only — failures surface as failed jobs; never call WebLLM.
         try {
-          const data = await suggestionsAPI.generate(originalText, targetText, exemplarTranslation)
+          const data = await suggestionsAPI.generate(
+            originalText,
+            targetText,
+            exemplarTranslation,
+            sessionIdForPersist || undefined,
+          )
           console.log("[processJobAsync] API response received:", {
             suggestionsCount: data.suggestions?.length ?? 0,
             suggestions: data.suggestions,
@@ -771,6 +778,7 @@ export default function TextCorrectionApp() {
           source = 'api'
           llmProvider = data.llmProvider || undefined
           llmModel = data.llmModel || undefined
+          prefetchedHistoryId = data.prefetchedHistoryId || undefined
         } catch (apiError) {
           // Localized message plus the per-provider breakdown: a generic
           // failure line cannot tell an unset key from an exhausted quota from
@@ -833,7 +841,11 @@ export default function TextCorrectionApp() {
       }
 
       // Shared DB: persist pending history + proposals so other envs can see them
-      if (sessionIdForPersist) {
+      if (prefetchedHistoryId) {
+        setJobQueue((prev) =>
+          prev.map((j) => (j.id === jobId ? { ...j, historyId: prefetchedHistoryId } : j)),
+        )
+      } else if (sessionIdForPersist) {
         try {
           const savedHistory = await historyAPI.createHistory({
             sessionId: sessionIdForPersist,